@@ -0,0 +1,483 @@
+import os
+import gc
+import sys
+import ast
+import json
+import copy
+import math
+import time
+import importlib.util
+import multiprocessing
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Tuple, Any, Optional
+
+# 每個輸入正規化為 (args tuple, kwargs dict)
+CallInput = Tuple[tuple, dict]
+
+@dataclass
+class BenchmarkResult:
+    function: str
+    status: str = "ok"               # ok | no_inputs | error | timeout
+    median_us: float = 0.0           # 單次呼叫耗時 (微秒，已扣除迴圈開銷)
+    p95_us: float = 0.0
+    mad_us: float = 0.0              # median absolute deviation
+    ci_low_us: float = 0.0           # 中位數的 95% 信賴區間 (順序統計量，不假設常態分佈)
+    ci_high_us: float = 0.0
+    mean_us: float = 0.0
+    rounds: int = 0                  # 樣本數
+    iterations: int = 0              # 每個樣本重複整組輸入的次數 (自動校準)
+    inputs: int = 0                  # 實際使用的輸入組數
+    rejected_inputs: int = 0         # 呼叫時拋出例外而被排除的輸入 (例如 assertRaises 的案例)
+    input_source: str = ""           # tests | generator | user
+    error: str = ""
+    samples: List[float] = field(default_factory=list)
+
+    @property
+    def median_ms(self) -> float:
+        return self.median_us / 1000
+
+# --- 輸入來源 ---
+
+def _literal(node: ast.AST, env: Dict[str, Any]):
+    """常值或先前以常值賦值的變數 (含 self.x)；無法靜態求值時拋出 ValueError"""
+    key = ast.unparse(node) if isinstance(node, (ast.Name, ast.Attribute)) else None
+    if key is not None:
+        if key in env: return env[key]
+        raise ValueError(key)
+    return ast.literal_eval(node)
+
+def collect_test_inputs(test_path: str, func_name: str, limit: int = 32) -> List[CallInput]:
+    """
+    從生成的單元測試中取出呼叫 func_name 時的參數：引數必須是常值，或是同一檔案中以常值賦值的
+    變數 / self 屬性 (setUp 常見寫法)。以 repr 去重，最多 limit 組。
+    """
+    try:
+        with open(test_path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError, ValueError):
+        return []
+
+    env = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 \
+                and isinstance(node.targets[0], (ast.Name, ast.Attribute)):
+            try:
+                env[ast.unparse(node.targets[0])] = ast.literal_eval(node.value)
+            except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+                pass
+
+    inputs, seen = [], set()
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call): continue
+        callee = node.func
+        name = callee.id if isinstance(callee, ast.Name) else callee.attr if isinstance(callee, ast.Attribute) else None
+        if name != func_name: continue
+        if any(isinstance(a, ast.Starred) for a in node.args) or any(k.arg is None for k in node.keywords):
+            continue
+        try:
+            args = tuple(_literal(a, env) for a in node.args)
+            kwargs = {k.arg: _literal(k.value, env) for k in node.keywords}
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            continue
+        key = repr((args, sorted(kwargs.items())))
+        if key in seen: continue
+        seen.add(key)
+        inputs.append((args, kwargs))
+        if len(inputs) >= limit: break
+    return inputs
+
+def normalize_inputs(items) -> List[CallInput]:
+    """使用者提供的輸入：tuple -> 位置參數，dict -> 關鍵字參數，(tuple, dict) -> 兩者，其他 -> 單一參數"""
+    result = []
+    for item in items:
+        if isinstance(item, tuple) and len(item) == 2 and isinstance(item[0], (tuple, list)) and isinstance(item[1], dict):
+            result.append((tuple(item[0]), dict(item[1])))
+        elif isinstance(item, tuple):
+            result.append((item, {}))
+        elif isinstance(item, dict):
+            result.append(((), dict(item)))
+        else:
+            result.append(((item,), {}))
+    return result
+
+# --- 統計 ---
+
+def _quantile(ordered: List[float], q: float) -> float:
+    """線性內插分位數 (ordered 已排序)"""
+    if not ordered: return 0.0
+    pos = (len(ordered) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """median / p95 / MAD / 中位數 95% 信賴區間 (二項分佈的常態近似取順序統計量)"""
+    ordered = sorted(samples)
+    n = len(ordered)
+    if n == 0:
+        return {"median_us": 0.0, "p95_us": 0.0, "mad_us": 0.0, "ci_low_us": 0.0, "ci_high_us": 0.0, "mean_us": 0.0}
+    median = _quantile(ordered, 0.5)
+    mad = _quantile(sorted(abs(x - median) for x in ordered), 0.5)
+    half = 1.96 * math.sqrt(n) / 2
+    lo = max(0, int(math.floor(n / 2 - half)) - 1)
+    hi = min(n - 1, int(math.ceil(n / 2 + half)))
+    return {"median_us": median, "p95_us": _quantile(ordered, 0.95), "mad_us": mad,
+            "ci_low_us": ordered[lo], "ci_high_us": ordered[hi], "mean_us": sum(ordered) / n}
+
+# --- Worker 行程 ---
+
+def _load_function(workspace_root: str, module_name: str, func_name: str):
+    if workspace_root not in sys.path:
+        sys.path.insert(0, workspace_root)
+    impl_file = "__init_logic__.py" if func_name == "__init__" else f"{func_name}.py"
+    impl_path = os.path.join(workspace_root, module_name, impl_file)
+    spec = importlib.util.spec_from_file_location(f"{module_name}.{func_name}", impl_path)
+    if spec is None or spec.loader is None:
+        raise ImportError(f"Implementation not found: {impl_path}")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return getattr(module, func_name)
+
+def _load_generator(path: str) -> List[CallInput]:
+    """tests/bench_<func>.py 中的 bench_inputs() (可回傳任何可迭代物件)"""
+    spec = importlib.util.spec_from_file_location("bench_inputs_" + os.path.splitext(os.path.basename(path))[0], path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return normalize_inputs(module.bench_inputs())
+
+# [修正] 需要副本時，每批預先複製的呼叫數上限 (限制記憶體用量)
+COPY_BATCH_CALLS = 10_000
+
+def _is_immutable(value) -> bool:
+    return copy.deepcopy(value) is value  # deepcopy 對不可變物件 (含只有不可變元素的 tuple) 回傳自身
+
+def _copier(value):
+    """單一參數的複製方式：不可變 -> None；元素皆不可變的 list/set/dict/bytearray -> 淺複製；其他 -> deepcopy"""
+    if _is_immutable(value):
+        return None
+    if type(value) in (list, set, bytearray) and all(_is_immutable(v) for v in value):
+        return copy.copy
+    if type(value) is dict and all(_is_immutable(v) for v in value.values()):
+        return copy.copy
+    return copy.deepcopy
+
+def _copy_plan(calls: List[CallInput]):
+    """每個輸入的 (args 複製方式, kwargs 複製方式)；全部輸入都不可變時回傳 None (不需副本)"""
+    plan = [([_copier(a) for a in args], {k: _copier(v) for k, v in kwargs.items()}) for args, kwargs in calls]
+    if all(not any(a) and not any(kw.values()) for a, kw in plan):
+        return None
+    return plan
+
+def _fresh(calls: List[CallInput], plan) -> List[CallInput]:
+    return [(tuple(c(a) if c else a for c, a in zip(arg_copiers, args)),
+             {k: kw_copiers[k](v) if kw_copiers[k] else v for k, v in kwargs.items()})
+            for (args, kwargs), (arg_copiers, kw_copiers) in zip(calls, plan)]
+
+def _batch_timer(func, calls: List[CallInput], plan=None):
+    """
+    回傳 timer(n)：整組輸入呼叫 n 輪的耗時 (ns)；func 為 None 時只量測迴圈本身的開銷。
+    [修正] plan (見 _copy_plan)：函式可能就地修改輸入 (排序、append、pop)，每次呼叫改用新的副本，
+    否則第一次呼叫之後量到的都是被改過的資料。副本在計時區段外分批預先建立。
+    """
+    def timer(n: int) -> int:
+        start = time.perf_counter_ns()
+        for _ in range(n):
+            for args, kwargs in calls:
+                func(*args, **kwargs)
+        return time.perf_counter_ns() - start
+
+    def loop_only(n: int) -> int:
+        start = time.perf_counter_ns()
+        for _ in range(n):
+            for args, kwargs in calls:
+                pass
+        return time.perf_counter_ns() - start
+
+    if plan is None:
+        return timer if func is not None else loop_only
+
+    per_batch = max(1, COPY_BATCH_CALLS // len(calls))
+    def fresh_timer(n: int) -> int:
+        total = 0
+        done = 0
+        while done < n:
+            k = min(per_batch, n - done)
+            batch = [_fresh(calls, plan) for _ in range(k)] if func is not None else [calls] * k
+            start = time.perf_counter_ns()
+            if func is not None:
+                for round_calls in batch:
+                    for args, kwargs in round_calls:
+                        func(*args, **kwargs)
+            else:
+                for round_calls in batch:
+                    for args, kwargs in round_calls:
+                        pass
+            total += time.perf_counter_ns() - start
+            done += k
+        return total
+    return fresh_timer
+
+def _run_benchmark(workspace_root: str, job: Dict) -> Dict:
+    """[Worker] 暖機 -> 校準重複次數 -> 收集樣本。樣本為單次呼叫耗時 (µs)"""
+    func = _load_function(workspace_root, job["module"], job["function"])
+    if job.get("generator"):
+        calls = _load_generator(job["generator"])
+    else:
+        calls = normalize_inputs(job["inputs"])
+
+    # 拋出例外的輸入 (測試中的錯誤案例) 不計時；驗證同樣使用副本，保留原始輸入
+    plan = _copy_plan(calls)
+    valid = []
+    for i, (args, kwargs) in enumerate(calls):
+        try:
+            call_args, call_kwargs = _fresh([(args, kwargs)], [plan[i]])[0] if plan else (args, kwargs)
+            func(*call_args, **call_kwargs)
+            valid.append(i)
+        except Exception:
+            pass
+    out = {"inputs": len(valid), "rejected_inputs": len(calls) - len(valid), "samples": [], "iterations": 0}
+    if not valid: return out
+
+    if plan is not None:
+        plan = [plan[i] for i in valid]
+    valid = [calls[i] for i in valid]
+    timer = _batch_timer(func, valid, plan)
+    loop_timer = _batch_timer(None, valid, plan)
+
+    # 1. 暖機：讓快取、惰性初始化與配置器進入穩定狀態
+    deadline = time.perf_counter() + job["warmup_s"]
+    while True:
+        timer(1)
+        if time.perf_counter() >= deadline: break
+
+    # 2. 校準：一個樣本至少 sample_s 秒，避免計時器解析度主導結果
+    target_ns = job["sample_s"] * 1e9
+    n = 1
+    while n < job["max_iterations"]:
+        elapsed = timer(n)
+        if elapsed >= target_ns: break
+        n = min(job["max_iterations"], n * 10 if elapsed <= 0 else max(n * 2, int(n * target_ns * 1.2 / elapsed)))
+    per_round = n * len(valid)
+
+    # 3. 取樣：停用 GC 降低抖動，並扣除量測迴圈本身的開銷
+    overhead = sorted(loop_timer(n) for _ in range(5))[2] / per_round
+    samples = []
+    budget = time.perf_counter() + job["max_time_s"]
+    gc.collect()
+    for i in range(job["rounds"]):
+        gc.disable()
+        try:
+            elapsed = timer(n)
+        finally:
+            gc.enable()
+        samples.append(max(0.0, elapsed / per_round - overhead) / 1000)
+        if i + 1 >= job["min_rounds"] and time.perf_counter() > budget: break
+
+    out.update(samples=samples, iterations=n)
+    return out
+
+def _bench_worker_main(conn, workspace_root: str):
+    """[Worker] 依序處理基準測試工作；被測函式的輸出導向 devnull，保持行程安靜"""
+    devnull = open(os.devnull, 'w')
+    sys.stdout = sys.stderr = devnull
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None: break
+        try:
+            conn.send({"ok": True, **_run_benchmark(workspace_root, job)})
+        except BaseException as e:
+            conn.send({"ok": False, "error": f"{type(e).__name__}: {e}"})
+    devnull.close()
+
+class _BenchWorker:
+    """單一 spawn 子行程；逾時即終止並在下一個工作前重新啟動"""
+    def __init__(self, workspace_root: str):
+        self.workspace_root = workspace_root
+        self.proc = None
+        self.conn = None
+
+    def _start(self):
+        ctx = multiprocessing.get_context("spawn")
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_bench_worker_main, args=(child, self.workspace_root), daemon=True)
+        self.proc.start()
+        child.close()
+
+    def run(self, job: Dict, timeout: float) -> Dict:
+        if self.proc is None or not self.proc.is_alive():
+            self._start()
+        self.conn.send(job)
+        try:
+            if self.conn.poll(timeout):
+                return self.conn.recv()
+            reason = "timeout"
+        except (EOFError, OSError):
+            reason = "crashed"
+        self.kill()
+        return {"ok": False, "status": reason, "error": f"Benchmark worker {reason}"}
+
+    def kill(self):
+        if self.proc is not None:
+            if self.proc.is_alive(): self.proc.kill()
+            self.proc.join()
+        if self.conn is not None: self.conn.close()
+        self.proc, self.conn = None, None
+
+    def close(self):
+        if self.proc is not None and self.proc.is_alive():
+            try:
+                self.conn.send(None)
+                self.proc.join(timeout=5)
+            except (OSError, BrokenPipeError):
+                pass
+        self.kill()
+
+class BenchmarkHarness:
+    """
+    [新增] 以 spec.json 為目標清單的統計式微基準測試。
+    - 輸入來源 (優先順序)：呼叫端傳入 > tests/bench_<func>.py 的 bench_inputs() > 生成的單元測試中的常值呼叫
+    - 在安靜的 spawn 子行程中暖機、自動校準重複次數、收集多個樣本，回報 median / p95 / MAD / 95% CI
+    - 每次執行的結果附加到 <module>/.benchmarks.json (保留最近 HISTORY 次)，燈號改用穩定的中位數
+    """
+    RESULT_FILE = ".benchmarks.json"
+    HISTORY = 20
+
+    def __init__(self, workspace_root: str, rounds: int = 30, min_rounds: int = 5, warmup_s: float = 0.1,
+                 sample_s: float = 0.01, max_time_s: float = 5.0, max_iterations: int = 1_000_000,
+                 timeout_s: float = 60.0):
+        self.workspace_root = os.path.abspath(workspace_root)
+        self.rounds = rounds
+        self.min_rounds = min_rounds
+        self.warmup_s = warmup_s
+        self.sample_s = sample_s
+        self.max_time_s = max_time_s
+        self.max_iterations = max_iterations
+        self.timeout_s = timeout_s
+        self._runs_cache = {}   # module -> (mtime, runs)
+
+    # --- 輸入 ---
+    def _spec_functions(self, module_name: str) -> List[str]:
+        spec_path = os.path.join(self.workspace_root, module_name, "spec.json")
+        try:
+            with open(spec_path, 'r', encoding='utf-8') as f:
+                return [fn['name'] for fn in json.load(f).get('functions', [])]
+        except Exception:
+            return []
+
+    def collect_inputs(self, module_name: str, func_name: str) -> Tuple[Optional[str], List[CallInput], str]:
+        """回傳 (generator 檔案路徑, 常值輸入, 來源)；有 generator 時輸入在 worker 內產生"""
+        tests_dir = os.path.join(self.workspace_root, module_name, "tests")
+        generator = os.path.join(tests_dir, f"bench_{func_name}.py")
+        if os.path.exists(generator):
+            return generator, [], "generator"
+        return None, collect_test_inputs(os.path.join(tests_dir, f"test_{func_name}.py"), func_name), "tests"
+
+    # --- 執行 ---
+    def benchmark_module(self, module_name: str, func_names: List[str] = None,
+                         inputs: Dict[str, list] = None, save: bool = True,
+                         commit: str = None) -> Dict[str, BenchmarkResult]:
+        """
+        對模組 (spec.json) 中的函式執行基準測試。
+        Args:
+            func_names: 只測這些函式 (預設為 spec 中全部)
+            inputs: { func_name: [輸入, ...] } 使用者提供的輸入 (格式見 normalize_inputs)
+            commit: 受測程式碼的版本 (記錄在該次執行中)
+        """
+        inputs = inputs or {}
+        targets = func_names or self._spec_functions(module_name)
+        print(f"[Benchmark] {module_name}: {len(targets)} function(s)")
+        results = {}
+        worker = _BenchWorker(self.workspace_root)
+        try:
+            for func_name in targets:
+                results[func_name] = self._benchmark_one(worker, module_name, func_name, inputs.get(func_name))
+        finally:
+            worker.close()
+        if save and results:
+            self.save_run(module_name, results, **({"commit": commit} if commit else {}))
+        return results
+
+    def benchmark_function(self, module_name: str, func_name: str, inputs: list = None) -> BenchmarkResult:
+        user = {func_name: inputs} if inputs is not None else None
+        return self.benchmark_module(module_name, [func_name], inputs=user)[func_name]
+
+    def _benchmark_one(self, worker: _BenchWorker, module_name: str, func_name: str, user_inputs) -> BenchmarkResult:
+        if user_inputs is not None:
+            generator, calls, source = None, normalize_inputs(user_inputs), "user"
+        else:
+            generator, calls, source = self.collect_inputs(module_name, func_name)
+        if not generator and not calls:
+            print(f"  [Skip] {func_name}: no reusable inputs")
+            return BenchmarkResult(func_name, status="no_inputs", input_source=source)
+
+        job = {"module": module_name, "function": func_name, "inputs": calls, "generator": generator,
+               "rounds": self.rounds, "min_rounds": self.min_rounds, "warmup_s": self.warmup_s,
+               "sample_s": self.sample_s, "max_time_s": self.max_time_s, "max_iterations": self.max_iterations}
+        reply = worker.run(job, self.timeout_s)
+        if not reply.get("ok"):
+            print(f"  [Error] {func_name}: {reply.get('error')}")
+            return BenchmarkResult(func_name, status=reply.get("status", "error"), input_source=source,
+                                   error=reply.get("error", ""))
+
+        result = BenchmarkResult(func_name, input_source=source, inputs=reply["inputs"],
+                                 rejected_inputs=reply["rejected_inputs"], iterations=reply["iterations"],
+                                 rounds=len(reply["samples"]), samples=[round(s, 4) for s in reply["samples"]])
+        if not reply["samples"]:
+            result.status = "no_inputs"
+            print(f"  [Skip] {func_name}: all {reply['rejected_inputs']} input(s) raised")
+            return result
+        for key, value in summarize(reply["samples"]).items():
+            setattr(result, key, round(value, 4))
+        print(f"  > {func_name}: median {result.median_us:.2f} us (95% CI {result.ci_low_us:.2f}-{result.ci_high_us:.2f}), "
+              f"p95 {result.p95_us:.2f}, MAD {result.mad_us:.2f}, {result.rounds}x{result.iterations} over {result.inputs} input(s)")
+        return result
+
+    # --- 儲存 ---
+    def _result_path(self, module_name: str) -> str:
+        return os.path.join(self.workspace_root, module_name, self.RESULT_FILE)
+
+    def save_run(self, module_name: str, results: Dict[str, BenchmarkResult], **extra) -> Dict:
+        """附加一次執行紀錄；extra 會寫入該次紀錄 (例如版本資訊)"""
+        runs = list(self.load_runs(module_name))
+        run = {"timestamp": time.strftime("%Y-%m-%d %H:%M:%S"), **extra,
+               "results": {name: asdict(r) for name, r in results.items()}}
+        runs.append(run)
+        runs = runs[-self.HISTORY:]
+        path = self._result_path(module_name)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"runs": runs}, f, indent=2)
+        except OSError as e:
+            print(f"[Benchmark] Failed to save results: {e}")
+        self._runs_cache.pop(module_name, None)
+        return run
+
+    def load_runs(self, module_name: str) -> List[Dict]:
+        """該模組的歷次執行 (舊 -> 新)；依檔案 mtime 快取，燈號重繪時不重複讀檔"""
+        path = self._result_path(module_name)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return []
+        cached = self._runs_cache.get(module_name)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                runs = json.load(f).get("runs", [])
+        except (OSError, ValueError):
+            runs = []
+        self._runs_cache[module_name] = (mtime, runs)
+        return runs
+
+    def latest(self, module_name: str, func_name: str) -> Optional[Dict]:
+        """最近一次成功的結果 (dict)；從未成功測過則為 None"""
+        for run in reversed(self.load_runs(module_name)):
+            res = run.get("results", {}).get(func_name)
+            if res and res.get("status") == "ok":
+                return res
+        return None
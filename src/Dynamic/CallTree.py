@@ -0,0 +1,152 @@
+from collections import deque
+from typing import Dict, List, Tuple, Any
+
+# 呼叫樹 (calling context tree)：同一條呼叫路徑上的重複呼叫累加到同一個節點，
+# 記憶體只隨「不同的呼叫路徑數」成長，與呼叫次數無關
+
+ROOT_KEY = ("", "root")
+
+class CallNode:
+    __slots__ = ("key", "children", "calls", "inclusive_ms")
+
+    def __init__(self, key: Tuple[str, str]):
+        self.key = key               # (檔名, qualname)
+        self.children = {}           # key -> CallNode
+        self.calls = 0
+        self.inclusive_ms = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.key[1]
+
+    @property
+    def exclusive_ms(self) -> float:
+        return max(0.0, self.inclusive_ms - sum(c.inclusive_ms for c in self.children.values()))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """巢狀 dict；以迴圈展開，深度遞迴的程式不會超出直譯器的遞迴上限"""
+        def shell(node):
+            return {"file": node.key[0], "name": node.key[1], "calls": node.calls,
+                    "inclusive_ms": round(node.inclusive_ms, 4), "exclusive_ms": round(node.exclusive_ms, 4),
+                    "children": []}
+        result = shell(self)
+        stack = [(self, result)]
+        while stack:
+            node, out = stack.pop()
+            for child in node.children.values():
+                child_out = shell(child)
+                out["children"].append(child_out)
+                stack.append((child, child_out))
+        return result
+
+class CallTree:
+    """
+    [新增] 以 (檔名, qualname) 為鍵的呼叫樹聚合器，取代逐次呼叫的 CallRecord 列表。
+    - trace 模式：enter / exit 維護執行中的呼叫堆疊，返回時把牆鐘時間累加到節點 (包含時間)；
+      排除時間 = 包含時間 - 子節點包含時間
+    - sampling 模式：record_sample 把一次取樣的時間加到整條路徑上
+    - history_size > 0 時另外以固定大小的環形緩衝區保留最近的原始呼叫事件，供時間軸檢視
+    """
+    def __init__(self, history_size: int = 10000):
+        self.root = CallNode(ROOT_KEY)
+        self.history_size = history_size
+        self.events = deque(maxlen=history_size) if history_size > 0 else None
+        self.event_count = 0          # 累計事件數 (含已被環形緩衝區淘汰的)
+        self._stack = []              # [(node, wall_start, cpu_start)]
+        self._active = {}             # key -> 堆疊上的層數 (判斷遞迴)
+
+    # --- 追蹤 ---
+    def enter(self, key: Tuple[str, str], wall: float, cpu: float, elapsed: float = 0.0):
+        parent = self._stack[-1][0] if self._stack else self.root
+        node = parent.children.get(key)
+        if node is None:
+            node = parent.children[key] = CallNode(key)
+        node.calls += 1
+        self._stack.append((node, wall, cpu))
+        self._active[key] = self._active.get(key, 0) + 1
+        self.record_event(parent.name, key[1], elapsed)
+
+    def exit(self, wall: float, cpu: float):
+        """
+        結束最內層呼叫。回傳 (key, wall_ms, cpu_ms, recursive)；recursive 表示同一函式
+        仍在外層執行中，函式層級的時間只應計入最外層那一次。堆疊為空時回傳 None。
+        """
+        if not self._stack: return None
+        node, wall_start, cpu_start = self._stack.pop()
+        wall_ms = (wall - wall_start) * 1000
+        node.inclusive_ms += wall_ms
+        depth = self._active[node.key] - 1
+        if depth: self._active[node.key] = depth
+        else: del self._active[node.key]
+        return node.key, wall_ms, (cpu - cpu_start) * 1000, depth > 0
+
+    def record_sample(self, keys: List[Tuple[str, str]], wall_ms: float, new_from: int, elapsed: float = 0.0):
+        """取樣模式：keys 為由外而內的堆疊；深度 >= new_from 的 frame 是本次取樣新觀察到的呼叫"""
+        node = self.root
+        for depth, key in enumerate(keys):
+            child = node.children.get(key)
+            if child is None:
+                child = node.children[key] = CallNode(key)
+            if depth >= new_from:
+                child.calls += 1
+                self.record_event(node.name, key[1], elapsed)
+            child.inclusive_ms += wall_ms
+            node = child
+
+    def record_event(self, caller: str, callee: str, elapsed: float):
+        self.event_count += 1
+        if self.events is not None:
+            self.events.append((caller, callee, elapsed))
+
+    def recent_events(self, since: int = 0) -> Tuple[list, int]:
+        """第 since 個事件之後、仍在環形緩衝區內的事件；回傳 (events, 目前累計事件數)"""
+        total = self.event_count
+        if self.events is None or total <= since: return [], total
+        return list(self.events)[-min(total - since, len(self.events)):], total
+
+    # --- 查詢 ---
+    def _walk(self):
+        """深度優先走訪：yield (node, parent, 此 key 是否已出現在祖先中)"""
+        stack = [(c, self.root, frozenset()) for c in self.root.children.values()]
+        while stack:
+            node, parent, ancestors = stack.pop()
+            yield node, parent, node.key in ancestors
+            inner = ancestors | {node.key}
+            stack.extend((c, node, inner) for c in node.children.values())
+
+    def functions(self) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """{ key: {calls, inclusive_ms, exclusive_ms} }；遞迴時包含時間只計最外層"""
+        result = {}
+        for node, _, recursive in self._walk():
+            f = result.setdefault(node.key, {"calls": 0, "inclusive_ms": 0.0, "exclusive_ms": 0.0})
+            f["calls"] += node.calls
+            f["exclusive_ms"] += node.exclusive_ms
+            if not recursive: f["inclusive_ms"] += node.inclusive_ms
+        return result
+
+    def edges(self) -> Dict[Tuple[Tuple[str, str], Tuple[str, str]], Dict[str, float]]:
+        """{ (caller key, callee key): {calls, time_ms} }；time_ms 為被呼叫端在此呼叫者下的包含時間"""
+        result = {}
+        for node, parent, recursive in self._walk():
+            e = result.setdefault((parent.key, node.key), {"calls": 0, "time_ms": 0.0})
+            e["calls"] += node.calls
+            if not recursive: e["time_ms"] += node.inclusive_ms
+        return result
+
+    def node_count(self) -> int:
+        return sum(1 for _ in self._walk())
+
+    # --- 序列化 (隔離模式由 worker 傳回) ---
+    def to_dict(self) -> Dict[str, Any]:
+        return self.root.to_dict()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], history_size: int = 10000) -> "CallTree":
+        tree = cls(history_size)
+        stack = [(tree.root, c) for c in data.get("children", [])]
+        while stack:
+            parent, d = stack.pop()
+            node = parent.children[(d["file"], d["name"])] = CallNode((d["file"], d["name"]))
+            node.calls, node.inclusive_ms = d["calls"], d["inclusive_ms"]
+            stack.extend((node, c) for c in d.get("children", []))
+        return tree
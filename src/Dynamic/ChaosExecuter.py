@@ -5,6 +5,8 @@ import random
 import importlib.util
 import unittest
 import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, Any, List
 from dataclasses import dataclass
 
@@ -15,6 +17,64 @@ class ChaosResult:
     survival_rate: float
     error_log: List[str]
 
+class VirtualClock:
+    """
+    [新增] 虛擬時鐘：安裝期間 time.sleep 只推進虛擬時間而不真正等待，
+    time.time / monotonic / perf_counter 回傳「真實時間 + 已推進量」。
+    讓 Latency 注入仍能觸發呼叫端的逾時判斷，但整輪測試不必實際睡眠。
+    注意：會修改 time 模組的全域屬性，只應在 chaos worker 行程內使用。
+    """
+    PATCHED = ("time", "monotonic", "perf_counter", "sleep")
+
+    def __init__(self):
+        self.offset = 0.0
+        self._orig = {}
+        self._swapped = []  # [(namespace, key, original)]
+
+    def sleep(self, seconds):
+        if seconds > 0: self.offset += seconds
+
+    def _fakes(self):
+        o = self._orig
+        return {
+            "time": lambda: o["time"]() + self.offset,
+            "monotonic": lambda: o["monotonic"]() + self.offset,
+            "perf_counter": lambda: o["perf_counter"]() + self.offset,
+            "sleep": self.sleep,
+        }
+
+    def install(self, namespaces=()):
+        """替換 time 模組屬性，以及 namespaces 中以 `from time import ...` 綁定的名稱"""
+        self._orig = {name: getattr(time, name) for name in self.PATCHED}
+        fakes = self._fakes()
+        for name, fake in fakes.items():
+            setattr(time, name, fake)
+        by_id = {id(f): fakes[name] for name, f in self._orig.items()}
+        for ns in namespaces:
+            for key, value in list(ns.items()):
+                fake = by_id.get(id(value))
+                if fake is not None:
+                    self._swapped.append((ns, key, value))
+                    ns[key] = fake
+
+    def uninstall(self):
+        for name, func in self._orig.items():
+            setattr(time, name, func)
+        for ns, key, value in self._swapped:
+            ns[key] = value
+        self._orig, self._swapped = {}, []
+
+# --- worker 行程狀態：每個 worker 只載入一次目標與測試模組 ---
+_WORKER_EXECUTER = None
+_WORKER_TEST_MODULES = {}  # { test_path: module }
+
+def _run_chaos_unit(workspace_dir: str, unit: Dict) -> Dict:
+    """[Worker] 執行一個 (函式, 注入, 回合) 單元"""
+    global _WORKER_EXECUTER
+    if _WORKER_EXECUTER is None:
+        _WORKER_EXECUTER = ChaosExecuter(workspace_dir)
+    return _WORKER_EXECUTER._run_unit(unit, _WORKER_TEST_MODULES)
+
 class ChaosExecuter:
     def __init__(self, workspace_dir: str = "./vibe_workspace"):
         self.workspace_dir = os.path.abspath(workspace_dir)
@@ -68,9 +128,94 @@ class ChaosExecuter:
 
         return wrapper
 
-    def produceChaos(self, module_name: str, test_rounds: int = 5) -> str:
+    def _load_test_module(self, test_path: str, cache: Dict):
+        """載入測試模組 (同一 worker 內快取，不再每回合重新 import)"""
+        test_mod = cache.get(test_path)
+        if test_mod is None:
+            name = "chaos_test_" + os.path.splitext(os.path.basename(test_path))[0]
+            test_spec = importlib.util.spec_from_file_location(name, test_path)
+            test_mod = importlib.util.module_from_spec(test_spec)
+            test_spec.loader.exec_module(test_mod)
+            cache[test_path] = test_mod
+        return test_mod
+
+    @staticmethod
+    def _is_target_func(value, func_name: str, impl_path: str) -> bool:
+        """判斷 value 是否為 impl_path 中定義的 func_name (同一檔案可能以不同模組名被載入多次)"""
+        code = getattr(value, "__code__", None)
+        return (getattr(value, "__name__", None) == func_name and code is not None
+                and os.path.abspath(code.co_filename) == impl_path)
+
+    def _target_namespaces(self, impl_path: str, func_name: str, test_mod) -> List[Dict]:
+        """
+        找出所有綁定了目標函式的命名空間：以任何名稱載入該實作檔的模組，
+        以及測試模組本身 (`from xxx import func` 會把函式複製到測試模組的全域變數)。
+        """
+        namespaces = []
+        for mod in list(sys.modules.values()):
+            mod_file = getattr(mod, "__file__", None)
+            if mod_file and os.path.abspath(mod_file) == impl_path:
+                namespaces.append(mod.__dict__)
+        namespaces.append(test_mod.__dict__)
+        return namespaces
+
+    def _run_unit(self, unit: Dict, test_cache: Dict) -> Dict:
+        """執行單一回合：套用有毒包裝器 -> 跑測試 -> 復原。回傳 {ok, log}"""
+        round_no = unit["round"] + 1
+        if self.workspace_dir not in sys.path:
+            sys.path.insert(0, self.workspace_dir)
+
+        target_mod = sys.modules.get(unit["module_key"])
+        if target_mod is None or getattr(target_mod, "__file__", None) != unit["impl_path"]:
+            target_mod = self._load_module_from_path(unit["impl_path"], unit["module_key"])
+        func_name = unit["function"]
+
+        clock = VirtualClock() if unit.get("virtual_clock") else None
+        patched = []  # [(namespace, key, original)]
+        try:
+            test_mod = self._load_test_module(unit["test_path"], test_cache)
+
+            # 套用「有毒」的包裝器 (所有引用到原函式的地方都要換掉)
+            original_func = getattr(target_mod, func_name, None)
+            for ns in self._target_namespaces(unit["impl_path"], func_name, test_mod):
+                for key, value in list(ns.items()):
+                    if value is original_func or self._is_target_func(value, func_name, unit["impl_path"]):
+                        patched.append((ns, key, value))
+                        ns[key] = self._create_poisoned_wrapper(value, unit["injection"])
+
+            if clock:
+                clock.install([test_mod.__dict__, target_mod.__dict__])
+
+            loader = unittest.TestLoader()
+            suite = loader.loadTestsFromModule(test_mod)
+            with open(os.devnull, 'w') as devnull:
+                runner = unittest.TextTestRunner(stream=devnull, verbosity=0) # 靜音輸出
+                result = runner.run(suite)
+
+            if result.wasSuccessful():
+                return {"ok": True, "log": None}
+            # 測試失敗 (代表程式碼沒處理好這個異常)
+            err_msg = f"Round {round_no}: Test Failed."
+            if result.errors: err_msg += f" Err: {result.errors[0][1].splitlines()[-1]}"
+            if result.failures: err_msg += f" Fail: {result.failures[0][1].splitlines()[-1]}"
+            return {"ok": False, "log": err_msg}
+
+        except Exception as e:
+            return {"ok": False, "log": f"Round {round_no}: Crashed ({str(e)})"}
+        finally:
+            # 復原原始函式 (清理戰場)
+            if clock: clock.uninstall()
+            for ns, key, value in reversed(patched):
+                ns[key] = value
+
+    def produceChaos(self, module_name: str, test_rounds: int = 5, max_workers: int = None,
+                     virtual_clock: bool = False) -> str:
         """
         執行混沌測試
+        Args:
+            max_workers: 平行 worker 行程數 (預設為 CPU 數)；1 表示在本行程內依序執行
+            virtual_clock: Latency 注入改用虛擬時鐘 (不實際睡眠，但 time.time() 等會前進)；
+                           max_workers=1 時會暫時修改本行程的 time 模組
         Returns: 報告 JSON 檔案路徑
         """
         module_dir = os.path.join(self.workspace_dir, module_name)
@@ -85,14 +230,14 @@ class ChaosExecuter:
         with open(plan_path, 'r') as f:
             plan = json.load(f)
 
-        results = []
-
-        # 遍歷計畫中的每個實驗
+        # 1. 展開成 (函式, 注入, 回合) 單元；campaigns 保持計畫中的順序以維持報告格式
+        campaigns = []
+        units = []
         for exp in plan.get('experiments', []):
             target_func_name = exp['target_function']
             injections = exp.get('injections', [])
 
-            # 1. 尋找對應的實作檔案與測試檔案
+            # 尋找對應的實作檔案與測試檔案
             impl_file = "__init_logic__.py" if target_func_name == "__init__" else f"{target_func_name}.py"
             impl_path = os.path.join(module_dir, impl_file)
             test_path = os.path.join(tests_dir, f"test_{target_func_name}.py")
@@ -101,71 +246,70 @@ class ChaosExecuter:
                 print(f"  [Skip] No unit test found for {target_func_name}. Cannot drive execution.")
                 continue
 
-            # 2. 載入目標模組 (為了 Patch)
+            # 載入目標模組確認實作存在 (實際的 Patch 在 worker 內進行)
             # 注意：這裡我們假設每個函式是獨立檔案，這讓 Patch 變得容易
             target_mod = self._load_module_from_path(impl_path, f"{module_name}.{target_func_name}")
             if not target_mod or not hasattr(target_mod, target_func_name):
                 print(f"  [Skip] Implementation not found for {target_func_name}")
                 continue
 
-            # 保存原始函式
-            original_func = getattr(target_mod, target_func_name)
-
-            # 3. 針對每種注入類型進行測試
             for inj in injections:
-                inj_type = inj['type']
-                success_count = 0
-                error_logs = []
-
-                print(f"  > Target: {target_func_name} | Attack: {inj_type} | Rounds: {test_rounds}")
+                campaign_id = len(campaigns)
+                campaigns.append((target_func_name, inj))
+                for i in range(test_rounds):
+                    units.append({
+                        "campaign": campaign_id, "round": i,
+                        "function": target_func_name, "injection": inj,
+                        "impl_path": impl_path, "test_path": test_path,
+                        "module_key": f"{module_name}.{target_func_name}",
+                        "virtual_clock": virtual_clock,
+                    })
 
-                # 套用「有毒」的包裝器
-                poisoned_func = self._create_poisoned_wrapper(original_func, inj)
-                setattr(target_mod, target_func_name, poisoned_func)
+        # 2. 執行所有單元 (跨核心平行)
+        workers = max_workers or os.cpu_count() or 1
+        workers = max(1, min(workers, len(units)))
+        print(f"  > {len(campaigns)} attacks x {test_rounds} rounds = {len(units)} units on {workers} worker(s)")
+        start = time.perf_counter()
 
-                # 4. 反覆執行測試
-                for i in range(test_rounds):
-                    # 使用 unittest TestLoader 來載入並執行該測試檔案
-                    loader = unittest.TestLoader()
+        if workers == 1:
+            test_cache = {}
+            outcomes = [self._run_unit(u, test_cache) for u in units]
+        else:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                futures = [pool.submit(_run_chaos_unit, self.workspace_dir, u) for u in units]
+                outcomes = []
+                for u, fut in zip(units, futures):
                     try:
-                        # 動態載入測試模組
-                        test_spec = importlib.util.spec_from_file_location("temp_test", test_path)
-                        test_mod = importlib.util.module_from_spec(test_spec)
-                        test_spec.loader.exec_module(test_mod)
-
-                        suite = loader.loadTestsFromModule(test_mod)
-                        runner = unittest.TextTestRunner(stream=open(os.devnull, 'w'), verbosity=0) # 靜音輸出
-                        result = runner.run(suite)
-
-                        if result.wasSuccessful():
-                            success_count += 1
-                        else:
-                            # 測試失敗 (代表程式碼沒處理好這個異常)
-                            err_msg = f"Round {i+1}: Test Failed."
-                            if result.errors: err_msg += f" Err: {result.errors[0][1].splitlines()[-1]}"
-                            if result.failures: err_msg += f" Fail: {result.failures[0][1].splitlines()[-1]}"
-                            error_logs.append(err_msg)
-
+                        outcomes.append(fut.result())
                     except Exception as e:
-                        error_logs.append(f"Round {i+1}: Crashed ({str(e)})")
+                        # worker 行程崩潰 (例如被測程式呼叫 os._exit)
+                        outcomes.append({"ok": False, "log": f"Round {u['round'] + 1}: Crashed ({str(e)})"})
+
+        # 3. 依攻擊彙整結果
+        results = []
+        for campaign_id, (target_func_name, inj) in enumerate(campaigns):
+            mine = [o for u, o in zip(units, outcomes) if u["campaign"] == campaign_id]
+            success_count = sum(1 for o in mine if o["ok"])
+            error_logs = [o["log"] for o in mine if not o["ok"]]
 
-                # 5. 復原原始函式 (清理戰場)
-                setattr(target_mod, target_func_name, original_func)
+            # 記錄結果
+            survival_rate = round(success_count / test_rounds, 2)
+            results.append({
+                "function": target_func_name,
+                "injection": inj['type'],
+                "survival_rate": survival_rate,
+                "status": "RESILIENT" if survival_rate >= 0.8 else "FRAGILE",
+                "details": inj,
+                "logs": error_logs[:3] # 只留前幾條錯誤以免 JSON 太大
+            })
 
-                # 記錄結果
-                survival_rate = round(success_count / test_rounds, 2)
-                results.append({
-                    "function": target_func_name,
-                    "injection": inj_type,
-                    "survival_rate": survival_rate,
-                    "status": "RESILIENT" if survival_rate >= 0.8 else "FRAGILE",
-                    "details": inj,
-                    "logs": error_logs[:3] # 只留前幾條錯誤以免 JSON 太大
-                })
+            print(f"  > Target: {target_func_name} | Attack: {inj['type']} | Rounds: {test_rounds}")
+            print(f"    -> Survival Rate: {survival_rate*100}%")
 
-                print(f"    -> Survival Rate: {survival_rate*100}%")
+        print(f"  > Campaign finished in {time.perf_counter() - start:.2f}s")
 
-        # 6. 輸出報告
+        # 4. 輸出報告
         report_path = os.path.join(module_dir, "chaos_report.json")
         final_output = {
             "timestamp": time.time(),
@@ -0,0 +1,404 @@
+import os
+import sys
+import time
+import json
+import struct
+import atexit
+import threading
+import multiprocessing
+from collections import deque
+# 先匯入 util，使 multiprocessing 的 atexit (join 所有非 daemon 子行程) 比 ExecutionPool.shutdown 先註冊、後執行；
+# 否則結束時會先 join 仍在等待工作的 worker 而卡住
+import multiprocessing.util
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+# --- 二進位紀錄格式 ---
+# 每筆紀錄 = header <BI (類型, payload 長度) + payload；一次 send_bytes 可包含多筆紀錄。
+# 字串 (函式名) 先以 STR 紀錄註冊一次，之後以整數 id 引用。
+REC_STR = 1      # <I id> + utf-8
+REC_CALL = 2     # 重複的 <I caller_id><I callee_id><d elapsed_sec>
+REC_METRIC = 3   # <I file_id><I qualname_id><I calls><d time_ms><d cpu_ms><Q mem_peak><Q mem_retained><Q io_r><Q io_w>
+                 # (累計值，後送的覆蓋先送的)
+REC_LINE = 4     # 重複的 <I file_id><I qualname_id><I line_no><I hits> (累計值，只送有變動的行)
+REC_SHOT = 5     # utf-8 截圖路徑
+REC_INFO = 6     # utf-8 JSON (mode / backend / sample_count)
+REC_ERROR = 7    # utf-8 錯誤訊息
+REC_DONE = 8     # 空
+REC_MEMORY = 9   # utf-8 JSON (收集器的配置位置報告；函式層級的峰值 / 保留量在 REC_METRIC 中)
+REC_TREE = 10    # utf-8 JSON (CallTree.to_dict 的結果；執行中定期送出快照，最後一份為準)
+
+_HEADER = struct.Struct("<BI")
+_STR_ID = struct.Struct("<I")
+_CALL = struct.Struct("<IId")
+_METRIC = struct.Struct("<IIIddQQQQ")
+_LINE = struct.Struct("<IIII")
+
+def _metric_values(m) -> tuple:
+    """REC_METRIC 的欄位 (名稱除外)；也用來判斷該函式的指標自上次串流後是否有變動"""
+    return (m.call_count, m.total_time_ms, m.cpu_time_ms, max(0, m.memory_peak_bytes),
+            max(0, m.memory_retained_bytes), m.io_read_bytes, m.io_write_bytes)
+
+class RecordEncoder:
+    """子行程端：把收集器的資料編碼成緊湊的二進位紀錄"""
+
+    def __init__(self):
+        self._strings = {}
+        self._buf = bytearray()
+
+    def _emit(self, rec_type: int, payload: bytes):
+        self._buf += _HEADER.pack(rec_type, len(payload))
+        self._buf += payload
+
+    def _intern(self, s: str) -> int:
+        sid = self._strings.get(s)
+        if sid is None:
+            sid = len(self._strings)
+            self._strings[s] = sid
+            self._emit(REC_STR, _STR_ID.pack(sid) + s.encode("utf-8"))
+        return sid
+
+    def calls(self, events):
+        if not events: return
+        payload = bytearray()
+        for caller, callee, elapsed in events:
+            payload += _CALL.pack(self._intern(caller), self._intern(callee), elapsed)
+        self._emit(REC_CALL, bytes(payload))
+
+    def metric(self, key: tuple, values: tuple):
+        self._emit(REC_METRIC, _METRIC.pack(self._intern(key[0]), self._intern(key[1]), *values))
+
+    def lines(self, line_hit_counts):
+        payload = bytearray()
+        for (path, qualname), hits in line_hit_counts.items():
+            fid, qid = self._intern(path), self._intern(qualname)
+            for line_no, count in hits.items():
+                payload += _LINE.pack(fid, qid, line_no, count)
+        if payload:
+            self._emit(REC_LINE, bytes(payload))
+
+    def text(self, rec_type: int, s: str):
+        self._emit(rec_type, s.encode("utf-8"))
+
+    def done(self):
+        self._emit(REC_DONE, b"")
+
+    def flush(self, conn):
+        if self._buf:
+            conn.send_bytes(bytes(self._buf))
+            self._buf = bytearray()
+
+class RecordDecoder:
+    """父行程端：解碼串流紀錄並累積成可還原收集器狀態的資料"""
+
+    def __init__(self, history_size: int = 0):
+        self._strings = {}
+        self.calls = deque(maxlen=history_size or None)   # [(caller, callee, elapsed_sec)]，與收集器的環形緩衝區同大小
+        self.tree = {}
+        self.metrics = {}        # { (file, qualname): (calls, time_ms, cpu_ms, mem_peak, mem_retained, io_r, io_w) }
+        self.lines = {}          # { (file, qualname): { line_no: hits } }
+        self.screenshots = []
+        self.info = {}
+        self.error = None
+        self.memory = {}
+        self.done = False
+
+    def feed(self, data: bytes) -> bool:
+        """解碼一個訊息；收到 DONE 時回傳 True"""
+        view = memoryview(data)
+        pos = 0
+        while pos < len(view):
+            rec_type, length = _HEADER.unpack_from(view, pos)
+            pos += _HEADER.size
+            payload = view[pos:pos + length]
+            pos += length
+
+            if rec_type == REC_STR:
+                (sid,) = _STR_ID.unpack_from(payload)
+                self._strings[sid] = bytes(payload[_STR_ID.size:]).decode("utf-8")
+            elif rec_type == REC_CALL:
+                s = self._strings
+                for caller, callee, elapsed in _CALL.iter_unpack(payload):
+                    self.calls.append((s[caller], s[callee], elapsed))
+            elif rec_type == REC_METRIC:
+                file_id, name_id, *values = _METRIC.unpack(payload)
+                self.metrics[(self._strings[file_id], self._strings[name_id])] = tuple(values)
+            elif rec_type == REC_LINE:
+                s = self._strings
+                for fid, qid, line_no, hits in _LINE.iter_unpack(payload):
+                    self.lines.setdefault((s[fid], s[qid]), {})[line_no] = hits
+            elif rec_type == REC_SHOT:
+                self.screenshots.append(bytes(payload).decode("utf-8"))
+            elif rec_type == REC_INFO:
+                self.info.update(json.loads(bytes(payload).decode("utf-8")))
+            elif rec_type == REC_TREE:
+                self.tree = json.loads(bytes(payload).decode("utf-8"))
+            elif rec_type == REC_MEMORY:
+                self.memory = json.loads(bytes(payload).decode("utf-8"))
+            elif rec_type == REC_ERROR:
+                self.error = bytes(payload).decode("utf-8")
+            elif rec_type == REC_DONE:
+                self.done = True
+        return self.done
+
+# --- 子行程 ---
+
+def _worker_main(conn, search_paths):
+    """
+    Worker 主迴圈：重複接收工作 (dict)，在本行程內以 MetricCollector 執行。
+    [修正] 執行期間由背景執行緒定期串流呼叫事件、有變動的指標 (含 IO)、行覆蓋率差量，
+    並較低頻率地送出呼叫樹快照；超時或超出記憶體而被終止時，父行程仍保有最近一次串流的資料。
+    收到 None 或父行程關閉管線時結束。
+    """
+    for p in search_paths:
+        if p not in sys.path: sys.path.append(p)
+    from MetricCollector import MetricCollector
+
+    collector = MetricCollector()
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+
+        collector.history_size = job.get("history_size", collector.history_size)
+        encoder = RecordEncoder()
+        send_lock = threading.Lock()
+        stop = threading.Event()
+        sent = 0
+        sent_metrics = {}     # (檔名, qualname) -> 上次送出的 _metric_values
+        sent_lines = {}       # ((檔名, qualname), 行號) -> 上次送出的命中數
+        tree_interval = job.get("tree_interval", 1.0)
+        next_tree = time.monotonic() + tree_interval
+
+        def stream_updates(final: bool = False):
+            """送出上次之後的新事件與變動量；執行中的收集器由另一執行緒修改，故先複製再比對"""
+            nonlocal sent, next_tree
+            events, total = collector.call_tree.recent_events(since=sent)
+            metrics = []
+            for key, m in list(collector.metrics.items()):
+                values = _metric_values(m)
+                if sent_metrics.get(key) != values:
+                    metrics.append((key, values))
+            lines = {}
+            for key, hits in list(collector._line_hit_counts.items()):
+                for line_no, count in list(hits.items()):
+                    if sent_lines.get((key, line_no)) != count:
+                        lines.setdefault(key, {})[line_no] = count
+            tree = None
+            if final or time.monotonic() >= next_tree:
+                try:
+                    tree = json.dumps(collector.getCallTree())
+                except RuntimeError:
+                    tree = None   # 走訪時呼叫樹被修改 (新增子節點)；下一輪再送
+                else:
+                    next_tree = time.monotonic() + tree_interval
+
+            with send_lock:
+                encoder.calls(events)
+                for key, values in metrics:
+                    encoder.metric(key, values)
+                encoder.lines(lines)
+                if tree is not None:
+                    encoder.text(REC_TREE, tree)
+                encoder.flush(conn)
+            sent = total
+            sent_metrics.update(metrics)
+            sent_lines.update(((key, line_no), count) for key, hits in lines.items() for line_no, count in hits.items())
+
+        def streamer():
+            while not stop.wait(job.get("flush_interval", 0.1)):
+                try: stream_updates()
+                except RuntimeError: continue   # 複製時字典正好被修改，下一輪重試
+                except Exception: break
+
+        flusher = threading.Thread(target=streamer, name="MetricStreamer", daemon=True)
+        flusher.start()
+        exec_error = None
+        try:
+            collector.execute_code(job["code"], mode=job["mode"], sample_interval=job["sample_interval"],
+                                   backend=job["backend"], coverage=job["coverage"],
+                                   memory=job.get("memory", "peak"), snapshot_at=job.get("snapshot_at"),
+                                   memory_frames=job.get("memory_frames", 16))
+            exec_error = collector.last_error
+        except Exception as e:
+            exec_error = str(e)
+        finally:
+            stop.set()
+            flusher.join()
+
+        try:
+            stream_updates(final=True)
+            with send_lock:
+                if collector.mode == "trace" and collector._memory_report:
+                    encoder.text(REC_MEMORY, json.dumps(collector._memory_report))
+                for path in collector.screenshots:
+                    encoder.text(REC_SHOT, path)
+                if exec_error:
+                    encoder.text(REC_ERROR, exec_error)
+                encoder.text(REC_INFO, json.dumps({
+                    "mode": collector.mode, "backend": collector.backend,
+                    "sample_count": collector.sample_count}))
+                encoder.done()
+                encoder.flush(conn)
+        except (BrokenPipeError, OSError):
+            break
+
+# --- 父行程 ---
+
+def _rss_bytes(pid: int):
+    """讀取子行程的常駐記憶體 (RSS)；無法取得時回傳 None"""
+    if HAS_PSUTIL:
+        try: return psutil.Process(pid).memory_info().rss
+        except Exception: return None
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+class _Worker:
+    def __init__(self, ctx, search_paths):
+        self.conn, child_conn = ctx.Pipe(duplex=True)
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, search_paths),
+                                   name="MetricWorker")
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def kill(self):
+        try: self.conn.close()
+        except OSError: pass
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+
+class ExecutionPool:
+    """
+    ExecutionPool: 隔離執行使用者程式碼的 worker 行程池。
+    - 使用 spawn 建立行程 (與 GUI 的 tkinter 狀態完全隔離)，閒置 worker 會在下次執行時重用，
+      避免每次都付出直譯器啟動與模組匯入成本；每個 worker 執行 max_jobs_per_worker 次後汰換。
+    - 父行程在等待結果時檢查牆鐘時間與 RSS 上限，超過即強制終止 worker，已收到的資料仍保留。
+    """
+    DEFAULT_TIME_LIMIT = 60.0     # 秒
+    DEFAULT_MEM_LIMIT_MB = 1024
+    POLL_INTERVAL = 0.05
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_idle: int = 2, max_jobs_per_worker: int = 20):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle = []
+        self._lock = threading.Lock()
+        self.max_idle = max_idle
+        self.max_jobs_per_worker = max_jobs_per_worker
+        # worker 需要能 import MetricCollector 及其相依模組
+        self._search_paths = [os.path.dirname(os.path.abspath(__file__))] + list(sys.path)
+
+    @classmethod
+    def shared(cls) -> "ExecutionPool":
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+                atexit.register(cls._shared.shutdown)
+            return cls._shared
+
+    def warmup(self, count: int = 1):
+        """預先啟動 worker，讓第一次執行也不需等待行程啟動"""
+        with self._lock:
+            while len(self._idle) < min(count, self.max_idle):
+                self._idle.append(_Worker(self._ctx, self._search_paths))
+
+    def _acquire(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive(): return worker
+                worker.kill()
+        return _Worker(self._ctx, self._search_paths)
+
+    def _release(self, worker: _Worker):
+        worker.jobs += 1
+        with self._lock:
+            if worker.alive() and worker.jobs < self.max_jobs_per_worker and len(self._idle) < self.max_idle:
+                self._idle.append(worker)
+                return
+        worker.close()
+
+    def run(self, job: dict, time_limit: float = None, mem_limit_mb: float = None):
+        """
+        執行一個工作並收集串流紀錄。
+        time_limit / mem_limit_mb: None 使用 DEFAULT_*，0 為不設上限
+        Returns: (RecordDecoder, status)  status: "ok" | "timeout" | "memory_limit" | "crashed"
+        """
+        time_limit = self.DEFAULT_TIME_LIMIT if time_limit is None else time_limit
+        mem_limit_mb = self.DEFAULT_MEM_LIMIT_MB if mem_limit_mb is None else mem_limit_mb
+        mem_limit = mem_limit_mb * 1024 * 1024 if mem_limit_mb else None
+
+        decoder = RecordDecoder(job.get("history_size", 0))
+        worker = self._acquire()
+        try:
+            worker.conn.send(job)
+        except (BrokenPipeError, OSError):
+            worker.kill()
+            return decoder, "crashed"
+
+        deadline = time.monotonic() + time_limit if time_limit else None
+        next_mem_check = 0.0
+        status = "ok"
+        while not decoder.done:
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                status = "timeout"
+                break
+            if mem_limit and now >= next_mem_check:
+                next_mem_check = now + self.POLL_INTERVAL
+                rss = _rss_bytes(worker.process.pid)
+                if rss is not None and rss > mem_limit:
+                    status = "memory_limit"
+                    break
+
+            timeout = self.POLL_INTERVAL if deadline is None else min(self.POLL_INTERVAL, deadline - now)
+            try:
+                if worker.conn.poll(timeout):
+                    decoder.feed(worker.conn.recv_bytes())
+                elif not worker.alive():
+                    status = "crashed"
+                    break
+            except (EOFError, OSError):
+                status = "crashed"
+                break
+
+        if status == "ok":
+            self._release(worker)
+        else:
+            worker.kill()
+        return decoder, status
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.close()
@@ -0,0 +1,263 @@
+import os
+import json
+import html
+import zlib
+import bisect
+from dataclasses import dataclass
+from typing import Dict, List, Any, Tuple
+
+# 火焰圖：由 MetricCollector.getCallTree() 的呼叫樹 (巢狀 dict) 產生
+# - collapsed stacks (Brendan Gregg 格式，flamegraph.pl / inferno 可讀)
+# - speedscope JSON (https://www.speedscope.app)
+# - 自帶互動 (點擊縮放、搜尋) 的 HTML/SVG
+# 寬度一律為包含時間 (ms)，collapsed 的數值為排除時間 (微秒)
+
+USER_FILENAME = "<string>"
+
+@dataclass
+class FlameFrame:
+    name: str
+    file: str
+    depth: int
+    start: float      # 在總寬度上的起點 (ms)
+    width: float      # 包含時間 (ms)
+    self_ms: float    # 排除時間 (ms)
+    calls: int
+    parent: int       # 父 frame 的索引，頂層為 -1
+
+    @property
+    def label(self) -> str:
+        return frame_label(self.name, self.file)
+
+def frame_label(name: str, file: str) -> str:
+    """使用者程式碼只顯示函式名，其餘附上檔名；';' 是 collapsed 格式的分隔符號，不能出現在名稱中"""
+    label = name if not file or file == USER_FILENAME else f"{name} ({os.path.basename(file)})"
+    return label.replace(";", ":")
+
+def frame_color(name: str, file: str) -> str:
+    """依名稱決定的穩定顏色：使用者程式碼為暖色系，函式庫/直譯器為冷色系"""
+    h = zlib.crc32(name.encode("utf-8"))
+    if not file or file == USER_FILENAME:
+        return "#%02x%02x%02x" % (205 + h % 50, 80 + (h >> 8) % 130, 40 + (h >> 16) % 40)
+    return "#%02x%02x%02x" % (70 + h % 40, 110 + (h >> 8) % 60, 160 + (h >> 16) % 60)
+
+class FlameLayout:
+    """
+    [新增] 火焰圖的版面配置。frames 依深度優先前序排列 (父節點一定在子節點之前)。
+    每個 frame 的子節點另外保留「依起點排序」與「依寬度遞減排序」兩份索引：visible() 只往下走
+    已畫出的 frame，並依情況以二分搜尋或寬度門檻提早結束，重繪成本與畫出的 frame 數成正比，
+    十萬個以上 frame 的剖析結果也不需要走訪全部。
+    min_fraction > 0 時捨棄比例小於此值的 frame (連同其子樹)，用於限制輸出檔大小。
+    """
+    def __init__(self, tree: Dict[str, Any], min_fraction: float = 0.0):
+        self.frames: List[FlameFrame] = []
+        top = tree.get("children", [])
+        self.total = sum(c.get("inclusive_ms", 0.0) for c in top)
+        self.dropped = 0
+        limit = self.total * min_fraction
+
+        # (節點, 深度, 起點, 可用寬度, 父索引)；子節點依序由左往右排列，寬度不超過父節點
+        stack = []
+        x = 0.0
+        for c in top:
+            stack.append((c, 0, x, c.get("inclusive_ms", 0.0), -1))
+            x += c.get("inclusive_ms", 0.0)
+        stack.reverse()
+        kids = {}
+        while stack:
+            node, depth, start, span, parent = stack.pop()
+            width = min(node.get("inclusive_ms", 0.0), span)
+            if width <= 0 or width < limit:
+                self.dropped += 1
+                continue
+            idx = len(self.frames)
+            self.frames.append(FlameFrame(node["name"], node.get("file", ""), depth, start, width,
+                                          node.get("exclusive_ms", 0.0), node.get("calls", 0), parent))
+            kids.setdefault(parent, []).append(idx)
+            children = []
+            cx, remaining = start, width
+            for child in node.get("children", []):
+                cw = min(child.get("inclusive_ms", 0.0), remaining)
+                children.append((child, depth + 1, cx, cw, idx))
+                cx += cw
+                remaining -= cw
+            stack.extend(reversed(children))
+
+        self.max_depth = max((f.depth for f in self.frames), default=-1) + 1
+        frames = self.frames
+        self._by_start = {p: sorted(c, key=lambda i: frames[i].start) for p, c in kids.items()}
+        self._starts = {p: [frames[i].start for i in c] for p, c in self._by_start.items()}
+        self._by_width = {p: sorted(c, key=lambda i: frames[i].width, reverse=True) for p, c in kids.items()}
+
+    def visible(self, x0: float, x1: float, min_width: float = 0.0):
+        """與 [x0, x1) 重疊、寬度 >= min_width 的 frame 索引 (父節點先於子節點)"""
+        frames = self.frames
+        pending = [-1]      # -1 代表頂層 (虛擬根節點)
+        while pending:
+            parent = pending.pop()
+            if parent not in self._by_start: continue
+            span = frames[parent].width if parent >= 0 else self.total
+            starts = self._starts[parent]
+            # 同一層的 frame 不重疊：起點 < x0 的只有最後一個可能跨進可見範圍
+            pos = max(0, bisect.bisect_right(starts, x0) - 1)
+            end = bisect.bisect_left(starts, x1, lo=pos)
+            # 寬度 >= min_width 的子節點最多 span / min_width 個；比可見範圍內的子節點少時改走寬度索引
+            if min_width > 0 and span / min_width < end - pos:
+                for i in self._by_width[parent]:
+                    f = frames[i]
+                    if f.width < min_width: break
+                    if f.start < x1 and f.start + f.width > x0:
+                        pending.append(i)
+                        yield i
+            else:
+                for i in self._by_start[parent][pos:end]:
+                    f = frames[i]
+                    if f.start + f.width > x0 and f.width >= min_width:
+                        pending.append(i)
+                        yield i
+
+    def search(self, pattern: str) -> Tuple[set, float]:
+        """名稱包含 pattern (不分大小寫) 的 frame 索引，以及它們涵蓋的時間 (巢狀的相符 frame 不重複計算)"""
+        pattern = pattern.lower()
+        matched, covered = set(), 0.0
+        inside = [False] * len(self.frames)
+        for i, f in enumerate(self.frames):
+            under = f.parent >= 0 and inside[f.parent]
+            if pattern in f.label.lower():
+                matched.add(i)
+                if not under: covered += f.width
+                under = True
+            inside[i] = under
+        return matched, covered
+
+# --- 匯出格式 ---
+
+def collapsed_stacks(tree: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """[(以 ';' 相連的堆疊, 排除時間 (微秒))]；排除時間為 0 的堆疊略過"""
+    result = []
+    stack = [(c, "") for c in reversed(tree.get("children", []))]
+    while stack:
+        node, prefix = stack.pop()
+        path = f"{prefix};{frame_label(node['name'], node.get('file', ''))}" if prefix else frame_label(node["name"], node.get("file", ""))
+        value = int(round(node.get("exclusive_ms", 0.0) * 1000))
+        if value > 0: result.append((path, value))
+        stack.extend((c, path) for c in reversed(node.get("children", [])))
+    return result
+
+def to_collapsed(tree: Dict[str, Any]) -> str:
+    return "".join(f"{path} {value}\n" for path, value in collapsed_stacks(tree))
+
+def to_speedscope(tree: Dict[str, Any], name: str = "MetaCoder profile") -> Dict[str, Any]:
+    """speedscope 的 sampled 格式：每個呼叫路徑一個樣本，權重為該路徑的排除時間"""
+    frames, frame_index = [], {}
+    samples, weights = [], []
+    stack = [(c, ()) for c in reversed(tree.get("children", []))]
+    while stack:
+        node, path = stack.pop()
+        key = (node["name"], node.get("file", ""))
+        fid = frame_index.get(key)
+        if fid is None:
+            fid = frame_index[key] = len(frames)
+            frames.append({"name": node["name"], "file": node.get("file", "")})
+        path = path + (fid,)
+        if node.get("exclusive_ms", 0.0) > 0:
+            samples.append(list(path))
+            weights.append(round(node["exclusive_ms"], 4))
+        stack.extend((c, path) for c in reversed(node.get("children", [])))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "MetaCoder",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled", "name": name, "unit": "milliseconds",
+            "startValue": 0, "endValue": round(sum(weights), 4),
+            "samples": samples, "weights": weights,
+        }],
+    }
+
+_HTML_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ margin: 0; background: #1e1f22; color: #ddd; font: 12px Consolas, monospace; }}
+#bar {{ padding: 6px 10px; }} #bar input {{ background: #2b2d30; color: #ddd; border: 1px solid #555; }}
+svg text {{ pointer-events: none; fill: #111; }} svg rect {{ stroke: #1e1f22; stroke-width: 0.5; cursor: pointer; }}
+rect.hit {{ fill: #e040fb !important; }}
+</style></head><body>
+<div id="bar"><b>{title}</b> &nbsp; total {total:.2f} ms &nbsp;
+<input id="q" placeholder="search" size="24"> <button onclick="reset()">Reset zoom</button> <span id="info"></span></div>
+<svg id="fg" width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">
+{body}
+</svg>
+<script>
+var W = {width}, H = {frame_h}, gs = document.querySelectorAll("#fg g");
+function fit(g, x, w) {{
+  var r = g.firstElementChild, t = g.lastElementChild, n = g.getAttribute("data-n");
+  if (w < 0.5 || x + w < 0 || x > W) {{ g.style.display = "none"; return; }}
+  var x1 = Math.min(x + w, W); x = Math.max(x, 0); w = x1 - x;
+  g.style.display = ""; r.setAttribute("x", x); r.setAttribute("width", w);
+  t.setAttribute("x", x + 3); var c = Math.floor((w - 6) / 7);
+  t.textContent = c < 3 ? "" : (n.length <= c ? n : n.slice(0, c - 2) + "..");
+}}
+function zoom(x0, w0) {{
+  gs.forEach(function (g) {{
+    var x = +g.getAttribute("data-x"), w = +g.getAttribute("data-w");
+    fit(g, (x - x0) / w0 * W, w / w0 * W);
+  }});
+}}
+function reset() {{ zoom(0, 1); }}
+gs.forEach(function (g) {{ g.onclick = function () {{ zoom(+g.getAttribute("data-x"), +g.getAttribute("data-w")); }}; }});
+document.getElementById("q").oninput = function () {{
+  var q = this.value.toLowerCase(), hits = 0;
+  gs.forEach(function (g) {{
+    var on = q && g.getAttribute("data-n").toLowerCase().indexOf(q) >= 0;
+    g.firstElementChild.classList.toggle("hit", !!on); if (on) hits++;
+  }});
+  document.getElementById("info").textContent = q ? hits + " frames" : "";
+}};
+reset();
+</script></body></html>
+"""
+
+def to_html(tree: Dict[str, Any], title: str = "MetaCoder flame graph", width: int = 1200,
+            frame_height: int = 16, min_fraction: float = 0.0005) -> str:
+    """自帶 JS 的 HTML/SVG 火焰圖；min_fraction 以下的 frame 不輸出，檔案大小與 frame 數無關"""
+    layout = FlameLayout(tree, min_fraction=min_fraction)
+    total = layout.total or 1.0
+    height = (layout.max_depth + 1) * frame_height
+    parts = []
+    for f in layout.frames:
+        y = height - (f.depth + 1) * frame_height
+        tip = f"{f.label} — {f.width:.3f} ms ({f.width / total:.1%}), self {f.self_ms:.3f} ms, {f.calls} calls"
+        parts.append(
+            f'<g data-n="{html.escape(f.label)}" data-x="{f.start / total:.6f}" data-w="{f.width / total:.6f}">'
+            f'<title>{html.escape(tip)}</title>'
+            f'<rect y="{y}" height="{frame_height - 1}" fill="{frame_color(f.name, f.file)}"/>'
+            f'<text y="{y + frame_height - 4}"></text></g>')
+    return _HTML_TEMPLATE.format(title=html.escape(title), total=layout.total, width=width, height=height,
+                                 frame_h=frame_height, body="\n".join(parts))
+
+FORMATS = ("collapsed", "speedscope", "html")
+
+def export(tree: Dict[str, Any], path: str, fmt: str = None) -> str:
+    """
+    把呼叫樹寫成檔案。fmt 為 None 時依副檔名判斷：
+    .html -> html，.speedscope.json / .json -> speedscope，其餘 -> collapsed
+    回傳實際使用的格式。
+    """
+    if fmt is None:
+        lower = path.lower()
+        fmt = "html" if lower.endswith((".html", ".htm")) else "speedscope" if lower.endswith(".json") else "collapsed"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown flame graph format: {fmt}")
+
+    if fmt == "collapsed":
+        content = to_collapsed(tree)
+    elif fmt == "speedscope":
+        content = json.dumps(to_speedscope(tree, os.path.basename(path)))
+    else:
+        content = to_html(tree, title=os.path.basename(path))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return fmt
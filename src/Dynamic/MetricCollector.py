@@ -5,10 +5,15 @@ import builtins
 import os
 import tkinter
 import importlib
+import threading
 from typing import Dict, List, Any
 from dataclasses import dataclass
 from collections import defaultdict # 記得 import 這個
+import ast
 import json
+import linecache
+from StackSampler import StackSampler
+from CallTree import CallTree
 
 try:
     from PIL import ImageGrab
@@ -30,19 +35,16 @@ def _set_dpi_awareness():
 
 @dataclass
 class FunctionMetric:
-    func_name: str
+    func_name: str                   # qualname (例如 Worker.run)
+    file: str = ""                   # 定義所在的檔案 (使用者程式為 "<string>")
     call_count: int = 0
     total_time_ms: float = 0.0
-    memory_peak_bytes: int = 0
+    cpu_time_ms: float = 0.0
+    memory_peak_bytes: int = 0       # 單次呼叫期間的真實峰值 (相對於進入時)，取所有呼叫的最大值
+    memory_retained_bytes: int = 0   # 各次呼叫返回時仍存活的新增配置總和 (包含子呼叫)
     io_read_bytes: int = 0
     io_write_bytes: int = 0
 
-@dataclass
-class CallRecord:
-    caller: str
-    callee: str
-    elapsed_time_sec: float
-
 class FileProxy:
     def __init__(self, real_file, collector):
         self._real_file = real_file
@@ -58,73 +60,446 @@ class FileProxy:
     def __enter__(self): self._real_file.__enter__(); return self
     def __exit__(self, exc_type, exc_val, exc_tb): return self._real_file.__exit__(exc_type, exc_val, exc_tb)
 
+class _MonitoringTracer:
+    """
+    [新增] 以 sys.monitoring (PEP 669, Python 3.12+) 實作的追蹤後端。
+    - PY_START 全域開啟，用來「發現」新的 code object；收集器自身/私有函式在第一次遇到時
+      回傳 DISABLE，之後該 code object 不再產生任何事件 (取代 settrace 每個事件都判斷一次)。
+    - PY_RESUME/PY_RETURN/PY_YIELD/LINE 只對接受的 code object 以 set_local_events 開啟。
+    - coverage="presence" 時，LINE 事件記錄一次後即回傳 DISABLE，該行之後不再觸發回呼
+      (有其他 sys.monitoring 工具在使用時例外，見 start())；
+      coverage="counts" 時另外開啟 JUMP，補上 settrace 在同一行向後跳躍時的 'line' 事件。
+    事件語意對齊 settrace：PY_START/PY_RESUME/PY_THROW 對應 'call'，PY_RETURN/PY_YIELD/PY_UNWIND 對應 'return'。
+    """
+    TOOL_NAME = "MetaCoder.MetricCollector"
+
+    def __init__(self, collector):
+        self.collector = collector
+        self.tool_id = None
+        self._thread_id = None
+        self._accepted = set()
+        self._line_tables = {}  # code -> { byte_offset: line }，供 JUMP 事件換算行號
+        self._disable_lines = True  # presence 模式下 LINE 記錄一次後回傳 DISABLE
+
+    @staticmethod
+    def available() -> bool:
+        return hasattr(sys, "monitoring")
+
+    def start(self):
+        mon = sys.monitoring
+        E = mon.events
+
+        # 優先使用 PROFILER_ID；若被其他工具佔用，改用未指定用途的 id
+        for tool_id in (mon.PROFILER_ID, 3, 4):
+            if mon.get_tool(tool_id) is None:
+                mon.use_tool_id(tool_id, self.TOOL_NAME)
+                self.tool_id = tool_id
+                break
+        else:
+            raise RuntimeError("No free sys.monitoring tool id")
+
+        # [修正] 上一次執行 (presence 模式) 回傳的 DISABLE 會殘留，需要 restart_events() 恢復；
+        # 但它會一併恢復「所有」工具的 DISABLE (除錯器、coverage 等自行停用的事件)，
+        # 因此只在沒有其他工具佔用 tool id 時呼叫。
+        # 取捨：有其他工具時不恢復，本次改為不回傳 LINE 的 DISABLE (較慢，但不再留下新的殘留)；
+        # 先前執行已停用的行仍不會觸發，同一行程中重複執行的程式碼其 presence 覆蓋率可能缺漏。
+        others = [mon.get_tool(i) for i in range(6) if i != self.tool_id and mon.get_tool(i) is not None]
+        self._disable_lines = not others
+        if others:
+            print(f"[MetricCollector] sys.monitoring shared with {', '.join(others)}; "
+                  f"not restarting events, coverage of previously run code may be incomplete.")
+        else:
+            mon.restart_events()
+
+        self._thread_id = threading.get_ident()
+        self._accepted = set()
+        mon.register_callback(self.tool_id, E.PY_START, self._on_start)
+        mon.register_callback(self.tool_id, E.PY_RESUME, self._on_start)
+        mon.register_callback(self.tool_id, E.PY_THROW, self._on_throw)
+        mon.register_callback(self.tool_id, E.PY_RETURN, self._on_return)
+        mon.register_callback(self.tool_id, E.PY_YIELD, self._on_return)
+        mon.register_callback(self.tool_id, E.PY_UNWIND, self._on_unwind)
+        mon.register_callback(self.tool_id, E.LINE, self._on_line)
+        mon.register_callback(self.tool_id, E.JUMP, self._on_jump)
+        # PY_THROW/PY_UNWIND 不能設為 local event，只能全域開啟 (回呼中再過濾)
+        mon.set_events(self.tool_id, E.PY_START | E.PY_THROW | E.PY_UNWIND)
+
+    def stop(self):
+        if self.tool_id is None: return
+        mon = sys.monitoring
+        E = mon.events
+        mon.set_events(self.tool_id, E.NO_EVENTS)
+        for code in self._accepted:
+            mon.set_local_events(self.tool_id, code, E.NO_EVENTS)
+        for event in (E.PY_START, E.PY_RESUME, E.PY_THROW, E.PY_RETURN, E.PY_YIELD, E.PY_UNWIND, E.LINE, E.JUMP):
+            mon.register_callback(self.tool_id, event, None)
+        mon.free_tool_id(self.tool_id)
+        self.tool_id = None
+        self._accepted = set()
+        self._line_tables = {}
+
+    def _on_start(self, code, offset):
+        if code not in self._accepted:
+            if MetricCollector._is_excluded(code):
+                return sys.monitoring.DISABLE
+            self._accepted.add(code)
+            E = sys.monitoring.events
+            local = E.PY_RESUME | E.PY_RETURN | E.PY_YIELD | E.LINE
+            # 計數模式需要 JUMP 才能像 settrace 一樣計入單行迴圈的每次迭代
+            if self.collector.coverage == "counts": local |= E.JUMP
+            sys.monitoring.set_local_events(self.tool_id, code, local)
+        # settrace 只追蹤呼叫 settrace 的執行緒；這裡以執行緒 id 對齊該行為
+        if threading.get_ident() == self._thread_id:
+            self.collector._on_call(code)
+
+    def _on_throw(self, code, offset, exception):
+        # generator.throw() 恢復執行，settrace 同樣視為 'call'
+        if code in self._accepted and threading.get_ident() == self._thread_id:
+            self.collector._on_call(code)
+
+    def _on_return(self, code, offset, retval):
+        if threading.get_ident() == self._thread_id:
+            self.collector._on_return(code)
+
+    def _on_unwind(self, code, offset, exception):
+        if code in self._accepted and threading.get_ident() == self._thread_id:
+            self.collector._on_return(code)
+
+    def _on_line(self, code, line_number):
+        if threading.get_ident() != self._thread_id: return
+        self.collector._on_line(MetricCollector._code_key(code), line_number)
+        if self.collector.coverage == "presence" and self._disable_lines:
+            return sys.monitoring.DISABLE
+
+    def _on_jump(self, code, offset, destination):
+        """
+        LINE 只在行號改變時觸發；settrace 另外會在「跳回同一行」的向後跳躍時發出 'line'
+        (例如 `for i in x: s += i` 寫在同一行)。依同樣規則補計，使兩種後端的覆蓋率一致。
+        """
+        if destination > offset:
+            return sys.monitoring.DISABLE  # 向前跳躍永遠不會產生額外的 line 事件
+        if threading.get_ident() != self._thread_id: return
+        table = self._line_tables.get(code)
+        if table is None:
+            table = {}
+            for start, end, line in code.co_lines():
+                for off in range(start, end, 2):
+                    table[off] = line
+            self._line_tables[code] = table
+        line = table.get(destination)
+        if line is None or line != table.get(offset):
+            return sys.monitoring.DISABLE  # 跨行跳躍由目標行的 LINE 事件處理，且跳躍目標固定
+        self.collector._on_line(MetricCollector._code_key(code), line)
+
 class MetricCollector:
-    def __init__(self):
+    USER_FILENAME = "<string>"   # exec(code_str) 編譯出的檔名，用來辨識使用者程式碼的 frame
+    TOP_SITES = 10
+    TOP_FUNCTION_SITES = 5
+    SNAPSHOT_GROWTH = 1.1        # 同一快照點只在記憶體成長超過 10% 時重新取快照
+
+    def __init__(self, history_size: int = 10000):
+        # 環形緩衝區保留的最近原始呼叫事件數 (0 = 不保留，只有聚合的呼叫樹)
+        self.history_size = history_size
         self._reset_state()
         self._orig_tk_methods = {}
         self._orig_open = None
 
     def _reset_state(self):
         self.metrics = {}
-        self.call_history = []
+        self.call_tree = CallTree(self.history_size)
         self.screenshots = []
         self._current_function_stack = []
-        self._start_times = {}
-        self._mem_snapshots = {}
         self._exec_start_time = 0.0
         self._last_snap_time = 0.0
         self._screenshot_interval = 1.0
 
+        # [新增] 取樣模式狀態
+        self.mode = "trace"
+        self._exec_thread_id = None
+        self._exec_boundary_code = None  # execute_code 自身的 code object，取樣時的堆疊邊界
+        self._prev_sample_stack = []     # 上一次取樣的 [(frame_id, code)]，用於偵測新的呼叫
+        self.sample_count = 0
+
+        # [新增] 追蹤後端 ("settrace" | "monitoring") 與覆蓋率模式 ("counts" | "presence")
+        self.backend = "settrace"
+        self.coverage = "counts"
+
+        # [新增] 執行結果狀態 ("ok" | "timeout" | "memory_limit" | "crashed")，隔離模式才可能非 ok
+        self.exec_status = "ok"
+        self.isolated = False
+        self.last_error = None
+
+        # [新增] 記憶體模式 ("peak" | "sites")：每層呼叫一個 [進入時, 期間峰值] 的堆疊，遞迴時各自獨立
+        self.memory = "peak"
+        self._mem_stack = []
+        self._snapshot_points = set()
+        self._snapshots = {}          # 快照點標籤 -> (traced_bytes, tracemalloc.Snapshot)
+        self._memory_report = {}      # 由快照彙整出的配置位置 / 呼叫堆疊 (見 _summarize_snapshots)
+
         # [修正] 初始化原始碼儲存列表與計數器
         self._source_code_lines: List[str] = []
-        self._line_hit_counts: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        # [修正] 指標與覆蓋率和呼叫樹一樣以 (檔名, qualname) 為鍵，不同模組的同名函式不再合併
+        self._line_hit_counts: Dict[tuple, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    def _get_metric(self, key):
+        m = self.metrics.get(key)
+        if m is None: m = self.metrics[key] = FunctionMetric(key[1], key[0])
+        return m
 
-    def _get_metric(self, name):
-        if name not in self.metrics: self.metrics[name] = FunctionMetric(name)
-        return self.metrics[name]
+    def _display_names(self, keys) -> Dict[tuple, str]:
+        """
+        (檔名, qualname) -> 輸出用的名稱：qualname 唯一時直接使用，
+        與其他檔案的函式同名時加上檔名 ("helpers.py:helper")，檔名也相同時使用完整路徑
+        """
+        by_qualname = defaultdict(set)
+        for path, qualname in keys:
+            by_qualname[qualname].add(path)
+        names = {}
+        for path, qualname in keys:
+            paths = by_qualname[qualname]
+            if len(paths) == 1:
+                names[(path, qualname)] = qualname
+            else:
+                base = os.path.basename(path)
+                unique = sum(1 for p in paths if os.path.basename(p) == base) == 1
+                names[(path, qualname)] = f"{base if unique else path}:{qualname}"
+        return names
+
+    def _names(self) -> Dict[tuple, str]:
+        return self._display_names(set(self.metrics) | set(self._line_hit_counts))
+
+    def _source_line(self, path: str, line_no: int) -> str:
+        if path == self.USER_FILENAME:
+            # 修正索引：行號從 1 開始，List 索引從 0 開始
+            if 0 <= line_no - 1 < len(self._source_code_lines):
+                return self._source_code_lines[line_no - 1].strip()
+            return "<unknown>"
+        return linecache.getline(path, line_no).strip() or "<unknown>"
 
     def _record_io(self, read=0, write=0):
+        owner = None
         if self._current_function_stack:
-            m = self._get_metric(self._current_function_stack[-1])
+            owner = self._current_function_stack[-1]
+        elif self.mode == "sampling":
+            # 取樣模式沒有維護呼叫堆疊，直接從當前 frame 往上找使用者函式
+            stack = self._user_stack(sys._getframe(1))
+            if stack: owner = self._code_key(stack[-1].f_code)
+        if owner:
+            m = self._get_metric(owner)
             m.io_read_bytes += read
             m.io_write_bytes += write
 
+    @staticmethod
+    def _is_excluded(code) -> bool:
+        # 排除自身與私有/內部函式 (與 _tracer 相同的規則)
+        return "MetricCollector" in code.co_filename or code.co_name.startswith("_")
+
+    def _user_stack(self, frame) -> list:
+        """
+        從 frame 往上走到 execute_code 的邊界，回傳由外而內 (root -> leaf) 的使用者 frame。
+        若 frame 不在 exec 範圍內 (尚未開始或已結束) 則回傳空列表。
+        """
+        stack = []
+        while frame is not None:
+            if frame.f_code is self._exec_boundary_code:
+                stack.reverse()
+                return [f for f in stack if not self._is_excluded(f.f_code)]
+            stack.append(frame)
+            frame = frame.f_back
+        return []
+
+    def _on_sample(self, frame, wall_dt: float, cpu_dt: float):
+        """
+        [取樣模式] 把一次取樣的時間歸屬到堆疊上的函式。
+        - time_ms / cpu_ms: 包含時間 (同一函式在堆疊上出現多次只算一次，處理遞迴)
+        - calls: 觀察到的新呼叫次數 (與上次取樣比對 frame 身分，為下限估計)
+        - coverage: 最內層使用者 frame 所在行的取樣次數
+        """
+        stack = self._user_stack(frame)
+        if not stack:
+            self._prev_sample_stack = []
+            return
+
+        ident = [(id(f), f.f_code) for f in stack]
+        prev = self._prev_sample_stack
+        common = 0
+        while common < len(prev) and common < len(ident) and prev[common] == ident[common]:
+            common += 1
+
+        elapsed = round(time.time() - self._exec_start_time, 6)
+        keys = [self._code_key(f.f_code) for f in stack]
+        self.call_tree.record_sample(keys, wall_dt * 1000, common, elapsed)
+        for depth in range(common, len(stack)):
+            self._get_metric(keys[depth]).call_count += 1
+
+        for key in set(keys):
+            m = self._get_metric(key)
+            m.total_time_ms += wall_dt * 1000
+            m.cpu_time_ms += cpu_dt * 1000
+
+        self._line_hit_counts[keys[-1]][stack[-1].f_lineno] += 1
+        self._prev_sample_stack = ident
+
+    # --- 追蹤事件的共用處理 (settrace 與 sys.monitoring 兩種後端共用，確保輸出一致) ---
+
+    @staticmethod
+    def _code_key(code):
+        """呼叫樹的鍵：(檔名, qualname)，不同模組/類別中的同名函式不會合併"""
+        return code.co_filename, getattr(code, "co_qualname", code.co_name)
+
+    def _on_call(self, code):
+        key = self._code_key(code)
+        now = time.time()
+        self._current_function_stack.append(key)
+        self.call_tree.enter(key, now, time.thread_time(), round(now - self._exec_start_time, 6))
+        self._mem_enter()
+        self._get_metric(key).call_count += 1
+
+    def _on_return(self, code):
+        key = self._code_key(code)
+        if self._current_function_stack and self._current_function_stack[-1] == key:
+            self._current_function_stack.pop()
+            _, wall_ms, cpu_ms, recursive = self.call_tree.exit(time.time(), time.thread_time())
+            m = self._get_metric(key)
+            # 遞迴時只計最外層呼叫的時間，內層已包含在其中
+            if not recursive:
+                m.total_time_ms += wall_ms
+                m.cpu_time_ms += cpu_ms
+            self._mem_exit(m)
+
+    # --- 記憶體：每層呼叫的真實峰值與保留量 ---
+
+    def _mem_enter(self):
+        """
+        進入函式：先把到目前為止的峰值結算給呼叫者，再重設 tracemalloc 的峰值，
+        使峰值量測從這一層開始 (取代「返回時 - 進入時」的差值，那會漏掉返回前已釋放的配置)
+        """
+        if not tracemalloc.is_tracing():
+            self._mem_stack.append(None)
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        if self._mem_stack and self._mem_stack[-1] is not None and peak > self._mem_stack[-1][1]:
+            self._mem_stack[-1][1] = peak
+        if hasattr(tracemalloc, "reset_peak"): tracemalloc.reset_peak()
+        self._mem_stack.append([current, current])
+
+    def _mem_exit(self, m: FunctionMetric):
+        frame = self._mem_stack.pop() if self._mem_stack else None
+        if frame is None or not tracemalloc.is_tracing(): return
+        current, peak = tracemalloc.get_traced_memory()
+        if not hasattr(tracemalloc, "reset_peak"): peak = current   # Python < 3.9 只能退回差值
+        base, frame_peak = frame[0], max(frame[1], peak)
+        if frame_peak - base > m.memory_peak_bytes: m.memory_peak_bytes = frame_peak - base
+        m.memory_retained_bytes += max(0, current - base)
+        if self._snapshot_points and (m.func_name in self._snapshot_points
+                                      or m.func_name.rpartition(".")[2] in self._snapshot_points):
+            self._take_snapshot(f"{m.func_name}:return", current)
+        # 子呼叫的峰值 (絕對值) 也是呼叫者的峰值
+        if self._mem_stack and self._mem_stack[-1] is not None and frame_peak > self._mem_stack[-1][1]:
+            self._mem_stack[-1][1] = frame_peak
+        if hasattr(tracemalloc, "reset_peak"): tracemalloc.reset_peak()
+
+    def _take_snapshot(self, label: str, current: int):
+        """sites 模式：在快照點取 tracemalloc 快照；每個標籤只保留記憶體最高的那一次"""
+        known = self._snapshots.get(label)
+        if known and current <= known[0] * self.SNAPSHOT_GROWTH: return
+        self._snapshots[label] = (current, tracemalloc.take_snapshot())
+
+    def _line_owners(self) -> Dict[int, str]:
+        """
+        使用者程式碼的行號 -> 所屬函式的 qualname (與 co_qualname 相同，例如 Worker.run、outer.<locals>.inner；
+        巢狀函式取最內層；模組層級為 '<module>')
+        """
+        owners = {}
+        try:
+            tree = ast.parse("\n".join(self._source_code_lines))
+        except (SyntaxError, ValueError):
+            return owners
+        # 外層函式先標記、內層後覆蓋
+        stack = [(tree, "")]
+        while stack:
+            node, prefix = stack.pop()
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    qualname = prefix + child.name
+                    for line in range(child.lineno, (child.end_lineno or child.lineno) + 1):
+                        owners[line] = qualname
+                    stack.append((child, qualname + ".<locals>."))
+                elif isinstance(child, ast.ClassDef):
+                    stack.append((child, prefix + child.name + "."))
+                else:
+                    stack.append((child, prefix))
+        return owners
+
+    def _summarize_snapshots(self):
+        """
+        把快照中的每筆存活配置歸屬到「最內層的使用者程式碼行」與使用者函式呼叫鏈。
+        配置位置在多個快照中出現時取最大的那一次，代表該位置觀察到的最高存活量。
+        """
+        owners = self._line_owners()
+        # 收集器自身的配置 (呼叫紀錄等) 以最內層 frame 排除
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        sites, stacks, snapshots = {}, {}, []
+        for label, (traced, snapshot) in sorted(self._snapshots.items(), key=lambda kv: kv[0]):
+            snap_sites, snap_stacks = defaultdict(lambda: [0, 0]), defaultdict(lambda: [0, 0])
+            for trace in snapshot.filter_traces(filters).traces:
+                user = [f.lineno for f in trace.traceback if f.filename == self.USER_FILENAME]
+                if not user: continue
+                site = snap_sites[user[-1]]
+                site[0] += trace.size
+                site[1] += 1
+                chain = tuple(owners.get(line, "<module>") for line in user)
+                entry = snap_stacks[chain]
+                entry[0] += trace.size
+                entry[1] += 1
+            for line, (size, count) in snap_sites.items():
+                if size > sites.get(line, (0,))[0]: sites[line] = (size, count)
+            for chain, (size, count) in snap_stacks.items():
+                if size > stacks.get(chain, (0,))[0]: stacks[chain] = (size, count)
+            snapshots.append({"label": label, "traced_bytes": traced,
+                              "user_bytes": sum(v[0] for v in snap_sites.values())})
+
+        def site_entry(line, size, count):
+            source = self._source_code_lines[line - 1].strip() if 0 < line <= len(self._source_code_lines) else "<unknown>"
+            return {"line": line, "function": owners.get(line, "<module>"), "source": source,
+                    "size_bytes": size, "count": count}
+
+        ranked = sorted(sites.items(), key=lambda kv: kv[1][0], reverse=True)
+        function_sites = defaultdict(list)
+        for line, (size, count) in ranked:
+            fname = owners.get(line, "<module>")
+            if len(function_sites[fname]) < self.TOP_FUNCTION_SITES:
+                function_sites[fname].append(site_entry(line, size, count))
+        self._memory_report = {
+            "top_sites": [site_entry(line, size, count) for line, (size, count) in ranked[:self.TOP_SITES]],
+            "top_stacks": [{"stack": list(chain), "size_bytes": size, "count": count}
+                           for chain, (size, count) in sorted(stacks.items(), key=lambda kv: kv[1][0], reverse=True)[:self.TOP_SITES]],
+            "snapshots": snapshots,
+            "function_sites": dict(function_sites),
+        }
+        self._snapshots = {}
+
+    def _on_line(self, key: tuple, line_no: int):
+        # [功能] 覆蓋率計算 (presence 模式只記錄是否執行過)
+        if self.coverage == "presence":
+            self._line_hit_counts[key][line_no] = 1
+        else:
+            self._line_hit_counts[key][line_no] += 1
+
     def _tracer(self, frame, event, arg):
         code = frame.f_code
-        fname = code.co_name
 
         # 排除自身
-        if "MetricCollector" in str(code.co_filename) or fname.startswith("_"):
+        if self._is_excluded(code):
             return self._tracer
 
-        now = time.time()
-
-        # [功能] 覆蓋率計算
         if event == 'line':
-            line_no = frame.f_lineno
-            self._line_hit_counts[fname][line_no] += 1
-            return self._tracer
-
-        if event == 'call':
-            caller = self._current_function_stack[-1] if self._current_function_stack else "root"
-            self.call_history.append(CallRecord(caller, fname, round(now - self._exec_start_time, 6)))
-            self._current_function_stack.append(fname)
-            self._start_times[fname] = now
-            self._mem_snapshots[fname] = tracemalloc.get_traced_memory()[0]
-            self._get_metric(fname).call_count += 1
-            return self._tracer # 必須回傳 tracer 以啟用 line 事件
-
+            self._on_line(self._code_key(code), frame.f_lineno)
+        elif event == 'call':
+            self._on_call(code)
         elif event == 'return':
-            if self._current_function_stack and self._current_function_stack[-1] == fname:
-                self._current_function_stack.pop()
-                dur = (now - self._start_times.get(fname, now)) * 1000
-                m = self._get_metric(fname)
-                m.total_time_ms += dur
-                peak = max(0, tracemalloc.get_traced_memory()[0] - self._mem_snapshots.get(fname, 0))
-                if peak > m.memory_peak_bytes: m.memory_peak_bytes = peak
-            return self._tracer
-
-        return self._tracer
+            self._on_return(code)
+        return self._tracer # 必須回傳 tracer 以啟用 line 事件
 
     def _snapshot(self, root):
         if not HAS_PIL: return
@@ -182,63 +557,274 @@ class MetricCollector:
             return FileProxy(orig_open(file, mode, *args, **kwargs), self)
         return hooked
 
-    def execute_code(self, code_str: str):
+    def execute_code(self, code_str: str, mode: str = "trace", sample_interval: float = 0.001,
+                     backend: str = "auto", coverage: str = "counts", isolated: bool = False,
+                     time_limit: float = None, mem_limit_mb: float = None,
+                     memory: str = "peak", snapshot_at: List[str] = None, memory_frames: int = 16):
+        """
+        執行使用者程式碼並收集指標。
+        Args:
+            mode: "trace"    - 逐呼叫/逐行追蹤 (精確計數，但開銷大)
+                  "sampling" - 計時器驅動的堆疊取樣 (低開銷；calls 為觀察下限，不量測記憶體)
+            sample_interval: 取樣間隔 (秒)，僅 sampling 模式使用
+            backend: trace 模式的追蹤後端
+                  "auto"       - Python 3.12+ 使用 sys.monitoring，否則退回 settrace
+                  "monitoring" - 強制使用 sys.monitoring (不支援時退回 settrace)
+                  "settrace"   - 使用 sys.settrace
+            coverage: "counts"   - 記錄每行執行次數
+                      "presence" - 只記錄是否執行過 (monitoring 後端可在首次命中後關閉該行事件)
+            isolated: True 時在可重用的 worker 子行程中執行 (見 ExecutionWorker)，
+                      不會修改本行程的 builtins.open / tkinter，結果仍還原到本收集器
+            time_limit / mem_limit_mb: 隔離模式的牆鐘時間 (秒) 與 RSS (MB) 上限，None 使用預設值，0 為不設上限
+                                        (例如 Tk 程式：mainloop 會執行到使用者關閉視窗)
+            memory: trace 模式的記憶體量測
+                    "peak"  - 每次呼叫的真實峰值與返回時保留量 (以呼叫堆疊區分遞迴)
+                    "sites" - 另外取 tracemalloc 快照，把存活配置歸屬到程式行與呼叫鏈 (見 getMemoryProfile)
+            snapshot_at: sites 模式下額外取快照的函式名 (在其返回時)；執行結束時一律取一次 "end" 快照
+            memory_frames: sites 模式每筆配置保留的堆疊深度
+        """
+        if mode not in ("trace", "sampling"):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        if backend not in ("auto", "monitoring", "settrace"):
+            raise ValueError(f"Unknown tracing backend: {backend}")
+        if coverage not in ("counts", "presence"):
+            raise ValueError(f"Unknown coverage mode: {coverage}")
+        if memory not in ("peak", "sites"):
+            raise ValueError(f"Unknown memory mode: {memory}")
+
+        if isolated:
+            self._execute_isolated(code_str, mode, sample_interval, backend, coverage, time_limit, mem_limit_mb,
+                                   memory, snapshot_at, memory_frames)
+            return
+
         _set_dpi_awareness()
         self._reset_state()
+        self.mode = mode
+        self.coverage = coverage
+        self.memory = memory
+        if memory == "sites":
+            self._snapshot_points = set(snapshot_at or ())
+
+        monitor = None
+        if mode == "trace" and backend != "settrace":
+            if _MonitoringTracer.available():
+                monitor = _MonitoringTracer(self)
+            elif backend == "monitoring":
+                print("[MetricCollector] sys.monitoring unavailable (requires Python 3.12+), falling back to settrace.")
+        self.backend = "monitoring" if monitor else "settrace"
 
         # --- [修正] 關鍵的一行：填充原始碼列表 ---
         # 處理 user_code 開頭可能的空白行，確保行號對齊
         self._source_code_lines = code_str.splitlines()
 
-        tracemalloc.start()
+        sampler = None
+        if mode == "trace":
+            tracemalloc.start(max(1, memory_frames) if memory == "sites" else 1)
         self._orig_open = builtins.open
         builtins.open = self._hook_open(self._orig_open)
         self._patch_tkinter()
+        self._exec_thread_id = threading.get_ident()
+        self._exec_boundary_code = sys._getframe().f_code
         self._exec_start_time = time.time()
-        sys.settrace(self._tracer)
+        if monitor:
+            try:
+                monitor.start()
+            except (RuntimeError, ValueError) as e:
+                print(f"[MetricCollector] sys.monitoring unavailable ({e}), falling back to settrace.")
+                monitor.stop()
+                monitor = None
+                self.backend = "settrace"
+        if mode == "trace" and not monitor:
+            sys.settrace(self._tracer)
+        elif mode == "sampling":
+            # 取樣執行緒需取得 GIL 才能讀取堆疊；暫時縮短切換間隔，否則實際取樣間隔會被拉長到預設的 5ms
+            orig_switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(orig_switch_interval, sample_interval))
+            sampler = StackSampler(self._exec_thread_id, self._on_sample, sample_interval)
+            sampler.start()
 
         global_scope = {"__name__": "__main__", "tk": tkinter, "tkinter": tkinter}
 
         try:
-            print("[MetricCollector] Executing user code...")
+            print(f"[MetricCollector] Executing user code ({mode}, {self.backend if mode == 'trace' else 'sampler'})...")
             exec(code_str, global_scope)
         except Exception as e:
+            self.last_error = str(e)
             print(f"[MetricCollector] Runtime Error: {e}")
         finally:
+            if sampler:
+                sampler.stop()
+                sys.setswitchinterval(orig_switch_interval)
+                self.sample_count = sampler.sample_count
+            if monitor:
+                monitor.stop()
             sys.settrace(None)
             if self._orig_open: builtins.open = self._orig_open
             self._unpatch_tkinter()
-            tracemalloc.stop()
+            if mode == "trace":
+                if memory == "sites":
+                    self._take_snapshot("end", tracemalloc.get_traced_memory()[0])
+                tracemalloc.stop()
+                if memory == "sites":
+                    self._summarize_snapshots()
+            self._mem_stack = []
+            self._prev_sample_stack = []
             print("[MetricCollector] Analysis finished.")
 
+    def _execute_isolated(self, code_str, mode, sample_interval, backend, coverage, time_limit, mem_limit_mb,
+                          memory="peak", snapshot_at=None, memory_frames=16):
+        """[新增] 交給 worker 子行程執行，並由串流紀錄還原收集器狀態"""
+        from ExecutionWorker import ExecutionPool
+
+        self._reset_state()
+        self.mode = mode
+        self.coverage = coverage
+        self.memory = memory
+        self.isolated = True
+        self._source_code_lines = code_str.splitlines()
+
+        job = {"code": code_str, "mode": mode, "sample_interval": sample_interval,
+               "backend": backend, "coverage": coverage,
+               "memory": memory, "snapshot_at": list(snapshot_at or ()), "memory_frames": memory_frames,
+               "history_size": self.history_size}
+        print(f"[MetricCollector] Executing user code ({mode}, isolated)...")
+        records, status = ExecutionPool.shared().run(job, time_limit=time_limit, mem_limit_mb=mem_limit_mb)
+
+        # 被終止的 worker 只留下最後一次串流的呼叫樹快照 (之後的呼叫由最近事件補上時間軸)
+        if records.tree:
+            self.call_tree = CallTree.from_dict(records.tree, self.history_size)
+        for caller, callee, elapsed in records.calls:
+            self.call_tree.record_event(caller, callee, elapsed)
+        for key, (calls, time_ms, cpu_ms, mem_peak, mem_retained, io_r, io_w) in records.metrics.items():
+            m = self._get_metric(key)
+            m.call_count, m.total_time_ms, m.cpu_time_ms = calls, time_ms, cpu_ms
+            m.memory_peak_bytes, m.memory_retained_bytes = mem_peak, mem_retained
+            m.io_read_bytes, m.io_write_bytes = io_r, io_w
+        for key, hits in records.lines.items():
+            self._line_hit_counts[key].update(hits)
+        self._memory_report = records.memory
+        self.screenshots = records.screenshots
+        self.backend = records.info.get("backend", self.backend)
+        self.sample_count = records.info.get("sample_count", 0)
+        self.last_error = records.error
+        self.exec_status = status
+
+        if status != "ok":
+            # 超時或超出記憶體時 worker 已被終止；指標、覆蓋率與呼叫樹為最後一次串流的內容
+            print(f"[MetricCollector] Worker terminated: {status}")
+        print("[MetricCollector] Analysis finished.")
+
+    def measureOverhead(self, code_str: str, repeats: int = 3, sample_interval: float = 0.001) -> Dict[str, Any]:
+        """
+        [新增] 開銷報告：同一段程式分別以「無量測 / trace / sampling」執行，比較牆鐘時間。
+        每種模式取 repeats 次中的最小值。注意：結束後收集器保留的是最後一次 (sampling) 的數據。
+        """
+        def timed(fn):
+            best = float("inf")
+            for _ in range(max(1, repeats)):
+                start = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - start)
+            return best * 1000
+
+        compiled = compile(code_str, "<string>", "exec")
+        baseline_ms = timed(lambda: exec(compiled, {"__name__": "__main__", "tk": tkinter, "tkinter": tkinter}))
+        trace_ms = timed(lambda: self.execute_code(code_str, mode="trace"))
+        sampling_ms = timed(lambda: self.execute_code(code_str, mode="sampling", sample_interval=sample_interval))
+
+        def ratio(x): return round(x / baseline_ms, 2) if baseline_ms > 0 else 0.0
+        return {
+            "baseline_ms": round(baseline_ms, 3),
+            "trace_ms": round(trace_ms, 3),
+            "sampling_ms": round(sampling_ms, 3),
+            "trace_overhead_x": ratio(trace_ms),
+            "sampling_overhead_x": ratio(sampling_ms),
+            "sample_interval_ms": sample_interval * 1000,
+            "samples": self.sample_count,
+        }
+
     # --- APIs ---
+    # [修正] 以下輸出的函式名稱由 _display_names 產生：同名函式來自不同檔案時以 "檔名:qualname" 區分
     def getBenchmarkData(self):
         res = {}
-        for n, m in self.metrics.items():
+        names = self._names()
+        for key, m in self.metrics.items():
             avg = m.total_time_ms / m.call_count if m.call_count else 0
-            res[n] = {"calls": m.call_count, "time_ms": round(m.total_time_ms, 4), "avg_ms": round(avg, 4), "mem_peak": m.memory_peak_bytes}
+            res[names[key]] = {"calls": m.call_count, "time_ms": round(m.total_time_ms, 4), "avg_ms": round(avg, 4), "cpu_ms": round(m.cpu_time_ms, 4), "mem_peak": m.memory_peak_bytes,
+                               "file": m.file, "qualname": m.func_name}
         return res
-    def getCallHistory(self): return [vars(c) for c in self.call_history]
-    def getIOHistory(self): return {n: {"r": m.io_read_bytes, "w": m.io_write_bytes} for n, m in self.metrics.items() if m.io_read_bytes or m.io_write_bytes}
+    def findFunctions(self, name: str) -> List[str]:
+        """
+        [新增] 對應到 name 的輸出名稱：完全相同、qualname 相同或 qualname 的最後一段相同 (例如 "run" -> "Worker.run")。
+        同名函式分屬不同檔案時回傳多個，由呼叫端依模組路徑挑選。
+        """
+        names = self._names()
+        exact = [n for n in names.values() if n == name]
+        if exact: return exact
+        return sorted(n for (_, qualname), n in names.items()
+                      if qualname == name or qualname.rpartition(".")[2] == name)
+    def getCallHistory(self):
+        """最近的原始呼叫事件 (環形緩衝區，最多 history_size 筆)，供時間軸檢視"""
+        events = self.call_tree.events or ()
+        return [{"caller": c, "callee": e, "elapsed_time_sec": t} for c, e, t in events]
+    def getCallTree(self): return self.call_tree.to_dict()
+    def exportFlameGraph(self, path: str, fmt: str = None) -> str:
+        """[新增] 把本次執行的呼叫樹匯出為 collapsed / speedscope / html 火焰圖 (見 FlameGraph.export)"""
+        import FlameGraph
+        return FlameGraph.export(self.getCallTree(), path, fmt)
+    def getCallGraph(self) -> List[Dict[str, Any]]:
+        """[新增] 聚合的呼叫邊：每對 (caller, callee) 一筆，含呼叫次數與被呼叫端的包含時間"""
+        edges = self.call_tree.edges()
+        names = self._display_names(set(self.metrics) | set(self._line_hit_counts) | {k for e in edges for k in e})
+        return [{"caller": names[u], "callee": names[v], "caller_file": u[0], "callee_file": v[0],
+                 "calls": e["calls"], "time_ms": round(e["time_ms"], 4)}
+                for (u, v), e in sorted(edges.items(), key=lambda kv: kv[1]["time_ms"], reverse=True)]
+    def getIOHistory(self):
+        names = self._names()
+        return {names[k]: {"r": m.io_read_bytes, "w": m.io_write_bytes} for k, m in self.metrics.items() if m.io_read_bytes or m.io_write_bytes}
     def getGUIScreenshot(self): return self.screenshots
 
+    def getMemoryProfile(self, target_funcs: List[str] = None) -> Dict[str, Any]:
+        """
+        [新增] 記憶體剖析結果 (trace 模式)。
+        functions: 每個函式的 peak_bytes (單次呼叫真實峰值)、retained_bytes (返回時仍存活的配置總和)
+                   與 top_sites (sites 模式：存活量最大的配置行)
+        top_sites / top_stacks: sites 模式下整體存活量最大的配置行 / 使用者函式呼叫鏈
+        snapshots: 各快照點的標籤與當下的記憶體量
+        """
+        if self.mode != "trace":
+            return {"mode": None, "functions": {}, "top_sites": [], "top_stacks": [], "snapshots": []}
+        # 配置位置只能歸屬到使用者程式碼 (以 qualname 為鍵)
+        function_sites = self._memory_report.get("function_sites", {})
+        names = self._names()
+        functions = {}
+        for key, m in self.metrics.items():
+            name = names[key]
+            if target_funcs and name not in target_funcs: continue
+            functions[name] = {"calls": m.call_count, "peak_bytes": m.memory_peak_bytes,
+                               "retained_bytes": m.memory_retained_bytes,
+                               "top_sites": function_sites.get(m.func_name, []) if m.file == self.USER_FILENAME else []}
+        top_sites = self._memory_report.get("top_sites", [])
+        top_stacks = self._memory_report.get("top_stacks", [])
+        if target_funcs:
+            top_sites = [s for s in top_sites if s["function"] in target_funcs]
+            top_stacks = [s for s in top_stacks if any(f in target_funcs for f in s["stack"])]
+        return {"mode": self.memory, "functions": functions, "top_sites": top_sites,
+                "top_stacks": top_stacks, "snapshots": self._memory_report.get("snapshots", [])}
+
     # --- [功能] 獲取覆蓋率報告 ---
     def getCodeCoverage(self) -> Dict[str, Any]:
         coverage_report = {}
-        for func_name, line_hits in self._line_hit_counts.items():
+        names = self._names()
+        for key, line_hits in self._line_hit_counts.items():
             func_report = {}
             for line_no, count in line_hits.items():
-                code_content = "<unknown>"
-                # 修正索引：行號從 1 開始，List 索引從 0 開始
-                if 0 <= line_no - 1 < len(self._source_code_lines):
-                    code_content = self._source_code_lines[line_no - 1].strip()
-
                 func_report[f"line_{line_no}"] = {
-                    "source": code_content,
+                    "source": self._source_line(key[0], line_no),
                     "hits": count,
                     "type": "loop_hotspot" if count > 1 else "visited"
                 }
-            coverage_report[func_name] = func_report
+            coverage_report[names[key]] = func_report
         return coverage_report
 
     # --- [功能] 標準化輸出 ---
@@ -247,8 +833,11 @@ class MetricCollector:
         將收集到的數據打包成 JSON。
         Args:
             target_funcs: 若指定，則只輸出這些函式的數據 (例如 ["complex_logic"])。
-                          若為 None 或空，則輸出全部。
+                          若為 None 或空，則輸出全部。名稱依 findFunctions 對應，
+                          同名函式分屬不同檔案時全部輸出 (鍵為 "檔名:qualname")。
         """
+        if target_funcs:
+            target_funcs = sorted({n for t in target_funcs for n in (self.findFunctions(t) or [t])})
 
         # 輔助過濾函式
         def filter_dict(source_dict):
@@ -256,7 +845,7 @@ class MetricCollector:
             return {k: v for k, v in source_dict.items() if k in target_funcs}
 
         # 針對 Call Graph 的特殊過濾 (只保留 caller 或 callee 在目標清單中的紀錄)
-        filtered_calls = self.getCallHistory()
+        filtered_calls = self.getCallGraph()
         if target_funcs:
             filtered_calls = [
                 c for c in filtered_calls
@@ -267,12 +856,17 @@ class MetricCollector:
             "meta": {
                 "timestamp": time.time(),
                 "platform": sys.platform,
+                "mode": self.mode,
+                "backend": self.backend if self.mode == "trace" else None,
+                "isolated": self.isolated,
+                "status": self.exec_status,
                 "filter_applied": target_funcs if target_funcs else "ALL"
             },
             "performance": filter_dict(self.getBenchmarkData()),
             "io_activity": filter_dict(self.getIOHistory()),
             "code_coverage": filter_dict(self.getCodeCoverage()),
             "call_graph": filtered_calls,
+            "memory": self.getMemoryProfile(target_funcs),
             # Screenshot 是全域的，無法依函式過濾，故保留
             "gui_screenshots": self.getGUIScreenshot(),
         }
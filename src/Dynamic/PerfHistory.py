@@ -0,0 +1,198 @@
+import os
+import json
+import math
+import time
+import threading
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+def mann_whitney(baseline: List[float], current: List[float]) -> Dict[str, float]:
+    """
+    Mann-Whitney U 檢定 (常態近似，含同分修正與連續性修正)。
+    回傳 {u, p_slower, p_faster}：current 整體大於 / 小於 baseline 的單尾 p 值。
+    不假設樣本為常態分佈，適合有長尾的計時資料。
+    """
+    na, nb = len(baseline), len(current)
+    if na == 0 or nb == 0:
+        return {"u": 0.0, "p_slower": 1.0, "p_faster": 1.0}
+    pooled = sorted([(x, 0) for x in baseline] + [(x, 1) for x in current])
+    n = na + nb
+    rank_sum_b, tie_term, i = 0.0, 0.0, 0
+    while i < n:
+        j = i
+        while j + 1 < n and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        avg_rank = (i + j) / 2 + 1
+        rank_sum_b += avg_rank * sum(1 for k in range(i, j + 1) if pooled[k][1] == 1)
+        t = j - i + 1
+        tie_term += t ** 3 - t
+        i = j + 1
+    u = rank_sum_b - nb * (nb + 1) / 2
+    mean = na * nb / 2
+    var = na * nb / 12 * ((n + 1) - tie_term / (n * (n - 1)))
+    if var <= 0:
+        return {"u": u, "p_slower": 1.0, "p_faster": 1.0}
+    sd = math.sqrt(var)
+    z_slower = (u - mean - 0.5) / sd
+    z_faster = (mean - u - 0.5) / sd
+    return {"u": u, "p_slower": 0.5 * math.erfc(z_slower / math.sqrt(2)),
+            "p_faster": 0.5 * math.erfc(z_faster / math.sqrt(2))}
+
+@dataclass
+class PerfComparison:
+    module: str
+    function: str
+    commit: str
+    baseline_commit: str
+    median_us: float
+    baseline_median_us: float
+    change: float          # median 相對變化 (+0.25 = 慢 25%)
+    p_value: float         # 對應方向的單尾 p 值
+    verdict: str           # regression | improvement | unchanged
+
+class PerfHistory:
+    """
+    [新增] 以 VersionController 的 commit hash 為鍵的效能歷史。
+    - record：保存某次基準測試的結果 (含原始樣本)，並與最近一個有同函式結果的祖先 commit 比較
+    - 比較以 Mann-Whitney U 檢定判斷顯著性，再要求中位數變化超過 min_change，避免把雜訊當成退化
+    - 存放在 .metacoder_cache (不進版本歷史)，rollback 不會抹掉效能紀錄
+    """
+    HISTORY_FILE = os.path.join(".metacoder_cache", "perf_history.json")
+    MAX_COMMITS = 200
+
+    def __init__(self, workspace_root: str, alpha: float = 0.01, min_change: float = 0.05):
+        self.workspace_root = os.path.abspath(workspace_root)
+        self.alpha = alpha
+        self.min_change = min_change
+        self._lock = threading.Lock()
+        self._data = None
+        self._mtime = None
+
+    # --- 儲存 ---
+    @property
+    def path(self) -> str:
+        return os.path.join(self.workspace_root, self.HISTORY_FILE)
+
+    def _load(self) -> Dict:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if self._data is None or mtime != self._mtime:
+            data = {}
+            if mtime is not None:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                except (OSError, ValueError):
+                    data = {}
+            data.setdefault("commits", {})     # hash -> {timestamp, message, functions, comparisons}
+            data.setdefault("latest", {})      # "module.func" -> 最近一次記錄它的 commit
+            self._data, self._mtime = data, mtime
+        return self._data
+
+    def _save(self):
+        data = self._data
+        # 只保留最近 MAX_COMMITS 個 commit 的紀錄
+        if len(data["commits"]) > self.MAX_COMMITS:
+            ordered = sorted(data["commits"], key=lambda h: data["commits"][h].get("timestamp", ""))
+            for h in ordered[:len(ordered) - self.MAX_COMMITS]:
+                del data["commits"][h]
+            data["latest"] = {k: h for k, h in data["latest"].items() if h in data["commits"]}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            self._mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            print(f"[PerfHistory] Failed to save history: {e}")
+
+    # --- 記錄與比較 ---
+    def record(self, commit: str, module_name: str, results: Dict, ancestors: List[str] = (),
+               message: str = "", dirty: bool = False) -> List[PerfComparison]:
+        """
+        保存 commit 上的基準測試結果並與祖先比較。
+        Args:
+            results: { func: BenchmarkResult 或其 dict }；只記錄 status == "ok" 的函式
+            ancestors: commit 的祖先 hash (由新到舊，可包含 commit 本身)
+            dirty: commit 是量測前自動歸檔的快照，含有使用者尚未提交的編輯 (不是刻意的重新生成)
+        """
+        with self._lock:
+            data = self._load()
+            entry = data["commits"].setdefault(commit, {"functions": {}, "comparisons": {}})
+            entry["timestamp"] = time.strftime("%Y-%m-%d %H:%M:%S")
+            if message: entry["message"] = message
+            if dirty: entry["dirty"] = True
+
+            comparisons = []
+            for func_name, res in results.items():
+                res = res if isinstance(res, dict) else asdict(res)
+                if res.get("status") != "ok" or not res.get("samples"): continue
+                key = f"{module_name}.{func_name}"
+                entry["functions"][key] = {k: res[k] for k in ("median_us", "p95_us", "mad_us", "ci_low_us",
+                                                               "ci_high_us", "samples") if k in res}
+                data["latest"][key] = commit
+                cmp = self._compare(data, key, commit, ancestors)
+                if cmp:
+                    entry["comparisons"][key] = asdict(cmp)
+                    comparisons.append(cmp)
+                else:
+                    entry["comparisons"].pop(key, None)
+            self._save()
+
+        for cmp in comparisons:
+            if cmp.verdict != "unchanged":
+                print(f"[PerfHistory] {cmp.module}.{cmp.function}: {cmp.verdict} {cmp.change:+.1%} "
+                      f"vs {cmp.baseline_commit[:7]} (p={cmp.p_value:.2g})")
+        return comparisons
+
+    def _compare(self, data: Dict, key: str, commit: str, ancestors: List[str]) -> Optional[PerfComparison]:
+        current = data["commits"][commit]["functions"][key]
+        for base in ancestors:
+            if base == commit: continue
+            baseline = data["commits"].get(base, {}).get("functions", {}).get(key)
+            if baseline and baseline.get("samples"):
+                return self.compare_samples(key, commit, current, base, baseline)
+        return None
+
+    def compare_samples(self, key: str, commit: str, current: Dict, base: str, baseline: Dict) -> PerfComparison:
+        module, _, func = key.partition(".")
+        test = mann_whitney(baseline["samples"], current["samples"])
+        base_med, cur_med = baseline["median_us"], current["median_us"]
+        change = (cur_med - base_med) / base_med if base_med > 0 else 0.0
+        if test["p_slower"] < self.alpha and change > self.min_change:
+            verdict, p = "regression", test["p_slower"]
+        elif test["p_faster"] < self.alpha and change < -self.min_change:
+            verdict, p = "improvement", test["p_faster"]
+        else:
+            verdict, p = "unchanged", min(test["p_slower"], test["p_faster"])
+        return PerfComparison(module, func, commit, base, round(cur_med, 4), round(base_med, 4),
+                              round(change, 4), p, verdict)
+
+    # --- 查詢 ---
+    def comparisons(self, commit: str) -> List[PerfComparison]:
+        with self._lock:
+            entry = self._load()["commits"].get(commit, {})
+            return [PerfComparison(**c) for c in entry.get("comparisons", {}).values()]
+
+    def status(self, module_name: str, func_name: str) -> Optional[PerfComparison]:
+        """函式最近一次記錄時與祖先比較的結果 (燈號用)；沒有基準可比時為 None"""
+        key = f"{module_name}.{func_name}"
+        with self._lock:
+            data = self._load()
+            commit = data["latest"].get(key)
+            cmp = data["commits"].get(commit, {}).get("comparisons", {}).get(key) if commit else None
+        return PerfComparison(**cmp) if cmp else None
+
+    def summary(self, commit: str) -> str:
+        """History 視窗的一欄：例如 '2 slower, 1 faster / 5 fn'"""
+        with self._lock:
+            entry = self._load()["commits"].get(commit)
+        if not entry: return ""
+        verdicts = [c["verdict"] for c in entry.get("comparisons", {}).values()]
+        parts = []
+        if verdicts.count("regression"): parts.append(f"{verdicts.count('regression')} slower")
+        if verdicts.count("improvement"): parts.append(f"{verdicts.count('improvement')} faster")
+        text = f"{len(entry.get('functions', {}))} fn"
+        if entry.get("dirty"): text += " (snapshot)"
+        return f"{', '.join(parts)} / {text}" if parts else text
@@ -7,7 +7,7 @@ from OllamaClient import OllamaClient
 
 class RuntimeAnalyst:
     def __init__(self, ollama_url: str = "http://localhost:11434"):
-        self.client = OllamaClient(ollama_url)
+        self.client = OllamaClient.shared(ollama_url)
 
     def analyzeSnapshot(
         self,
@@ -64,26 +64,42 @@ class RuntimeAnalyst:
         io_data: Dict[str, Any],
         coverage_data: Dict[str, Any],
         calls_data: List[Dict[str, Any]],
-        logic_model: str = "gemma3:12b"
+        logic_model: str = "gemma3:12b",
+        memory_data: Optional[Dict[str, Any]] = None
     ) -> Tuple[str, float]: # [修正] 回傳 Tuple
         """
         效能瓶頸分析
+        memory_data: MetricCollector.getMemoryProfile() 的結果 (可選)，提供峰值、保留量與主要配置位置
         """
         print(f"[*] [RuntimeAnalyst] Analyzing bottlenecks for '{func_name}' with {logic_model}...")
 
         # A. 效能數據 (增加防禦性檢查，避免 Zero Call Count 誤判)
         metric = perf_data.get(func_name)
+        if metric is None:
+            # [修正] 不同檔案的同名函式以 "檔名:qualname" 為鍵；取總耗時最高的一個
+            candidates = [k for k, v in perf_data.items()
+                          if v.get("qualname") == func_name or k.rpartition(":")[2] == func_name]
+            if candidates:
+                func_name = max(candidates, key=lambda k: perf_data[k].get("time_ms", 0))
+                metric = perf_data[func_name]
         if metric is None:
             # 如果找不到該函式的數據，直接回傳錯誤，不要讓 LLM 瞎掰
             return f"Error: No performance data found for function '{func_name}'. Check function name spelling.", 0.0
 
-        avg_time = metric.get("avg_time_ms", 0)
-        total_time = metric.get("total_time_ms", 0)
-        calls = metric.get("total_calls", 0)
-        mem_peak = metric.get("memory_peak_bytes", 0)
+        # [修正] 鍵名對齊 MetricCollector.getBenchmarkData()
+        avg_time = metric.get("avg_ms", 0)
+        total_time = metric.get("time_ms", 0)
+        calls = metric.get("calls", 0)
+        mem_peak = metric.get("mem_peak", 0)
+
+        # B. IO 數據 (getIOHistory 的鍵為 r / w)
+        io_metric = io_data.get(func_name, {"r": 0, "w": 0})
 
-        # B. IO 數據
-        io_metric = io_data.get(func_name, {"read": 0, "write": 0})
+        # B2. 記憶體剖析 (配置位置)
+        mem_func = (memory_data or {}).get("functions", {}).get(func_name, {})
+        mem_retained = mem_func.get("retained_bytes", 0)
+        mem_sites = [f"line_{s['line']} ({s['size_bytes']}B x{s['count']}): {s['source']}"
+                     for s in mem_func.get("top_sites", [])[:3]]
 
         # C. 覆蓋率分析
         lines_info = coverage_data.get(func_name, {})
@@ -99,17 +115,21 @@ class RuntimeAnalyst:
             elif hits > 50: # 門檻值
                 hotspots.append(f"{line_key} (Hits={hits}): {code}")
 
-        # D. 外部呼叫
-        outgoing_calls = [c for c in calls_data if c['caller'] == func_name]
+        # D. 外部呼叫 (calls_data 為聚合的呼叫邊，每對 caller/callee 一筆)
+        outgoing_calls = sorted((c for c in calls_data if c['caller'] == func_name),
+                                key=lambda c: c.get('time_ms', 0), reverse=True)
+        total_outgoing = sum(c.get('calls', 1) for c in outgoing_calls)
+        top_callees = [f"{c['callee']} (x{c.get('calls', 1)}, {c.get('time_ms', 0)}ms)" for c in outgoing_calls[:3]]
 
         # 2. 彙整 Context 字串
         analysis_context = (
             f"TARGET: {func_name}\n"
             f"METRICS: Time={total_time}ms (Avg {avg_time}ms), Calls={calls}, MemPeak={mem_peak}B\n"
-            f"IO: R={io_metric.get('read')}B, W={io_metric.get('write')}B\n"
+            f"IO: R={io_metric.get('r')}B, W={io_metric.get('w')}B\n"
+            f"MEMORY: Retained={mem_retained}B, TOP_ALLOC_SITES: {json.dumps(mem_sites, ensure_ascii=False)}\n"
             f"HOTSPOTS (Top 5): {json.dumps(hotspots[:5], ensure_ascii=False)}\n"
             f"DEAD_CODE (Top 5): {json.dumps(dead_code[:5], ensure_ascii=False)}\n"
-            f"OUTGOING_CALLS: {len(outgoing_calls)}\n"
+            f"OUTGOING_CALLS: {total_outgoing} to {len(outgoing_calls)} functions, TOP: {json.dumps(top_callees, ensure_ascii=False)}\n"
         )
 
         # [修正] Prompt：強制簡潔正式
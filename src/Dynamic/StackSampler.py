@@ -0,0 +1,65 @@
+import sys
+import time
+import threading
+
+class StackSampler:
+    """
+    StackSampler: 計時器驅動的低開銷堆疊取樣器。
+    以獨立執行緒每隔 interval 秒讀取目標執行緒的當前 frame (sys._current_frames)，
+    並把「距上次取樣的牆鐘時間 / 目標執行緒 CPU 時間」交給 on_sample 回呼歸屬。
+
+    不使用 signal.setitimer：execute_code 通常在 GUI 的背景 worker 執行緒中被呼叫，
+    而 signal handler 只能安裝在主執行緒。
+    """
+
+    def __init__(self, target_thread_id: int, on_sample, interval: float = 0.001):
+        self.target_thread_id = target_thread_id
+        self.on_sample = on_sample  # callback(frame, wall_dt_sec, cpu_dt_sec)
+        self.interval = interval
+        self.sample_count = 0
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._cpu_clock = None
+
+        # 以 pthread CPU clock 量測目標執行緒的 CPU 時間 (Unix)；不支援時 CPU 時間記為 0
+        if hasattr(time, "pthread_getcpuclockid"):
+            try:
+                self._cpu_clock = time.pthread_getcpuclockid(target_thread_id)
+            except (OSError, OverflowError):
+                self._cpu_clock = None
+
+    def _read_cpu(self) -> float:
+        if self._cpu_clock is None: return 0.0
+        try:
+            return time.clock_gettime(self._cpu_clock)
+        except OSError:
+            return 0.0
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="StackSampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        last_wall = time.perf_counter()
+        last_cpu = self._read_cpu()
+
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            now_wall = time.perf_counter()
+            now_cpu = self._read_cpu()
+
+            if frame is not None:
+                self.on_sample(frame, now_wall - last_wall, max(0.0, now_cpu - last_cpu))
+                self.sample_count += 1
+            # 釋放 frame 參考，避免延長使用者程式區域變數的生命週期
+            frame = None
+
+            last_wall, last_cpu = now_wall, now_cpu
@@ -1,20 +1,90 @@
 import unittest
 import os
 import sys
-from typing import Dict
+import json
+import time
+import hashlib
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+@dataclass
+class TestRunReport:
+    results: Dict[str, bool] = field(default_factory=dict)       # { func_name: passed }
+    durations: Dict[str, float] = field(default_factory=dict)    # { test_id: 秒 }
+    func_durations: Dict[str, float] = field(default_factory=dict)  # { func_name: 該函式所有測試耗時總和 }
+    cached_files: List[str] = field(default_factory=list)        # 因內容未變而略過的測試檔
+    executed_files: List[str] = field(default_factory=list)
+    wall_time: float = 0.0
+
+class _TimedResult(unittest.TestResult):
+    """記錄每個 test case 耗時的 TestResult"""
+    def __init__(self):
+        super().__init__()
+        self.durations = {}
+        self._started = {}
+
+    def startTest(self, test):
+        self._started[test.id()] = time.perf_counter()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        super().stopTest(test)
+        tid = test.id()
+        self.durations[tid] = time.perf_counter() - self._started.pop(tid, time.perf_counter())
+
+def _run_test_file(workspace_root: str, test_path: str) -> Dict:
+    """
+    [Worker] 執行單一測試檔。測試目錄是 package 時以 discover (top_level_dir=workspace_root) 載入，
+    與原本整包 discover 的 import 方式一致；否則 (tests/ 沒有 __init__.py) 直接以檔案路徑載入。
+    Returns: { test_id: {"ok": bool, "duration": float} }
+    """
+    if workspace_root not in sys.path:
+        sys.path.insert(0, workspace_root)
+
+    loader = unittest.TestLoader()
+    test_dir = os.path.dirname(test_path)
+    if os.path.isfile(os.path.join(test_dir, "__init__.py")):
+        suite = loader.discover(start_dir=test_dir, pattern=os.path.basename(test_path), top_level_dir=workspace_root)
+    else:
+        rel = os.path.relpath(os.path.splitext(test_path)[0], workspace_root)
+        spec = importlib.util.spec_from_file_location(rel.replace(os.sep, "."), test_path)
+        test_mod = importlib.util.module_from_spec(spec)
+        try:
+            spec.loader.exec_module(test_mod)
+            suite = loader.loadTestsFromModule(test_mod)
+        except Exception as e:
+            # 與 discover 相同：匯入失敗視為一個錯誤的測試
+            print(f"[TestRunner] Failed to import {os.path.basename(test_path)}: {e}")
+            return {f"{spec.name}.<import>": {"ok": False, "duration": 0.0}}
+    result = _TimedResult()
+    suite.run(result)
+
+    failed_ids = {t.id() for t, _ in result.failures + result.errors}
+    failed_ids |= {t.id() for t in result.unexpectedSuccesses}
+    tests = {tid: {"ok": tid not in failed_ids, "duration": dur} for tid, dur in result.durations.items()}
+    # setUpClass / setUpModule 失敗不會經過 startTest，另外補上
+    for tid in failed_ids - tests.keys():
+        tests[tid] = {"ok": False, "duration": 0.0}
+    return tests
 
 class TestRunner:
-    def __init__(self, workspace_root: str):
+    CACHE_FILE = ".test_cache.json"  # 與 .status.json 放在同一個模組目錄
+
+    def __init__(self, workspace_root: str, max_workers: int = None):
         self.workspace_root = os.path.abspath(workspace_root)
+        self.max_workers = max_workers
+        self.last_report = None
 
     def run_module_tests(self, module_name: str) -> Dict[str, bool]:
-        results = {}
+        """回傳 {func_name: bool}；計時與快取資訊見 self.last_report"""
+        return self.run_module_tests_detailed(module_name).results
 
-        # 1. 確保 Import 路徑正確
-        if self.workspace_root not in sys.path:
-            sys.path.insert(0, self.workspace_root)
+    # --- 測試檔探索與對應 ---
 
-        # 2. 尋找測試目錄
+    def _test_dir(self, module_name: str):
         # 支援兩種結構:
         # A. root/module/tests/
         # B. root/module/ (tests inside)
@@ -22,63 +92,171 @@ class TestRunner:
         if not os.path.exists(target_dir):
             # Fallback: check if module itself has tests
             target_dir = os.path.join(self.workspace_root, module_name)
+        return target_dir if os.path.exists(target_dir) else None
 
-        if not os.path.exists(target_dir):
-            print(f"[TestRunner] No test directory found for {module_name}")
-            return {}
+    @staticmethod
+    def _discover_files(target_dir: str) -> List[str]:
+        files = []
+        for root, dirs, names in os.walk(target_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(('.', '__'))]
+            files.extend(os.path.join(root, n) for n in names if n.startswith("test_") and n.endswith(".py"))
+        return sorted(files)
+
+    @staticmethod
+    def _func_of(test_path: str) -> str:
+        # 假設 test_login.py 對應 login 函式
+        stem = os.path.splitext(os.path.basename(test_path))[0]
+        return stem[5:] or "unknown"
 
-        print(f"[TestRunner] Discovering tests in {target_dir}...")
+    # --- 快取 ---
 
+    def _declared_dependencies(self, module_name: str) -> List[str]:
+        spec_path = os.path.join(self.workspace_root, module_name, "spec.json")
         try:
-            # 3. 使用 Discover 掃描所有測試
-            loader = unittest.TestLoader()
-            suite = loader.discover(start_dir=target_dir, pattern="test_*.py", top_level_dir=self.workspace_root)
-
-            # 4. 執行
-            # 使用自訂 result 來收集每個 case 的結果
-            runner = unittest.TextTestRunner(verbosity=0)
-            result = runner.run(suite)
-
-            # 5. 解析結果
-            # 預設 result 物件沒有直接提供 {func: bool} 的 map，我們需要自己拼湊
-            # 這裡簡單處理：如果有失敗，標記為 False。
-            # 但使用者想看到「每個函式」的狀態。
-            # 由於 unittest 是以 Class/Method 為單位，我們嘗試解析 test id
-            # id 格式通常是: module.class.method
-
-            # 為了拿到所有跑過的 test，我們需要一個 set
-            all_tests = set()
-            def collect_tests(suite_obj):
-                if hasattr(suite_obj, '__iter__'):
-                    for x in suite_obj: collect_tests(x)
-                else:
-                    all_tests.add(suite_obj)
-            collect_tests(suite)
-
-            failed_ids = {f[0].id() for f in result.failures + result.errors}
-
-            for test_case in all_tests:
-                test_id = test_case.id()
-                # test_id e.g., "vibe_workspace.auth.tests.test_login.TestLogin.test_login_success"
-                # 我們嘗試提取 function name (假設測試檔名對應函式名)
-                # 假設 test_login.py 對應 login 函式
-                parts = test_id.split('.')
-                func_name = "unknown"
-                for p in parts:
-                    if p.startswith("test_") and p != "test_": # 找到 test_login
-                        func_name = p[5:] # remove test_
-                        break
-
-                # 判斷結果
-                is_pass = test_id not in failed_ids
-
-                # 存入 results (如果同一個函式有多個測試，只要有一個失敗就算失敗 AND logic)
-                if func_name not in results:
-                    results[func_name] = is_pass
-                else:
-                    results[func_name] = results[func_name] and is_pass
+            with open(spec_path, 'r', encoding='utf-8') as f:
+                return list(json.load(f).get('dependencies', []))
+        except Exception:
+            return []
+
+    def _source_digest(self, modules: List[str]) -> str:
+        """模組目錄下所有 .py 的內容雜湊 (不含其測試)"""
+        h = hashlib.sha1()
+        for mod in sorted(modules):
+            mod_dir = os.path.join(self.workspace_root, mod)
+            if not os.path.isdir(mod_dir): continue
+            for name in sorted(os.listdir(mod_dir)):
+                if name.endswith(".py"):
+                    h.update(f"{mod}/{name}\0".encode())
+                    with open(os.path.join(mod_dir, name), 'rb') as f:
+                        h.update(f.read())
+        return h.hexdigest()
+
+    @staticmethod
+    def _file_digest(path: str) -> str:
+        if not os.path.exists(path): return "missing"
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+
+    def _cache_key(self, test_path: str, module_digest: str, dep_digest: str) -> str:
+        """
+        [修正] 測試檔本身 + 同模組所有實作檔 + 宣告依賴模組。
+        函式會呼叫同模組的其他函式，只雜湊 <func>.py 時改了輔助函式仍會沿用舊的通過結果。
+        """
+        parts = [self._file_digest(test_path), module_digest, dep_digest]
+        return hashlib.sha1("|".join(parts).encode()).hexdigest()
 
+    def _load_cache(self, module_dir: str) -> Dict:
+        try:
+            with open(os.path.join(module_dir, self.CACHE_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _save_cache(self, module_dir: str, cache: Dict):
+        try:
+            with open(os.path.join(module_dir, self.CACHE_FILE), 'w', encoding='utf-8') as f:
+                json.dump(cache, f, indent=4)
+        except Exception as e:
+            print(f"[TestRunner] Failed to save test cache: {e}")
+
+    # --- 執行 ---
+
+    def _purge_modules(self, module_dir: str):
+        """同行程執行時移除已載入的實作/測試模組，確保讀到最新的檔案內容"""
+        prefix = module_dir + os.sep
+        for name, mod in list(sys.modules.items()):
+            mod_file = getattr(mod, "__file__", None)
+            if mod_file and os.path.abspath(mod_file).startswith(prefix):
+                del sys.modules[name]
+
+    def run_module_tests_detailed(self, module_name: str, use_cache: bool = True) -> TestRunReport:
+        """
+        平行執行模組的測試檔並記錄每個測試的耗時。
+        測試檔、同模組的實作檔與宣告依賴模組的內容雜湊都未變、且上次為全數通過時，沿用快取結果不再執行。
+        """
+        report = TestRunReport()
+        self.last_report = report
+        start = time.perf_counter()
+
+        # 1. 確保 Import 路徑正確
+        if self.workspace_root not in sys.path:
+            sys.path.insert(0, self.workspace_root)
+
+        # 2. 尋找測試目錄
+        target_dir = self._test_dir(module_name)
+        if not target_dir:
+            print(f"[TestRunner] No test directory found for {module_name}")
+            return report
+
+        module_dir = os.path.join(self.workspace_root, module_name)
+        test_files = self._discover_files(target_dir)
+        print(f"[TestRunner] Discovered {len(test_files)} test files in {target_dir}...")
+
+        # 3. 比對快取
+        cache = self._load_cache(module_dir) if use_cache else {}
+        module_digest = self._source_digest([module_name])
+        dep_digest = self._source_digest(self._declared_dependencies(module_name))
+        outcomes = {}  # { test_path: { test_id: {"ok", "duration"} } }
+        keys = {}
+        pending = []
+        for path in test_files:
+            rel = os.path.relpath(path, module_dir)
+            keys[path] = self._cache_key(path, module_digest, dep_digest)
+            entry = cache.get(rel)
+            if entry and entry.get("key") == keys[path]:
+                outcomes[path] = entry["tests"]
+                report.cached_files.append(rel)
+            else:
+                pending.append(path)
+
+        # 4. 執行 (以測試檔為單位分派到 worker 行程)
+        workers = max(1, min(self.max_workers or os.cpu_count() or 1, len(pending)))
+        try:
+            if workers == 1:
+                self._purge_modules(module_dir)
+                for path in pending:
+                    outcomes[path] = _run_test_file(self.workspace_root, path)
+            else:
+                ctx = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                    futures = {path: pool.submit(_run_test_file, self.workspace_root, path) for path in pending}
+                    for path, fut in futures.items():
+                        try:
+                            outcomes[path] = fut.result()
+                        except Exception as e:
+                            print(f"[TestRunner] {os.path.basename(path)} crashed: {e}")
+                            outcomes[path] = {f"{os.path.basename(path)}.<crashed>": {"ok": False, "duration": 0.0}}
         except Exception as e:
             print(f"[TestRunner] Error: {e}")
+        report.executed_files = [os.path.relpath(p, module_dir) for p in pending]
+
+        # 5. 彙整結果 (同一個函式有多個測試，只要有一個失敗就算失敗 AND logic)
+        for path in test_files:
+            tests = outcomes.get(path)
+            if tests is None: continue
+            func_name = self._func_of(path)
+            for test_id, res in tests.items():
+                report.durations[test_id] = round(res["duration"], 6)
+                report.func_durations[func_name] = round(report.func_durations.get(func_name, 0.0) + res["duration"], 6)
+                report.results[func_name] = report.results.get(func_name, True) and res["ok"]
+
+            # 只快取全數通過的結果
+            rel = os.path.relpath(path, module_dir)
+            if path in pending:
+                if tests and all(r["ok"] for r in tests.values()):
+                    cache[rel] = {"key": keys[path], "tests": tests}
+                else:
+                    cache.pop(rel, None)
+
+        # 清掉已不存在的測試檔紀錄
+        live = {os.path.relpath(p, module_dir) for p in test_files}
+        for rel in list(cache):
+            if rel not in live: del cache[rel]
+        if use_cache:
+            self._save_cache(module_dir, cache)
 
-        return results
+        report.wall_time = round(time.perf_counter() - start, 4)
+        passed = sum(1 for v in report.results.values() if v)
+        print(f"[TestRunner] {passed}/{len(report.results)} functions passed "
+              f"({len(pending)} files run, {len(report.cached_files)} cached, {report.wall_time}s)")
+        return report
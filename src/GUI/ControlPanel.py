@@ -159,8 +159,12 @@ class ControlPanel:
             self.mediator.workspace.draw_dependency_graph() # 其實就是刷新圖表
 
         elif mode == "runtime_analysis":
+            # [新增] 選取模組時執行統計式基準測試 (以單元測試的輸入重複量測)
+            if selected_type == 'module':
+                self.mediator.meta.execute_benchmark_workflow(selected_name, self.mediator)
+                return
             if selected_type != 'function':
-                messagebox.showwarning("Target Error", "Runtime analysis requires selecting a Function.")
+                messagebox.showwarning("Target Error", "Runtime analysis requires selecting a Function or Module.")
                 return
             # 獲取程式碼
             code = self.mediator.workspace.get_active_code()
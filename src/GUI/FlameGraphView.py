@@ -0,0 +1,172 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+from FlameGraph import FlameLayout, frame_color, export
+
+class FlameGraphView:
+    """
+    [新增] WorkSpace 的火焰圖分頁 (根在上方的 icicle 方向，寬度為包含時間)。
+    - 左鍵點擊 frame 放大到該 frame 的範圍，右鍵 / Reset 還原；滾輪以游標為中心縮放
+    - 搜尋框：名稱相符的 frame 以洋紅色標示，並顯示涵蓋的時間比例
+    - 重繪只取出可見且寬度 >= 1px 的 frame (FlameLayout.visible 二分搜尋)，十萬個 frame 也不卡頓
+    """
+    FRAME_H = 18
+    MIN_PX = 1.0          # 小於 1 像素的 frame 不畫
+    TEXT_PX = 40          # 寬度足夠才畫文字
+    CHAR_PX = 7
+    HIT_COLOR = "#e040fb"
+
+    def __init__(self, parent, mediator):
+        self.mediator = mediator
+        self.colors = mediator.colors
+        self.layout = None
+        self.tree = None
+        self.view = (0.0, 1.0)        # 目前顯示的範圍 (ms)
+        self.matches = set()
+        self.match_ms = 0.0           # 相符 frame 涵蓋的時間 (巢狀不重複計算)
+        self._items = {}              # canvas item -> frame 索引
+        self._redraw_job = None
+
+        self.frame = ttk.Frame(parent)
+
+        toolbar = tk.Frame(self.frame, bg=self.colors['bg'])
+        toolbar.pack(fill=tk.X, side=tk.TOP)
+        tk.Label(toolbar, text="Search:", bg=self.colors['bg'], fg=self.colors['fg']).pack(side=tk.LEFT, padx=(5, 2))
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *_: self.on_search())
+        tk.Entry(toolbar, textvariable=self.search_var, width=24, bg=self.colors['editor_bg'], fg=self.colors['fg'],
+                 insertbackground="white").pack(side=tk.LEFT, padx=2)
+        tk.Button(toolbar, text="Reset", command=self.reset_zoom, bg="#4a88c7", fg="white", bd=0).pack(side=tk.LEFT, padx=5)
+        tk.Button(toolbar, text="Export...", command=self.on_export, bg="#4a88c7", fg="white", bd=0).pack(side=tk.LEFT, padx=2)
+        self.lbl_info = tk.Label(toolbar, text="No profile. Run a Runtime analysis first.",
+                                 bg=self.colors['bg'], fg="#888", font=("Consolas", 9), anchor="w")
+        self.lbl_info.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=10)
+
+        body = tk.Frame(self.frame, bg=self.colors['editor_bg'])
+        body.pack(fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(body, bg=self.colors['editor_bg'], highlightthickness=0)
+        vbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=vbar.set)
+        vbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.canvas.bind("<Configure>", lambda e: self.schedule_redraw())
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<Button-3>", lambda e: self.reset_zoom())
+        self.canvas.bind("<Motion>", self.on_motion)
+        self.canvas.bind("<MouseWheel>", self.on_wheel)                       # Windows / macOS
+        self.canvas.bind("<Button-4>", lambda e: self.on_wheel(e, 120))      # X11
+        self.canvas.bind("<Button-5>", lambda e: self.on_wheel(e, -120))
+
+    # --- 資料 ---
+    def set_tree(self, tree: dict):
+        """載入 MetricCollector.getCallTree() 的結果"""
+        self.tree = tree
+        self.layout = FlameLayout(tree) if tree else None
+        self.view = (0.0, self.layout.total if self.layout and self.layout.total > 0 else 1.0)
+        self.matches, self.match_ms = set(), 0.0
+        if self.search_var.get(): self.on_search()
+        self.redraw()
+
+    # --- 繪製 ---
+    def schedule_redraw(self):
+        # Configure 事件在拖曳視窗時會連續觸發，合併成一次重繪
+        if self._redraw_job: self.canvas.after_cancel(self._redraw_job)
+        self._redraw_job = self.canvas.after(30, self.redraw)
+
+    def redraw(self):
+        self._redraw_job = None
+        self.canvas.delete("all")
+        self._items = {}
+        layout = self.layout
+        if not layout or not layout.frames:
+            self.canvas.create_text(20, 20, text="No profile data.", fill="#666", anchor="nw")
+            return
+
+        width = max(self.canvas.winfo_width(), 100)
+        x0, x1 = self.view
+        scale = width / (x1 - x0)
+        h = self.FRAME_H
+        for i in layout.visible(x0, x1, min_width=self.MIN_PX / scale):
+            f = layout.frames[i]
+            left = max(0.0, (f.start - x0) * scale)
+            right = min(width, (f.start + f.width - x0) * scale)
+            top = f.depth * h
+            color = self.HIT_COLOR if i in self.matches else frame_color(f.name, f.file)
+            item = self.canvas.create_rectangle(left, top, right, top + h - 1, fill=color, outline=self.colors['editor_bg'])
+            self._items[item] = i
+            if right - left >= self.TEXT_PX:
+                chars = int((right - left - 6) / self.CHAR_PX)
+                label = f.label if len(f.label) <= chars else f.label[:max(chars - 2, 1)] + ".."
+                self.canvas.create_text(left + 3, top + h / 2, text=label, anchor="w", fill="#111", font=("Consolas", 9))
+        self.canvas.configure(scrollregion=(0, 0, width, (layout.max_depth + 1) * h))
+        self._update_info()
+
+    def _update_info(self, hover: int = None):
+        layout = self.layout
+        if not layout: return
+        if hover is not None:
+            f = layout.frames[hover]
+            share = f.width / layout.total if layout.total else 0
+            text = (f"{f.label}  |  {f.width:.3f} ms ({share:.1%})  self {f.self_ms:.3f} ms  "
+                    f"calls {f.calls}  depth {f.depth}")
+        else:
+            text = f"{len(layout.frames)} frames, total {layout.total:.2f} ms"
+            if self.search_var.get().strip():
+                share = self.match_ms / layout.total if layout.total else 0
+                text += f"  |  '{self.search_var.get()}': {len(self.matches)} frames, {share:.1%}"
+        self.lbl_info.config(text=text)
+
+    def _frame_at(self, event):
+        items = self.canvas.find_overlapping(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y),
+                                             self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        for item in reversed(items):
+            if item in self._items: return self._items[item]
+        return None
+
+    # --- 互動 ---
+    def on_click(self, event):
+        idx = self._frame_at(event)
+        if idx is None or not self.layout: return
+        f = self.layout.frames[idx]
+        self.view = (f.start, f.start + f.width)
+        self.redraw()
+
+    def reset_zoom(self):
+        if not self.layout: return
+        self.view = (0.0, self.layout.total if self.layout.total > 0 else 1.0)
+        self.redraw()
+
+    def on_wheel(self, event, delta: int = None):
+        if not self.layout: return
+        delta = event.delta if delta is None else delta
+        x0, x1 = self.view
+        width = max(self.canvas.winfo_width(), 100)
+        pivot = x0 + (x1 - x0) * (event.x / width)
+        factor = 0.8 if delta > 0 else 1.25
+        span = min(self.layout.total, max((x1 - x0) * factor, self.layout.total * 1e-9))
+        start = min(max(0.0, pivot - (pivot - x0) * factor), self.layout.total - span)
+        self.view = (start, start + span)
+        self.schedule_redraw()
+
+    def on_motion(self, event):
+        self._update_info(self._frame_at(event))
+
+    def on_search(self):
+        if not self.layout: return
+        pattern = self.search_var.get().strip()
+        self.matches, self.match_ms = self.layout.search(pattern) if pattern else (set(), 0.0)
+        self.schedule_redraw()
+
+    def on_export(self):
+        if not self.tree:
+            messagebox.showwarning("Export", "No profile data to export.")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".html",
+            filetypes=[("Flame graph (HTML)", "*.html"), ("speedscope", "*.speedscope.json"), ("Collapsed stacks", "*.collapsed")])
+        if not path: return
+        try:
+            fmt = export(self.tree, path)
+            self.mediator.log(f"[Runtime] Flame graph exported ({fmt}): {path}")
+        except Exception as e:
+            messagebox.showerror("Export", f"Export failed: {e}")
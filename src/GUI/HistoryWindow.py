@@ -6,19 +6,25 @@ class HistoryWindow:
         self.mediator = mediator
         self.window = tk.Toplevel(parent)
         self.window.title("Project History & Version Control")
-        self.window.geometry("600x400")
+        self.window.geometry("720x400")
         self.window.configure(bg="#2b2b2b")
 
         # 列表區
-        columns = ("short_hash", "date", "message")
+        columns = ("short_hash", "date", "message", "perf")
         self.tree = ttk.Treeview(self.window, columns=columns, show="headings")
         self.tree.heading("short_hash", text="Hash")
         self.tree.heading("date", text="Date")
         self.tree.heading("message", text="Message")
+        self.tree.heading("perf", text="Performance")
 
         self.tree.column("short_hash", width=80)
         self.tree.column("date", width=150)
         self.tree.column("message", width=350)
+        self.tree.column("perf", width=140)
+        # [新增] 與前一版相比顯著變慢的 commit 以紅字標示
+        self.tree.tag_configure("regression", foreground="#ff5555")
+        self.tree.tag_configure("improvement", foreground="#50fa7b")
+        self.tree.bind("<Double-1>", lambda e: self.on_show_perf())
 
         self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
@@ -32,6 +38,9 @@ class HistoryWindow:
         tk.Button(btn_frame, text="Refresh", command=self.refresh,
                   bg="#4a88c7", fg="white").pack(side=tk.LEFT)
 
+        tk.Button(btn_frame, text="Performance Diff", command=self.on_show_perf,
+                  bg="#4a88c7", fg="white").pack(side=tk.LEFT, padx=5)
+
         self.refresh()
 
     def refresh(self):
@@ -39,8 +48,27 @@ class HistoryWindow:
             self.tree.delete(item)
 
         history = self.mediator.meta.vc.getHistory(limit=20)
+        perf = self.mediator.meta.perf_history
         for h in history:
-            self.tree.insert("", "end", values=(h['short_hash'], h['date'], h['message']))
+            verdicts = {c.verdict for c in perf.comparisons(h['hash'])}
+            tags = [v for v in ("regression", "improvement") if v in verdicts][:1]
+            self.tree.insert("", "end", iid=h['hash'], tags=tags,
+                             values=(h['short_hash'], h['date'], h['message'], perf.summary(h['hash'])))
+
+    def on_show_perf(self):
+        """[新增] 顯示所選 commit 的基準測試與前一版的比較 (Mann-Whitney)"""
+        selected = self.tree.selection()
+        if not selected: return
+        commit_hash = selected[0]
+        comparisons = self.mediator.meta.perf_history.comparisons(commit_hash)
+        if not comparisons:
+            messagebox.showinfo("Performance", f"No benchmark comparison recorded for {commit_hash[:7]}.")
+            return
+        order = {"regression": 0, "improvement": 1, "unchanged": 2}
+        lines = [f"{c.verdict.upper():<11} {c.module}.{c.function}: {c.baseline_median_us:.2f} -> "
+                 f"{c.median_us:.2f} us ({c.change:+.1%}, p={c.p_value:.2g}) vs {c.baseline_commit[:7]}"
+                 for c in sorted(comparisons, key=lambda c: (order[c.verdict], -c.change))]
+        messagebox.showinfo("Performance", "\n".join(lines))
 
     def on_rollback(self):
         selected = self.tree.selection()
@@ -98,8 +98,19 @@ class MainWindow:
         edit_menu.add_command(label="Undo", command=lambda: self.log("Undo not implemented"))
         menubar.add_cascade(label="Edit", menu=edit_menu)
 
+        project_menu = tk.Menu(menubar, tearoff=0, bg="#3c3f41", fg="#a9b7c6")
+        project_menu.add_command(label="Build Whole Project (Refine + Implement + Tests)", command=self.on_build_project)
+        project_menu.add_command(label="Implement All Refined Modules", command=lambda: self.on_build_project(("implement", "test")))
+        menubar.add_cascade(label="Project", menu=project_menu)
+
         settings_menu = tk.Menu(menubar, tearoff=0, bg="#3c3f41", fg="#a9b7c6")
         settings_menu.add_command(label="Model Selection...", command=self.on_model_settings)
+        self.llm_cache_var = tk.BooleanVar(value=self.meta.llm_cache_config.get("enabled", False))
+        settings_menu.add_checkbutton(label="LLM Response Cache", variable=self.llm_cache_var,
+                                      command=self.on_toggle_llm_cache)
+        self.chaos_clock_var = tk.BooleanVar(value=self.meta.chaos_config.get("virtual_clock", False))
+        settings_menu.add_checkbutton(label="Chaos: Virtual Clock (skip injected latency sleeps)",
+                                      variable=self.chaos_clock_var, command=self.on_toggle_chaos_clock)
         menubar.add_cascade(label="Settings", menu=settings_menu)
 
         # 在 menubar 中新增一個 Version 選單
@@ -163,7 +174,9 @@ class MainWindow:
                     break
 
                 try:
+                    llm_before = self.meta.get_llm_stats()
                     task_item['func']()
+                    self._log_llm_stats(llm_before)
 
                     if self._current_cancel_flag.is_set():
                         if task_item['cancel']: self.root.after(0, task_item['cancel'])
@@ -201,6 +214,7 @@ class MainWindow:
             self.log(f"Switching workspace to: {dir_path}")
             self.meta.set_workspace(dir_path)
             self.nav.set_workspace(dir_path)
+            self.llm_cache_var.set(self.meta.llm_cache_config.get("enabled", False))
 
             # 清空 UI
             self.workspace.clear_all_editors()
@@ -208,6 +222,35 @@ class MainWindow:
 
             self.root.title(f"Vibe-Coder IDE - {os.path.basename(dir_path)}")
 
+    def on_build_project(self, stages=("refine", "implement", "test")):
+        """[新增] 以 GenerationPipeline 依依賴順序並行生成整個專案"""
+        def on_event(ev):
+            # 事件來自 pipeline 的事件迴圈執行緒，轉交 UI 執行緒
+            self.root.after(0, lambda: self._on_pipeline_event(ev))
+
+        def task():
+            self.log(f"[Pipeline] Building project ({' -> '.join(stages)})...")
+            report = self.meta.build_project(cancel_event=self._current_cancel_flag, on_event=on_event, stages=stages)
+            self.log(f"[Pipeline] {len(report.refined)} refined, {len(report.implemented)} implemented, "
+                     f"{len(report.tests)} tests, {len(report.failed)} failed in {report.wall_time}s ({report.backend})")
+            blocked = [m for m, st in report.module_status.items() if st == "blocked"]
+            if blocked: self.log(f"[Pipeline] Blocked modules: {', '.join(blocked)}")
+
+        self.run_async(task, success_callback=self.nav.refresh_tree, cancel_callback=self.nav.refresh_tree)
+
+    def _on_pipeline_event(self, ev):
+        if ev.stage == "pipeline": return
+        name = ev.target or ev.module
+        if ev.status == "started":
+            self.nav.set_item_loading(name, True)
+        else:
+            self.nav.set_item_loading(name, False)
+            if ev.status in ("failed", "blocked"):
+                self.log(f"[Pipeline] {ev.stage} {ev.module}.{ev.target} {ev.status}: {ev.detail}")
+            if ev.stage == "refine" and ev.status == "done":
+                self.nav.refresh_tree()
+        self.set_status(f"Pipeline [{ev.done}/{ev.total}] {ev.stage} {name}: {ev.status}")
+
     def on_model_settings(self):
         win = tk.Toplevel(self.root)
         win.title("Model Configuration")
@@ -232,6 +275,33 @@ class MainWindow:
 
         tk.Button(win, text="Save", command=save, bg="#4a88c7", fg="white").grid(row=row, column=0, columnspan=2, pady=20)
 
+    def on_toggle_llm_cache(self):
+        enabled = self.llm_cache_var.get()
+        self.meta.set_llm_cache(enabled)
+        self.log(f"[LLM Cache] {'Enabled' if enabled else 'Disabled'}.")
+
+    def on_toggle_chaos_clock(self):
+        enabled = self.chaos_clock_var.get()
+        self.meta.set_chaos_virtual_clock(enabled)
+        self.log(f"[Chaos] Virtual clock {'enabled' if enabled else 'disabled'}.")
+
+    def _log_llm_stats(self, before: dict):
+        """任務結束後，若期間有 LLM 請求則記錄本次的連線/快取統計"""
+        after = self.meta.get_llm_stats()
+        c0, c1 = before["client"], after["client"]
+        requests_made = c1["requests"] - c0["requests"]
+        if requests_made > 0:
+            self.log(f"[LLM] {requests_made} requests | conn reused {c1['connections_reused'] - c0['connections_reused']}"
+                     f" | TTFT avg {c1['ttft_ms_avg']}ms | queue max {c1['queue_wait_ms_max']}ms")
+
+        k0, k1 = before["cache"], after["cache"]
+        if k1:
+            hits = k1["hits"] - (k0["hits"] if k0 else 0)
+            misses = k1["misses"] - (k0["misses"] if k0 else 0)
+            if hits or misses:
+                self.log(f"[LLM Cache] +{hits} hits / +{misses} misses "
+                         f"(hit rate {k1['hit_rate']*100:.0f}%, {k1['entries']} entries, {k1['size_mb']}MB)")
+
     def open_history(self):
         from HistoryWindow import HistoryWindow
         HistoryWindow(self.root, self)
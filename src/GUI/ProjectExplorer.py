@@ -8,7 +8,6 @@ class ProjectExplorer:
     def __init__(self, parent, mediator):
         self.mediator = mediator
         self.meta = mediator.meta
-        self._last_snapshot = {}
         self._is_refreshing = False
 
         # Loading 動畫相關
@@ -26,7 +25,10 @@ class ProjectExplorer:
         self.tree.bind("<Button-1>", self._on_tree_click)
 
         self._init_menu()
-        self.frame.after(1000, self._monitor_loop)
+        # [優化] 改由 FileWatcher (背景執行緒) 推送變更，取代 Tk 執行緒上的 mtime 輪詢
+        self.meta.file_watcher.subscribe(self._on_file_events)
+        self.meta.file_watcher.start()
+        self.frame.after_idle(self.refresh_tree)
 
         # 啟動動畫迴圈
         self._animate_loading()
@@ -123,11 +125,7 @@ class ProjectExplorer:
             proj_name = data.get('project_name', 'Project')
             root = self.tree.insert("", "end", text=proj_name, open=True, values=("project",))
 
-            # 推斷專案根目錄
-            if self.meta.current_architecture_path:
-                project_base_dir = os.path.dirname(self.meta.current_architecture_path)
-            else:
-                project_base_dir = self.meta.workspace_root
+            project_base_dir = self._project_base_dir()
 
             # --- [Fix 1] 顯示 Main Entry Point ---
             entry_point = data.get('entry_point')
@@ -160,6 +158,40 @@ class ProjectExplorer:
         finally:
             self._is_refreshing = False
 
+    def _project_base_dir(self):
+        """推斷專案根目錄"""
+        if self.meta.current_architecture_path:
+            return os.path.dirname(self.meta.current_architecture_path)
+        return self.meta.workspace_root
+
+    def _refresh_modules(self, modules):
+        """[新增] 只重建指定模組底下的函式節點 (spec.json / .status.json 變更)"""
+        if self._is_refreshing: return
+        roots = self.tree.get_children()
+        if not roots: return
+        mod_nodes = {self.tree.item(n, 'text'): n for n in self.tree.get_children(roots[0])}
+        if any(m not in mod_nodes for m in modules):
+            # 新模組出現在樹以外：整棵重建
+            self.refresh_tree()
+            return
+        for mod_name in modules:
+            mod_node = mod_nodes[mod_name]
+            mod_dir = os.path.join(self._project_base_dir(), mod_name)
+            spec_path = os.path.join(mod_dir, "spec.json")
+            self.tree.delete(*self.tree.get_children(mod_node))
+            if os.path.exists(spec_path):
+                self.tree.item(mod_node, values=("module", spec_path))
+                self._load_functions_to_tree(mod_node, mod_dir, spec_path)
+
+    def _on_file_events(self, events):
+        """FileWatcher 回呼 (監看執行緒)：分類後轉交 Tk 執行緒處理"""
+        full = any(ev.category == "rescan" or os.path.basename(ev.path) == "architecture.json" for ev in events)
+        modules = {ev.module for ev in events if ev.category in ("spec", "status") and ev.module}
+        if full:
+            self.frame.after(0, self.refresh_tree)
+        elif modules:
+            self.frame.after(0, lambda: self._refresh_modules(sorted(modules)))
+
     def _init_menu(self):
         self.menu = tk.Menu(self.frame, tearoff=0)
         self.menu.add_command(label="Refine Selected Modules (Phase 2)", command=self.on_refine)
@@ -179,24 +211,9 @@ class ProjectExplorer:
             self.menu.post(event.x_root, event.y_root)
 
     def set_workspace(self, path):
-        self._last_snapshot = {}
         self.tree.delete(*self.tree.get_children())
         self.frame.after_idle(self.refresh_tree)
 
-    def _monitor_loop(self):
-        if not self.frame.winfo_exists(): return
-        try:
-            if self.meta.workspace_root:
-                snap = 0
-                if self.meta.current_architecture_path and os.path.exists(self.meta.current_architecture_path):
-                     snap = os.path.getmtime(self.meta.current_architecture_path)
-                # 這裡可以加入對 .status.json 的監控，但為了效能，我們依賴操作觸發刷新
-                if snap != self._last_snapshot.get('arch', 0):
-                    self._last_snapshot['arch'] = snap
-                    self.frame.after_idle(self.refresh_tree)
-        except: pass
-        self.frame.after(2000, self._monitor_loop)
-
     def _save_expanded_state(self):
         expanded = set()
         for child in self.tree.get_children():
@@ -265,22 +282,18 @@ class ProjectExplorer:
 
         if not target_modules: return
 
-        def task():
-            for mod in target_modules:
-                if self.mediator._current_cancel_flag.is_set(): break
-                self.mediator.log(f"[Action] Refining module '{mod}'...")
-
-                # --- [Fix 3] 在 UI 線程設置 loading ---
-                self.frame.after(0, lambda m=mod: self.set_item_loading(m, True))
-
-                res = self.mediator.meta.refine_module(mod, cancel_event=self.mediator._current_cancel_flag)
-
-                if res is None:
-                    self.mediator.log(f"[Fail] Refinement of {mod} failed/blocked.")
-
-                # 完成後移除 loading (refresh_tree 會處理，但保險起見)
-                self.frame.after(0, lambda m=mod: self.set_item_loading(m, False))
+        def on_event(mod, status):
+            # 由排程執行緒呼叫，轉交 UI 線程更新 loading 狀態
+            self.frame.after(0, lambda: self.set_item_loading(mod, status == "started"))
+            if status in ("failed", "blocked"):
+                self.mediator.log(f"[Fail] Refinement of {mod} {status}.")
 
+        def task():
+            # [新增] 依 DAG 排程：互不相依的模組同時細化，依賴完成後立即開始下游
+            self.mediator.log(f"[Action] Refining modules: {', '.join(target_modules)}...")
+            report = self.mediator.meta.refine_modules(target_modules, cancel_event=self.mediator._current_cancel_flag,
+                                                       on_event=on_event)
+            self.mediator.log(f"[Schedule] {report.summary()}")
             self.frame.after(0, self.refresh_tree)
 
         self.mediator.run_async(task)
@@ -305,11 +318,13 @@ class ProjectExplorer:
 
         if not tasks: return
 
-        # 1. 檢查依賴 & 排程
+        # 1. 檢查依賴 (同一批次中的依賴模組會先被排程實作，不算未滿足)
+        dag = self.meta.get_module_dag()
+        selected = {mod_name for mod_name, _ in tasks}
+        targets = {}
         for (mod_name, spec_path), funcs in tasks.items():
-
-            # [Fix 2] 強制依賴檢查並確保彈窗
-            is_met = self.meta.check_dependencies_met(mod_name)
+            external = [d for d in (dag.dependencies(mod_name) if dag else []) if d not in selected]
+            is_met = all(self.meta._module_has_impl(d) for d in external)
             print(f"[Debug] Dependency check for {mod_name}: {is_met}") # Debug Log
 
             if not is_met:
@@ -317,38 +332,42 @@ class ProjectExplorer:
                 self.mediator.log(f"[Blocked] {msg}")
                 tk.messagebox.showwarning("Dependency Error", msg)
                 continue # 跳過此模組
-
-            # 2. 為每個函式建立獨立任務
+            targets[mod_name] = (spec_path, funcs)
             for func in funcs:
                 self.set_item_loading(func, True)
 
-                # (... Closure 設定保持不變 ...)
-                def make_task(s_path, f_name, m_name):
-                    def task_func():
-                        self.mediator.log(f"[Action] Generating code for {f_name} (in {m_name})...")
-                        result = self.meta.coder.implement_function_direct(
-                            s_path, f_name,
-                            self.meta.model_config['coder'],
-                            cancel_event=self.mediator._current_cancel_flag
-                        )
-                        return result
-
-                    def success_cb():
-                        self.set_item_loading(f_name, False)
-                        self.refresh_tree()
-
-                        mod_dir = os.path.dirname(s_path)
-                        code_path = os.path.join(mod_dir, "__init_logic__.py" if f_name == "__init__" else f"{f_name}.py")
-
-                        # [Fix 4] 如果檔案存在，嘗試開啟或重載
-                        if os.path.exists(code_path):
-                            with open(code_path, 'r', encoding='utf-8') as f:
-                                code = f.read()
-                            # 這裡 open_file 如果已經開啟會切換 tab，我們需要確保內容更新
-                            # 所以先呼叫 reload，再 open (switch)
-                            self.mediator.workspace.reload_active_file()
-                            self.mediator.workspace.open_file(f_name, code, code_path)
-                    return task_func, success_cb
-
-                t_func, s_cb = make_task(spec_path, func, mod_name)
-                self.mediator.run_async(t_func, success_callback=s_cb)
+        if not targets: return
+
+        # 2. 依 DAG 排程 (見 MetaCoder.implement_modules)
+        done_files = []
+
+        def on_event(mod, status):
+            if status in ("failed", "blocked", "cancelled"):
+                self.mediator.log(f"[Schedule] {mod}: {status}")
+
+        def task_func():
+            self.mediator.log(f"[Action] Generating code for {sum(len(f) for _, f in targets.values())} functions "
+                              f"in {len(targets)} modules...")
+            report, results = self.meta.implement_modules(targets, cancel_event=self.mediator._current_cancel_flag,
+                                                          on_event=on_event)
+            self.mediator.log(f"[Schedule] {report.summary()}")
+            done_files.extend(r.file_path for res in results.values() for r in res)
+
+        def finish_cb():
+            for _, funcs in targets.values():
+                for func in funcs:
+                    self.set_item_loading(func, False)
+            self.refresh_tree()
+
+            # [Fix 4] 開啟或重載剛實作的檔案
+            # 這裡 open_file 如果已經開啟會切換 tab，我們需要確保內容更新
+            # 所以先呼叫 reload，再 open (switch)
+            self.mediator.workspace.reload_active_file()
+            for code_path in done_files:
+                if os.path.exists(code_path):
+                    with open(code_path, 'r', encoding='utf-8') as f:
+                        code = f.read()
+                    f_name = os.path.splitext(os.path.basename(code_path))[0]
+                    self.mediator.workspace.open_file(f_name, code, code_path)
+
+        self.mediator.run_async(task_func, success_callback=finish_cb, cancel_callback=finish_cb)
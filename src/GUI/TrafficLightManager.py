@@ -15,6 +15,9 @@ class TrafficLightManager:
 
     def __init__(self, meta_coder):
         self.meta = meta_coder
+        # [優化] 函式層級的 radon 指標以內容雜湊快取，重繪時不再重新 parse
+        from BatchCodeAnalyzer import BatchCodeAnalyzer
+        self.code_metrics = BatchCodeAnalyzer()
 
     def get_color(self, view_mode: str, data_mode: str, node_name: str, parent_mod: str = None) -> str:
         """
@@ -62,13 +65,14 @@ class TrafficLightManager:
         1. 耦合度 (Coupling Score)
         2. 內聚性 (Cohesion - LCOM4 & Density)
         """
-        analyzer = self.meta.static_analyzer
+        # [優化] 由 StructureAnalyzer 的指標表取值 (只在檔案變動後重算)，重繪時不再逐一計算
+        metrics = self.meta.static_analyzer.module_metrics(mod_name)
 
         # A. 耦合度 (0-100, 越高越好)
-        coupling_score = analyzer.calculateCoupling(mod_name)
+        coupling_score = metrics.coupling
 
         # B. 內聚性 (需聚合該模組下所有類別的 LCOM4)
-        cohesion_data = analyzer.calculateCohesion(mod_name)
+        cohesion_data = metrics.cohesion
         # cohesion_data = {'ClassName': {'lcom4': int, 'density': float}}
 
         if not cohesion_data:
@@ -88,6 +92,28 @@ class TrafficLightManager:
         final_score = coupling_score - lcom_penalty
         return self._score_to_color(final_score)
 
+    def invalidate(self, events: list = None):
+        """[新增] 由 FileWatcher 事件觸發；events 為 None 或含 rescan 時清除全部"""
+        if events is None or any(ev.category == "rescan" for ev in events):
+            self.code_metrics.invalidate()
+            return
+        for ev in events:
+            if ev.category == "implementation":
+                self.code_metrics.invalidate(ev.path)
+
+    def _function_path(self, func_name: str, mod_name: str) -> str:
+        mod_dir = os.path.join(self.meta.workspace_root, mod_name)
+        filename = "__init_logic__.py" if func_name == "__init__" else f"{func_name}.py"
+        return os.path.join(mod_dir, filename)
+
+    def prefetch_static_functions(self, pairs):
+        """
+        [新增] 整個 Function View 重繪前先批次分析 [(mod_name, func_name)]，
+        未命中快取的檔案較多時交給行程池處理。
+        """
+        paths = [self._function_path(func, mod) for mod, func in pairs]
+        self.code_metrics.analyzeFiles(paths)
+
     def _eval_static_function(self, func_name: str, mod_name: str) -> str:
         """
         [Function View] Static Eval
@@ -96,28 +122,16 @@ class TrafficLightManager:
         2. 圈複雜度 (CC)
         """
         try:
-            # 讀取原始碼
-            # 這裡做一個簡單的 I/O 優化：如果 CodeAnalyzer 已經快取了該檔案則直接用
-            # 但目前架構 CodeAnalyzer 是針對 string，所以我們需讀檔
-            mod_dir = os.path.join(self.meta.workspace_root, mod_name)
-            filename = "__init_logic__.py" if func_name == "__init__" else f"{func_name}.py"
-            path = os.path.join(mod_dir, filename)
-
-            if not os.path.exists(path): return self.GRAY
-
-            with open(path, 'r', encoding='utf-8') as f:
-                code = f.read()
-
-            # 使用 CodeAnalyzer
-            from CodeAnalyzer import CodeAnalyzer
-            analyzer = CodeAnalyzer(code)
+            # 由 BatchCodeAnalyzer 取值：檔案未變動時直接命中快取 (不讀檔、不 parse)
+            metrics = self.code_metrics.analyzeFile(self._function_path(func_name, mod_name))
+            if metrics is None: return self.GRAY
 
             # 1. MI Score (0-100)
-            mi = analyzer.calculateMaintainability()
+            mi = metrics['maintainability']
 
             # 2. CC (Cyclomatic Complexity) - 硬性門檻
-            # cc_visit 回傳 dict {'func_name': cc}
-            cc_data = analyzer.calculateComplexity()
+            # complexity 為 dict {'func_name': cc}
+            cc_data = metrics['complexity']
             # 由於我們只傳入了單一函式的程式碼，cc_data 應該只有一項，或 func_name 匹配
             # 簡單取最大值
             max_cc = max(cc_data.values()) if cc_data else 0
@@ -137,17 +151,17 @@ class TrafficLightManager:
     def _eval_runtime(self, view_mode: str, node_name: str, parent_mod: str) -> str:
         """
         [Runtime]
-        依賴 MetricCollector 提供的數據
+        [優化] 優先使用 BenchmarkHarness 存下的中位數 (多樣本、已暖機)；
+        沒有基準測試結果的函式才退回 MetricCollector 單次 trace 的 avg_ms
         """
         # 獲取 benchmark 數據
         bench = self.meta.collector.getBenchmarkData()
 
         if view_mode == 'function':
-            data = bench.get(node_name)
-            if not data: return self.GRAY
-
-            avg_time = data.get('avg_ms', 0)
-            calls = data.get('calls', 0)
+            # [新增] 與前一個版本相比顯著變慢 (PerfHistory) 時一律標紅
+            if self._regressed(parent_mod, node_name): return self.RED
+            avg_time = self._runtime_ms(bench, parent_mod, node_name)
+            if avg_time is None: return self.GRAY
 
             # 絕對指標評分 (針對一般 desktop app)
             # 紅色：明顯卡頓 (>100ms) 或極高頻呼叫累積耗時長
@@ -164,14 +178,16 @@ class TrafficLightManager:
 
             total_avg_time = 0
             func_count = 0
+            regressed = False
 
             try:
                 with open(spec_path, 'r') as f:
                     spec = json.load(f)
                 for func in spec.get('functions', []):
-                    fname = func['name']
-                    if fname in bench:
-                        total_avg_time += bench[fname].get('avg_ms', 0)
+                    regressed = regressed or self._regressed(node_name, func['name'])
+                    ms = self._runtime_ms(bench, node_name, func['name'])
+                    if ms is not None:
+                        total_avg_time += ms
                         func_count += 1
             except: pass
 
@@ -179,9 +195,31 @@ class TrafficLightManager:
 
             module_avg = total_avg_time / func_count
             if module_avg > 50: return self.RED
-            if module_avg > 15: return self.YELLOW
+            # 模組內有函式退化時至少為黃燈
+            if module_avg > 15 or regressed: return self.YELLOW
             return self.GREEN
 
+    def _regressed(self, mod_name: str, func_name: str) -> bool:
+        history = getattr(self.meta, 'perf_history', None)
+        if not history or not mod_name: return False
+        cmp = history.status(mod_name, func_name)
+        return bool(cmp and cmp.verdict == "regression")
+
+    def _runtime_ms(self, bench: Dict, mod_name: str, func_name: str):
+        """單次呼叫耗時 (ms)：基準測試中位數 > trace avg_ms > None"""
+        harness = getattr(self.meta, 'bench', None)
+        stable = harness.latest(mod_name, func_name) if harness and mod_name else None
+        if stable:
+            return stable['median_us'] / 1000
+        data = bench.get(func_name)
+        if data is None:
+            # [修正] 同名函式分屬不同檔案時鍵為 "檔名:qualname"；取定義在該模組目錄下的那一個
+            mod_dir = os.path.join(os.path.abspath(self.meta.workspace_root), mod_name or "", "")
+            matches = [d for d in bench.values() if d.get('qualname') == func_name
+                       and os.path.abspath(d.get('file', '')).startswith(mod_dir)]
+            data = matches[0] if len(matches) == 1 else None
+        return data.get('avg_ms', 0) if data else None
+
     # --- Chaos Logic ---
 
     def _eval_chaos(self, view_mode: str, node_name: str, parent_mod: str) -> str:
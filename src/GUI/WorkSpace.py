@@ -3,6 +3,7 @@ from tkinter import ttk, scrolledtext
 import math
 import random
 import os
+from FlameGraphView import FlameGraphView
 
 class WorkSpace:
     def __init__(self, parent, mediator):
@@ -66,6 +67,11 @@ class WorkSpace:
         self.canvas = tk.Canvas(self.graph_frame, bg=self.colors['editor_bg'], highlightthickness=0)
         self.canvas.pack(fill=tk.BOTH, expand=True)
 
+        # --- Tab 3: Flame Graph (最近一次 Runtime 分析的呼叫樹) ---
+        self.flame_view = FlameGraphView(self.notebook, mediator)
+        self.notebook.add(self.flame_view.frame, text="Flame Graph")
+        self._flame_signature = None
+
     def _init_graph_menu(self):
         self.graph_menu = tk.Menu(self.canvas, tearoff=0)
         self.graph_menu.add_command(label="Refine Module", command=self.on_graph_refine)
@@ -160,6 +166,16 @@ class WorkSpace:
         selected_tab = self.notebook.index(self.notebook.select())
         if selected_tab == 1:
             self.draw_dependency_graph()
+        elif selected_tab == 2:
+            self.draw_flame_graph()
+
+    def draw_flame_graph(self):
+        """以收集器最新的呼叫樹更新火焰圖；同一次執行的資料不重新配置版面"""
+        collector = self.mediator.meta.collector
+        signature = (id(collector.call_tree), collector.call_tree.event_count)
+        if signature == self._flame_signature: return
+        self._flame_signature = signature
+        self.flame_view.set_tree(collector.getCallTree())
 
     # ... (其餘 Graph 相關程式碼 draw_dependency_graph, _generate_colors 等與上一版相同，請保留) ...
     # 為了簡潔，這裡省略重複的 Graph 代碼，請確保它們還在
@@ -283,6 +299,11 @@ class WorkSpace:
         node_pos_map = {} # { 'mod.func': (x, y) }
         nodes_to_draw = []
 
+        # [優化] 靜態評估模式：先批次分析所有函式檔 (結果快取於 TrafficLightManager)
+        if current_data_mode == 'static_eval':
+            self.mediator.meta.traffic_light.prefetch_static_functions(
+                [(mod, func) for mod in modules for func in data[mod] if not func.startswith("test_")])
+
         # 1. 計算節點位置
         for i, mod in enumerate(modules):
             funcs = data[mod]
@@ -331,8 +352,11 @@ class WorkSpace:
                 except: pass
 
         # B. 從 Static Analysis (Phase 3 - 如果有實作)
-        # 這裡需要 StructureAnalyzer 支援函式級依賴，如果尚未支援，至少我們有了 A 方案。
-        # 假設 A 方案已經夠用 (因為我們修復了 required_calls)
+        # [新增] 由 CallGraphIndex 取得實際的函式呼叫 (key 即 '模組.函式')
+        try:
+            edges.update(self.mediator.meta.get_call_edges())
+        except Exception as e:
+            print(f"[WorkSpace] Call graph unavailable: {e}")
 
         for src_name, tgt_name in edges:
             # 嘗試匹配座標
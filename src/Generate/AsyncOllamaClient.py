@@ -0,0 +1,161 @@
+import json
+import time
+import asyncio
+from typing import Dict, Tuple
+from OllamaClient import OllamaClient, _parse_chunk, _entropy, _is_json
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+class AsyncOllamaClient:
+    """
+    AsyncOllamaClient: OllamaClient 的 asyncio 版本，供 GenerationPipeline 在單一事件迴圈中同時推進多個生成。
+    - 安裝 httpx 時以 httpx.AsyncClient 串流 /api/chat；否則退回以 asyncio.to_thread 呼叫同步的共用實例。
+    - 與同步實例共用回應快取、統計 (get_metrics) 與每個模型的並行上限 (limit_for)，
+      並行數在事件迴圈內以 asyncio.Semaphore 控制。
+    - cancel_event 為既有的 threading.Event，等待排隊與讀取串流時都會檢查。
+    """
+    def __init__(self, base_url: str = "http://localhost:11434", sync_client: OllamaClient = None):
+        self.sync = sync_client or OllamaClient.shared(base_url)
+        self.base_url = self.sync.base_url
+        self._http = None
+        self._semaphores = {}  # { model: asyncio.Semaphore }，只在建立它的事件迴圈內使用
+
+    @property
+    def backend(self) -> str:
+        return "httpx" if HAS_HTTPX else "thread"
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        sem = self._semaphores.get(model)
+        if sem is None:
+            sem = asyncio.Semaphore(self.sync.limit_for(model))
+            self._semaphores[model] = sem
+        return sem
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _acquire(self, sem: asyncio.Semaphore, cancel_event):
+        while True:
+            if cancel_event and cancel_event.is_set():
+                self.sync._record(cancelled=1)
+                raise InterruptedError("Task Cancelled")
+            try:
+                await asyncio.wait_for(sem.acquire(), timeout=0.1)
+                return
+            except asyncio.TimeoutError:
+                continue
+
+    async def _stream_chat(self, payload: Dict, cancel_event=None, timeout=None) -> Tuple[str, float, Dict]:
+        """與 OllamaClient._stream_chat 相同的語意與回傳值 (httpx 串流)"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(base_url=self.base_url, timeout=None,
+                                           limits=httpx.Limits(max_keepalive_connections=OllamaClient.POOL_SIZE))
+        sync = self.sync
+        sync._record(requests=1, in_flight=1)
+
+        full_content = ""
+        total_logprob = 0.0
+        token_count = 0
+        ttft_ms = None
+        started = time.perf_counter()
+        try:
+            async with self._http.stream("POST", "/api/chat", json=payload, timeout=timeout) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if cancel_event and cancel_event.is_set():
+                        print("[Ollama] Request cancelled by user.")
+                        sync._record(cancelled=1)
+                        raise InterruptedError("Task Cancelled")
+                    if line:
+                        content, logprobs = _parse_chunk(line)
+                        if content and ttft_ms is None:
+                            ttft_ms = (time.perf_counter() - started) * 1000
+                        full_content += content
+                        total_logprob += sum(logprobs)
+                        token_count += len(logprobs)
+        except (InterruptedError, asyncio.CancelledError):
+            raise
+        except Exception:
+            sync._record(errors=1)
+            raise
+        finally:
+            sync._record(in_flight=-1)
+
+        if ttft_ms is not None:
+            sync._record(ttft_ms_total=ttft_ms, ttft_ms_max=ttft_ms, ttft_samples=1)
+        stats = {
+            "ttft_ms": round(ttft_ms, 2) if ttft_ms is not None else None,
+            "total_ms": round((time.perf_counter() - started) * 1000, 2),
+            "tokens": token_count,
+        }
+        return full_content, _entropy(total_logprob, token_count), stats
+
+    async def _complete(self, payload: Dict, cancel_event=None, timeout=None, use_cache: bool = True,
+                        is_valid=None) -> Tuple[str, float, Dict]:
+        sem = self._semaphore(payload.get("model", ""))
+        queued_at = time.perf_counter()
+        await self._acquire(sem, cancel_event)
+        queue_wait_ms = (time.perf_counter() - queued_at) * 1000
+        try:
+            if not HAS_HTTPX:
+                # 同步實例自行處理快取、統計與取消；此處的 semaphore 讓佔用的執行緒數不超過並行上限
+                return await asyncio.to_thread(self.sync._complete, payload, cancel_event, timeout, use_cache, is_valid)
+
+            sync = self.sync
+            sync._record(queue_wait_ms_total=queue_wait_ms, queue_wait_ms_max=queue_wait_ms)
+            cache = sync.cache if use_cache else None
+            key = None
+            if cache:
+                key = cache.key_for(payload)
+                hit = cache.get(key)
+                if hit is not None:
+                    content, entropy = hit
+                    return content, entropy, {"cached": True, "queue_wait_ms": 0.0, "ttft_ms": 0.0,
+                                              "total_ms": 0.0, "tokens": 0}
+
+            content, entropy, stats = await self._stream_chat(payload, cancel_event, timeout)
+            stats["queue_wait_ms"] = round(queue_wait_ms, 2)
+            stats["cached"] = False
+            if cache and content and (is_valid is None or is_valid(content)):
+                cache.put(key, content, entropy, payload.get("model", ""))
+            return content, entropy, stats
+        finally:
+            sem.release()
+
+    async def chat_complete_json(self, model: str, system_prompt: str, user_prompt: str, temperature: float = 0.2,
+                                 cancel_event=None, use_cache: bool = True) -> Tuple[Dict, float, Dict]:
+        """Returns: (parsed_json, entropy, stats)；錯誤時回傳 ({}, -1.0, {})，取消時拋出 InterruptedError"""
+        payload = OllamaClient._json_payload(model, system_prompt, user_prompt, temperature)
+        try:
+            content, entropy, stats = await self._complete(payload, cancel_event, use_cache=use_cache, is_valid=_is_json)
+            try:
+                parsed = json.loads(content)
+            except ValueError:
+                parsed = {}
+            return parsed, entropy, stats
+        except InterruptedError:
+            raise
+        except Exception as e:
+            print(f"[AsyncOllamaClient JSON Error] {e}")
+            return {}, -1.0, {}
+
+    async def chat_complete_raw(self, model: str, system_prompt: str, user_prompt: str, temperature: float = 0.3,
+                                cancel_event=None, use_cache: bool = True) -> Tuple[str, float]:
+        """Returns: (content, entropy)；錯誤時回傳 ("Error: ...", -1.0)，取消時拋出 InterruptedError"""
+        payload = OllamaClient._raw_payload(model, system_prompt, user_prompt, temperature)
+        try:
+            content, entropy, _ = await self._complete(payload, cancel_event, timeout=60, use_cache=use_cache)
+            return content, entropy
+        except InterruptedError:
+            raise
+        except Exception as e:
+            if cancel_event and cancel_event.is_set():
+                raise InterruptedError("Task Cancelled")
+            print(f"[AsyncOllamaClient Raw Error] {e}")
+            return f"Error: {str(e)}", -1.0
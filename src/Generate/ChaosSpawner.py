@@ -6,7 +6,7 @@ from OllamaClient import OllamaClient
 
 class ChaosSpawner:
     def __init__(self, ollama_url: str = "http://localhost:11434"):
-        self.client = OllamaClient(ollama_url)
+        self.client = OllamaClient.shared(ollama_url)
 
     def _extract_json(self, text: str) -> Dict:
         """嘗試從 LLM 回應中提取 JSON"""
@@ -79,7 +79,7 @@ class ChaosSpawner:
         )
 
         # 3. 呼叫 LLM
-        content_str, entropy = self.client.chat_complete_json(model_name, system_prompt, user_prompt)
+        content_str, entropy, _ = self.client.chat_complete_json(model_name, system_prompt, user_prompt)
 
         # 4. 存檔
         output_path = os.path.join(module_dir, "weakness_analysis.json")
@@ -171,7 +171,7 @@ class ChaosSpawner:
         )
 
         # 4. 呼叫 LLM
-        content_str, entropy = self.client.chat_complete_json(model_name, system_prompt, user_prompt)
+        content_str, entropy, _ = self.client.chat_complete_json(model_name, system_prompt, user_prompt)
 
         # 5. 存檔
         output_path = os.path.join(module_dir, "chaos_plan.json")
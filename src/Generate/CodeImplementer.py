@@ -20,7 +20,7 @@ class ImplementationResult:
 
 class CodeImplementer:
     def __init__(self, ollama_url: str = "http://localhost:11434"):
-        self.client = OllamaClient(ollama_url)
+        self.client = OllamaClient.shared(ollama_url)
 
 
 
@@ -104,11 +104,9 @@ class CodeImplementer:
             except: pass
         return 1
 
-    def _implement_single_function(self, spec_data: Dict, func_name: str, module_dir: str, model_name: str, feedback_report: str, cancel_event) -> ImplementationResult:
-        start_time = time.time()
-        filename = "__init_logic__.py" if func_name == "__init__" else f"{func_name}.py"
-        target_path = os.path.join(module_dir, filename)
-
+    def _build_impl_prompts(self, spec_data: Dict, func_name: str, module_dir: str, feedback_report: str = None):
+        """[新增] 組裝函式實作的 Prompt (同步流程與 GenerationPipeline 共用)
+        Returns: (system_prompt, user_prompt)"""
         # 1. 準備 Context
         target_func_spec = next((f for f in spec_data.get('functions', []) if f['name'] == func_name), None)
         module_name = spec_data.get('module_name', 'unknown')
@@ -146,24 +144,38 @@ class CodeImplementer:
 
         if feedback_report: # Fix mode logic (省略，保持原樣但加入 dep_context)
              user_prompt = f"FIX REQUEST:\n{feedback_report}\n\n" + user_prompt
+        return system_prompt, user_prompt
 
-        # 2. 生成
-        try:
-            content_str, entropy = self.client.chat_complete_raw(model_name, system_prompt, user_prompt, cancel_event=cancel_event)
-            code_body = self._extract_python_code(content_str)
+    def _write_implementation(self, module_dir: str, func_name: str, content_str: str, entropy: float, start_time: float) -> ImplementationResult:
+        """[新增] 擷取程式碼、寫入實作檔並更新 .status.json"""
+        filename = "__init_logic__.py" if func_name == "__init__" else f"{func_name}.py"
+        target_path = os.path.join(module_dir, filename)
 
-            # 簡單修補 import (如果 LLM 沒寫)
-            if "import" not in code_body:
-                code_body = "from typing import Any, List, Dict, Optional\n" + code_body
+        code_body = self._extract_python_code(content_str)
 
-            with open(target_path, 'w', encoding='utf-8') as f:
-                f.write(code_body)
+        # 簡單修補 import (如果 LLM 沒寫)
+        if "import" not in code_body:
+            code_body = "from typing import Any, List, Dict, Optional\n" + code_body
 
-            # 3. 更新狀態
-            version = self._get_next_version(module_dir, func_name)
-            self._update_status_file(module_dir, func_name, "implemented", entropy, version)
+        with open(target_path, 'w', encoding='utf-8') as f:
+            f.write(code_body)
 
-            return ImplementationResult(func_name, target_path, entropy, time.time() - start_time, True, version)
+        # 3. 更新狀態
+        version = self._get_next_version(module_dir, func_name)
+        self._update_status_file(module_dir, func_name, "implemented", entropy, version)
+
+        return ImplementationResult(func_name, target_path, entropy, time.time() - start_time, True, version)
+
+    def _implement_single_function(self, spec_data: Dict, func_name: str, module_dir: str, model_name: str, feedback_report: str, cancel_event) -> ImplementationResult:
+        start_time = time.time()
+        filename = "__init_logic__.py" if func_name == "__init__" else f"{func_name}.py"
+        target_path = os.path.join(module_dir, filename)
+
+        # 2. 生成
+        try:
+            system_prompt, user_prompt = self._build_impl_prompts(spec_data, func_name, module_dir, feedback_report)
+            content_str, entropy = self.client.chat_complete_raw(model_name, system_prompt, user_prompt, cancel_event=cancel_event)
+            return self._write_implementation(module_dir, func_name, content_str, entropy, start_time)
 
         except InterruptedError:
             return ImplementationResult(func_name, target_path, 0.0, 0.0, False)
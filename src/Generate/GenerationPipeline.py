@@ -0,0 +1,298 @@
+import os
+import json
+import time
+import asyncio
+from typing import Dict, List, Callable, Iterable
+from dataclasses import dataclass, field
+from AsyncOllamaClient import AsyncOllamaClient
+from ModuleDAG import ModuleDAG
+from CodeImplementer import ImplementationResult
+from TestSpawner import TestGenerationResult
+
+@dataclass
+class PipelineEvent:
+    stage: str      # "refine" | "implement" | "test" | "pipeline"
+    module: str
+    target: str     # 模組名或函式名
+    status: str     # "started" | "done" | "failed" | "skipped" | "blocked" | "cancelled"
+    done: int = 0   # 已結束的工作單元數
+    total: int = 0  # 目前已知的工作單元數 (模組細化後才知道函式數量，會逐步增加)
+    detail: str = ""
+
+@dataclass
+class PipelineReport:
+    module_status: Dict[str, str] = field(default_factory=dict)   # { module: "done" | "failed" | "blocked" | "cancelled" }
+    refined: List[str] = field(default_factory=list)
+    implemented: List[ImplementationResult] = field(default_factory=list)
+    tests: List[TestGenerationResult] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)                # "module" 或 "module.func"
+    cancelled: bool = False
+    wall_time: float = 0.0
+    backend: str = ""
+    spans: Dict[str, tuple] = field(default_factory=dict)          # { module: (start, end) } 相對開始的秒數
+    critical_path: List[str] = field(default_factory=list)         # 依實際耗時的最長依賴鏈
+    critical_path_time: float = 0.0
+
+class GenerationPipeline:
+    """
+    GenerationPipeline: 以 asyncio 一次推進整個專案的 細化 -> 實作 -> 測試生成。
+    - 模組順序依 architecture.json 的依賴：細化需等依賴模組的 spec 完成，
+      實作需等依賴模組至少有一個函式 implemented (與 MetaCoder.check_dependencies_met 相同的門檻)。
+    - 同一模組的函式、互不相依的模組同時生成，實際並行數由 AsyncOllamaClient 的每模型上限控制。
+    - 已有 spec.json 的模組不重新細化、已 implemented 的函式與已存在的測試檔都會略過，可中斷後接續執行。
+    - on_event(PipelineEvent) 在事件迴圈執行緒中呼叫，GUI 需自行轉交主執行緒 (root.after)。
+    - audit_spec(module, ModuleDetailResult) / audit_impl(spec_path, ImplementationResult) 回傳 False
+      時視為該步驟失敗 (由 MetaCoder 提供循環依賴與實作依賴檢查)。
+    """
+    STAGES = ("refine", "implement", "test")
+
+    def __init__(self, architecture_path: str, project_manager, coder, tester, model_config: Dict[str, str],
+                 on_event: Callable[[PipelineEvent], None] = None,
+                 audit_spec: Callable = None, audit_impl: Callable = None):
+        self.architecture_path = architecture_path
+        self.project_dir = os.path.dirname(architecture_path)
+        self.pm = project_manager
+        self.coder = coder
+        self.tester = tester
+        self.model_config = model_config
+        self.on_event = on_event
+        self.audit_spec = audit_spec
+        self.audit_impl = audit_impl
+
+        self.dag = None
+        self._done = 0
+        self._total = 0
+        self._t0 = 0.0
+
+    # --- 排程計畫 ---
+
+    def _load_plan(self) -> Dict[str, Dict]:
+        """{ module: {"deps": [...], "refinable": bool} }；entry point (main) 依賴所有模組且不需細化"""
+        self.dag = ModuleDAG.from_architecture(self.architecture_path)
+        plan = {}
+        for mod in self.dag.topological_order():
+            refinable = mod in self.dag.description
+            if not refinable and not os.path.exists(os.path.join(self.project_dir, mod, "spec.json")):
+                continue
+            plan[mod] = {"deps": self.dag.dependencies(mod), "refinable": refinable}
+        return plan
+
+    def _emit(self, stage: str, module: str, target: str, status: str, detail: str = ""):
+        if status != "started" and stage != "pipeline":
+            self._done += 1
+        if self.on_event:
+            try:
+                self.on_event(PipelineEvent(stage, module, target, status, self._done, self._total, detail))
+            except Exception as e:
+                print(f"[Pipeline] on_event error: {e}")
+
+    def _read_status(self, module: str) -> Dict:
+        try:
+            with open(os.path.join(self.project_dir, module, ".status.json"), 'r') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    # --- 執行 ---
+
+    def run(self, cancel_event=None, stages: Iterable[str] = STAGES) -> PipelineReport:
+        """同步入口 (在 GUI 的 worker 執行緒中呼叫)"""
+        return asyncio.run(self.run_async(cancel_event, stages))
+
+    async def run_async(self, cancel_event=None, stages: Iterable[str] = STAGES) -> PipelineReport:
+        stages = set(stages)
+        report = PipelineReport()
+        start = self._t0 = time.perf_counter()
+        plan = self._load_plan()
+        client = AsyncOllamaClient(sync_client=self.coder.client)
+        report.backend = client.backend
+        print(f"[Pipeline] {len(plan)} modules, stages={sorted(stages)}, backend={client.backend}")
+
+        self._done = 0
+        self._total = sum(1 for m in plan.values() if m["refinable"]) if "refine" in stages else 0
+        refined = {m: asyncio.Event() for m in plan}
+        implemented = {m: asyncio.Event() for m in plan}
+        spec_ok = {}
+
+        flows = {m: asyncio.create_task(self._module_flow(m, plan[m], stages, client, cancel_event, report,
+                                                          refined, implemented, spec_ok))
+                 for m in plan}
+        watcher = asyncio.create_task(self._watch_cancel(cancel_event, flows.values()))
+        try:
+            results = await asyncio.gather(*flows.values(), return_exceptions=True)
+        finally:
+            watcher.cancel()
+            await client.aclose()
+
+        for mod, res in zip(flows, results):
+            if isinstance(res, asyncio.CancelledError):
+                report.module_status[mod] = "cancelled"
+            elif isinstance(res, BaseException):
+                print(f"[Pipeline] {mod} error: {res}")
+                report.module_status[mod] = "failed"
+                report.failed.append(mod)
+            else:
+                report.module_status[mod] = res
+        report.cancelled = bool(cancel_event and cancel_event.is_set())
+        report.wall_time = round(time.perf_counter() - start, 3)
+        path, total = self.dag.critical_path({m: end - begin for m, (begin, end) in report.spans.items()})
+        report.critical_path, report.critical_path_time = path, round(total, 3)
+
+        self._emit("pipeline", "", "", "cancelled" if report.cancelled else "done",
+                   f"{len(report.implemented)} implemented, {len(report.tests)} tests, {len(report.failed)} failed")
+        print(f"[Pipeline] Finished in {report.wall_time}s: {report.module_status}")
+        if report.critical_path:
+            print(f"[Pipeline] Critical path {report.critical_path_time}s: {' -> '.join(report.critical_path)}")
+        return report
+
+    async def _watch_cancel(self, cancel_event, tasks):
+        """cancel_event 被設定時取消所有仍在進行的模組流程"""
+        if cancel_event is None: return
+        while not cancel_event.is_set():
+            await asyncio.sleep(0.1)
+        for t in tasks:
+            t.cancel()
+
+    async def _module_flow(self, module: str, info: Dict, stages: set, client, cancel_event, report,
+                           refined: Dict, implemented: Dict, spec_ok: Dict) -> str:
+        spec_path = os.path.join(self.project_dir, module, "spec.json")
+        began = None
+        try:
+            # 1. 細化 (等依賴模組的 spec)
+            for dep in info["deps"]:
+                await refined[dep].wait()
+            began = time.perf_counter() - self._t0
+            blocked = [d for d in info["deps"] if not spec_ok.get(d)]
+            if blocked:
+                spec_ok[module] = False
+                if "refine" in stages and info["refinable"]:
+                    self._emit("refine", module, module, "blocked", f"waiting on {', '.join(blocked)}")
+                return "blocked"
+
+            if os.path.exists(spec_path):
+                if "refine" in stages and info["refinable"]:
+                    self._emit("refine", module, module, "skipped", "spec exists")
+            elif "refine" in stages and info["refinable"]:
+                if not await self._refine(module, client, cancel_event, report):
+                    spec_ok[module] = False
+                    return "failed"
+            else:
+                spec_ok[module] = False
+                return "blocked"
+            spec_ok[module] = True
+            refined[module].set()
+
+            # 2. 實作 (等依賴模組至少有一個已實作函式)
+            if "implement" in stages:
+                for dep in info["deps"]:
+                    await implemented[dep].wait()
+                missing = [d for d in info["deps"]
+                           if not any(v.get('status') == 'implemented' for v in self._read_status(d).values())]
+                if missing:
+                    self._emit("implement", module, module, "blocked", f"no implemented funcs in {', '.join(missing)}")
+                    return "blocked"
+                await self._implement_module(module, spec_path, client, cancel_event, report)
+            implemented[module].set()
+
+            # 3. 測試生成 (不阻擋其他模組)
+            if "test" in stages:
+                await self._test_module(module, spec_path, client, cancel_event, report)
+            return "failed" if any(f.startswith(f"{module}.") for f in report.failed) else "done"
+        finally:
+            if began is not None:
+                report.spans[module] = (round(began, 4), round(time.perf_counter() - self._t0, 4))
+            # 無論成功、失敗或取消都要放行下游，避免等待者卡住
+            spec_ok.setdefault(module, False)
+            refined[module].set()
+            implemented[module].set()
+
+    async def _refine(self, module: str, client, cancel_event, report) -> bool:
+        self._emit("refine", module, module, "started")
+        model = self.model_config["architect"]
+        try:
+            system_prompt, user_prompt, mod_dir, declared_deps = self.pm._build_detail_prompts(self.architecture_path, module)
+            spec_data, entropy, _ = await client.chat_complete_json(model, system_prompt, user_prompt, cancel_event=cancel_event)
+            if not spec_data.get('functions'):
+                raise ValueError("empty spec returned")
+            result = self.pm._write_module_detail(mod_dir, module, spec_data, declared_deps, entropy, {}, cancel_event)
+            if self.audit_spec and not self.audit_spec(module, result):
+                raise ValueError("audit failed")
+        except InterruptedError:
+            self._emit("refine", module, module, "cancelled")
+            raise asyncio.CancelledError()
+        except Exception as e:
+            report.failed.append(module)
+            self._emit("refine", module, module, "failed", str(e))
+            return False
+        report.refined.append(module)
+        self._emit("refine", module, module, "done", f"entropy {entropy}")
+        return True
+
+    async def _implement_module(self, module: str, spec_path: str, client, cancel_event, report):
+        with open(spec_path, 'r', encoding='utf-8') as f:
+            spec_data = json.load(f)
+        status = self._read_status(module)
+        funcs = [fn['name'] for fn in spec_data.get('functions', [])
+                 if status.get(fn['name'], {}).get('status') != 'implemented']
+        self._total += len(funcs)
+        await asyncio.gather(*(self._implement_func(module, spec_path, spec_data, fn, client, cancel_event, report)
+                               for fn in funcs))
+
+    async def _implement_func(self, module: str, spec_path: str, spec_data: Dict, func_name: str, client, cancel_event, report):
+        self._emit("implement", module, func_name, "started")
+        module_dir = os.path.dirname(spec_path)
+        start_time = time.time()
+        try:
+            system_prompt, user_prompt = self.coder._build_impl_prompts(spec_data, func_name, module_dir)
+            content, entropy = await client.chat_complete_raw(self.model_config["coder"], system_prompt, user_prompt,
+                                                              cancel_event=cancel_event)
+            if entropy == -1.0:
+                raise RuntimeError(content)
+            res = self.coder._write_implementation(module_dir, func_name, content, entropy, start_time)
+            if self.audit_impl and not self.audit_impl(spec_path, res):
+                raise ValueError("audit failed")
+        except InterruptedError:
+            self._emit("implement", module, func_name, "cancelled")
+            raise asyncio.CancelledError()
+        except Exception as e:
+            report.failed.append(f"{module}.{func_name}")
+            self._emit("implement", module, func_name, "failed", str(e))
+            return
+        report.implemented.append(res)
+        self._emit("implement", module, func_name, "done", f"entropy {entropy}")
+
+    async def _test_module(self, module: str, spec_path: str, client, cancel_event, report):
+        with open(spec_path, 'r', encoding='utf-8') as f:
+            spec_data = json.load(f)
+        tests_dir = os.path.join(os.path.dirname(spec_path), "tests")
+        os.makedirs(tests_dir, exist_ok=True)
+        status = self._read_status(module)
+        funcs = [fn['name'] for fn in spec_data.get('functions', [])
+                 if status.get(fn['name'], {}).get('status') == 'implemented'
+                 and not os.path.exists(os.path.join(tests_dir, f"test_{fn['name']}.py"))]
+        self._total += len(funcs)
+        await asyncio.gather(*(self._test_func(module, spec_data, fn, tests_dir, client, cancel_event, report)
+                               for fn in funcs))
+
+    async def _test_func(self, module: str, spec_data: Dict, func_name: str, tests_dir: str, client, cancel_event, report):
+        system_prompt, user_prompt = self.tester._build_test_prompts(spec_data, func_name)
+        if system_prompt is None:
+            self._emit("test", module, func_name, "skipped", "no return value")
+            return
+        self._emit("test", module, func_name, "started")
+        start_time = time.time()
+        try:
+            content, entropy = await client.chat_complete_raw(self.model_config["coder"], system_prompt, user_prompt,
+                                                              cancel_event=cancel_event)
+            if entropy == -1.0:
+                raise RuntimeError(content)
+            res = self.tester._write_test(tests_dir, func_name, content, entropy, start_time)
+        except InterruptedError:
+            self._emit("test", module, func_name, "cancelled")
+            raise asyncio.CancelledError()
+        except Exception as e:
+            report.failed.append(f"{module}.{func_name}")
+            self._emit("test", module, func_name, "failed", str(e))
+            return
+        report.tests.append(res)
+        self._emit("test", module, func_name, "done", res.test_file_path)
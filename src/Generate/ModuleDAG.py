@@ -0,0 +1,207 @@
+import json
+import time
+import threading
+from typing import Dict, List, Callable, Iterable, Tuple
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+@dataclass
+class ScheduleReport:
+    status: Dict[str, str] = field(default_factory=dict)        # { module: "done" | "failed" | "blocked" | "cancelled" }
+    waves: List[List[str]] = field(default_factory=list)        # 靜態拓撲分層 (同一層可同時執行)
+    spans: Dict[str, Tuple[float, float, float]] = field(default_factory=dict)  # { module: (ready, start, end) } 相對開始的秒數
+    workers: int = 1
+    makespan: float = 0.0           # 總牆鐘時間
+    busy_time: float = 0.0          # 所有模組執行時間總和
+    idle_time: float = 0.0          # worker 閒置的 slot-秒 (= workers * makespan - busy_time)
+    utilization: float = 0.0
+    critical_path: List[str] = field(default_factory=list)   # 依實際耗時計算的最長依賴鏈
+    critical_path_time: float = 0.0
+
+    def summary(self) -> str:
+        done = sum(1 for s in self.status.values() if s == "done")
+        return (f"{done}/{len(self.status)} modules done in {self.makespan:.2f}s | "
+                f"critical path {self.critical_path_time:.2f}s ({' -> '.join(self.critical_path)}) | "
+                f"idle {self.idle_time:.2f} slot-s, utilization {self.utilization * 100:.0f}% on {self.workers} workers")
+
+class ModuleDAG:
+    """
+    ModuleDAG: 由 architecture.json 建立一次的模組依賴圖。
+    - 邊 A -> B 表示 A 依賴 B (B 必須先完成)；不在 modules 列表中的依賴名稱會被忽略。
+    - 有 entry_point 時加入 main 節點，依賴所有模組 (與 MetaCoder.check_dependencies_met 的特例一致)。
+    - 形成循環的模組不會出現在 waves() 中，列於 self.cyclic。
+    """
+    def __init__(self, dependencies: Dict[str, List[str]], description: Dict[str, str] = None):
+        self._deps = {m: [d for d in deps if d in dependencies and d != m] for m, deps in dependencies.items()}
+        self._dependents = {m: [] for m in self._deps}
+        for m, deps in self._deps.items():
+            for d in deps:
+                self._dependents[d].append(m)
+        self.description = description or {}
+        self._waves, self.cyclic = self._layer()
+
+    @classmethod
+    def from_architecture(cls, architecture_path: str) -> "ModuleDAG":
+        with open(architecture_path, 'r', encoding='utf-8') as f:
+            arch = json.load(f)
+        deps = {m['name']: list(m.get('dependencies', [])) for m in arch.get('modules', [])}
+        desc = {m['name']: m.get('description', '') for m in arch.get('modules', [])}
+        if arch.get('entry_point') and "main" not in deps:
+            deps["main"] = list(deps.keys())
+        return cls(deps, desc)
+
+    @property
+    def modules(self) -> List[str]:
+        return list(self._deps)
+
+    def __contains__(self, module: str) -> bool:
+        return module in self._deps
+
+    def dependencies(self, module: str) -> List[str]:
+        return list(self._deps.get(module, []))
+
+    def dependents(self, module: str) -> List[str]:
+        return list(self._dependents.get(module, []))
+
+    def _layer(self):
+        """Kahn 演算法分層：第 n 層的模組只依賴前 n-1 層"""
+        indegree = {m: len(deps) for m, deps in self._deps.items()}
+        layer = [m for m, n in indegree.items() if n == 0]
+        waves, seen = [], set()
+        while layer:
+            waves.append(layer)
+            seen.update(layer)
+            nxt = []
+            for m in layer:
+                for dependent in self._dependents[m]:
+                    indegree[dependent] -= 1
+                    if indegree[dependent] == 0:
+                        nxt.append(dependent)
+            layer = nxt
+        cyclic = [m for m in self._deps if m not in seen]
+        return waves, cyclic
+
+    def waves(self, subset: Iterable[str] = None) -> List[List[str]]:
+        """拓撲分層；給定 subset 時只保留其中的模組 (相對順序不變)"""
+        if subset is None:
+            return [list(w) for w in self._waves]
+        keep = set(subset)
+        return [w for w in ([m for m in wave if m in keep] for wave in self._waves) if w]
+
+    def topological_order(self, subset: Iterable[str] = None) -> List[str]:
+        return [m for wave in self.waves(subset) for m in wave]
+
+    def critical_path(self, durations: Dict[str, float]) -> Tuple[List[str], float]:
+        """依實際耗時找出最長的依賴鏈 (只計入有耗時紀錄的模組)"""
+        best = {}  # { module: (累計耗時, 前一個模組) }
+        for m in self.topological_order():
+            if m not in durations: continue
+            prev = max(((best[d][0], d) for d in self._deps[m] if d in best), default=(0.0, None))
+            best[m] = (prev[0] + durations[m], prev[1])
+        if not best:
+            return [], 0.0
+        tail = max(best, key=lambda m: best[m][0])
+        total = best[tail][0]
+        path = []
+        while tail is not None:
+            path.append(tail)
+            tail = best[tail][1]
+        return path[::-1], total
+
+class DagScheduler:
+    """
+    DagScheduler: 依 ModuleDAG 在執行緒池上執行每個模組的工作。
+    - 依賴全部滿足 (同批次內的依賴已完成且 is_satisfied 為真；批次外的依賴 is_satisfied 為真) 的模組立即開始，
+      不必等同一個 wave 的其他模組。
+    - 依賴失敗或不滿足的模組標記為 blocked；cancel_event 設定後不再啟動新模組。
+    - 回傳 ScheduleReport：每個模組的 ready/start/end、關鍵路徑長度與 worker 閒置時間。
+    """
+    def __init__(self, dag: ModuleDAG, max_workers: int = 2, is_satisfied: Callable[[str], bool] = None):
+        self.dag = dag
+        self.max_workers = max(1, max_workers)
+        self.is_satisfied = is_satisfied or (lambda m: True)
+
+    def run(self, modules: Iterable[str], work: Callable[[str], bool], cancel_event: threading.Event = None,
+            on_event: Callable[[str, str], None] = None) -> ScheduleReport:
+        """work(module) 回傳 True 表示成功；on_event(module, status) 於排程執行緒呼叫"""
+        targets = list(dict.fromkeys(modules))
+        report = ScheduleReport(workers=self.max_workers, waves=self.dag.waves(targets))
+        for m in targets:
+            if m in self.dag.cyclic:
+                report.status[m] = "blocked"
+
+        def emit(module, status):
+            if on_event:
+                try: on_event(module, status)
+                except Exception as e: print(f"[DagScheduler] on_event error: {e}")
+
+        t0 = time.perf_counter()
+        pending = {m for m in targets if m not in report.status}
+        ready_at = {}
+        start_at = {}
+        running = {}  # { future: module }
+
+        def prerequisites(m):
+            """None = 尚需等待；True = 可執行；False = 永遠無法滿足"""
+            for d in self.dag.dependencies(m):
+                if d in pending or any(rm == d for rm in running.values()):
+                    return None
+                if report.status.get(d, "done") != "done" or not self.is_satisfied(d):
+                    return False
+            return True
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                # 1. 依 DAG 順序找出可開始的模組
+                cancelled = bool(cancel_event and cancel_event.is_set())
+                # 不在 DAG 中的模組 (例如架構外手動建立的資料夾) 視為沒有依賴
+                order = self.dag.topological_order(pending) + sorted(m for m in pending if m not in self.dag)
+                for m in order:
+                    ok = prerequisites(m)
+                    if ok is None: continue
+                    pending.discard(m)
+                    if not ok or cancelled:
+                        report.status[m] = "cancelled" if cancelled else "blocked"
+                        emit(m, report.status[m])
+                        continue
+                    ready_at.setdefault(m, time.perf_counter() - t0)
+                    if len(running) >= self.max_workers:
+                        pending.add(m)
+                        continue
+                    start_at[m] = time.perf_counter() - t0
+                    emit(m, "started")
+                    running[pool.submit(work, m)] = m
+
+                if not running:
+                    # 剩下的模組都在等待無法完成的依賴
+                    for m in list(pending):
+                        report.status[m] = "blocked"
+                        emit(m, "blocked")
+                    pending.clear()
+                    break
+
+                # 2. 等任一模組完成，立即解除其下游的阻擋
+                finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    m = running.pop(fut)
+                    try:
+                        ok = bool(fut.result())
+                    except Exception as e:
+                        print(f"[DagScheduler] {m} failed: {e}")
+                        ok = False
+                    end = time.perf_counter() - t0
+                    report.spans[m] = (ready_at[m], start_at[m], end)
+                    if cancel_event and cancel_event.is_set() and not ok:
+                        report.status[m] = "cancelled"
+                    else:
+                        report.status[m] = "done" if ok else "failed"
+                    emit(m, report.status[m])
+
+        report.makespan = round(time.perf_counter() - t0, 4)
+        durations = {m: end - start for m, (_, start, end) in report.spans.items()}
+        report.busy_time = round(sum(durations.values()), 4)
+        report.idle_time = round(max(0.0, self.max_workers * report.makespan - report.busy_time), 4)
+        report.utilization = round(report.busy_time / (self.max_workers * report.makespan), 3) if report.makespan else 0.0
+        path, total = self.dag.critical_path(durations)
+        report.critical_path, report.critical_path_time = path, round(total, 4)
+        return report
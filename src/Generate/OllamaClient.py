@@ -1,58 +1,290 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import os
+import time
 import base64
+import threading
 from typing import Dict, Tuple, Optional, List, Any
+from ResponseCache import ResponseCache
+
+def _is_json(text: str) -> bool:
+    try:
+        json.loads(text)
+        return True
+    except ValueError:
+        return False
+
+def _parse_chunk(line) -> Tuple[str, List[float]]:
+    """解析一行 NDJSON 串流，回傳 (content 片段, logprob 列表)；無法解析時回傳 ("", [])"""
+    try:
+        chunk = json.loads(line)
+    except ValueError:
+        return "", []
+    if not isinstance(chunk, dict):
+        return "", []
+    # [修正] 欄位型別不符時只略過該部分，不讓單一異常的行拖垮整個請求
+    message = chunk.get('message')
+    if not isinstance(message, dict):
+        message = {}
+    content = message.get('content', '')
+    if not isinstance(content, str):
+        content = ""
+
+    # [Fix] 收集 Logprobs
+    # 優先檢查 root，其次檢查 message 內部 (相容不同 API 版本)
+    logs = chunk.get('logprobs') or message.get('logprobs')
+    if not isinstance(logs, list):
+        return content, []
+    logprobs = [item['logprob'] for item in logs
+                if isinstance(item, dict) and isinstance(item.get('logprob'), (int, float))]
+    return content, logprobs
+
+def _entropy(total_logprob: float, token_count: int) -> float:
+    """Entropy = - Average Log Probability"""
+    if token_count <= 0: return 0.0
+    return round(-(total_logprob / token_count), 4)
 
 class OllamaClient:
-    def __init__(self, base_url: str = "http://localhost:11434"):
-        self.base_url = base_url
+    """
+    Ollama /api/chat 客戶端。
+    - 以 OllamaClient.shared(base_url) 取得行程內共用的實例：所有 Spawner/Implementer 共用同一個
+      requests.Session 連線池 (keep-alive)，不再每次生成都建立新的 TCP 連線。
+    - 每個模型有一個 semaphore 限制同時進行中的生成數 (Ollama 本身會排隊，過多並行只會拉長每個請求的延遲)。
+    - get_metrics() 提供連線重用、排隊等待與首 token 延遲 (TTFT) 統計。
+    - enable_cache() 後，相同 (model, messages, format, options, images) 的請求直接取用磁碟快取
+      (見 ResponseCache)；個別呼叫可用 use_cache=False 略過。
+    """
+    DEFAULT_MAX_CONCURRENT = 2   # 每個模型同時進行中的生成數
+    POOL_SIZE = 8                # 連線池大小 (同一主機的最大保留連線數)
+
+    _shared_instances = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, base_url: str = "http://localhost:11434", max_concurrent: int = None):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrent = max_concurrent or self.DEFAULT_MAX_CONCURRENT
+
+        self.session = requests.Session()
+        self._adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.POOL_SIZE, max_retries=0)
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+
+        self._limits = {}       # { model: 上限 } 個別覆寫
+        self._semaphores = {}   # { model: BoundedSemaphore }
+        self._lock = threading.Lock()
+
+        self._stats = {
+            "requests": 0, "errors": 0, "cancelled": 0,
+            "in_flight": 0, "max_in_flight": 0,
+            "queue_wait_ms_total": 0.0, "queue_wait_ms_max": 0.0,
+            "ttft_ms_total": 0.0, "ttft_ms_max": 0.0, "ttft_samples": 0,
+        }
+        self.cache = None  # ResponseCache，預設關閉
+
+    @classmethod
+    def shared(cls, base_url: str = "http://localhost:11434") -> "OllamaClient":
+        """取得該 base_url 的行程共用實例"""
+        key = base_url.rstrip("/")
+        with cls._shared_lock:
+            client = cls._shared_instances.get(key)
+            if client is None:
+                client = cls(key)
+                cls._shared_instances[key] = client
+            return client
+
+    # --- 回應快取 ---
+
+    def enable_cache(self, cache_dir: str, max_mb: float = 256):
+        """開啟磁碟回應快取 (同一目錄重複呼叫時沿用現有實例，只更新容量上限)"""
+        if self.cache and self.cache.cache_dir == cache_dir:
+            self.cache.max_bytes = int(max_mb * 1024 * 1024)
+        else:
+            self.cache = ResponseCache(cache_dir, max_mb)
+
+    def disable_cache(self):
+        self.cache = None
+
+    def get_cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self.cache.stats() if self.cache else None
+
+    def _complete(self, payload: Dict, cancel_event=None, timeout=None, use_cache: bool = True,
+                  is_valid=None) -> Tuple[str, float, Dict]:
+        """快取查詢 -> 串流生成 -> 寫入快取。is_valid(content) 為 False 的結果不寫入快取"""
+        cache = self.cache if use_cache else None
+        key = None
+        if cache:
+            key = cache.key_for(payload)
+            hit = cache.get(key)
+            if hit is not None:
+                content, entropy = hit
+                return content, entropy, {"cached": True, "queue_wait_ms": 0.0, "ttft_ms": 0.0,
+                                          "total_ms": 0.0, "tokens": 0}
+
+        content, entropy, stats = self._stream_chat(payload, cancel_event, timeout)
+        stats["cached"] = False
+        if cache and content and (is_valid is None or is_valid(content)):
+            cache.put(key, content, entropy, payload.get("model", ""))
+        return content, entropy, stats
+
+    # --- 並行限制 ---
+
+    def set_concurrency(self, limit: int, model: str = None):
+        """設定同時進行中的生成數上限；model=None 時修改預設值 (只影響尚未建立 semaphore 的模型)"""
+        limit = max(1, int(limit))
+        with self._lock:
+            if model is None:
+                self.max_concurrent = limit
+            else:
+                self._limits[model] = limit
+                self._semaphores.pop(model, None)  # 下次請求時以新上限重建
+
+    def limit_for(self, model: str) -> int:
+        with self._lock:
+            return self._limits.get(model, self.max_concurrent)
+
+    def _semaphore(self, model: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem = self._semaphores.get(model)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self._limits.get(model, self.max_concurrent))
+                self._semaphores[model] = sem
+            return sem
+
+    # --- 統計 ---
+
+    def _record(self, **updates):
+        with self._lock:
+            for k, v in updates.items():
+                if k.endswith("_max"):
+                    self._stats[k] = max(self._stats[k], v)
+                else:
+                    self._stats[k] += v
+            if self._stats["in_flight"] > self._stats["max_in_flight"]:
+                self._stats["max_in_flight"] = self._stats["in_flight"]
 
-    def chat_complete_json(self, model: str, system_prompt: str, user_prompt: str, temperature: float = 0.2, cancel_event=None) -> Tuple[Dict, float, Dict]:
+    def _pool_counters(self) -> Tuple[int, int]:
+        """從 urllib3 連線池讀取 (新建連線數, 請求數)"""
+        conns = reqs = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            conns += getattr(pool, "num_connections", 0)
+            reqs += getattr(pool, "num_requests", 0)
+        return conns, reqs
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+        new_conns, http_requests = self._pool_counters()
+        done = max(1, s["requests"])
+        return {
+            "requests": s["requests"],
+            "errors": s["errors"],
+            "cancelled": s["cancelled"],
+            "in_flight": s["in_flight"],
+            "max_in_flight": s["max_in_flight"],
+            "connections_opened": new_conns,
+            "connections_reused": max(0, http_requests - new_conns),
+            "queue_wait_ms_avg": round(s["queue_wait_ms_total"] / done, 2),
+            "queue_wait_ms_max": round(s["queue_wait_ms_max"], 2),
+            "ttft_ms_avg": round(s["ttft_ms_total"] / max(1, s["ttft_samples"]), 2),
+            "ttft_ms_max": round(s["ttft_ms_max"], 2),
+        }
+
+    # --- 串流核心 ---
+
+    def _stream_chat(self, payload: Dict, cancel_event=None, timeout=None) -> Tuple[str, float, Dict]:
         """
-        支援 cancel_event 的 JSON 請求
+        送出串流請求並累積內容與 logprobs。
+        Returns: (full_content, entropy, stats)  失敗時拋出例外，取消時拋出 InterruptedError
         """
-        payload = {
-            "model": model,
-            "messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
-            "format": "json",
-            "stream": True,
-            "options": {"temperature": temperature, "num_ctx": 4096},
-            "logprobs": True # [Fix] 啟用 logprobs
-        }
+        model = payload.get("model", "")
+        sem = self._semaphore(model)
+
+        queued_at = time.perf_counter()
+        while not sem.acquire(timeout=0.1):
+            if cancel_event and cancel_event.is_set():
+                self._record(cancelled=1)
+                raise InterruptedError("Task Cancelled")
+        queue_wait_ms = (time.perf_counter() - queued_at) * 1000
+        self._record(requests=1, in_flight=1, queue_wait_ms_total=queue_wait_ms, queue_wait_ms_max=queue_wait_ms)
 
         full_content = ""
         total_logprob = 0.0
         token_count = 0
-
+        ttft_ms = None
+        started = time.perf_counter()
         try:
-            with requests.post(f"{self.base_url}/api/chat", json=payload, stream=True) as response:
+            with self.session.post(f"{self.base_url}/api/chat", json=payload, stream=True, timeout=timeout) as response:
                 response.raise_for_status()
                 for line in response.iter_lines():
                     if cancel_event and cancel_event.is_set():
                         print("[Ollama] Request cancelled by user.")
+                        self._record(cancelled=1)
                         raise InterruptedError("Task Cancelled")
 
                     if line:
-                        try:
-                            chunk = json.loads(line)
-                            if 'message' in chunk:
-                                content = chunk['message'].get('content', '')
-                                full_content += content
-
-                            # [Fix] 收集 Logprobs
-                            # 根據文件，它可能在 root level (如 /api/generate) 或 message level
-                            logs = chunk.get('logprobs')
-                            if not logs and 'message' in chunk:
-                                logs = chunk['message'].get('logprobs')
-
-                            if logs:
-                                for item in logs:
-                                    lp = item.get('logprob')
-                                    if lp is not None:
-                                        total_logprob += lp
-                                        token_count += 1
-                        except: pass
+                        content, logprobs = _parse_chunk(line)
+                        if content and ttft_ms is None:
+                            ttft_ms = (time.perf_counter() - started) * 1000
+                        full_content += content
+                        total_logprob += sum(logprobs)
+                        token_count += len(logprobs)
+        except InterruptedError:
+            raise
+        except Exception:
+            self._record(errors=1)
+            raise
+        finally:
+            self._record(in_flight=-1)
+            sem.release()
+
+        if ttft_ms is not None:
+            self._record(ttft_ms_total=ttft_ms, ttft_ms_max=ttft_ms, ttft_samples=1)
+
+        entropy = _entropy(total_logprob, token_count)
+        stats = {
+            "queue_wait_ms": round(queue_wait_ms, 2),
+            "ttft_ms": round(ttft_ms, 2) if ttft_ms is not None else None,
+            "total_ms": round((time.perf_counter() - started) * 1000, 2),
+            "tokens": token_count,
+        }
+        return full_content, entropy, stats
+
+    @staticmethod
+    def _json_payload(model: str, system_prompt: str, user_prompt: str, temperature: float) -> Dict:
+        return {
+            "model": model,
+            "messages": [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}],
+            "format": "json",
+            "stream": True,
+            "options": {"temperature": temperature, "num_ctx": 4096},
+            "logprobs": True # [Fix] 啟用 logprobs
+        }
+
+    @staticmethod
+    def _raw_payload(model: str, system_prompt: str, user_prompt: str, temperature: float, b64_images: List[str] = None) -> Dict:
+        user_msg = {"role": "user", "content": user_prompt}
+        if b64_images: user_msg["images"] = b64_images
+        return {
+            "model": model,
+            "messages": [{"role": "system", "content": system_prompt}, user_msg],
+            "stream": True,
+            "options": {"temperature": temperature},
+            "logprobs": True # [Fix] 根據您的文件，啟用 logprobs
+        }
+
+    def chat_complete_json(self, model: str, system_prompt: str, user_prompt: str, temperature: float = 0.2, cancel_event=None, use_cache: bool = True) -> Tuple[Dict, float, Dict]:
+        """
+        支援 cancel_event 的 JSON 請求
+        Returns: (parsed_json, entropy, stats)  stats 含 cached / queue_wait_ms / ttft_ms / total_ms / tokens
+        """
+        payload = self._json_payload(model, system_prompt, user_prompt, temperature)
+
+        try:
+            full_content, entropy, stats = self._complete(payload, cancel_event, use_cache=use_cache,
+                                                          is_valid=_is_json)
 
             # 解析 JSON
             try:
@@ -60,13 +292,7 @@ class OllamaClient:
             except:
                 parsed_json = {}
 
-            # 計算熵值
-            entropy = 0.0
-            if token_count > 0:
-                avg_logprob = total_logprob / token_count
-                entropy = round(-avg_logprob, 4)
-
-            return parsed_json, entropy, {}
+            return parsed_json, entropy, stats
 
         except InterruptedError:
             raise
@@ -81,7 +307,8 @@ class OllamaClient:
         user_prompt: str,
         temperature: float = 0.3,
         images: Optional[List[str]] = None,
-        cancel_event=None
+        cancel_event=None,
+        use_cache: bool = True
     ) -> Tuple[str, float]:
         """
         支援 cancel_event 的原始文字請求 (Stream Mode)
@@ -97,57 +324,10 @@ class OllamaClient:
                     except Exception as e:
                         print(f"[OllamaClient] Failed to encode image {img_path}: {e}")
 
-        user_msg = {"role": "user", "content": user_prompt}
-        if b64_images: user_msg["images"] = b64_images
-
-        payload = {
-            "model": model,
-            "messages": [{"role": "system", "content": system_prompt}, user_msg],
-            "stream": True,
-            "options": {"temperature": temperature},
-            "logprobs": True # [Fix] 根據您的文件，啟用 logprobs
-        }
-
-        full_content = ""
-        total_logprob = 0.0
-        token_count = 0
+        payload = self._raw_payload(model, system_prompt, user_prompt, temperature, b64_images)
 
         try:
-            with requests.post(f"{self.base_url}/api/chat", json=payload, stream=True, timeout=60) as response:
-                response.raise_for_status()
-
-                for line in response.iter_lines():
-                    if cancel_event and cancel_event.is_set():
-                        print("[Ollama] Request cancelled by user.")
-                        raise InterruptedError("Task Cancelled")
-
-                    if line:
-                        try:
-                            chunk = json.loads(line)
-                            if 'message' in chunk:
-                                content = chunk['message'].get('content', '')
-                                full_content += content
-
-                            # [Fix] 收集 Logprobs
-                            # 優先檢查 root，其次檢查 message 內部 (相容不同 API 版本)
-                            logs = chunk.get('logprobs')
-                            if not logs and 'message' in chunk:
-                                logs = chunk['message'].get('logprobs')
-
-                            if logs:
-                                for item in logs:
-                                    lp = item.get('logprob')
-                                    if lp is not None:
-                                        total_logprob += lp
-                                        token_count += 1
-                        except: pass
-
-            # 計算熵值 (Entropy = - Average Log Probability)
-            entropy = 0.0
-            if token_count > 0:
-                avg_logprob = total_logprob / token_count
-                entropy = round(-avg_logprob, 4)
-
+            full_content, entropy, _ = self._complete(payload, cancel_event, timeout=60, use_cache=use_cache)
             return full_content, entropy
 
         except InterruptedError:
@@ -23,7 +23,7 @@ class ModuleDetailResult:
 class ProjectManager:
     def __init__(self, workspace_dir: str = "./vibe_workspace", ollama_url: str = "http://localhost:11434"):
         self.workspace_dir = workspace_dir
-        self.client = OllamaClient(ollama_url)
+        self.client = OllamaClient.shared(ollama_url)
         if not os.path.exists(workspace_dir):
             os.makedirs(workspace_dir)
 
@@ -72,13 +72,9 @@ class ProjectManager:
 
         return GenerationResult(arch_path, project_dir, entropy, time.time() - start_time)
 
-    def generateModuleDetail(self, architecture_path: str, target_module_name: str, progress_data: Dict[str, Any], model_name: str,cancel_event: threading.Event = None ) -> ModuleDetailResult:
-        """
-        (Phase 2) 單一模組細化
-        **優化重點**：強化參數完整性 Prompt
-        """
-        print(f"[*] (Phase 2) Refining Module '{target_module_name}' with {model_name}...")
-
+    def _build_detail_prompts(self, architecture_path: str, target_module_name: str):
+        """[新增] 組裝模組細化的 Prompt (同步流程與 GenerationPipeline 共用)
+        Returns: (system_prompt, user_prompt, mod_dir, declared_deps)"""
         with open(architecture_path, 'r', encoding='utf-8') as f:
             arch_data = json.load(f)
 
@@ -138,6 +134,15 @@ class ProjectManager:
             f"{dep_context}\n"
             "Generate the full spec.json."
         )
+        return system_prompt, user_prompt, mod_dir, declared_deps
+
+    def generateModuleDetail(self, architecture_path: str, target_module_name: str, progress_data: Dict[str, Any], model_name: str,cancel_event: threading.Event = None ) -> ModuleDetailResult:
+        """
+        (Phase 2) 單一模組細化
+        **優化重點**：強化參數完整性 Prompt
+        """
+        print(f"[*] (Phase 2) Refining Module '{target_module_name}' with {model_name}...")
+        system_prompt, user_prompt, mod_dir, declared_deps = self._build_detail_prompts(architecture_path, target_module_name)
 
         # 在生成 Spec 之前檢查
         if cancel_event and cancel_event.is_set():
@@ -146,7 +151,11 @@ class ProjectManager:
 
         # 呼叫 LLM
         spec_data, entropy, _ = self.client.chat_complete_json(model_name, system_prompt, user_prompt, cancel_event=cancel_event)
+        return self._write_module_detail(mod_dir, target_module_name, spec_data, declared_deps, entropy, progress_data, cancel_event)
 
+    def _write_module_detail(self, mod_dir: str, target_module_name: str, spec_data: Dict, declared_deps: List[str],
+                             entropy: float, progress_data: Dict[str, Any], cancel_event: threading.Event = None) -> ModuleDetailResult:
+        """[新增] 寫入 spec.json、__init__.py 與函式 stub"""
         # 強制補全依賴
         if 'dependencies' not in spec_data:
             spec_data['dependencies'] = declared_deps
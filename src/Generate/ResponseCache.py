@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+class ResponseCache:
+    """
+    ResponseCache: OllamaClient 的內容定址 LLM 回應快取 (opt-in)。
+    以 (model, messages, format, options, images) 的雜湊為 key，保存生成內容與計算出的熵值。
+
+    目錄結構:
+        <cache_dir>/<key>.json   {"content", "entropy", "model", "created"}
+    以檔案 mtime 作為最近使用時間 (命中時 touch)，總大小超過 max_bytes 時由最久未使用的開始淘汰。
+    """
+    def __init__(self, cache_dir: str, max_mb: float = 256):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._entries = {}  # { key: [size, last_access] }
+        self._total = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"): continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            self._entries[name[:-5]] = [st.st_size, st.st_mtime]
+            self._total += st.st_size
+
+    @staticmethod
+    def key_for(payload: Dict) -> str:
+        """由請求內容計算 key (圖片以 base64 形式存在 messages 中，一併納入)"""
+        material = {
+            "model": payload.get("model"),
+            "messages": payload.get("messages"),
+            "format": payload.get("format"),
+            "options": payload.get("options"),
+        }
+        blob = json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(blob).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """命中時回傳 (content, entropy)，否則回傳 None"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            now = time.time()
+            os.utime(self._path(key), (now, now))
+        except Exception:
+            # 快取檔遺失或損毀，當作未命中
+            with self._lock:
+                size = self._entries.pop(key, [0])[0]
+                self._total -= size
+                self.misses += 1
+            return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries[key][1] = now
+            self.hits += 1
+        return entry["content"], entry["entropy"]
+
+    def put(self, key: str, content: str, entropy: float, model: str = ""):
+        data = json.dumps({"content": content, "entropy": entropy, "model": model, "created": time.time()},
+                          ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        try:
+            target = self._path(key)
+            tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, target)
+        except Exception as e:
+            print(f"[ResponseCache] Failed to store entry: {e}")
+            return
+
+        with self._lock:
+            old = self._entries.get(key)
+            if old: self._total -= old[0]
+            self._entries[key] = [len(data), time.time()]
+            self._total += len(data)
+            self.stores += 1
+            self._evict()
+
+    def _evict(self):
+        """(需持有鎖) 依最近使用時間淘汰，直到總大小低於上限"""
+        if self._total <= self.max_bytes:
+            return
+        for key, (size, _) in sorted(self._entries.items(), key=lambda kv: kv[1][1]):
+            if self._total <= self.max_bytes: break
+            try: os.remove(self._path(key))
+            except OSError: pass
+            del self._entries[key]
+            self._total -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                try: os.remove(self._path(key))
+                except OSError: pass
+            self._entries.clear()
+            self._total = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_mb": round(self._total / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+            }
@@ -17,7 +17,7 @@ class TestGenerationResult:
 
 class TestSpawner:
     def __init__(self, ollama_url: str = "http://localhost:11434"):
-        self.client = OllamaClient(ollama_url)
+        self.client = OllamaClient.shared(ollama_url)
 
     def _extract_python_code(self, text: str) -> str:
         match = re.search(r"```python\s*(.*?)\s*```", text, re.DOTALL)
@@ -32,27 +32,21 @@ class TestSpawner:
         normalized = return_type.lower().strip()
         return normalized not in ['none', 'void', 'noreturn', 'nothing']
 
-    def _generate_single_test(self, spec_data: Dict, func_name: str, tests_dir: str, model_name: str = "gemma3:12b") -> TestGenerationResult:
-        start_time = time.time()
-
+    def _build_test_prompts(self, spec_data: Dict, func_name: str):
+        """[新增] 組裝單元測試 Prompt (同步流程與 GenerationPipeline 共用)
+        Returns: (system_prompt, user_prompt)；不需產生測試時回傳 (None, skip_result)"""
         # 1. 獲取函式規格
         target_func_spec = next((f for f in spec_data.get('functions', []) if f['name'] == func_name), None)
         if not target_func_spec:
-            return TestGenerationResult(func_name, "", -1.0, 0.0, True)
+            return None, TestGenerationResult(func_name, "", -1.0, 0.0, True)
 
         # 2. 檢查回傳值
         return_type = target_func_spec.get('return_type', 'None')
         if not self._should_generate_test(return_type):
             print(f"    > Skipping test for {func_name} (Return type: {return_type})")
-            return TestGenerationResult(func_name, "", 0.0, 0.0, True)
+            return None, TestGenerationResult(func_name, "", 0.0, 0.0, True)
 
-        print(f"    > Generating Unit Test for {func_name}...")
-
-        # 3. 準備檔案路徑
-        test_filename = f"test_{func_name}.py"
-        test_file_path = os.path.join(tests_dir, test_filename)
-
-        # 4. 準備 Prompt
+        # 3. 準備 Prompt
         module_name = spec_data.get('module_name', 'unknown_module')
 
         system_prompt = (
@@ -77,20 +71,33 @@ class TestSpawner:
             f"Target Function Info:\n{func_info}\n\n"
             "Generate the unittest code now:"
         )
+        return system_prompt, user_prompt
 
-        try:
-            content_str, entropy = self.client.chat_complete_raw(model_name, system_prompt, user_prompt)
-            code_body = self._extract_python_code(content_str)
+    def _write_test(self, tests_dir: str, func_name: str, content_str: str, entropy: float, start_time: float) -> TestGenerationResult:
+        """[新增] 擷取程式碼並寫入 tests/test_<func>.py"""
+        test_file_path = os.path.join(tests_dir, f"test_{func_name}.py")
+        code_body = self._extract_python_code(content_str)
+
+        # 加入 sys.path hack 讓測試在碎片化狀態下也能跑 (可選，視您如何執行測試而定)
+        # 這裡簡單加上標準 import 頭
+        if "import unittest" not in code_body:
+            code_body = "import unittest\n" + code_body
 
-            # 加入 sys.path hack 讓測試在碎片化狀態下也能跑 (可選，視您如何執行測試而定)
-            # 這裡簡單加上標準 import 頭
-            if "import unittest" not in code_body:
-                code_body = "import unittest\n" + code_body
+        with open(test_file_path, 'w', encoding='utf-8') as f:
+            f.write(code_body)
 
-            with open(test_file_path, 'w', encoding='utf-8') as f:
-                f.write(code_body)
+        return TestGenerationResult(func_name, test_file_path, entropy, time.time() - start_time, False)
+
+    def _generate_single_test(self, spec_data: Dict, func_name: str, tests_dir: str, model_name: str = "gemma3:12b") -> TestGenerationResult:
+        start_time = time.time()
+        system_prompt, user_prompt = self._build_test_prompts(spec_data, func_name)
+        if system_prompt is None:
+            return user_prompt  # 略過 (無規格或無回傳值)
 
-            return TestGenerationResult(func_name, test_file_path, entropy, time.time() - start_time, False)
+        print(f"    > Generating Unit Test for {func_name}...")
+        try:
+            content_str, entropy = self.client.chat_complete_raw(model_name, system_prompt, user_prompt)
+            return self._write_test(tests_dir, func_name, content_str, entropy, start_time)
 
         except Exception as e:
             print(f"[!] Error generating test for {func_name}: {e}")
@@ -1,6 +1,7 @@
 import os
 import json
 import sys
+import threading
 import tkinter as tk
 
 # 設定模組搜尋路徑，確保能 import 子資料夾中的模組
@@ -18,10 +19,17 @@ from MetricCollector import MetricCollector
 from RuntimeAnalyst import RuntimeAnalyst
 from ChaosExecuter import ChaosExecuter
 from VersionController import VersionController
+from FileWatcher import FileWatcher
 from StructureAnalyzer import StructureAnalyzer
 from OllamaManager import OllamaManager
 from TestRunner import TestRunner
+from BenchmarkHarness import BenchmarkHarness
+from PerfHistory import PerfHistory
 from TrafficLightManager import TrafficLightManager
+from OllamaClient import OllamaClient
+from GenerationPipeline import GenerationPipeline
+from ModuleDAG import ModuleDAG, DagScheduler
+from DependencyGraph import DependencyGraph
 
 # Frontend Import
 from MainWindow import MainWindow
@@ -40,6 +48,11 @@ class MetaCoder:
             "vision": "gemma3:4b"
         }
 
+        # [新增] LLM 回應快取 (opt-in)：存放在 <workspace>/.metacoder_cache/llm
+        self.llm_cache_config = {"enabled": False, "max_mb": 256}
+        # [新增] 混沌測試：virtual_clock 讓 Latency 注入不實際睡眠；max_workers 為 None 時使用 CPU 數
+        self.chaos_config = {"virtual_clock": False, "max_workers": None}
+
         # 嘗試載入設定 (如果存在)
         self._load_config()
 
@@ -55,15 +68,32 @@ class MetaCoder:
         self.static_analyzer = StructureAnalyzer(self.workspace_root)
 
         self.current_architecture_path = None
+        # [新增] 模組 DAG 與 .status.json 摘要快取 (依檔案 mtime 失效)
+        self._dag = None
+        self._dag_key = None
+        self._impl_status_cache = {}
+        # [新增] spec.json 宣告的模組依賴圖 (增量維護 SCC)，第一次細化稽核時建立
+        self._spec_graph = None
+        self._spec_graph_dir = None
+        self._audit_lock = threading.Lock()
+        # [修正] 保護 _dag / _impl_status_cache：FileWatcher 執行緒會在排程器與 GUI 讀取時使其失效。
+        # 鎖的順序：_audit_lock -> static_analyzer.lock；_cache_lock 內不取其他鎖
+        self._cache_lock = threading.Lock()
         # [Fix 3] 初始化 Ollama Manager
         self.ollama_mgr = OllamaManager()
         # [New] 初始化測試與燈號管理
         self.test_runner = TestRunner(self.workspace_root)
-        self.static_analyzer = StructureAnalyzer(self.workspace_root)
+        # [新增] 統計式微基準測試 (結果存於 <module>/.benchmarks.json，供 Runtime 燈號使用)
+        self.bench = BenchmarkHarness(self.workspace_root)
+        self.perf_history = PerfHistory(self.workspace_root)
 
         # [新增]
         self.traffic_light = TrafficLightManager(self)
 
+        # [新增] 工作區檔案監看 (背景執行緒)：由 GUI 啟動，變更時主動使快取失效
+        self.file_watcher = FileWatcher(self.workspace_root)
+        self.file_watcher.subscribe(self._on_file_events)
+
     # --- [Fix 3] Ollama 控制 API ---
     def ensure_ollama_started(self):
         """在生成前呼叫"""
@@ -81,7 +111,42 @@ class MetaCoder:
                 with open(self.config_path, 'r') as f:
                     saved = json.load(f)
                     self.model_config.update(saved.get('models', {}))
+                    self.llm_cache_config.update(saved.get('llm_cache', {}))
+                    self.chaos_config.update(saved.get('chaos', {}))
             except: pass
+        self._apply_llm_cache()
+
+    def _save_config(self):
+        with open(self.config_path, 'w') as f:
+            json.dump({'models': self.model_config, 'llm_cache': self.llm_cache_config,
+                       'chaos': self.chaos_config}, f, indent=4)
+
+    def _apply_llm_cache(self):
+        client = OllamaClient.shared()
+        if self.llm_cache_config.get("enabled"):
+            cache_dir = os.path.join(self.workspace_root, ".metacoder_cache", "llm")
+            client.enable_cache(cache_dir, self.llm_cache_config.get("max_mb", 256))
+        else:
+            client.disable_cache()
+
+    def set_llm_cache(self, enabled: bool, max_mb: float = None):
+        """開關 LLM 回應快取並存檔"""
+        self.llm_cache_config["enabled"] = bool(enabled)
+        if max_mb: self.llm_cache_config["max_mb"] = max_mb
+        self._apply_llm_cache()
+        self._save_config()
+        print(f"[Meta] LLM response cache {'enabled' if enabled else 'disabled'}.")
+
+    def set_chaos_virtual_clock(self, enabled: bool):
+        """開關混沌測試的虛擬時鐘並存檔"""
+        self.chaos_config["virtual_clock"] = bool(enabled)
+        self._save_config()
+        print(f"[Meta] Chaos virtual clock {'enabled' if enabled else 'disabled'}.")
+
+    def get_llm_stats(self) -> dict:
+        """LLM 連線/快取統計 (供 GUI log 顯示)"""
+        client = OllamaClient.shared()
+        return {"client": client.get_metrics(), "cache": client.get_cache_stats()}
 
     def run(self):
         """啟動 GUI 主迴圈"""
@@ -95,8 +160,7 @@ class MetaCoder:
         if role in self.model_config:
             self.model_config[role] = model_name
             # 立即存檔
-            with open(self.config_path, 'w') as f:
-                json.dump({'models': self.model_config}, f, indent=4)
+            self._save_config()
             print(f"[Meta] Model for {role} updated to {model_name} and saved.")
 
     # --- [Fix 2] Main.py Spec 處理 ---
@@ -196,24 +260,57 @@ class MetaCoder:
         if not result: return None # 被取消或失敗
 
         # 3. [Audit] 虛擬靜態分析：循環依賴檢查
+        if not self._audit_refinement(module_name, result):
+            return None # 視為失敗
+
+        # 4. [Commit] 通過檢查，歸檔
+        self.vc.archiveVersion(f"Refined Module: {module_name}")
+        return result
+
+    def _audit_refinement(self, module_name: str, result) -> bool:
+        """[新增] 細化後的循環依賴檢查；失敗時回滾剛生成的 spec (refine_module 與 GenerationPipeline 共用)"""
+        with self._audit_lock:
+            return self._audit_refinement_locked(module_name, result)
+
+    def _read_spec_deps(self, spec_path: str):
+        try:
+            with open(spec_path, 'r') as f:
+                return json.load(f).get('dependencies', [])
+        except Exception:
+            return None
+
+    def _get_spec_graph(self):
+        """[新增] 由所有 spec.json 建立一次依賴圖；之後由稽核與 FileWatcher 事件增量更新"""
+        project_dir = os.path.dirname(self.current_architecture_path)
+        if self._spec_graph is None or self._spec_graph_dir != project_dir:
+            graph = DependencyGraph()
+            for d in os.listdir(project_dir):
+                deps = self._read_spec_deps(os.path.join(project_dir, d, "spec.json"))
+                if deps is not None:
+                    graph.set_dependencies(d, deps)
+            self._spec_graph, self._spec_graph_dir = graph, project_dir
+        return self._spec_graph
+
+    def _update_spec_graph(self, spec_path: str, removed: bool):
+        """spec.json 變更 (FileWatcher)：只更新該模組的出邊"""
+        with self._audit_lock:
+            if self._spec_graph is None: return
+            if os.path.dirname(os.path.dirname(spec_path)) != self._spec_graph_dir: return
+            module = os.path.basename(os.path.dirname(spec_path))
+            deps = None if removed else self._read_spec_deps(spec_path)
+            self._spec_graph.set_dependencies(module, deps or [])
+
+    def _audit_refinement_locked(self, module_name: str, result) -> bool:
         print(f"[Meta] Auditing circular dependencies for {module_name}...")
 
-        # 構建虛擬代碼 Map (所有已存在的 Spec + 剛生成的這個)
-        virtual_map = {}
-        # 讀取所有現有模組
-        for d in os.listdir(project_dir):
-            spec_p = os.path.join(project_dir, d, "spec.json")
-            if os.path.exists(spec_p):
-                with open(spec_p, 'r') as f:
-                    s = json.load(f)
-                    # 轉換為 import 語句
-                    imports = "\n".join([f"import {dep}" for dep in s.get('dependencies', [])])
-                    virtual_map[d] = imports
-
-        cycles = self.static_analyzer.detect_cycles_from_stubs(virtual_map)
-
-        if cycles:
-            print(f"[Audit Failed] Circular dependency detected: {cycles}")
+        # [優化] 不再重讀所有 spec 並重建整張圖：只檢查剛生成模組的依賴是否會在既有的 SCC 圖上形成環
+        graph = self._get_spec_graph()
+        module = os.path.basename(os.path.dirname(result.spec_file_path))
+        deps = self._read_spec_deps(result.spec_file_path) or []
+        cycle = graph.check_dependencies(module, deps)
+
+        if cycle:
+            print(f"[Audit Failed] Circular dependency detected: {' -> '.join(cycle)}")
             # [Rollback] 刪除剛生成的 spec 和 stub
             # 最快的方法是 git checkout -- <module_dir> (如果之前有 commit)
             # 或者手動刪除。這裡使用 VC 的 rollback file (需擴充支援資料夾) 或簡單用 os.remove
@@ -226,11 +323,15 @@ class MetaCoder:
             os.remove(result.spec_file_path)
             # ... (刪除 stubs)
             print(f"[Meta] Rolled back refinement for {module_name}.")
-            return None # 視為失敗
+            graph.set_dependencies(module, [])
+            return False
 
-        # 4. [Commit] 通過檢查，歸檔
-        self.vc.archiveVersion(f"Refined Module: {module_name}")
-        return result
+        graph.set_dependencies(module, deps)
+
+        # [新增] 通知靜態分析器：只重新解析新產生的 stub
+        for frag_path in result.fragment_files:
+            self.static_analyzer.invalidate(frag_path)
+        return True
 
     # --- Phase 3: 函式實作 ---
     def implement_functions(self, spec_path: str, func_names: list, cancel_event=None):
@@ -241,7 +342,33 @@ class MetaCoder:
 
         if not results: return []
 
-        # 2. [Audit] 實作一致性檢查
+        # 2. [Audit] 實作一致性檢查 ([優化] 同一批檔案的 import 一次掃描)
+        valid_results = self._audit_implementations(spec_path, [res for res in results if res.success])
+
+        # [Fix 5] 版本控制存檔
+        if valid_results:
+            msg = f"Implemented {len(valid_results)} funcs: {', '.join([r.function_name for r in valid_results])}"
+            self.vc.archiveVersion(msg)
+            print(f"[Meta] Version Archived: {msg}")
+
+        return valid_results
+
+    def _audit_implementation(self, spec_path: str, res) -> bool:
+        """[新增] 實作一致性檢查 (只能 import spec 宣告的依賴)；失敗時寫回 stub 並標記 audit_failed"""
+        with self._audit_lock:
+            return self._audit_implementation_locked(spec_path, res)
+
+    def _audit_implementations(self, spec_path: str, results: list) -> list:
+        """[新增] 批次版 _audit_implementation：回傳通過稽核的結果"""
+        if not results: return []
+        with self._audit_lock:
+            allowed = self._allowed_deps(spec_path)
+            verdicts = self.static_analyzer.verify_implementation_deps_batch(
+                [(res.file_path, allowed) for res in results])
+            return [res for res in results
+                    if self._finish_implementation_audit(spec_path, res, verdicts[res.file_path])]
+
+    def _allowed_deps(self, spec_path: str) -> list:
         # 讀取 Spec 中的允許依賴
         with open(spec_path, 'r') as f:
             spec = json.load(f)
@@ -249,30 +376,54 @@ class MetaCoder:
         # 允許依賴自己模組
         mod_name = spec.get('module_name')
         if mod_name: allowed.append(mod_name)
+        return allowed
+
+    def _audit_implementation_locked(self, spec_path: str, res) -> bool:
+        passed = self.static_analyzer.verify_implementation_deps(res.file_path, self._allowed_deps(spec_path))
+        return self._finish_implementation_audit(spec_path, res, passed)
+
+    def _finish_implementation_audit(self, spec_path: str, res, passed: bool) -> bool:
+        if passed:
+            # [新增] 以增量維護的 import 圖檢查這個檔案的 import 是否會形成循環依賴
+            cycle = self.static_analyzer.find_import_cycle(res.file_path)
+            if cycle:
+                print(f"[Audit] Circular import: {' -> '.join(cycle)}")
+                passed = False
+        if not passed:
+            print(f"[Audit Failed] Implementation of {res.function_name} violates dependency rules.")
+            # [Rollback] 還原該檔案
+            # 這裡簡單清空或寫回 pass stub
+            with open(res.file_path, 'w') as f:
+                f.write(f"def {res.function_name}(*args, **kwargs):\n    raise NotImplementedError('Audit Failed: Dependency Violation')")
+            # 更新狀態為 failed
+            self.coder._update_status_file(os.path.dirname(spec_path), res.function_name, "audit_failed", 0, 0)
+
+        # [新增] 實作檔已寫入 (或已回滾)，增量更新解析快取
+        self.static_analyzer.invalidate(res.file_path)
+        return passed
+
+    # --- [新增] 整個專案的非同步生成管線 ---
+    def build_project(self, cancel_event=None, on_event=None, stages=GenerationPipeline.STAGES):
+        """
+        依 architecture.json 的依賴順序，同時進行所有模組的 細化 -> 實作 -> 測試生成 (見 GenerationPipeline)。
+        on_event(PipelineEvent) 於背景執行緒呼叫。結束後將產出一次歸檔。
+        """
+        if not self.current_architecture_path:
+            self.get_project_tree()
+        if not self.current_architecture_path: raise ValueError("No architecture.")
 
-        valid_results = []
-        for res in results:
-            if not res.success: continue
-
-            # 檢查
-            if self.static_analyzer.verify_implementation_deps(res.file_path, allowed):
-                valid_results.append(res)
-            else:
-                print(f"[Audit Failed] Implementation of {res.function_name} violates dependency rules.")
-                # [Rollback] 還原該檔案
-                # 這裡簡單清空或寫回 pass stub
-                with open(res.file_path, 'w') as f:
-                    f.write(f"def {res.function_name}(*args, **kwargs):\n    raise NotImplementedError('Audit Failed: Dependency Violation')")
-                # 更新狀態為 failed
-                self.coder._update_status_file(os.path.dirname(spec_path), res.function_name, "audit_failed", 0, 0)
+        pipeline = GenerationPipeline(
+            self.current_architecture_path, self.pm, self.coder, self.tester, self.model_config,
+            on_event=on_event, audit_spec=self._audit_refinement, audit_impl=self._audit_implementation
+        )
+        report = pipeline.run(cancel_event=cancel_event, stages=stages)
 
-        # [Fix 5] 版本控制存檔
-        if valid_results:
-            msg = f"Implemented {len(valid_results)} funcs: {', '.join([r.function_name for r in valid_results])}"
+        if report.refined or report.implemented or report.tests:
+            msg = (f"Pipeline: {len(report.refined)} modules refined, "
+                   f"{len(report.implemented)} funcs implemented, {len(report.tests)} tests")
             self.vc.archiveVersion(msg)
             print(f"[Meta] Version Archived: {msg}")
-
-        return valid_results
+        return report
 
     # --- 測試生成 ---
     def generate_tests(self, spec_path: str, func_names: list):
@@ -281,12 +432,12 @@ class MetaCoder:
         return self.tester.generateUnitTest(spec_path, func_names, model)
 
     # --- 動態分析與除錯 ---
-    def run_dynamic_analysis(self, code_str: str, target_func: str):
-        """執行代碼 -> 收集數據 -> LLM 分析"""
+    def run_dynamic_analysis(self, code_str: str, target_func: str, mode: str = "trace", isolated: bool = False):
+        """執行代碼 -> 收集數據 -> LLM 分析 (mode: "trace" 精確 / "sampling" 低開銷；isolated: 改在 worker 子行程執行)"""
         print("[Meta] Starting Dynamic Analysis...")
 
         # 1. 執行並收集 (LLM-free)
-        self.collector.execute_code(code_str)
+        self.collector.execute_code(code_str, mode=mode, isolated=isolated)
         raw_json = self.collector.outputMetricResult(target_funcs=[target_func])
         data = json.loads(raw_json)
 
@@ -298,7 +449,8 @@ class MetaCoder:
             data['io_activity'],
             data['code_coverage'],
             data['call_graph'],
-            logic_model=model_logic
+            logic_model=model_logic,
+            memory_data=data.get('memory')
         )
 
         # 3. 視覺分析 (如果有截圖)
@@ -323,9 +475,26 @@ class MetaCoder:
             "entropies": (l_entropy, v_entropy)
         }
 
+    def run_benchmarks(self, module_name: str, func_names: list = None, inputs: dict = None):
+        """
+        [新增] 以生成的單元測試 (或 tests/bench_<func>.py) 的輸入重複執行函式，回傳 {func: BenchmarkResult}。
+        單次 trace 的 avg_ms 雜訊大，燈號優先使用這裡存下的中位數。
+        """
+        # 先歸檔，讓結果對應到確切的程式碼版本；再與祖先版本比較是否顯著變慢
+        # [修正] 歸檔若產生新 commit，代表一併提交了尚未歸檔的編輯：記錄下來，避免被誤認為刻意的重新生成
+        head = self.vc.currentVersion()
+        commit = self.vc.archiveVersion(f"Benchmark snapshot: {module_name}")
+        dirty = commit != head
+        if dirty:
+            print(f"[Meta] Benchmark snapshot {commit[:7]} committed pending edits in the workspace.")
+        results = self.bench.benchmark_module(module_name, func_names, inputs=inputs, commit=commit)
+        self.perf_history.record(commit, module_name, results, ancestors=self.vc.getAncestors(commit),
+                                 message=f"Benchmark: {module_name}", dirty=dirty)
+        return results
+
     # --- 混沌工程 ---
-    def run_chaos_campaign(self, module_name: str):
-        """弱點分析 -> 生成計畫 -> 執行攻擊"""
+    def run_chaos_campaign(self, module_name: str, virtual_clock: bool = None, max_workers: int = None):
+        """弱點分析 -> 生成計畫 -> 執行攻擊 (virtual_clock / max_workers 為 None 時使用 chaos_config)"""
         model = self.model_config["analyst"]
 
         # 1. 分析
@@ -337,9 +506,14 @@ class MetaCoder:
             weakness_path, 2, model # Focus Level 2 (Medium+)
         )
         # 3. 執行
-        report_path = self.chaos_runner.produceChaos(module_name)
+        report_path = self._produce_chaos(module_name, virtual_clock, max_workers)
         return report_path
 
+    def _produce_chaos(self, module_name: str, virtual_clock: bool = None, max_workers: int = None):
+        if virtual_clock is None: virtual_clock = self.chaos_config.get("virtual_clock", False)
+        if max_workers is None: max_workers = self.chaos_config.get("max_workers")
+        return self.chaos_runner.produceChaos(module_name, max_workers=max_workers, virtual_clock=virtual_clock)
+
     # --- 系統操作 ---
     def get_project_tree(self):
         """
@@ -408,35 +582,77 @@ class MetaCoder:
 
         else:
             # 方案 B: 退回源碼分析 (Reality)
-            if not self.static_analyzer.dependencies:
-                self.static_analyzer._preprocess()
-            nodes = list(self.static_analyzer.internal_modules)
-            for src, targets in self.static_analyzer.dependencies.items():
-                for tgt in targets:
-                    if tgt in nodes:
-                        edges.append((src, tgt))
+            analyzer = self.static_analyzer
+            with analyzer.lock:
+                if not analyzer.dependencies:
+                    analyzer._preprocess()
+                nodes = list(analyzer.internal_modules)
+                for src, targets in analyzer.dependencies.items():
+                    for tgt in targets:
+                        if tgt in nodes:
+                            edges.append((src, tgt))
 
         return nodes, edges
 
     def _get_module_dependencies_from_arch(self, module_name):
         """從 architecture.json 讀取依賴列表"""
-        if not self.current_architecture_path: return []
-        with open(self.current_architecture_path, 'r') as f:
-            arch = json.load(f)
-        mod = next((m for m in arch.get('modules', []) if m['name'] == module_name), None)
-        return mod.get('dependencies', []) if mod else []
+        dag = self.get_module_dag()
+        return dag.dependencies(module_name) if dag else []
+
+    def get_module_dag(self):
+        """[新增] 由 architecture.json 建立的模組 DAG；只在架構檔變更 (mtime) 時重建"""
+        if not self.current_architecture_path:
+            self.get_project_tree()
+        path = self.current_architecture_path
+        if not path or not os.path.exists(path): return None
+        key = (path, os.path.getmtime(path))
+        with self._cache_lock:
+            if self._dag_key != key:
+                self._dag = ModuleDAG.from_architecture(path)
+                self._dag_key = key
+            return self._dag
+
+    def _module_has_impl(self, module_name: str) -> bool:
+        """[新增] 模組是否至少有一個 implemented 函式 (快取 .status.json，檔案變更才重讀)"""
+        project_dir = os.path.dirname(self.current_architecture_path)
+        status_path = os.path.join(project_dir, module_name, ".status.json")
+        try:
+            st = os.stat(status_path)
+        except OSError:
+            return False
+        key = (st.st_mtime_ns, st.st_size)
+        with self._cache_lock:
+            cached = self._impl_status_cache.get(status_path)
+        if cached and cached[0] == key:
+            return cached[1]
+        try:
+            with open(status_path, 'r') as f:
+                status = json.load(f)
+            has_impl = any(v.get('status') == 'implemented' for v in status.values())
+        except Exception:
+            return False
+        with self._cache_lock:
+            self._impl_status_cache[status_path] = (key, has_impl)
+        return has_impl
+
+    def _module_has_spec(self, module_name: str) -> bool:
+        project_dir = os.path.dirname(self.current_architecture_path)
+        return os.path.exists(os.path.join(project_dir, module_name, "spec.json"))
 
     def get_function_distribution(self):
         """
         [修正] 聚合模組名稱，解決 Legend 過於破碎的問題。
         將 'auth.login', 'auth.utils' 統一聚合為 'auth'。
         """
-        if not self.static_analyzer.graphs:
-            self.static_analyzer._preprocess()
+        analyzer = self.static_analyzer
+        with analyzer.lock:
+            if not analyzer.graphs:
+                analyzer._preprocess()
+            graphs = list(analyzer.graphs.items())
 
         distribution = {} # { 'module_folder_name': [func_names...] }
 
-        for mod_key, graph in self.static_analyzer.graphs.items():
+        for mod_key, graph in graphs:
             # mod_key 可能是 "auth.login" 或 "main"
             # 我們只取最頂層的模組名稱 (即資料夾名稱)
             # 如果是 'auth.login' -> top_mod = 'auth'
@@ -446,7 +662,7 @@ class MetaCoder:
             # 排除一些非業務邏輯的根節點 (視情況而定，這裡先保留)
 
             funcs = []
-            for _, data in graph.graph.nodes(data=True):
+            for _, data in graph.iter_nodes():
                 if data.get('type') == 'function':
                     funcs.append(data.get('name'))
 
@@ -459,6 +675,24 @@ class MetaCoder:
 
         return distribution
 
+    def get_call_graph(self):
+        """[新增] 函式層級呼叫圖 (見 CallGraphIndex)；key 與 get_function_distribution 的 '模組.函式' 一致"""
+        analyzer = self.static_analyzer
+        with analyzer.lock:
+            if not analyzer.graphs:
+                analyzer._preprocess()
+            return analyzer.get_call_graph()
+
+    def get_call_edges(self) -> list:
+        """呼叫圖的邊 [(caller, callee)]；在分析器鎖內查詢 (CallGraphIndex 查詢時會惰性重建)"""
+        with self.static_analyzer.lock:
+            return self.get_call_graph().edges()
+
+    def get_impacted_functions(self, module_name: str, func_name: str) -> list:
+        """[新增] 影響分析：module_name.func_name 變更後需要重新測試的函式"""
+        with self.static_analyzer.lock:
+            return sorted(self.get_call_graph().impacted_by(f"{module_name}.{func_name}"))
+
     def set_workspace(self, new_path: str):
         print(f"[Meta] Switching workspace to: {new_path}")
         self.workspace_root = os.path.abspath(new_path)
@@ -468,47 +702,99 @@ class MetaCoder:
         self.pm = ProjectManager(self.workspace_root)
         self.static_analyzer = StructureAnalyzer(self.workspace_root)
         self.chaos_runner = ChaosExecuter(self.workspace_root)
+        self.bench = BenchmarkHarness(self.workspace_root)
+        self.perf_history = PerfHistory(self.workspace_root)
         self.current_architecture_path = None
+        with self._cache_lock:
+            self._dag = None
+            self._dag_key = None
+            self._impl_status_cache = {}
+        with self._audit_lock:
+            self._spec_graph = None
+        self.traffic_light.invalidate()
+        self.file_watcher.set_root(self.workspace_root)
 
         self._load_config() # 載入該 Workspace 的特定設定
         self.get_project_tree()
         print("[Meta] Workspace reset complete.")
 
+    def _on_file_events(self, events: list):
+        """
+        [新增] FileWatcher 回呼 (監看執行緒)：依事件類別只讓受影響的快取失效。
+        - implementation: StructureAnalyzer 重新解析該檔
+        - status: 丟棄該模組的 .status.json 摘要
+        - spec: architecture.json 變更時重建 DAG
+        [修正] 每種快取只在各自的鎖內修改 (StructureAnalyzer 內部自行加鎖)，且不巢狀取鎖，
+        與 DagScheduler 的工作執行緒及 Tk 執行緒並行讀取時不會讀到半更新的狀態
+        """
+        for ev in events:
+            if ev.category == "rescan":
+                self.static_analyzer.refresh()
+                with self._cache_lock:
+                    self._impl_status_cache = {}
+                    self._dag_key = None
+                with self._audit_lock:
+                    self._spec_graph = None
+            elif ev.category == "implementation":
+                self.static_analyzer.invalidate(ev.path)
+            elif ev.category == "status":
+                with self._cache_lock:
+                    self._impl_status_cache.pop(ev.path, None)
+            elif ev.category == "spec" and os.path.basename(ev.path) == "architecture.json":
+                with self._cache_lock:
+                    self._dag_key = None
+            elif ev.category == "spec":
+                self._update_spec_graph(ev.path, ev.removed)
+        self.traffic_light.invalidate(events)
+
     def check_dependencies_met(self, module_name: str) -> bool:
-        if not self.current_architecture_path: return True
+        dag = self.get_module_dag()
+        if dag is None: return True
         try:
-            with open(self.current_architecture_path, 'r') as f:
-                arch = json.load(f)
-
-            mod_info = next((m for m in arch.get('modules', []) if m['name'] == module_name), None)
-            # 如果是 main，可能不在 modules 列表中，這裡假設 main 依賴所有 top-level modules
-            # 為求簡單，如果找不到 mod_info，我們預設它依賴所有已存在的模組 (這對 main 很有用)
-            dependencies = []
-            if mod_info:
-                dependencies = mod_info.get('dependencies', [])
-            elif module_name == 'main':
-                # 特例處理 main: 檢查所有其他模組是否 ready
-                dependencies = [m['name'] for m in arch.get('modules', [])]
-
-            project_dir = os.path.dirname(self.current_architecture_path)
-
-            for dep in dependencies:
-                status_path = os.path.join(project_dir, dep, ".status.json")
-                if not os.path.exists(status_path):
-                    print(f"[Check] {module_name} blocked: {dep} missing status file.")
+            # main 不在 modules 列表時，DAG 會讓它依賴所有模組
+            for dep in dag.dependencies(module_name):
+                # 只要有任何一個函式實作了，就當作該模組可用 (Low bar for MVP)
+                if not self._module_has_impl(dep):
+                    print(f"[Check] {module_name} blocked: {dep} has no impl funcs.")
                     return False
-
-                with open(status_path, 'r') as f:
-                    status = json.load(f)
-                    # 只要有任何一個函式實作了，就當作該模組可用 (Low bar for MVP)
-                    if not any(v.get('status') == 'implemented' for v in status.values()):
-                        print(f"[Check] {module_name} blocked: {dep} has no impl funcs.")
-                        return False
-
             return True # All checks passed
         except Exception as e:
             print(f"[Check Error] {e}")
             return True # Fail open to avoid deadlocks
+
+    # --- [新增] 依 DAG 排程的批次細化 / 實作 ---
+    def _scheduler_workers(self, role: str) -> int:
+        return self.coder.client.limit_for(self.model_config[role])
+
+    def refine_modules(self, module_names: list, cancel_event=None, on_event=None):
+        """依依賴順序細化多個模組：互不相依者同時進行，依賴的 spec 一完成就開始下游。Returns: ScheduleReport"""
+        dag = self.get_module_dag()
+        if dag is None: raise ValueError("No architecture.")
+        scheduler = DagScheduler(dag, self._scheduler_workers("architect"), is_satisfied=self._module_has_spec)
+        report = scheduler.run(module_names, lambda m: self.refine_module(m, cancel_event) is not None,
+                               cancel_event=cancel_event, on_event=on_event)
+        print(f"[Meta] Refine schedule: {report.summary()}")
+        return report
+
+    def implement_modules(self, targets: dict, cancel_event=None, on_event=None):
+        """
+        targets: { module_name: (spec_path, [func_names]) }
+        依賴模組有實作後才開始下游模組；同時進行的模組數等於 coder 模型的並行上限。Returns: (ScheduleReport, results)
+        """
+        dag = self.get_module_dag()
+        if dag is None: raise ValueError("No architecture.")
+        results = {}
+
+        def work(module_name):
+            spec_path, funcs = targets[module_name]
+            results[module_name] = self.implement_functions(spec_path, funcs, cancel_event=cancel_event)
+            return bool(results[module_name])
+
+        scheduler = DagScheduler(dag, self._scheduler_workers("coder"), is_satisfied=self._module_has_impl)
+        report = scheduler.run(list(targets), work, cancel_event=cancel_event, on_event=on_event)
+        print(f"[Meta] Implement schedule: {report.summary()}")
+        return report, results
+
     # --- Workflow: Unit Test ---
     def execute_test_workflow(self, target_name, target_type, spec_path, mediator):
         """生成並執行單元測試"""
@@ -545,6 +831,10 @@ class MetaCoder:
             # Log 結果
             pass_count = sum(1 for v in results.values() if v)
             mediator.log(f"[Test Result] Passed {pass_count}/{len(results)}")
+            report = self.test_runner.last_report
+            if report:
+                mediator.log(f"[Test Timing] {report.wall_time}s wall, "
+                             f"{len(report.executed_files)} files run, {len(report.cached_files)} cached")
 
             # 更新 Graph
             mediator.root.after(0, mediator.workspace.draw_dependency_graph)
@@ -554,33 +844,63 @@ class MetaCoder:
         mediator.run_async(task)
 
     # --- Workflow: Runtime Analysis ---
-    def execute_runtime_workflow(self, func_name, code_str, mediator):
+    def execute_runtime_workflow(self, func_name, code_str, mediator, mode: str = "trace", isolated: bool = False):
         """執行代碼並分析效能"""
         def task():
-            mediator.log(f"[Runtime] Executing {func_name} with Profiler...")
+            mediator.log(f"[Runtime] Executing {func_name} with Profiler ({mode})...")
 
             # 1. 執行與收集數據
             # 這裡需要注意：execute_code 需要能跑起來的代碼。
             # 如果代碼依賴其他模組，直接 exec 可能會失敗。
             # 簡單解法：我們先跑，失敗就報錯。
+            # isolated (選用): 在 worker 子行程執行，目標卡死或吃光記憶體時不會拖垮 IDE；
+            # 預設在本行程執行，Tk 程式可一直跑到使用者關閉視窗 (隔離模式有牆鐘上限)
             try:
-                self.collector.execute_code(code_str)
+                self.collector.execute_code(code_str, mode=mode, isolated=isolated)
             except Exception as e:
                 mediator.log(f"[Runtime Error] Execution failed: {e}")
                 return
 
+            if self.collector.exec_status != "ok":
+                mediator.log(f"[Runtime Warning] Worker terminated ({self.collector.exec_status}); partial data only.")
+
             # 2. 獲取數據
             raw_json = self.collector.outputMetricResult(target_funcs=[func_name])
             data = json.loads(raw_json)
 
-            perf = data['performance'].get(func_name, {})
-            mediator.log(f"[Runtime Data] Time: {perf.get('total_time_ms')}ms, Mem: {perf.get('mem_peak')} bytes")
+            # 同名函式分屬不同檔案時各有一筆，鍵為 "檔名:qualname"
+            if not data['performance']:
+                mediator.log(f"[Runtime Data] No calls to {func_name} were recorded.")
+            for name, perf in data['performance'].items():
+                mediator.log(f"[Runtime Data] {name}: Time: {perf.get('time_ms')}ms, Mem: {perf.get('mem_peak')} bytes")
 
             # 3. LLM 分析 (可選，這裡只做數據更新讓燈號變色)
             # 如果你要看 LLM 報告，可以呼叫 analyst.analyzeBottleNeck
 
             mediator.log("[Runtime] Profile updated. Refreshing graph...")
             mediator.root.after(0, mediator.workspace.draw_dependency_graph)
+            mediator.root.after(0, mediator.workspace.draw_flame_graph)
+
+        mediator.run_async(task)
+
+    # --- Workflow: Benchmark ---
+    def execute_benchmark_workflow(self, module_name, mediator, func_names: list = None):
+        """[新增] 對模組 (或其中部分函式) 執行統計式基準測試並更新燈號"""
+        def task():
+            mediator.log(f"[Benchmark] Benchmarking {module_name}...")
+            results = self.run_benchmarks(module_name, func_names)
+            for name, res in results.items():
+                if res.status == "ok":
+                    mediator.log(f"[Benchmark] {name}: median {res.median_us:.2f} us "
+                                 f"[{res.ci_low_us:.2f}, {res.ci_high_us:.2f}], p95 {res.p95_us:.2f} us, "
+                                 f"MAD {res.mad_us:.2f} us ({res.input_source}, {res.inputs} inputs)")
+                else:
+                    mediator.log(f"[Benchmark] {name}: {res.status} {res.error}".rstrip())
+                cmp = self.perf_history.status(module_name, name) if res.status == "ok" else None
+                if cmp and cmp.verdict != "unchanged":
+                    mediator.log(f"[Perf {cmp.verdict.upper()}] {name}: {cmp.change:+.1%} vs "
+                                 f"{cmp.baseline_commit[:7]} (p={cmp.p_value:.2g})")
+            mediator.root.after(0, mediator.workspace.draw_dependency_graph)
 
         mediator.run_async(task)
 
@@ -607,8 +927,9 @@ class MetaCoder:
             if mediator._current_cancel_flag.is_set(): return
 
             # 3. 執行攻擊
-            mediator.log("[Chaos] Launching attacks (this may take time)...")
-            report_path = self.chaos_runner.produceChaos(module_name)
+            clock = " (virtual clock)" if self.chaos_config.get("virtual_clock") else ""
+            mediator.log(f"[Chaos] Launching attacks{clock} (this may take time)...")
+            report_path = self._produce_chaos(module_name)
 
             # 4. 讀取報告摘要
             try:
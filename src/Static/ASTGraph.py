@@ -13,6 +13,9 @@ class ASTGraph:
         self.graph = nx.DiGraph()
         # 記錄起始節點 ID (可選)
         self.root_id = None
+        # [新增] 延遲標籤：節點只存 label_src，由 label_renderer(source_lines, label_src) 在需要時產生文字
+        self.source_lines = []
+        self.label_renderer = None
 
 # 修改原本的 add_node，增加 **kwargs
     def add_node(self, content: str, node_type: str = "process", node_id: str = None, **kwargs) -> str:
@@ -21,7 +24,10 @@ class ASTGraph:
 
         # [修改點] 確保將 kwargs 傳遞給 NetworkX 的 add_node
         # 原本可能是: self.graph.add_node(node_id, label=content, type=node_type)
-        self.graph.add_node(node_id, label=content, type=node_type, **kwargs)
+        # [優化] content 為 None 時不寫入 label (延遲標籤節點，見 get_label)
+        if content is not None:
+            kwargs['label'] = content
+        self.graph.add_node(node_id, type=node_type, **kwargs)
 
         if self.root_id is None:
             self.root_id = node_id
@@ -47,12 +53,44 @@ class ASTGraph:
 
         self.graph.add_edge(source_id, target_id, **attr)
 
+    def set_edge_label(self, source_id: str, target_id: str, label: str):
+        """[新增] 修改既有邊的標籤 (與 CompactASTGraph 共用的介面)"""
+        if label:
+            self.graph[source_id][target_id]['label'] = label
+        else:
+            self.graph[source_id][target_id].pop('label', None)
+
+    def freeze(self):
+        """[新增] 與 CompactASTGraph 介面一致；NetworkX 後端不需壓縮"""
+        pass
+
+    def __len__(self):
+        return self.graph.number_of_nodes()
+
+    def iter_nodes(self):
+        """[新增] 逐一產生 (node_id, 屬性 dict)；兩種後端共用，呼叫端不必直接碰 self.graph"""
+        return iter(self.graph.nodes(data=True))
+
     def get_node_info(self, node_id: str) -> dict:
         """取得特定節點的詳細資訊"""
         if node_id in self.graph:
             return self.graph.nodes[node_id]
         return None
 
+    def get_label(self, node_id: str) -> str:
+        """
+        [新增] 取得節點顯示文字。延遲標籤節點第一次被查詢時才產生文字並寫回 label 屬性，
+        之後與一般節點相同。
+        """
+        data = self.graph.nodes[node_id]
+        if 'label' not in data:
+            src = data.get('label_src')
+            if src is not None and self.label_renderer is not None:
+                data['label'] = self.label_renderer(self.source_lines, src)
+            else:
+                return node_id
+        return data['label']
+
     def get_next_steps(self, node_id: str) -> list:
         """
         取得某節點的下一步驟 (Outgoing edges)。
@@ -98,7 +136,7 @@ class ASTGraph:
         for node, data in self.graph.nodes(data=True):
             n_type = data.get('type', 'process')
             color_map.append(type_color.get(n_type, '#cccccc'))
-            labels[node] = data.get('label', node)
+            labels[node] = self.get_label(node)
 
         node_collection = nx.draw_networkx_nodes(self.graph, pos,
                                                  node_color=color_map,
@@ -0,0 +1,159 @@
+import os
+import hashlib
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from CodeAnalyzer import CodeAnalyzer
+
+# 子行程只需要這個模組與 CodeAnalyzer (radon)：不匯入 networkx / GUI，spawn 啟動成本低
+
+def analyze_source(code: str) -> dict:
+    """單檔：parse 一次，四類指標共用同一棵 AST"""
+    return CodeAnalyzer(code).analyzeAll()
+
+def analyze_sources(codes: list) -> list:
+    """子行程入口：分析一批原始碼字串，回傳與輸入同順序的指標 dict"""
+    return [analyze_source(code) for code in codes]
+
+class BatchCodeAnalyzer:
+    """
+    [新增] 多檔批次版 CodeAnalyzer。
+    - 每個檔案只 parse 一次 (CodeAnalyzer.analyzeAll)
+    - 結果以內容雜湊 (sha1) 為鍵快取，LRU 淘汰；內容相同的檔案共用同一份結果
+    - (path, mtime, size) 未變的檔案連讀檔與雜湊都省略
+    - 全工作區掃描時，未命中的檔案可分送到行程池
+    回傳的 dict 為快取本體，呼叫端請勿修改。
+    """
+    PARALLEL_MIN_FILES = 200   # spawn 每個 worker 約需 1 秒，檔案少時依序分析較快
+    CHUNKS_PER_WORKER = 4
+
+    def __init__(self, capacity: int = 4096, max_workers: int = None):
+        self.capacity = capacity
+        self.max_workers = max_workers
+        self._lru = OrderedDict()   # digest -> metrics
+        self._stat_index = {}       # path -> (mtime_ns, size, digest)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def hash_content(code: str) -> str:
+        return hashlib.sha1(code.encode('utf-8')).hexdigest()
+
+    # --- LRU ---
+    def _lookup(self, digest: str):
+        metrics = self._lru.get(digest)
+        if metrics is not None:
+            self._lru.move_to_end(digest)
+            self.hits += 1
+        return metrics
+
+    def _remember(self, digest: str, metrics: dict):
+        self.misses += 1
+        self._lru[digest] = metrics
+        self._lru.move_to_end(digest)
+        while len(self._lru) > self.capacity:
+            self._lru.popitem(last=False)
+
+    # --- 單檔 ---
+    def analyzeSource(self, code: str) -> dict:
+        digest = self.hash_content(code)
+        metrics = self._lookup(digest)
+        if metrics is None:
+            metrics = analyze_source(code)
+            self._remember(digest, metrics)
+        return metrics
+
+    def analyzeFile(self, path: str):
+        """回傳指標 dict；檔案不存在或無法讀取時回傳 None"""
+        return self.analyzeFiles([path], max_workers=1).get(path)
+
+    # --- 多檔 ---
+    def _stat_digest(self, path: str, st) -> str:
+        entry = self._stat_index.get(path)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[2]
+        return None
+
+    def _resolve_workers(self, n_files: int, max_workers) -> int:
+        workers = max_workers if max_workers is not None else self.max_workers
+        if workers is None:
+            if n_files < self.PARALLEL_MIN_FILES: return 1
+            workers = os.cpu_count() or 1
+        return max(1, min(workers, n_files))
+
+    def analyzeFiles(self, paths: list, max_workers: int = None) -> dict:
+        """
+        批次分析多個檔案，回傳 {path: metrics}；讀不到的檔案不列入。
+        Args:
+            max_workers: None 時依檔案數與 CPU 數決定；1 表示依序分析
+        """
+        results = {}
+        pending = OrderedDict()   # digest -> (code, [paths])
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            digest = self._stat_digest(path, st)
+            if digest is not None:
+                metrics = self._lookup(digest)
+                if metrics is not None:
+                    results[path] = metrics
+                    continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    code = f.read()
+            except (OSError, UnicodeDecodeError):
+                continue
+            digest = self.hash_content(code)
+            self._stat_index[path] = (st.st_mtime_ns, st.st_size, digest)
+            metrics = self._lookup(digest)
+            if metrics is not None:
+                results[path] = metrics
+            elif digest in pending:
+                pending[digest][1].append(path)
+            else:
+                pending[digest] = (code, [path])
+
+        if not pending:
+            return results
+
+        digests = list(pending)
+        codes = [pending[d][0] for d in digests]
+        workers = self._resolve_workers(len(codes), max_workers)
+        computed = self._analyze_parallel(codes, workers) if workers > 1 else None
+        if computed is None:
+            computed = analyze_sources(codes)
+
+        for digest, metrics in zip(digests, computed):
+            self._remember(digest, metrics)
+            for path in pending[digest][1]:
+                results[path] = metrics
+        return results
+
+    def _analyze_parallel(self, codes: list, workers: int):
+        """行程池分析；任何失敗都回傳 None 讓呼叫端改為依序分析"""
+        n_chunks = min(len(codes), workers * self.CHUNKS_PER_WORKER)
+        bounds = [len(codes) * i // n_chunks for i in range(n_chunks + 1)]
+        chunks = [codes[bounds[i]:bounds[i + 1]] for i in range(n_chunks)]
+        try:
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                computed = []
+                for part in pool.map(analyze_sources, chunks):
+                    computed.extend(part)
+            return computed
+        except Exception as e:
+            print(f"[BatchCodeAnalyzer] Parallel analysis failed, falling back to sequential: {e}")
+            return None
+
+    def invalidate(self, path: str = None):
+        """檔案變更時清除 stat 索引 (內容雜湊快取不受影響)；path 為 None 時全部清除"""
+        if path is None:
+            self._stat_index.clear()
+        else:
+            self._stat_index.pop(path, None)
+
+    def get_stats(self) -> dict:
+        return {'entries': len(self._lru), 'capacity': self.capacity,
+                'hits': self.hits, 'misses': self.misses}
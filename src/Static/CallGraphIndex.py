@@ -0,0 +1,250 @@
+import os
+import ast
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+
+# 函式層級呼叫圖：每個檔案只做一次 ast 走訪 (import 綁定、函式定義、呼叫點)，
+# 解析結果 (哪個呼叫指向哪個函式) 在檔案集合變動後才重建
+
+@dataclass
+class FileCalls:
+    """單一檔案的掃描結果 (尚未解析成函式 key)"""
+    module: str                                        # 檔案模組名，例如 'auth.login'
+    package: str                                       # 相對匯入的基準套件，例如 'auth'
+    functions: dict = field(default_factory=dict)      # qualname -> lineno
+    bindings: dict = field(default_factory=dict)       # 名稱 -> 絕對的點分路徑
+    calls: list = field(default_factory=list)          # [(caller qualname, 'a.b.c')]
+    signature: tuple = None                            # (mtime_ns, size)
+
+@dataclass(frozen=True)
+class FunctionInfo:
+    key: str          # 'auth.login' (一檔一函式) 或 'auth.utils.helper'
+    module: str       # 檔案模組名
+    qualname: str     # 'login' / 'Session.close'
+    path: str
+    lineno: int
+
+def _dotted(node):
+    """Name / Attribute 鏈轉為 'a.b.c'；其他形式 (呼叫結果、下標...) 回傳 None"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return '.'.join(reversed(parts))
+
+def _resolve_relative(level: int, module: str, package: str):
+    if level == 0:
+        return module
+    parts = package.split('.') if package else []
+    if level - 1 > len(parts):
+        return None
+    base = parts[:len(parts) - (level - 1)]
+    if module:
+        base = base + [module]
+    return '.'.join(base) or None
+
+def scan_calls(code: str, module: str, package: str) -> FileCalls:
+    """走訪一次 AST：收集 import 綁定、頂層函式/方法定義，以及每個函式內的呼叫點"""
+    result = FileCalls(module, package)
+    tree = ast.parse(code)
+    # (node, 目前所屬的函式 qualname, 類別前綴)
+    stack = [(child, None, "") for child in reversed(tree.body)]
+    while stack:
+        node, owner, prefix = stack.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if owner is None:
+                owner = prefix + node.name
+                result.functions[owner] = node.lineno
+            # 巢狀函式的呼叫歸屬外層函式
+            stack.extend((c, owner, prefix) for c in reversed(node.body))
+            stack.extend((d, owner, prefix) for d in node.decorator_list)
+            continue
+        if isinstance(node, ast.ClassDef) and owner is None:
+            stack.extend((c, None, f"{prefix}{node.name}.") for c in reversed(node.body))
+            continue
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    result.bindings[alias.asname] = alias.name
+                else:
+                    head = alias.name.split('.')[0]
+                    result.bindings[head] = head
+            continue
+        if isinstance(node, ast.ImportFrom):
+            base = _resolve_relative(node.level, node.module, package)
+            if base:
+                for alias in node.names:
+                    if alias.name != '*':
+                        result.bindings[alias.asname or alias.name] = f"{base}.{alias.name}"
+            continue
+        if isinstance(node, ast.Call) and owner is not None:
+            target = _dotted(node.func)
+            if target and not target.startswith(("self.", "cls.")):
+                result.calls.append((owner, target))
+        stack.extend((c, owner, prefix) for c in ast.iter_child_nodes(node))
+    return result
+
+class CallGraphIndex:
+    """
+    [新增] 全工作區的函式層級靜態呼叫圖。
+    - 呼叫經由 import 綁定解析 (import a.b / from a import b / 相對匯入)，並依 ProjectManager 的
+      一檔一函式配置：'from db import connect; connect()' 指向 db/connect.py 中的 connect
+    - 同套件內未 import 的裸名稱呼叫，若套件內有同名檔案則視為呼叫該函式
+    - 函式 key：一檔一函式為 '<頂層模組>.<函式>' (與 Function View 的節點名稱一致)，其餘為 '<檔案模組>.<qualname>'
+    - 檔案增刪改只重新掃描該檔；解析後的鄰接表在下次查詢時重建 (只做字典查找，不重新 parse)
+    """
+    def __init__(self):
+        self._files = {}       # path -> FileCalls
+        self._stale = set()
+        self._dirty = True
+        self._functions = {}   # key -> FunctionInfo
+        self._callees = {}     # key -> set(key)
+        self._callers = {}     # key -> set(key)
+
+    # --- 檔案維護 ---
+    def update_file(self, path: str, module: str):
+        """檔案新增或變更；內容 (mtime, size) 未變且未被標記時略過"""
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.remove_file(path)
+            return
+        signature = (st.st_mtime_ns, st.st_size)
+        known = self._files.get(path)
+        if known and known.signature == signature and known.module == module and path not in self._stale:
+            return
+        self._stale.discard(path)
+        package = module if os.path.basename(path) == "__init__.py" else module.rpartition('.')[0]
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                scanned = scan_calls(f.read(), module, package)
+        except (OSError, UnicodeDecodeError, SyntaxError, ValueError) as e:
+            print(f"[CallGraph] Skip {os.path.basename(path)}: {e}")
+            scanned = FileCalls(module, package)
+        scanned.signature = signature
+        self._files[path] = scanned
+        self._dirty = True
+
+    def remove_file(self, path: str):
+        if self._files.pop(os.path.abspath(path), None) is not None:
+            self._dirty = True
+
+    def mark_stale(self, path: str):
+        """強制下次 update_file 重新掃描 (例如同一秒內改寫、mtime 未變)"""
+        self._stale.add(os.path.abspath(path))
+
+    def sync(self, files: dict):
+        """以 { path: module } 為準同步：移除已不存在的檔案，更新其餘檔案"""
+        live = {os.path.abspath(p): m for p, m in files.items()}
+        for path in [p for p in self._files if p not in live]:
+            self.remove_file(path)
+        for path, module in live.items():
+            self.update_file(path, module)
+
+    # --- 解析 ---
+    @staticmethod
+    def _key(module: str, qualname: str) -> str:
+        stem = module.rpartition('.')[2]
+        if stem == qualname or (stem == "__init_logic__" and qualname == "__init__"):
+            return f"{module.split('.')[0]}.{qualname}"
+        return f"{module}.{qualname}"
+
+    def _ensure(self):
+        if not self._dirty: return
+        by_module = {fc.module: fc for fc in self._files.values()}
+        key_of = {}   # (module, qualname) -> key
+        functions = {}
+        for path, fc in self._files.items():
+            for qualname, lineno in fc.functions.items():
+                key = self._key(fc.module, qualname)
+                key_of[(fc.module, qualname)] = key
+                functions.setdefault(key, FunctionInfo(key, fc.module, qualname, path, lineno))
+
+        def resolve_dotted(dotted: str):
+            parts = dotted.split('.')
+            for i in range(len(parts), 0, -1):
+                fc = by_module.get('.'.join(parts[:i]))
+                if fc is None: continue
+                rest = '.'.join(parts[i:])
+                if not rest:
+                    # 呼叫的是模組本身：一檔一函式，對應檔名同名的函式
+                    rest = "__init__" if parts[i - 1] == "__init_logic__" else parts[i - 1]
+                return key_of.get((fc.module, rest))
+            return None
+
+        callees = defaultdict(set)
+        callers = defaultdict(set)
+        for fc in self._files.values():
+            for owner, target in fc.calls:
+                head, _, rest = target.partition('.')
+                if not rest and head in fc.functions:
+                    callee = key_of[(fc.module, head)]
+                elif head in fc.bindings:
+                    callee = resolve_dotted(fc.bindings[head] + ('.' + rest if rest else ''))
+                elif not rest and fc.package:
+                    callee = resolve_dotted(f"{fc.package}.{head}")
+                else:
+                    callee = None
+                caller = key_of[(fc.module, owner)]
+                if callee and callee != caller:
+                    callees[caller].add(callee)
+                    callers[callee].add(caller)
+
+        self._functions, self._callees, self._callers = functions, dict(callees), dict(callers)
+        self._dirty = False
+
+    # --- 查詢 ---
+    def functions(self) -> dict:
+        self._ensure()
+        return dict(self._functions)
+
+    def edges(self) -> list:
+        self._ensure()
+        return sorted((u, v) for u, vs in self._callees.items() for v in vs)
+
+    def callees(self, key: str) -> list:
+        self._ensure()
+        return sorted(self._callees.get(key, ()))
+
+    def callers(self, key: str) -> list:
+        self._ensure()
+        return sorted(self._callers.get(key, ()))
+
+    def fan_out(self, key: str) -> int:
+        self._ensure()
+        return len(self._callees.get(key, ()))
+
+    def fan_in(self, key: str) -> int:
+        self._ensure()
+        return len(self._callers.get(key, ()))
+
+    def _closure(self, roots, adjacency) -> set:
+        seen = set(roots)
+        queue = deque(seen)
+        while queue:
+            for nxt in adjacency.get(queue.popleft(), ()):
+                if nxt not in seen:
+                    seen.add(nxt)
+                    queue.append(nxt)
+        return seen
+
+    def entry_points(self) -> list:
+        """預設的進入點：main 模組內的函式；沒有時找名為 main 的函式"""
+        self._ensure()
+        roots = [k for k, f in self._functions.items() if f.module.split('.')[0] == "main"]
+        return sorted(roots or [k for k, f in self._functions.items() if f.qualname == "main"])
+
+    def reachable_from(self, roots=None) -> set:
+        """從 roots (預設 entry_points()) 可呼叫到的函式 (含 roots)"""
+        self._ensure()
+        roots = self.entry_points() if roots is None else [r for r in roots if r in self._functions]
+        return self._closure(roots, self._callees)
+
+    def impacted_by(self, key: str) -> set:
+        """key 變更時需要重新測試的函式：所有直接或間接呼叫它的函式 (不含 key 本身)"""
+        self._ensure()
+        return self._closure([key], self._callers) - {key}
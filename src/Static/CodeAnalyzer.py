@@ -1,12 +1,17 @@
+import ast
 import radon.complexity as radon_cc
 import radon.metrics as radon_metrics
 import radon.raw as radon_raw
 from radon.visitors import ComplexityVisitor
 
+_UNSET = object()
+
 class CodeAnalyzer:
     """
     CodeAnalyzer: 專注於「程式碼層級」的指標計算。
     完全封裝 radon 套件，負責計算單一檔案或程式碼片段的統計數據。
+    [優化] AST、raw 統計、CC visitor 與 Halstead 結果各只計算一次，四類指標共用
+    (原本每個指標各自 parse，MI 又再 parse 並重算 CC / Halstead)。
     """
     def __init__(self, source_code: str):
         """
@@ -14,6 +19,44 @@ class CodeAnalyzer:
             source_code (str): 待分析的原始碼字串。
         """
         self.code = source_code
+        self._tree = _UNSET
+        self._raw = _UNSET
+        self._cc_visitor = _UNSET
+        self._halstead = _UNSET
+
+    # --- 共用的中間結果 (失敗時保存例外，之後的呼叫直接重拋) ---
+    def _cached(self, attr, compute):
+        value = getattr(self, attr)
+        if value is _UNSET:
+            try:
+                value = compute()
+            except Exception as e:
+                value = e
+            setattr(self, attr, value)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def _get_tree(self):
+        return self._cached('_tree', lambda: ast.parse(self.code))
+
+    def _get_raw(self):
+        return self._cached('_raw', lambda: radon_raw.analyze(self.code))
+
+    def _get_cc_visitor(self):
+        return self._cached('_cc_visitor', lambda: ComplexityVisitor.from_ast(self._get_tree()))
+
+    def _get_halstead(self):
+        return self._cached('_halstead', lambda: radon_metrics.h_visit_ast(self._get_tree()))
+
+    def analyzeAll(self) -> dict:
+        """[新增] 一次取得四類指標 (共用同一棵 AST)"""
+        return {
+            'complexity': self.calculateComplexity(),
+            'halstead': self.calculateHalstead(),
+            'raw': self.calculateRawMetrics(),
+            'maintainability': self.calculateMaintainability(),
+        }
 
     # --- 1. 迴圈複雜度 (Cyclomatic Complexity) ---
     def calculateComplexity(self) -> dict:
@@ -26,8 +69,8 @@ class CodeAnalyzer:
         """
         results = {}
         try:
-            # cc_visit 會自動解析 AST 並找出所有區塊 (Function/Class)
-            blocks = radon_cc.cc_visit(self.code)
+            # ComplexityVisitor 會找出所有區塊 (Function/Class)
+            blocks = self._get_cc_visitor().blocks
 
             for block in blocks:
                 # 只關注函式與方法 (Function & Method)
@@ -52,7 +95,7 @@ class CodeAnalyzer:
         這通常是針對整段傳入的代碼計算。
         """
         try:
-            h_metrics = radon_metrics.h_visit(self.code)
+            h_metrics = self._get_halstead()
             # h_visit 回傳的是一個 named tuple，包含 total 和 functions 屬性
             # 這裡我們回傳整體的統計
             return {
@@ -70,7 +113,7 @@ class CodeAnalyzer:
         計算 LOC (總行數), LLOC (邏輯行數), SLOC (原始碼行數 - 去除空行註解), Comments (註解行數)。
         """
         try:
-            raw = radon_raw.analyze(self.code)
+            raw = self._get_raw()
             return {
                 'loc': raw.loc,           # Total lines
                 'lloc': raw.lloc,         # Logical lines
@@ -90,8 +133,13 @@ class CodeAnalyzer:
         > 85: 高 (易於維護)
         """
         try:
-            # multi=True 表示支援多行字串計算
-            mi_score = radon_metrics.mi_visit(self.code, multi=True)
+            # multi=True 表示支援多行字串計算 (與 radon.metrics.mi_parameters 相同的參數，改用共用結果)
+            raw = self._get_raw()
+            comments_lines = raw.comments + raw.multi
+            comments = comments_lines / float(raw.sloc) * 100 if raw.sloc != 0 else 0
+            mi_score = radon_metrics.mi_compute(self._get_halstead().total.volume,
+                                                self._get_cc_visitor().total_complexity,
+                                                raw.lloc, comments)
             return round(mi_score, 2)
         except Exception:
             return 0.0
@@ -0,0 +1,316 @@
+import sys
+from array import array
+
+_MISSING = -(2 ** 31)   # int 欄位的「未設定」標記
+
+class CompactASTGraph:
+    """
+    CompactASTGraph: ASTGraph 的陣列式替代後端，供 StructureAnalyzer 為整個工作區保存大量流程圖。
+    - 節點 ID 為連續整數；type / 屬性鍵組合 / 邊標籤以小整數代碼儲存，代碼表為所有實例共用。
+    - lineno / end_lineno / real_loc / is_abstract 存於 array 欄位；name / parent_class / parent_method /
+      accessed_fields 以 sys.intern 後的字串 (tuple) 存於 list 欄位；label_src (延遲標籤) 的樣板存為代碼、
+      原始碼位置攤平存入同一個 int array；其餘屬性放在稀疏 dict。
+    - 建構期間以 forward-star (每個節點的出邊鏈結串列) 維護出邊，freeze() 後壓縮為 CSR
+      (offsets / targets / 邊標籤代碼)；freeze 後再加邊會自動展開回 forward-star。
+    - 與 ASTGraph 相同的 add_node / add_edge / get_node_info / get_next_steps / get_label / iter_nodes API；
+      get_node_info 回傳的是快照 dict，修改它不會寫回圖中。需要 NetworkX 時以 to_networkx() 轉換。
+    """
+    # 共用代碼表：只會附加，不會重排 (代碼一經配發即固定，可安全 pickle)
+    NODE_TYPES = ['process', 'start', 'end', 'decision', 'loop', 'io', 'import', 'function', 'class']
+    EDGE_LABELS = [None, 'Yes', 'No', 'True', 'False']
+    SCHEMAS = [()]
+    TEMPLATES = [None]
+    _type_code = {t: i for i, t in enumerate(NODE_TYPES)}
+    _edge_code = {l: i for i, l in enumerate(EDGE_LABELS)}
+    _schema_code = {(): 0}
+    _template_code = {None: 0}
+    _SPAN_WIDTH = 5   # 每個片段 (lineno, col, end_lineno, end_col, is_stmt)
+
+    INT_COLUMNS = ('lineno', 'end_lineno', 'real_loc')
+    STR_COLUMNS = ('name', 'parent_class', 'parent_method')
+
+    def __init__(self):
+        self.root_id = None
+        # 延遲標籤 (與 ASTGraph 相同語意)
+        self.source_lines = []
+        self.label_renderer = None
+
+        self._type = array('B')
+        self._schema = array('H')          # 該節點設定過哪些屬性鍵 (SCHEMAS 代碼)
+        self._labels = []                  # str 或 None (延遲標籤尚未產生)
+        self._ints = {c: array('i') for c in self.INT_COLUMNS}
+        self._strs = {c: [] for c in self.STR_COLUMNS}
+        self._abstract = array('b')        # -1 = 未設定
+        self._fields = []                  # accessed_fields (tuple) 或 None
+        # 延遲標籤 (見 PythonSourceParser.render_label)：樣板代碼 + 片段在 _spans 中的起點與數量
+        self._template = array('H')
+        self._span_start = array('i')
+        self._span_count = array('B')
+        self._spans = array('i')
+        self._extra = {}                   # { node_id: {key: value} } 其餘屬性
+
+        # forward-star：_first/_last 為每個節點第一條/最後一條出邊，_next 串起同一節點的出邊
+        self._first = array('i')
+        self._last = array('i')
+        self._next = array('i')
+        self._dst = array('i')
+        self._elabel = array('B')
+        # CSR (freeze 後)：節點 u 的出邊為 _targets[_offsets[u]:_offsets[u+1]]
+        self._offsets = None
+        self._targets = None
+        self._tlabels = None
+
+    # --- 代碼表 ---
+    @classmethod
+    def _code(cls, table: list, index: dict, value) -> int:
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(table)
+            table.append(value)
+        return code
+
+    @staticmethod
+    def _intern(value):
+        return sys.intern(value) if isinstance(value, str) else value
+
+    # --- 建構 API ---
+    def add_node(self, content: str, node_type: str = "process", node_id: int = None, **kwargs) -> int:
+        """node_id 一律由圖配發 (連續整數)；傳入的 node_id 會被忽略"""
+        node_id = len(self._type)
+        self._type.append(self._code(self.NODE_TYPES, self._type_code, node_type))
+        self._labels.append(content)
+
+        keys = tuple(kwargs)
+        self._schema.append(self._code(self.SCHEMAS, self._schema_code, keys))
+        for col in self.INT_COLUMNS:
+            value = kwargs.pop(col, None)
+            self._ints[col].append(_MISSING if value is None else value)
+        for col in self.STR_COLUMNS:
+            self._strs[col].append(self._intern(kwargs.pop(col, None)))
+        abstract = kwargs.pop('is_abstract', None)
+        self._abstract.append(-1 if abstract is None else int(bool(abstract)))
+        fields = kwargs.pop('accessed_fields', None)
+        self._fields.append(None if fields is None else tuple(sys.intern(f) for f in fields))
+        self._add_label_src(kwargs.pop('label_src', None))
+        if kwargs:
+            self._extra[node_id] = kwargs
+
+        if self._offsets is not None:
+            self._offsets.append(self._offsets[-1])
+        else:
+            self._first.append(-1)
+            self._last.append(-1)
+
+        if self.root_id is None:
+            self.root_id = node_id
+        return node_id
+
+    def _add_label_src(self, label_src):
+        if label_src is None:
+            self._template.append(0)
+            self._span_start.append(-1)
+            self._span_count.append(0)
+            return
+        template, spans = label_src
+        self._template.append(self._code(self.TEMPLATES, self._template_code, template))
+        self._span_start.append(len(self._spans))
+        self._span_count.append(len(spans))
+        for span in spans:
+            self._spans.extend(int(v) for v in span)
+
+    def _label_src(self, node_id: int):
+        start = self._span_start[node_id]
+        if start == -1:
+            return None
+        w = self._SPAN_WIDTH
+        spans = []
+        for i in range(self._span_count[node_id]):
+            lineno, col, end_lineno, end_col, is_stmt = self._spans[start + i * w:start + (i + 1) * w]
+            spans.append((lineno, col, end_lineno, end_col, bool(is_stmt)))
+        return (self.TEMPLATES[self._template[node_id]], tuple(spans))
+
+    def _thaw(self):
+        """CSR 展開回 forward-star，以便繼續加邊"""
+        if self._offsets is None:
+            return
+        n = len(self._type)
+        self._first = array('i', [-1]) * n
+        self._last = array('i', [-1]) * n
+        self._next = array('i')
+        self._dst = array('i')
+        self._elabel = array('B')
+        for u in range(n):
+            for e in range(self._offsets[u], self._offsets[u + 1]):
+                self._append_edge(u, self._targets[e], self._tlabels[e])
+        self._offsets = self._targets = self._tlabels = None
+
+    def _append_edge(self, u: int, v: int, label_code: int):
+        e = len(self._dst)
+        self._dst.append(v)
+        self._elabel.append(label_code)
+        self._next.append(-1)
+        if self._first[u] == -1:
+            self._first[u] = e
+        else:
+            self._next[self._last[u]] = e
+        self._last[u] = e
+
+    def _edge_ids(self, u: int):
+        if self._offsets is not None:
+            return range(self._offsets[u], self._offsets[u + 1])
+        ids = []
+        e = self._first[u]
+        while e != -1:
+            ids.append(e)
+            e = self._next[e]
+        return ids
+
+    def add_edge(self, source_id: int, target_id: int, condition: str = None):
+        """與 NetworkX DiGraph 相同：重複的 (source, target) 只保留一條，有 condition 時覆寫標籤"""
+        n = len(self._type)
+        if not (0 <= source_id < n and 0 <= target_id < n):
+            raise ValueError("Source or Target ID does not exist in the graph.")
+        self._thaw()
+        for e in self._edge_ids(source_id):
+            if self._dst[e] == target_id:
+                if condition:
+                    self._elabel[e] = self._code(self.EDGE_LABELS, self._edge_code, condition)
+                return
+        code = self._code(self.EDGE_LABELS, self._edge_code, condition) if condition else 0
+        self._append_edge(source_id, target_id, code)
+
+    def set_edge_label(self, source_id: int, target_id: int, label: str):
+        code = self._code(self.EDGE_LABELS, self._edge_code, label) if label else 0
+        labels = self._tlabels if self._offsets is not None else self._elabel
+        targets = self._targets if self._offsets is not None else self._dst
+        for e in self._edge_ids(source_id):
+            if targets[e] == target_id:
+                labels[e] = code
+                return
+
+    def freeze(self):
+        """將出邊壓縮為 CSR 並釋放 forward-star 陣列 (解析完成後呼叫)"""
+        if self._offsets is not None:
+            return
+        n = len(self._type)
+        offsets = array('i', [0]) * (n + 1)
+        targets = array('i')
+        labels = array('B')
+        for u in range(n):
+            e = self._first[u]
+            while e != -1:
+                targets.append(self._dst[e])
+                labels.append(self._elabel[e])
+                e = self._next[e]
+            offsets[u + 1] = len(targets)
+        self._offsets, self._targets, self._tlabels = offsets, targets, labels
+        self._first = self._last = self._next = self._dst = self._elabel = None
+
+    # --- 查詢 API ---
+    def __len__(self):
+        return len(self._type)
+
+    def __contains__(self, node_id) -> bool:
+        return isinstance(node_id, int) and 0 <= node_id < len(self._type)
+
+    def get_node_info(self, node_id: int) -> dict:
+        """取得特定節點的詳細資訊 (快照)"""
+        if node_id not in self:
+            return None
+        data = {'type': self.NODE_TYPES[self._type[node_id]]}
+        extra = self._extra.get(node_id, {})
+        for key in self.SCHEMAS[self._schema[node_id]]:
+            if key in self._ints:
+                value = self._ints[key][node_id]
+                data[key] = None if value == _MISSING else value
+            elif key in self._strs:
+                data[key] = self._strs[key][node_id]
+            elif key == 'is_abstract':
+                value = self._abstract[node_id]
+                data[key] = None if value == -1 else bool(value)
+            elif key == 'accessed_fields':
+                value = self._fields[node_id]
+                data[key] = None if value is None else list(value)
+            elif key == 'label_src':
+                data[key] = self._label_src(node_id)
+            else:
+                data[key] = extra[key]
+        if self._labels[node_id] is not None:
+            data['label'] = self._labels[node_id]
+        return data
+
+    def iter_nodes(self):
+        """逐一產生 (node_id, 屬性 dict)，對應 ASTGraph.iter_nodes"""
+        for node_id in range(len(self._type)):
+            yield node_id, self.get_node_info(node_id)
+
+    def get_label(self, node_id: int) -> str:
+        """延遲標籤節點第一次被查詢時才產生文字並保存"""
+        label = self._labels[node_id]
+        if label is None:
+            src = self._label_src(node_id)
+            if src is None or self.label_renderer is None:
+                return str(node_id)
+            label = self._labels[node_id] = self.label_renderer(self.source_lines, src)
+        return label
+
+    def get_next_steps(self, node_id: int) -> list:
+        """
+        取得某節點的下一步驟 (Outgoing edges)。
+        回傳格式: [(target_id, condition), ...]
+        """
+        if self._offsets is not None:
+            start, end = self._offsets[node_id], self._offsets[node_id + 1]
+            return [(self._targets[e], self.EDGE_LABELS[self._tlabels[e]]) for e in range(start, end)]
+        return [(self._dst[e], self.EDGE_LABELS[self._elabel[e]]) for e in self._edge_ids(node_id)]
+
+    def iter_edges(self):
+        """逐一產生 (source, target, condition)"""
+        for u in range(len(self._type)):
+            for v, label in self.get_next_steps(u):
+                yield u, v, label
+
+    # --- pickle (ParseCache) ---
+    def __getstate__(self):
+        # 代碼表為行程內共用且會動態增長，存檔時附上本圖用到的對照，載入時重新對應
+        state = self.__dict__.copy()
+        state['_tables'] = (list(self.NODE_TYPES), list(self.SCHEMAS), list(self.EDGE_LABELS), list(self.TEMPLATES))
+        return state
+
+    def __setstate__(self, state):
+        node_types, schemas, edge_labels, templates = state.pop('_tables')
+        self.__dict__.update(state)
+        cls = type(self)
+        type_map = [cls._code(cls.NODE_TYPES, cls._type_code, t) for t in node_types]
+        schema_map = [cls._code(cls.SCHEMAS, cls._schema_code, tuple(sys.intern(k) for k in keys)) for keys in schemas]
+        label_map = [cls._code(cls.EDGE_LABELS, cls._edge_code, l) for l in edge_labels]
+        template_map = [cls._code(cls.TEMPLATES, cls._template_code, t) for t in templates]
+        self._template = array('H', (template_map[c] for c in self._template))
+        self._type = array('B', (type_map[c] for c in self._type))
+        self._schema = array('H', (schema_map[c] for c in self._schema))
+        for attr in ('_tlabels', '_elabel'):
+            codes = getattr(self, attr)
+            if codes is not None:
+                setattr(self, attr, array('B', (label_map[c] for c in codes)))
+        # pickle 不保留 intern，重新 intern 讓跨檔案的相同名稱共用同一物件
+        for col in self._strs.values():
+            col[:] = [self._intern(v) for v in col]
+        self._fields = [None if f is None else tuple(sys.intern(x) for x in f) for f in self._fields]
+
+    # --- 轉換 ---
+    def to_networkx(self):
+        """轉為 ASTGraph (NetworkX DiGraph)，節點 ID 沿用整數、標籤於此時全部產生"""
+        import ASTGraph
+        g = ASTGraph.ASTGraph()
+        for node_id, data in self.iter_nodes():
+            data.pop('label', None)
+            data.pop('label_src', None)
+            node_type = data.pop('type')
+            g.add_node(self.get_label(node_id), node_type=node_type, node_id=node_id, **data)
+        for u, v, label in self.iter_edges():
+            g.add_edge(u, v, condition=label)
+        g.root_id = self.root_id
+        return g
+
+    def visualize(self):
+        self.to_networkx().visualize()
@@ -0,0 +1,281 @@
+from collections import defaultdict, deque
+
+class DependencyGraph:
+    """
+    [新增] 增量維護強連通分量 (SCC) 的模組依賴圖。
+    - 以 SCC 縮圖 + 動態拓撲序 (Pearce-Kelly) 保存：加邊時只在順序違反的區間內搜尋，
+      形成環時把路徑上的分量合併；刪邊時只對原分量重跑 Tarjan
+    - would_create_cycle(a, b) 在 a 的拓撲序早於 b 時 O(1) 回答，否則只搜尋兩者之間的分量
+    - find_cycle / check_dependencies 回報加入新邊後的最短環 ([a, b, ..., a])
+    同一條邊可由多個來源 (例如同一模組的多個檔案) 提供，以參考計數管理。
+    """
+    def __init__(self):
+        self._succ = defaultdict(dict)   # u -> {v: 參考計數}
+        self._pred = defaultdict(set)    # v -> {u}
+        self._sources = {}               # (node, source) -> set(targets)
+        self._comp = {}                  # node -> 分量 id
+        self._members = {}               # 分量 id -> set(nodes)
+        self._ord = {}                   # 分量 id -> 拓撲序 (可不連續)
+        self._next_comp = 0
+        self._next_ord = 0
+        # 最近一次 would_create_cycle 走訪的分量數 (0 表示由拓撲序直接判定)
+        self.last_search_size = 0
+
+    # --- 節點 ---
+    def __contains__(self, node) -> bool:
+        return node in self._comp
+
+    def __len__(self) -> int:
+        return len(self._comp)
+
+    def nodes(self) -> list:
+        return list(self._comp)
+
+    def successors(self, node) -> list:
+        return list(self._succ.get(node, ()))
+
+    def add_node(self, node):
+        if node in self._comp: return
+        self._new_comp({node}, self._next_ord)
+        self._next_ord += 1
+
+    def remove_node(self, node):
+        if node not in self._comp: return
+        for v in list(self._succ.get(node, ())):
+            self._drop_edge(node, v)
+        for u in list(self._pred.get(node, ())):
+            self._drop_edge(u, node)
+        self._succ.pop(node, None)
+        self._pred.pop(node, None)
+        for key in [k for k in self._sources if k[0] == node]:
+            del self._sources[key]
+        c = self._comp.pop(node)
+        self._members[c].discard(node)
+        if not self._members[c]:
+            del self._members[c], self._ord[c]
+        else:
+            self._split(c)
+
+    def _new_comp(self, members: set, order: int) -> int:
+        c = self._next_comp
+        self._next_comp += 1
+        self._members[c] = members
+        self._ord[c] = order
+        for n in members:
+            self._comp[n] = c
+        return c
+
+    # --- 邊 ---
+    def add_edge(self, u, v):
+        self.add_node(u)
+        self.add_node(v)
+        if v in self._succ[u]:
+            self._succ[u][v] += 1
+            return
+        self._succ[u][v] = 1
+        self._pred[v].add(u)
+        cu, cv = self._comp[u], self._comp[v]
+        if cu != cv and self._ord[cu] > self._ord[cv]:
+            self._repair(cu, cv)
+
+    def remove_edge(self, u, v):
+        count = self._succ.get(u, {}).get(v)
+        if count is None: return
+        if count > 1:
+            self._succ[u][v] = count - 1
+            return
+        self._drop_edge(u, v)
+        if u != v and self._comp[u] == self._comp[v]:
+            self._split(self._comp[u])
+
+    def _drop_edge(self, u, v):
+        del self._succ[u][v]
+        self._pred[v].discard(u)
+
+    def set_dependencies(self, node, targets, source=None):
+        """以 targets 取代 source 對 node 提供的依賴 (source 預設為 node 本身)"""
+        key = (node, node if source is None else source)
+        old = self._sources.get(key, set())
+        new = set(targets)
+        self.add_node(node)
+        for t in old - new:
+            self.remove_edge(node, t)
+        for t in new - old:
+            self.add_edge(node, t)
+        if new:
+            self._sources[key] = new
+        else:
+            self._sources.pop(key, None)
+
+    # --- 分量鄰接 ---
+    def _comp_succ(self, c):
+        comp = self._comp
+        return {comp[v] for u in self._members[c] for v in self._succ.get(u, ())} - {c}
+
+    def _comp_pred(self, c):
+        comp = self._comp
+        return {comp[u] for v in self._members[c] for u in self._pred.get(v, ())} - {c}
+
+    def _search(self, start, step, keep) -> set:
+        seen = {start}
+        stack = [start]
+        while stack:
+            for nxt in step(stack.pop()):
+                if nxt not in seen and keep(nxt):
+                    seen.add(nxt)
+                    stack.append(nxt)
+        return seen
+
+    # --- Pearce-Kelly 重排 / 合併 ---
+    def _repair(self, cu, cv):
+        """新邊 cu -> cv 違反拓撲序 (ord[cu] > ord[cv])：重排區間內的分量，形成環時合併"""
+        lb, ub = self._ord[cv], self._ord[cu]
+        order = self._ord
+        forward = self._search(cv, self._comp_succ, lambda c: order[c] <= ub)
+        backward = self._search(cu, self._comp_pred, lambda c: order[c] >= lb)
+        slots = sorted({order[c] for c in forward | backward})
+        by_ord = lambda c: order[c]
+
+        if cu in forward:
+            merged = forward & backward   # cv -> ... -> cu 路徑上的分量
+            before = sorted(backward - merged, key=by_ord)
+            after = sorted(forward - merged, key=by_ord)
+            members = set()
+            for c in merged:
+                members |= self._members.pop(c)
+                del self._ord[c]
+            for c, slot in zip(before, slots):
+                order[c] = slot
+            for c, slot in zip(after, slots[len(slots) - len(after):]):
+                order[c] = slot
+            self._new_comp(members, slots[len(before)])
+        else:
+            seq = sorted(backward, key=by_ord) + sorted(forward, key=by_ord)
+            for c, slot in zip(seq, slots):
+                order[c] = slot
+
+    def _split(self, c):
+        """分量內刪邊後以 Tarjan 重算該分量，子分量依拓撲序放回原位置"""
+        members = self._members[c]
+        parts = self._tarjan(members)
+        if len(parts) == 1: return
+        ranked = sorted(self._ord, key=self._ord.get)
+        del self._members[c], self._ord[c]
+        new_ids = [self._new_comp(p, 0) for p in parts]
+        pos = 0
+        for comp in ranked:
+            for cid in (new_ids if comp == c else (comp,)):
+                self._ord[cid] = pos
+                pos += 1
+        self._next_ord = pos
+
+    def _tarjan(self, members: set) -> list:
+        """members 誘導子圖的 SCC，依拓撲序回傳 (迭代版，避免遞迴深度限制)"""
+        index, low, on_stack = {}, {}, set()
+        stack, result = [], []
+        counter = 0
+        for root in members:
+            if root in index: continue
+            work = [(root, iter([v for v in self._succ.get(root, ()) if v in members]))]
+            index[root] = low[root] = counter; counter += 1
+            stack.append(root); on_stack.add(root)
+            while work:
+                node, it = work[-1]
+                advanced = False
+                for v in it:
+                    if v not in index:
+                        index[v] = low[v] = counter; counter += 1
+                        stack.append(v); on_stack.add(v)
+                        work.append((v, iter([w for w in self._succ.get(v, ()) if w in members])))
+                        advanced = True
+                        break
+                    if v in on_stack:
+                        low[node] = min(low[node], index[v])
+                if advanced: continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    scc = set()
+                    while True:
+                        w = stack.pop(); on_stack.discard(w); scc.add(w)
+                        if w == node: break
+                    result.append(scc)
+        result.reverse()   # Tarjan 先輸出匯點分量
+        return result
+
+    # --- 查詢 ---
+    def would_create_cycle(self, u, v) -> bool:
+        """加入 u -> v 是否形成環 (不修改圖)"""
+        self.last_search_size = 0
+        if u == v: return True
+        if u not in self._comp or v not in self._comp: return False
+        cu, cv = self._comp[u], self._comp[v]
+        if cu == cv: return True
+        ub = self._ord[cu]
+        if ub < self._ord[cv]: return False
+        reach = self._search(cv, self._comp_succ, lambda c: self._ord[c] <= ub)
+        self.last_search_size = len(reach)
+        return cu in reach
+
+    def find_cycle(self, u, v):
+        """加入 u -> v 後經過該邊的最短環 [u, v, ..., u]；不會形成環時回傳 None"""
+        if not self.would_create_cycle(u, v): return None
+        if u == v: return [u, u]
+        lo, hi = self._ord[self._comp[v]], self._ord[self._comp[u]]
+        path = self._shortest_path(v, u, lambda n: lo <= self._ord[self._comp[n]] <= hi)
+        return [u] + path if path else None
+
+    def check_dependencies(self, node, targets, source=None):
+        """
+        模擬 set_dependencies(node, targets, source)：回傳 targets 中任一依賴所在的最短環，沒有則回傳 None。
+        (target -> ... -> node 的最短路徑終點是 node，不會用到 node 既有的出邊，因此與移除舊依賴無關；
+        targets 已在圖中時同樣成立，呼叫前後是否已 set_dependencies 都得到相同結果)
+        """
+        for t in sorted(set(targets), key=str):
+            cycle = self.find_cycle(node, t)
+            if cycle: return cycle
+        return None
+
+    def _shortest_path(self, start, goal, allowed):
+        parent = {start: None}
+        queue = deque([start])
+        while queue:
+            n = queue.popleft()
+            if n == goal:
+                path = []
+                while n is not None:
+                    path.append(n)
+                    n = parent[n]
+                return path[::-1]
+            for m in self._succ.get(n, ()):
+                if m not in parent and allowed(m):
+                    parent[m] = n
+                    queue.append(m)
+        return None
+
+    def component(self, node) -> frozenset:
+        return frozenset(self._members[self._comp[node]])
+
+    def components(self) -> list:
+        """所有 SCC，依拓撲序 (被依賴者在後)"""
+        return [set(self._members[c]) for c in sorted(self._ord, key=self._ord.get)]
+
+    def cycles(self) -> list:
+        """每個非平凡 SCC (或自我依賴) 回報一個最短環 [a, b, ..., a]"""
+        result = []
+        for members in self.components():
+            if len(members) == 1:
+                n = next(iter(members))
+                if n in self._succ.get(n, ()): result.append([n, n])
+                continue
+            start = min(members, key=str)
+            best = None
+            for nxt in sorted(self._succ[start], key=str):
+                if nxt not in members: continue
+                path = self._shortest_path(nxt, start, members.__contains__)
+                if path and (best is None or len(path) < len(best)):
+                    best = path
+            result.append([start] + best)
+        return result
@@ -0,0 +1,90 @@
+import ast
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+# 只需要 import 語句時使用：不建立流程圖、不產生標籤，走訪到 import 節點即停止
+
+# 可能包含 import 的複合語句 (try/if/with/函式/類別內的延遲 import)；其餘語句與所有運算式不走訪
+_COMPOUND = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.If, ast.For, ast.AsyncFor,
+             ast.While, ast.With, ast.AsyncWith, ast.Try)
+if hasattr(ast, "TryStar"):
+    _COMPOUND += (ast.TryStar,)
+if hasattr(ast, "Match"):
+    _COMPOUND += (ast.Match,)
+
+@dataclass(frozen=True)
+class ImportRef:
+    """
+    一筆 import。
+    module: 'import a.b' 為 'a.b'；'from a.b import c' 為 'a.b'；'from . import c' 為 None
+    names: 'from' 形式匯入的名稱 ('*' 表示全部)；'import' 形式為空
+    level: 相對匯入的點數 (0 = 絕對匯入)
+    """
+    module: Optional[str]
+    names: Tuple[str, ...] = ()
+    level: int = 0
+    lineno: int = 0
+
+    def resolve(self, package: str = None) -> list:
+        """
+        轉為絕對模組名列表。package 為檔案所在的套件 (例如 auth/login.py 為 'auth')；
+        'from . import x' 無法得知 x 是子模組或名稱，兩者皆視為依賴 package 本身。
+        """
+        if self.level == 0:
+            return [self.module]
+        parts = package.split('.') if package else []
+        if self.level - 1 > len(parts):
+            return []   # 超出頂層套件 (執行時會是 ImportError)
+        base = parts[:len(parts) - (self.level - 1)]
+        if self.module:
+            base = base + [self.module]
+        return ['.'.join(base)] if base else []
+
+def _iter_stmts(body):
+    stack = [body]
+    while stack:
+        for node in stack.pop():
+            yield node
+            if isinstance(node, _COMPOUND):
+                for field in ("body", "orelse", "finalbody"):
+                    block = getattr(node, field, None)
+                    if block: stack.append(block)
+                for handler in getattr(node, "handlers", ()):
+                    stack.append(handler.body)
+                for case in getattr(node, "cases", ()):
+                    stack.append(case.body)
+
+def scan_imports(code: str) -> list:
+    """回傳原始碼中所有 ImportRef (含巢狀在函式/區塊內的 import)；語法錯誤時拋出 SyntaxError"""
+    if "import" not in code:
+        return []
+    refs = []
+    for node in _iter_stmts(ast.parse(code).body):
+        if isinstance(node, ast.Import):
+            refs.extend(ImportRef(alias.name, (), 0, node.lineno) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            refs.append(ImportRef(node.module, tuple(a.name for a in node.names), node.level, node.lineno))
+    return refs
+
+def top_level_imports(code: str, package: str = None) -> set:
+    """依賴的頂層模組名集合 ('from x.y import z' -> 'x'；相對匯入依 package 解析)"""
+    result = set()
+    for ref in scan_imports(code):
+        for name in ref.resolve(package):
+            result.add(name.split('.')[0])
+    return result
+
+def scan_files(paths: list, packages: dict = None) -> dict:
+    """
+    批次掃描：回傳 { path: set(頂層模組) }；讀取或解析失敗的檔案值為該例外。
+    packages: { path: 所屬套件 }，用於解析相對匯入
+    """
+    packages = packages or {}
+    results = {}
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                results[path] = top_level_imports(f.read(), packages.get(path))
+        except (OSError, UnicodeDecodeError, SyntaxError, ValueError) as e:
+            results[path] = e
+    return results
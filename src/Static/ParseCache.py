@@ -0,0 +1,117 @@
+import os
+import json
+import pickle
+import hashlib
+
+class ParseCache:
+    """
+    ParseCache: StructureAnalyzer 的持久化解析快取。
+    以「檔案路徑 + 內容雜湊」為 key，將解析結果 (ASTGraph、imports、類別欄位摘要)
+    存放在工作區的 .metacoder_cache/ 之下，跨次啟動沿用，只有內容變動的檔案才需重新解析。
+
+    目錄結構:
+        .metacoder_cache/parse_index.json   { rel_path: content_hash }
+        .metacoder_cache/parse/<hash>.pkl   解析結果 (內容定址，相同內容共用)
+    """
+    CACHE_DIR_NAME = ".metacoder_cache"
+    # 解析結果格式變更時遞增，舊快取會被整批捨棄
+    CACHE_VERSION = 3
+
+    def __init__(self, work_dir: str):
+        self.cache_dir = os.path.join(work_dir, self.CACHE_DIR_NAME)
+        self.entry_dir = os.path.join(self.cache_dir, "parse")
+        self.index_path = os.path.join(self.cache_dir, "parse_index.json")
+
+        self._index = {}  # { rel_path: content_hash }
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+        self._load_index()
+
+    @staticmethod
+    def hash_content(data: bytes) -> str:
+        """計算檔案內容雜湊 (sha1 足以辨識內容變更)"""
+        return hashlib.sha1(data).hexdigest()
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.CACHE_VERSION:
+                self._index = data.get('files', {})
+            else:
+                # 版本不符：視為空快取，下次 save 時覆寫
+                self._dirty = True
+        except Exception as e:
+            print(f"[ParseCache] Index unreadable, starting fresh: {e}")
+            self._index = {}
+
+    def _entry_path(self, digest: str) -> str:
+        return os.path.join(self.entry_dir, f"{digest}.pkl")
+
+    def get(self, rel_path: str, digest: str):
+        """命中時回傳解析結果 dict，否則回傳 None"""
+        if self._index.get(rel_path) != digest:
+            self.misses += 1
+            return None
+        try:
+            with open(self._entry_path(digest), 'rb') as f:
+                entry = pickle.load(f)
+            self.hits += 1
+            return entry
+        except Exception:
+            # 快取檔遺失或損毀，當作未命中
+            self._index.pop(rel_path, None)
+            self._dirty = True
+            self.misses += 1
+            return None
+
+    def put(self, rel_path: str, digest: str, entry: dict):
+        try:
+            os.makedirs(self.entry_dir, exist_ok=True)
+            target = self._entry_path(digest)
+            if not os.path.exists(target):
+                tmp = f"{target}.{os.getpid()}.tmp"
+                with open(tmp, 'wb') as f:
+                    pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, target)
+            self._index[rel_path] = digest
+            self._dirty = True
+        except Exception as e:
+            print(f"[ParseCache] Failed to store {rel_path}: {e}")
+
+    def discard(self, rel_path: str):
+        if self._index.pop(rel_path, None) is not None:
+            self._dirty = True
+
+    def prune(self, live_paths: set):
+        """移除已不存在的檔案紀錄，並刪除沒有任何路徑引用的快取檔"""
+        for rel_path in list(self._index):
+            if rel_path not in live_paths:
+                del self._index[rel_path]
+                self._dirty = True
+
+        if not os.path.isdir(self.entry_dir):
+            return
+        referenced = set(self._index.values())
+        for name in os.listdir(self.entry_dir):
+            if name.endswith(".pkl") and name[:-4] not in referenced:
+                try: os.remove(os.path.join(self.entry_dir, name))
+                except OSError: pass
+
+    def save(self):
+        """將索引寫回磁碟 (只在有變動時寫入)"""
+        if not self._dirty:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.CACHE_VERSION, 'files': self._index}, f)
+            os.replace(tmp, self.index_path)
+            self._dirty = False
+        except Exception as e:
+            print(f"[ParseCache] Failed to save index: {e}")
@@ -0,0 +1,79 @@
+import heapq
+from collections import defaultdict
+import CompactASTGraph, PythonSourceParser, ParseCache
+
+# 子行程只需要這個模組：不匯入 networkx / matplotlib，spawn 啟動成本低
+
+def summarize(graph) -> dict:
+    """從 ASTGraph / CompactASTGraph 萃取 imports、函式、類別與各方法使用的欄位 (與 graph 一同快取)"""
+    imports, functions, classes = [], [], []
+    class_fields = defaultdict(lambda: defaultdict(set))
+
+    for _, data in graph.iter_nodes():
+        n_type = data.get('type')
+        if n_type == 'import':
+            imports.append(data.get('label', ''))
+        elif n_type == 'function':
+            functions.append({
+                'name': data.get('name'),
+                'lineno': data.get('lineno'),
+                'end_lineno': data.get('end_lineno'),
+                'real_loc': data.get('real_loc', 0),
+                'parent_class': data.get('parent_class'),
+            })
+        elif n_type == 'class':
+            classes.append({
+                'name': data.get('name'),
+                'lineno': data.get('lineno'),
+                'is_abstract': data.get('is_abstract', False),
+            })
+
+        cls_name, method = data.get('parent_class'), data.get('parent_method')
+        if cls_name and method:
+            class_fields[cls_name][method].update(data.get('accessed_fields', []))
+
+    return {
+        'imports': imports,
+        'functions': functions,
+        'classes': classes,
+        'class_fields': {c: {m: sorted(f) for m, f in ms.items()} for c, ms in class_fields.items()},
+    }
+
+def parse_source(code: str, graph=None) -> dict:
+    """解析原始碼，回傳 {'graph', 'summary'}；未指定 graph 時使用 CompactASTGraph"""
+    if graph is None:
+        graph = CompactASTGraph.CompactASTGraph()
+    # 延遲標籤：摘要只需要 import 文字，其餘標籤等到繪圖時才產生
+    analyzer = PythonSourceParser.PythonSourceParser(graph, lazy_labels=True)
+    analyzer.analyze_code(code)
+    return {'graph': graph, 'summary': summarize(graph)}
+
+def parse_files(paths: list) -> list:
+    """
+    子行程入口：解析一批檔案。
+    回傳 [(path, digest, entry, error)]；entry 內的 graph 為 CompactASTGraph (陣列欄位，pickle 體積小)。
+    """
+    results = []
+    for path in paths:
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            digest = ParseCache.ParseCache.hash_content(raw)
+            results.append((path, digest, parse_source(raw.decode('utf-8')), None))
+        except Exception as e:
+            results.append((path, None, None, str(e)))
+    return results
+
+def balance_chunks(sizes: dict, n_chunks: int) -> list:
+    """
+    依檔案大小切成 n_chunks 批 (LPT：由大到小放進目前總量最小的一批)，
+    讓每個 worker 拿到的位元組數接近，避免大檔集中在同一批。
+    """
+    n_chunks = max(1, min(n_chunks, len(sizes)))
+    heap = [(0, i) for i in range(n_chunks)]
+    chunks = [[] for _ in range(n_chunks)]
+    for path in sorted(sizes, key=lambda p: sizes[p], reverse=True):
+        total, i = heapq.heappop(heap)
+        chunks[i].append(path)
+        heapq.heappush(heap, (total + max(sizes[path], 1), i))
+    return [c for c in chunks if c]
@@ -4,16 +4,72 @@ from typing import List
 # 假設上一段程式碼儲存在 ast_graph.py，或是直接在此檔案上方定義了 ASTGraph
 # from ast_graph import ASTGraph
 
+# [優化] 會遞迴展開子區塊的語句；其餘語句 (含 try/with/match 等) 整句成為一個 process/io 節點
+_FLOW_CONTAINERS = (ast.Module, ast.If, ast.While, ast.For, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+_LEAF_EXCLUDED = (ast.If, ast.While, ast.For, ast.Import, ast.ImportFrom,
+                  ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+_INERT_NODES = (ast.Name, ast.Constant, ast.expr_context, ast.operator, ast.unaryop, ast.cmpop, ast.boolop)
+
+def _is_abstract_decorator(decorator) -> bool:
+    # @abstractmethod 或 @abc.abstractmethod
+    return (isinstance(decorator, ast.Name) and decorator.id == 'abstractmethod') or \
+           (isinstance(decorator, ast.Attribute) and decorator.attr == 'abstractmethod')
+
+def _source_segment(source_lines, lineno, col, end_lineno, end_col) -> str:
+    """依 AST 位置切出原始碼片段 (col_offset 為 UTF-8 位元組位移)"""
+    lines = source_lines[lineno - 1:end_lineno]
+    if not lines:
+        return ""
+    if len(lines) == 1:
+        return lines[0].encode()[col:end_col].decode()
+    first = lines[0].encode()[col:].decode()
+    last = lines[-1].encode()[:end_col].decode()
+    return "\n".join([first] + lines[1:-1] + [last])
+
+def render_label(source_lines, label_src) -> str:
+    """
+    [新增] 延遲標籤的產生器 (ASTGraph.label_renderer)。
+    label_src = (template, spans)；每個片段重新解析後 unparse，結果與即時模式的 ast.unparse 相同。
+    """
+    template, spans = label_src
+    parts = []
+    for lineno, col, end_lineno, end_col, is_stmt in spans:
+        text = _source_segment(source_lines, lineno, col, end_lineno, end_col)
+        try:
+            if not is_stmt:
+                parts.append(ast.unparse(ast.parse(f"({text})", mode="eval").body))
+                continue
+            try:
+                node = ast.parse(text).body[0]
+            except SyntaxError:
+                # 縮排中的複合語句 (try/with...)：補回首行縮排並包進 if 區塊，其餘行維持原縮排
+                prefix = source_lines[lineno - 1].encode()[:col].decode()
+                node = ast.parse("if 1:\n" + prefix + text).body[0].body[0]
+            parts.append(ast.unparse(node))
+        except (SyntaxError, IndexError, ValueError):
+            parts.append(text)
+    return template.format(*parts)
+
 class PythonSourceParser:
     """
     分析 Python 原始碼並將其轉換為 ASTGraph 流程圖結構。
+    [優化] 單次走訪：
+    - 欄位存取 (self.xxx) 與 @abstractmethod 在 _index_tree 中由下而上一次彙整，不再對每個語句/類別重跑 ast.walk。
+    - 真實行數由每個檔案建立一次的前綴和表計算。
+    - lazy_labels=True 時 process/io/decision/loop 節點只記錄原始碼位置，
+      標籤在 ASTGraph.get_label() 被呼叫 (例如繪圖) 時才產生；import/function/class 標籤維持即時產生
+      (StructureAnalyzer 的依賴分析需要 import 文字)。
     """
-    def __init__(self, graph_instance):
+    def __init__(self, graph_instance, lazy_labels: bool = False):
         self.graph = graph_instance
+        self.lazy_labels = lazy_labels
         # 新增狀態堆疊，用於記錄當前處於哪個 Class 或 Function 內
         self.current_class = None
         self.current_method = None
         self.source_lines = []  # [新增] 用於儲存原始碼行
+        self._loc_prefix = [0]     # [優化] _loc_prefix[i] = 前 i 行中的真實行數
+        self._leaf_fields = {}     # [優化] { 流程葉語句: set(self 欄位) }
+        self._abstract_classes = set()
     def _connect_with_context(self, src, target):
         """智能連接：若來源是條件或迴圈節點且尚未有 True 路徑，則自動標記為 No"""
         label = None
@@ -23,8 +79,8 @@ class PythonSourceParser:
         if src_node and src_node.get('type') in ['condition', 'loop']:
             # 檢查是否已有 Yes/True 路徑
             has_true = False
-            for _, _, data in self.graph.graph.out_edges(src, data=True):
-                if data.get('label') in ['Yes', 'True']:
+            for _, condition in self.graph.get_next_steps(src):
+                if condition in ['Yes', 'True']:
                     has_true = True
 
             # 如果有 True 路徑，則這條新建立的邊應該是 False (No) 路徑
@@ -45,6 +101,12 @@ class PythonSourceParser:
             print(f"Syntax Error in source code: {e}")
             return
 
+        self._build_loc_prefix()
+        self._index_tree(tree)
+        if self.lazy_labels:
+            self.graph.source_lines = self.source_lines
+            self.graph.label_renderer = render_label
+
         # 2. 建立起點
         start_node_id = self.graph.add_node("Program Start", node_type="start")
 
@@ -56,6 +118,8 @@ class PythonSourceParser:
         end_node_id = self.graph.add_node("Program End", node_type="end")
         for leaf in final_leaves:
             self.graph.add_edge(leaf, end_node_id)
+        # [新增] 解析完成：CompactASTGraph 於此將出邊壓縮為 CSR
+        self.graph.freeze()
 
     def _process_block(self, statements: List[ast.stmt], incoming_ids: List[str]) -> List[str]:
         """
@@ -77,20 +141,105 @@ class PythonSourceParser:
 
         return current_incoming
 
+    # [優化] 每個檔案只掃描一次原始碼行，之後任意區間的真實行數為 O(1)
+    def _build_loc_prefix(self):
+        prefix = [0]
+        count = 0
+        for line in self.source_lines:
+            stripped = line.strip()
+            # 過濾空行與單行註解
+            if stripped and not stripped.startswith('#'):
+                count += 1
+            prefix.append(count)
+        self._loc_prefix = prefix
+
     # [新增] 輔助函式：計算真實行數
     def _count_real_loc(self, start_line, end_line):
         if start_line is None or end_line is None:
             return 0
 
-        # Python 行號從 1 開始，List 索引從 0 開始
-        lines = self.source_lines[start_line-1 : end_line]
-        real_count = 0
-        for line in lines:
-            stripped = line.strip()
-            # 過濾空行與單行註解
-            if stripped and not stripped.startswith('#'):
-                real_count += 1
-        return real_count
+        # Python 行號從 1 開始；超出範圍的行號截斷到檔案尾
+        last = len(self._loc_prefix) - 1
+        start = min(max(start_line, 1), last + 1)
+        end = min(end_line, last)
+        if end < start:
+            return 0
+        return self._loc_prefix[end] - self._loc_prefix[start - 1]
+
+    def _index_tree(self, tree):
+        """
+        [優化] 以一次後序走訪整棵樹，由下而上彙整：
+        - 每個流程葉語句 (會成為 process/io 節點的語句) 子樹內的 self.xxx 欄位
+        - 子樹內含 @abstractmethod 方法的類別
+        子節點的集合併入最大的那一個 (small-to-large)，整體接近線性。
+        兩者都只在類別內有意義，類別外只沿流程語句往下找類別定義。
+        """
+        self._leaf_fields = {}
+        self._abstract_classes = set()
+        fields = {}       # { node: set }，等待父節點合併
+        abstract = set()  # 子樹含 @abstractmethod 的節點，等待父節點合併
+
+        # (node, is_flow, in_class, children)；children 為 None 表示尚未展開
+        # is_flow 表示此語句位於流程層級 (會被 _process_statement 處理)
+        stack = [(tree, True, False, None)]
+        while stack:
+            node, is_flow, in_class, children = stack.pop()
+            if children is None:
+                in_class = in_class or isinstance(node, ast.ClassDef)
+                expand = is_flow and isinstance(node, _FLOW_CONTAINERS)
+                children = []
+                for child in ast.iter_child_nodes(node):
+                    child_flow = expand and isinstance(child, ast.stmt)
+                    # 沒有子節點可貢獻的葉節點 (Name/Constant/ctx/運算子) 不必走訪
+                    if child_flow or (in_class and not isinstance(child, _INERT_NODES)):
+                        children.append(child)
+                stack.append((node, is_flow, in_class, children))
+                stack.extend((child, expand and isinstance(child, ast.stmt), in_class, None) for child in children)
+                continue
+            if not in_class:
+                continue
+
+            acc = None
+            has_abstract = False
+            for child in children:
+                child_fields = fields.pop(child, None)
+                if child_fields:
+                    if acc is None:
+                        acc = child_fields
+                    else:
+                        if len(child_fields) > len(acc):
+                            acc, child_fields = child_fields, acc
+                        acc |= child_fields
+                if child in abstract:
+                    abstract.discard(child)
+                    has_abstract = True
+
+            if isinstance(node, ast.Attribute):
+                if isinstance(node.value, ast.Name) and node.value.id == 'self':
+                    if acc is None:
+                        acc = set()
+                    acc.add(node.attr)
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                if any(_is_abstract_decorator(d) for d in node.decorator_list):
+                    has_abstract = True
+
+            if is_flow and isinstance(node, ast.stmt) and not isinstance(node, _LEAF_EXCLUDED):
+                # 葉語句之間不會互相巢狀，複製的總量不超過樹的大小
+                self._leaf_fields[node] = set(acc) if acc else set()
+            if has_abstract and isinstance(node, ast.ClassDef):
+                self._abstract_classes.add(node)
+
+            if acc:
+                fields[node] = acc
+            if has_abstract:
+                abstract.add(node)
+
+    def _add_labeled_node(self, template: str, parts: list, node_type: str, **attrs) -> str:
+        """[優化] 依模式建立節點：即時模式 unparse parts 填入 template；延遲模式只記錄各片段位置"""
+        if not self.lazy_labels:
+            return self.graph.add_node(template.format(*(ast.unparse(p) for p in parts)), node_type=node_type, **attrs)
+        spans = tuple((p.lineno, p.col_offset, p.end_lineno, p.end_col_offset, isinstance(p, ast.stmt)) for p in parts)
+        return self.graph.add_node(None, node_type=node_type, label_src=(template, spans), **attrs)
 
     def _process_statement(self, stmt: ast.stmt, incoming_ids: List[str]) -> List[str]:
         """
@@ -100,8 +249,7 @@ class PythonSourceParser:
 
         # 1. 處理 If (分支)
         if isinstance(stmt, ast.If):
-            condition_text = f"If {ast.unparse(stmt.test)}?"
-            decision_id = self.graph.add_node(condition_text, node_type="decision")
+            decision_id = self._add_labeled_node("If {}?", [stmt.test], "decision")
 
             # 連接入口到這個判斷點
             for src in incoming_ids:
@@ -173,8 +321,7 @@ class PythonSourceParser:
 
         # 2. 處理 While (迴圈)
         elif isinstance(stmt, ast.While):
-            condition_text = f"While {ast.unparse(stmt.test)}?"
-            decision_id = self.graph.add_node(condition_text, node_type="decision")
+            decision_id = self._add_labeled_node("While {}?", [stmt.test], "decision")
 
             for src in incoming_ids:
                 self.graph.add_edge(src, decision_id)
@@ -197,13 +344,9 @@ class PythonSourceParser:
             # 簡單解法：While False 出口就是 decision_id。標籤在 ASTGraph 繪圖時可能顯示不出來，除非我們特別處理。
             return [decision_id]
         elif isinstance(stmt, ast.For):
-            # 1. 解析迴圈變數與迭代範圍
-            target = ast.unparse(stmt.target)   # 例如 "i"
-            iterator = ast.unparse(stmt.iter)   # 例如 "range(10)"
-            condition_text = f"For {target} in {iterator}?"
-
+            # 1. 解析迴圈變數 (例如 "i") 與迭代範圍 (例如 "range(10)")
             # 2. 建立迴圈節點 (類型設為 loop)
-            loop_id = self.graph.add_node(condition_text, node_type="loop")
+            loop_id = self._add_labeled_node("For {} in {}?", [stmt.target, stmt.iter], "loop")
 
             # 3. 將上一步驟連入此迴圈節點
             for src in incoming_ids:
@@ -281,17 +424,9 @@ class PythonSourceParser:
                     break
                 # (進階可檢查 attribute access 如 abc.ABC)
 
-            # 2. 檢查方法裝飾器 (Decorators): 是否有 @abstractmethod
+            # 2. 檢查方法裝飾器 (Decorators): 子樹內是否有 @abstractmethod (已由 _index_tree 彙整)
             if not is_abstract:
-                for node in ast.walk(stmt):
-                    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                        for decorator in node.decorator_list:
-                            # 檢查 @abstractmethod 或 @abc.abstractmethod
-                            if (isinstance(decorator, ast.Name) and decorator.id == 'abstractmethod') or \
-                               (isinstance(decorator, ast.Attribute) and decorator.attr == 'abstractmethod'):
-                                is_abstract = True
-                                break
-                    if is_abstract: break
+                is_abstract = stmt in self._abstract_classes
 
             # [關鍵修改] add_node 時傳入 name, lineno, is_abstract
             class_id = self.graph.add_node(
@@ -324,15 +459,11 @@ class PythonSourceParser:
                 return incoming_ids
             # ---------------------------------------
 # [新增] LCOM4 關鍵：提取使用的實例屬性 (Field Access)
+            # [優化] self.xxx 的集合已由 _index_tree 由下而上彙整
             used_fields = set()
             if self.current_class and self.current_method:
-                for node in ast.walk(stmt):
-                    # 尋找 self.xxx 的模式
-                    if isinstance(node, ast.Attribute):
-                        if isinstance(node.value, ast.Name) and node.value.id == 'self':
-                            used_fields.add(node.attr)
+                used_fields = self._leaf_fields.get(stmt, used_fields)
             # --------------------------------------------------
-            content = ast.unparse(stmt)
 
             # 簡單判斷是否為 I/O (Print 或 Input)
             is_io = False
@@ -352,9 +483,8 @@ class PythonSourceParser:
 
             n_type = "io" if is_io else "process" # 假設 is_io 已計算
 
-            node_id = self.graph.add_node(
-                content,
-                node_type=n_type,
+            node_id = self._add_labeled_node(
+                "{}", [stmt], n_type,
                 lineno=stmt.lineno,             # LOC 支援
                 parent_class=self.current_class, # LCOM4 支援 (方便追蹤)
                 parent_method=self.current_method,
@@ -371,12 +501,11 @@ class PythonSourceParser:
         輔助函式：為剛建立的邊加上標籤。
         這是為了解決遞迴建立節點時，難以即時傳入 Edge Label 的問題。
         """
-        edges = self.graph.graph.out_edges(source_id, data=True)
-        for u, v, data in edges:
-            if exclude_existing and 'label' in data:
+        for target, condition in self.graph.get_next_steps(source_id):
+            if exclude_existing and condition is not None:
                 continue
-            if exclude_label and data.get('label') == exclude_label:
+            if exclude_label and condition == exclude_label:
                 continue
 
-            # NetworkX 的邊屬性更新
-            self.graph.graph[u][v]['label'] = label
+            # 邊屬性更新 (兩種圖後端共用的介面)
+            self.graph.set_edge_label(source_id, target, label)
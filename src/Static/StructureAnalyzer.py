@@ -1,18 +1,73 @@
 import os
 import math
-import networkx as nx
+import threading
+import functools
+import multiprocessing
 from collections import defaultdict
-import ASTGraph, PythonSourceParser
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import ASTGraph, CompactASTGraph, ParseCache, ParseWorker, DependencyGraph, ImportScanner, CallGraphIndex
+
+@dataclass
+class ModuleMetrics:
+    """[新增] compute_all_metrics() 的一列：單一模組的靜態指標"""
+    module: str
+    ca: int = 0                     # Afferent coupling：依賴此模組的內部模組數
+    ce: int = 0                     # Efferent coupling：此模組依賴的內部模組數
+    coupling: float = 100.0         # calculateCoupling 分數 (0-100)
+    instability: float = 0.0        # I = Ce / (Ca + Ce)
+    abstractness: float = 0.0       # A = 抽象類別數 / 總類別數
+    distance: float = 0.0           # 與主序列的距離 D = |A + I - 1|
+    cohesion: Dict[str, dict] = field(default_factory=dict)   # calculateCohesion 的結果
+    avg_lcom4: Optional[float] = None
+
+def _locked(method):
+    """[新增] 以 self.lock 序列化：FileWatcher 執行緒的 invalidate/refresh 與 GUI / 排程器的查詢不會交錯"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class StructureAnalyzer:
-    def __init__(self, work_dir: str):
+    # [新增] 待解析檔案少於此數量時不啟動行程池 (spawn 的 worker 需重新匯入主程式，啟動約需一秒)
+    PARALLEL_MIN_FILES = 200
+    # 每個 worker 分到的批數 (批數多一些，執行較快的 worker 可以多拿)
+    CHUNKS_PER_WORKER = 4
+
+    def __init__(self, work_dir: str, use_cache: bool = True, compact_graphs: bool = True, max_workers: int = None):
         self.work_dir = work_dir
+        # [新增] 保護下列所有快取結構；直接讀取 graphs / dependencies 等屬性的呼叫端也應持有此鎖
+        self.lock = threading.RLock()
+        # [新增] 預設以陣列式 CompactASTGraph 保存流程圖 (大型工作區記憶體用量低)；False 時使用 NetworkX 版 ASTGraph
+        self.compact_graphs = compact_graphs
+        # [新增] 預處理的平行解析行程數 (None = CPU 核心數，1 = 在本行程依序解析)
+        self.max_workers = max_workers
+        # 最近一次 _preprocess 的統計: { files, parsed, cached, workers, chunks }
+        self.last_preprocess = {}
         # 識別專案內部的模組清單 (用於區分內部依賴與第三方函式庫)
         self.internal_modules = self._get_internal_modules(work_dir)
-        # 儲存每個模組的 ASTGraph 快取: { module_name: ASTGraph }
+        # 儲存每個模組的 ASTGraph 快取: { module_name: ASTGraph | CompactASTGraph }
         self.graphs = {}
         # 儲存模組間依賴關係 (用於 Instability): { module_name: set(imported_modules) }
         self.dependencies = defaultdict(set)
+        # [新增] 反向依賴索引: { module_name: set(依賴它的模組) }，與 dependencies 同步維護
+        self.dependents = defaultdict(set)
+        # [新增] 頂層模組 (套件) 層級的 import 圖，增量維護 SCC，供循環依賴檢查
+        self.import_graph = DependencyGraph.DependencyGraph()
+        # [新增] 函式層級呼叫圖 (get_call_graph 時才同步，只重新掃描變動的檔案)
+        self.call_index = CallGraphIndex.CallGraphIndex()
+        self._call_index_dirty = True
+        # [新增] 全專案指標表 (compute_all_metrics)，只重算 _dirty_metrics 中的模組
+        self._metrics = {}
+        self._dirty_metrics = set()
+        # [新增] 每個模組的解析摘要: { module_name: {'imports', 'functions', 'classes', 'class_fields'} }
+        self.summaries = {}
+        # [新增] 絕對路徑 -> 模組名，供 invalidate() 反查
+        self._path_to_module = {}
+        # [新增] 持久化解析快取 (.metacoder_cache/)，只重新解析內容變動的檔案
+        self.cache = ParseCache.ParseCache(work_dir) if use_cache else None
 
         # 初始化時自動執行預處理
         self._preprocess()
@@ -35,42 +90,242 @@ class StructureAnalyzer:
                         mods.add(mod_name.split('.')[0])
         return mods
 
-    def _preprocess(self):
-        """一次性解析所有檔案 (排除 tests)"""
-        for root, _, files in os.walk(self.work_dir):
-            # [Fix 1] 排除測試目錄
-            if "tests" in root.split(os.sep):
-                continue
-
+    def _module_name_for(self, path: str):
+        """將檔案路徑轉為模組名；測試檔或非 .py 檔回傳 None"""
+        file = os.path.basename(path)
+        if not file.endswith(".py") or file.startswith("test_"):
+            return None
+        rel_path = os.path.relpath(path, self.work_dir)
+        parts = rel_path.split(os.sep)
+        # [Fix 1] 排除測試目錄與快取目錄
+        if "tests" in parts[:-1] or ParseCache.ParseCache.CACHE_DIR_NAME in parts:
+            return None
+        if file == "__init__.py":
+            return rel_path.replace(os.sep, ".")[:-12]
+        return rel_path.replace(os.sep, ".")[:-3]
+
+    def _iter_source_files(self):
+        """列出所有需解析的 (path, module_name)"""
+        for root, dirs, files in os.walk(self.work_dir):
+            # 不深入快取目錄
+            if ParseCache.ParseCache.CACHE_DIR_NAME in dirs:
+                dirs.remove(ParseCache.ParseCache.CACHE_DIR_NAME)
             for file in files:
-                if file.endswith(".py") and not file.startswith("test_"):
-                    path = os.path.join(root, file)
-                    rel_path = os.path.relpath(path, self.work_dir)
-                    mod_name = rel_path.replace(os.sep, ".")[:-3]
-                    if file == "__init__.py":
-                        mod_name = rel_path.replace(os.sep, ".")[:-12]
-
-                    try:
-                        with open(path, 'r', encoding='utf-8') as f:
-                            code = f.read()
-
-                        graph = ASTGraph.ASTGraph()
-                        analyzer = PythonSourceParser.PythonSourceParser(graph)
-                        analyzer.analyze_code(code)
-                        self.graphs[mod_name] = graph
-
-                        # ... (依賴提取邏輯保持不變) ...
-                        for _, data in graph.graph.nodes(data=True):
-                            if data.get('type') == 'import':
-                                imp_str = data.get('label', '')
-                                for token in imp_str.replace(',', ' ').split():
-                                    clean_token = token.split('.')[0]
-                                    if clean_token in self.internal_modules and clean_token != mod_name:
-                                        self.dependencies[mod_name].add(clean_token)
-                    except Exception as e:
-                        print(f"[Analyzer] Error processing {file}: {e}")
+                path = os.path.join(root, file)
+                mod_name = self._module_name_for(path)
+                if mod_name is not None:
+                    yield path, mod_name
+
+    def _summarize(self, graph) -> dict:
+        """從 ASTGraph 萃取 imports、函式、類別與各方法使用的欄位 (與 graph 一同快取)"""
+        return ParseWorker.summarize(graph)
+
+    def _new_graph(self):
+        return CompactASTGraph.CompactASTGraph() if self.compact_graphs else ASTGraph.ASTGraph()
+
+    def _parse_source(self, code: str) -> dict:
+        return ParseWorker.parse_source(code, self._new_graph())
+
+    def _read_source(self, path: str):
+        """讀取檔案並查詢快取: 回傳 (rel_path, digest, raw, 快取 entry 或 None)"""
+        with open(path, 'rb') as f:
+            raw = f.read()
+        rel_path = os.path.relpath(path, self.work_dir)
+        digest = ParseCache.ParseCache.hash_content(raw)
+        entry = self.cache.get(rel_path, digest) if self.cache else None
+        return rel_path, digest, raw, entry
+
+    def _store_entry(self, path: str, mod_name: str, entry: dict):
+        graph = entry['graph']
+        if not self.compact_graphs and isinstance(graph, CompactASTGraph.CompactASTGraph):
+            # 平行解析的結果一律是 CompactASTGraph；要求 NetworkX 後端時於此轉換
+            graph = graph.to_networkx()
+        self.graphs[mod_name] = graph
+        self.summaries[mod_name] = entry['summary']
+        self._path_to_module[os.path.abspath(path)] = mod_name
+        self._call_index_dirty = True
+
+    def _load_file(self, path: str, mod_name: str):
+        """讀取單一檔案：內容雜湊命中快取則直接沿用，否則重新解析並寫入快取"""
+        rel_path, digest, raw, entry = self._read_source(path)
+        if entry is None:
+            entry = self._parse_source(raw.decode('utf-8'))
+            if self.cache: self.cache.put(rel_path, digest, entry)
+
+        self._store_entry(path, mod_name, entry)
+        return rel_path
+
+    def _resolve_workers(self, n_files: int) -> int:
+        if n_files < self.PARALLEL_MIN_FILES:
+            return 1
+        return max(1, min(self.max_workers or os.cpu_count() or 1, n_files))
+
+    def _parse_parallel(self, pending: dict, workers: int) -> int:
+        """
+        [新增] 以行程池解析未命中快取的檔案。
+        pending: { path: (mod_name, 檔案大小) }；依大小平衡切批，worker 回傳 CompactASTGraph + 摘要後在本行程合併。
+        回傳實際批數。
+        """
+        chunks = ParseWorker.balance_chunks({p: size for p, (_, size) in pending.items()},
+                                            workers * self.CHUNKS_PER_WORKER)
+        ctx = multiprocessing.get_context("spawn")
+        results = {}  # { path: (digest, entry, error) }
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                futures = [pool.submit(ParseWorker.parse_files, chunk) for chunk in chunks]
+                for fut in as_completed(futures):
+                    for path, digest, entry, error in fut.result():
+                        results[path] = (digest, entry, error)
+        except Exception as e:
+            # worker 行程崩潰：剩下的檔案改在本行程依序解析 (見下方)
+            print(f"[Analyzer] Parallel parsing failed ({e}), falling back to sequential for "
+                  f"{len(pending) - len(results)} file(s)")
+
+        # 依原本的走訪順序合併，graphs / summaries 的順序與依序解析相同
+        for path, (mod_name, _) in pending.items():
+            try:
+                if path not in results:
+                    self._load_file(path, mod_name)
+                    continue
+                digest, entry, error = results[path]
+                if error is not None:
+                    raise RuntimeError(error)
+                if self.cache:
+                    self.cache.put(os.path.relpath(path, self.work_dir), digest, entry)
+                self._store_entry(path, mod_name, entry)
+            except Exception as err:
+                print(f"[Analyzer] Error processing {os.path.basename(path)}: {err}")
+        return len(chunks)
+
+    def _update_dependencies(self, mod_name: str):
+        """依摘要中的 import 語句重建單一模組的內部依賴"""
+        deps = set()
+        for imp_str in self.summaries.get(mod_name, {}).get('imports', []):
+            for token in imp_str.replace(',', ' ').split():
+                clean_token = token.split('.')[0]
+                if clean_token in self.internal_modules and clean_token != mod_name:
+                    deps.add(clean_token)
+        self._set_dependencies(mod_name, deps)
+
+    def _set_dependencies(self, mod_name: str, deps: set):
+        """
+        [新增] 更新單一模組的正向依賴並同步反向索引。
+        該模組本身與 Ca 有變動的模組 (新增/移除的依賴對象) 標記為需重算指標。
+        """
+        old = self.dependencies.get(mod_name, set())
+        for target in old - deps:
+            importers = self.dependents.get(target)
+            if importers is not None:
+                importers.discard(mod_name)
+                if not importers: del self.dependents[target]
+            self._dirty_metrics.add(target)
+        for target in deps - old:
+            self.dependents[target].add(mod_name)
+            self._dirty_metrics.add(target)
+        if deps:
+            self.dependencies[mod_name] = deps
+        else:
+            self.dependencies.pop(mod_name, None)
+        self._dirty_metrics.add(mod_name)
+        # 同一套件內的檔案各自作為一個來源，檔案間互相 import 不算套件自我依賴
+        package = mod_name.split('.')[0]
+        self.import_graph.set_dependencies(package, deps - {package}, source=mod_name)
+
+    @_locked
+    def _preprocess(self):
+        """
+        一次性解析所有檔案 (排除 tests)，未變動的檔案直接從快取載入。
+        [新增] 未命中快取的檔案達 PARALLEL_MIN_FILES 且 max_workers != 1 時，分散到行程池平行解析。
+        """
+        live_paths = set()
+        pending = {}  # { path: (mod_name, size) }
+        for path, mod_name in self._iter_source_files():
+            try:
+                rel_path, digest, raw, entry = self._read_source(path)
+                live_paths.add(rel_path)
+                if entry is None:
+                    pending[path] = (mod_name, len(raw))
+                else:
+                    self._store_entry(path, mod_name, entry)
+            except Exception as e:
+                print(f"[Analyzer] Error processing {os.path.basename(path)}: {e}")
+
+        workers = self._resolve_workers(len(pending))
+        chunks = 0
+        if workers > 1:
+            chunks = self._parse_parallel(pending, workers)
+        else:
+            for path, (mod_name, _) in pending.items():
+                try:
+                    self._load_file(path, mod_name)
+                except Exception as e:
+                    print(f"[Analyzer] Error processing {os.path.basename(path)}: {e}")
+        self.last_preprocess = {'files': len(live_paths), 'parsed': len(pending),
+                                'cached': len(live_paths) - len(pending), 'workers': workers, 'chunks': chunks}
+
+        for mod_name in self.summaries:
+            self._update_dependencies(mod_name)
+        self._metrics.clear()
+        self._dirty_metrics = set(self.summaries)
+
+        if self.cache:
+            self.cache.prune(live_paths)
+            self.cache.save()
+
+    # --- [新增] 增量更新 API (供生成流程寫檔後呼叫) ---
+    @_locked
+    def invalidate(self, path: str):
+        """
+        單一檔案變更後呼叫：重新解析該檔 (或在檔案已刪除時移除)，並更新依賴表。
+        """
+        path = os.path.abspath(path)
+        mod_name = self._module_name_for(path)
+        if mod_name is None:
+            return
+
+        known = mod_name in self.summaries
+        self.call_index.mark_stale(path)
+        self._call_index_dirty = True
+        if os.path.exists(path):
+            try:
+                self._load_file(path, mod_name)
+            except Exception as e:
+                print(f"[Analyzer] Error processing {os.path.basename(path)}: {e}")
+                return
+        else:
+            self.graphs.pop(mod_name, None)
+            self.summaries.pop(mod_name, None)
+            self._set_dependencies(mod_name, set())
+            self._path_to_module.pop(path, None)
+            if self.cache: self.cache.discard(os.path.relpath(path, self.work_dir))
+
+        if known != (mod_name in self.summaries):
+            # 模組新增或刪除會改變內部模組白名單，所有依賴需重算 (只處理字串，不重新解析)
+            self.internal_modules = self._get_internal_modules(self.work_dir)
+            for name in self.summaries:
+                self._update_dependencies(name)
+        else:
+            self._update_dependencies(mod_name)
+
+        if self.cache: self.cache.save()
+
+    @_locked
+    def refresh(self):
+        """重新掃描整個工作區；內容未變的檔案由快取提供，只重新解析變動者"""
+        self.internal_modules = self._get_internal_modules(self.work_dir)
+        self.graphs = {}
+        self.summaries = {}
+        self.dependencies = defaultdict(set)
+        self.dependents = defaultdict(set)
+        self.import_graph = DependencyGraph.DependencyGraph()
+        # [修正] 呼叫圖索引一併重建，否則已刪除 / 改名檔案的邊會留到下次查詢
+        self.call_index = CallGraphIndex.CallGraphIndex()
+        self._call_index_dirty = True
+        self._path_to_module = {}
+        self._preprocess()
 
     # --- 1. 耦合度 (Coupling) [跨模組] ---
+    @_locked
     def calculateCoupling(self, module_name: str) -> float:
         """
         計算指數遞減評分。
@@ -86,66 +341,97 @@ class StructureAnalyzer:
 
     # --- 2. 內聚性 (LCOM4) [模組內] ---
     # 修改 calculateCohesion
+    @_locked
     def calculateCohesion(self, module_name: str) -> dict:
         """
         計算 LCOM4 與 連接密度 (Density)。
         Returns: { 'ClassName': {'lcom4': int, 'density': float} }
+        [優化] 直接使用解析摘要 (方法清單與各方法使用的欄位已在 _summarize 中一次整理好)，
+        不再對每個類別掃描整張圖；方法間的連結見 _cohesion_of。
         """
-        graph = self.graphs.get(module_name)
-        if not graph: return {}
+        summary = self.summaries.get(module_name)
+        if not summary: return {}
 
-        results = {}
-        class_nodes = [d for _, d in graph.graph.nodes(data=True) if d.get('type') == 'class']
+        methods_by_class = defaultdict(list)
+        for func in summary.get('functions', []):
+            if func.get('parent_class'):
+                methods_by_class[func['parent_class']].append(func['name'])
 
-        for cls in class_nodes:
+        results = {}
+        class_fields = summary.get('class_fields', {})
+        for cls in summary.get('classes', []):
             cls_name = cls.get('name')
-
-            # 1. 建立方法關聯圖
-            methods = []
-            method_usage = defaultdict(set)
-
-            for _, d in graph.graph.nodes(data=True):
-                # 找出方法
-                if d.get('type') == 'function' and d.get('parent_class') == cls_name:
-                    methods.append(d.get('name'))
-                # 找出屬性使用
-                if d.get('parent_class') == cls_name and d.get('parent_method'):
-                    fields = d.get('accessed_fields', [])
-                    for f in fields:
-                        method_usage[d.get('parent_method')].add(f)
+            methods = methods_by_class.get(cls_name, [])
 
             # 無方法或單一方法，視為完美內聚
             if len(methods) <= 1:
                 results[cls_name] = {'lcom4': 1, 'density': 1.0}
                 continue
 
-            m_graph = nx.Graph()
-            m_graph.add_nodes_from(methods)
-
-            actual_edges = 0
-            for i in range(len(methods)):
-                for j in range(i + 1, len(methods)):
-                    m1, m2 = methods[i], methods[j]
-                    if not method_usage[m1].isdisjoint(method_usage[m2]):
-                        m_graph.add_edge(m1, m2)
-                        actual_edges += 1
-
-            # 2. 計算 LCOM4 (連通分量數)
-            lcom4 = nx.number_connected_components(m_graph)
-
-            # 3. [新增] 計算連接密度 (Density)
-            # Max Edges = n * (n-1) / 2
-            n = len(methods)
-            max_edges = (n * (n - 1)) / 2
-            density = 0.0
-            if max_edges > 0:
-                density = round(actual_edges / max_edges, 2)
-
+            lcom4, density = self._cohesion_of(methods, class_fields.get(cls_name, {}))
             results[cls_name] = {'lcom4': lcom4, 'density': density}
 
         return results
 
+    @staticmethod
+    def _cohesion_of(methods: list, usage: dict):
+        """
+        計算單一類別的 (LCOM4, density)，複雜度約為 O(方法數 + 欄位存取數)：
+        - 兩個方法共用任一欄位、或其中一個透過 self.x() 呼叫另一個，即視為相連。
+        - LCOM4：以 欄位 -> 方法 反向索引搭配 union-find 合併，數連通分量。
+        - Density：相連的方法對數 / n(n-1)/2；每個方法的鄰居以 int bitset (欄位遮罩 OR) 求得後 popcount，
+          不需兩兩比對。methods 中同名的項目 (如 property 的 getter/setter) 各自計入 n。
+        """
+        names = set(methods)
+        parent = {m: m for m in names}
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        def union(a, b):
+            ra, rb = find(a), find(b)
+            if ra != rb: parent[ra] = rb
+
+        # 1. 反向索引：欄位 -> 使用它的方法 (位置 bitset)；同時記錄方法間的呼叫
+        name_mask = defaultdict(int)      # 方法名 -> 該名稱所有位置的 bitset
+        for pos, m in enumerate(methods):
+            name_mask[m] |= 1 << pos
+        field_mask = defaultdict(int)     # 欄位 -> 使用它的方法位置 bitset
+        field_owner = {}                  # 欄位 -> 第一個使用它的方法 (union-find 用)
+        call_mask = defaultdict(int)      # 方法名 -> 與它有呼叫關係的方法位置 bitset
+        for m in names:
+            for f in usage.get(m, ()):
+                field_mask[f] |= name_mask[m]
+                owner = field_owner.setdefault(f, m)
+                if owner != m: union(owner, m)
+                if f in names and f != m:
+                    union(m, f)
+                    call_mask[m] |= name_mask[f]
+                    call_mask[f] |= name_mask[m]
+
+        # 2. LCOM4 (連通分量數)
+        lcom4 = len({find(m) for m in names})
+
+        # 3. 連接密度 (Density)
+        # Max Edges = n * (n-1) / 2
+        n = len(methods)
+        neighbours = {}
+        for m in names:
+            mask = call_mask[m]
+            for f in usage.get(m, ()):
+                mask |= field_mask[f]
+            neighbours[m] = mask
+        degree_sum = sum((neighbours[m] & ~(1 << pos)).bit_count() for pos, m in enumerate(methods))
+        actual_edges = degree_sum // 2
+        max_edges = (n * (n - 1)) / 2
+        density = round(actual_edges / max_edges, 2) if max_edges > 0 else 0.0
+        return lcom4, density
+
     # --- 3. 穩定性 (Instability) [模組間] ---
+    @_locked
     def calculateInstability(self, module_name: str) -> float:
         """
         計算穩定性指標 I。
@@ -155,14 +441,11 @@ class StructureAnalyzer:
         if module_name not in self.graphs: return 0.0
 
         # Ce (Efferent): 我依賴了誰 (Outgoing)
-        ce = len(self.dependencies[module_name])
+        ce = len(self.dependencies.get(module_name, ()))
 
         # Ca (Afferent): 誰依賴了我 (Incoming)
-        # 這需要遍歷全域依賴表
-        ca = 0
-        for other_mod, imports in self.dependencies.items():
-            if other_mod != module_name and module_name in imports:
-                ca += 1
+        # [優化] 由反向索引直接取得，不再遍歷全域依賴表
+        ca = len(self.dependents.get(module_name, ()))
 
         if (ca + ce) == 0:
             return 0.5 # 既不依賴人也沒人依賴，中性
@@ -170,24 +453,21 @@ class StructureAnalyzer:
         return round(ce / (ca + ce), 2)
 
     # --- 4. 抽象度 (Abstractness) [模組內] ---
+    @_locked
     def calculateAbstractness(self, module_name: str) -> float:
         """
         計算抽象度 A。
         公式: A = 抽象類別數 / 總類別數
         範圍: [0, 1]
         """
-        graph = self.graphs.get(module_name)
-        if not graph: return 0.0
-
-        total_classes = 0
-        abstract_classes = 0
+        summary = self.summaries.get(module_name)
+        if not summary: return 0.0
 
-        for _, d in graph.graph.nodes(data=True):
-            if d.get('type') == 'class':
-                total_classes += 1
-                # 檢查前置步驟中提取的 is_abstract 標記
-                if d.get('is_abstract', False):
-                    abstract_classes += 1
+        # [優化] 類別清單已在解析摘要中，不必走訪整張圖
+        classes = summary.get('classes', [])
+        total_classes = len(classes)
+        # 檢查前置步驟中提取的 is_abstract 標記
+        abstract_classes = sum(1 for c in classes if c.get('is_abstract', False))
 
         if total_classes == 0:
             return 0.0
@@ -195,13 +475,62 @@ class StructureAnalyzer:
         return round(abstract_classes / total_classes, 2)
 
 
+    # --- 5. [新增] 全專案指標表 ---
+    def _compute_metrics(self, module_name: str) -> ModuleMetrics:
+        instability = self.calculateInstability(module_name)
+        abstractness = self.calculateAbstractness(module_name)
+        cohesion = self.calculateCohesion(module_name)
+        lcom_values = [d['lcom4'] for d in cohesion.values()]
+        return ModuleMetrics(
+            module=module_name,
+            ca=len(self.dependents.get(module_name, ())),
+            ce=len(self.dependencies.get(module_name, ())),
+            coupling=self.calculateCoupling(module_name),
+            instability=instability,
+            abstractness=abstractness,
+            distance=round(abs(abstractness + instability - 1), 2),
+            cohesion=cohesion,
+            avg_lcom4=round(sum(lcom_values) / len(lcom_values), 2) if lcom_values else None,
+        )
+
+    @_locked
+    def compute_all_metrics(self) -> Dict[str, ModuleMetrics]:
+        """
+        回傳所有已解析模組的指標表 { module_name: ModuleMetrics }。
+        表格跨呼叫保留；invalidate() 之後只重算該模組與 Ca 受影響的模組 (模組新增/刪除時全部重算)。
+        """
+        for mod_name in self._dirty_metrics:
+            if mod_name in self.summaries:
+                self._metrics[mod_name] = self._compute_metrics(mod_name)
+            else:
+                self._metrics.pop(mod_name, None)
+        self._dirty_metrics.clear()
+        return dict(self._metrics)
+
+    @_locked
+    def module_metrics(self, module_name: str) -> ModuleMetrics:
+        """單一模組的指標列 (供每次重繪都要查詢的 GUI 使用)；不在表中的名稱 (例如套件資料夾) 即時計算"""
+        if self._dirty_metrics:
+            self.compute_all_metrics()
+        row = self._metrics.get(module_name)
+        return row if row is not None else self._compute_metrics(module_name)
+
+    @_locked
+    def get_call_graph(self) -> CallGraphIndex.CallGraphIndex:
+        """[新增] 與目前已解析檔案同步的函式呼叫圖 (callers / callees / fan-in / 可達性 / 影響範圍)"""
+        if self._call_index_dirty:
+            self.call_index.sync(self._path_to_module)
+            self._call_index_dirty = False
+        return self.call_index
+
     # --- [新增] 虛擬靜態分析 (Phase 2 Check) ---
     def detect_cycles_from_stubs(self, virtual_code_map: dict) -> list:
         """
         基於虛擬代碼 map { 'mod_name': 'import a\nimport b' } 檢測循環依賴。
-        Returns: list of cycles (e.g. [['a', 'b', 'a']])
+        Returns: list of cycles (e.g. [['a', 'b', 'a']])，每個強連通分量回報一個最短環
+        (細化流程改用 DependencyGraph 增量檢查，見 MetaCoder._audit_refinement)
         """
-        temp_graph = nx.DiGraph()
+        temp_graph = DependencyGraph.DependencyGraph()
 
         for mod, code in virtual_code_map.items():
             temp_graph.add_node(mod)
@@ -216,49 +545,69 @@ class StructureAnalyzer:
                         target = parts[1].strip().split('.')[0] # 取頂層模組
                         temp_graph.add_edge(mod, target)
 
-        try:
-            return list(nx.simple_cycles(temp_graph))
-        except:
-            return []
+        return temp_graph.cycles()
+
+    @_locked
+    def find_import_cycle(self, code_path: str):
+        """
+        [新增] 檔案 (已寫入、尚未 invalidate) 的 import 是否會讓套件層級形成循環依賴。
+        只查詢增量維護的 import_graph，不重建整張圖；回傳最短環 [a, b, ..., a] 或 None。
+        """
+        mod_name = self._module_name_for(os.path.abspath(code_path))
+        if mod_name is None: return None
+        package = mod_name.split('.')[0]
+        targets = {t for t in self._file_imports(code_path)
+                   if t in self.internal_modules and t != package}
+        return self.import_graph.check_dependencies(package, targets, source=mod_name)
+
+    def _package_for(self, code_path: str):
+        """檔案所屬的套件 (解析相對匯入用)；不在工作區內時回傳 None"""
+        path = os.path.abspath(code_path)
+        if os.path.relpath(path, self.work_dir).startswith(os.pardir):
+            return None
+        mod_name = self._module_name_for(path)
+        if mod_name is None: return None
+        if os.path.basename(path) == "__init__.py":
+            return mod_name
+        return mod_name.rpartition('.')[0] or None
+
+    def _file_imports(self, code_path: str) -> set:
+        """[優化] 只掃描 import 語句 (ImportScanner)，回傳 import 的頂層模組名"""
+        with open(code_path, 'r', encoding='utf-8') as f:
+            code = f.read()
+        return ImportScanner.top_level_imports(code, self._package_for(code_path))
 
     # --- [新增] 實作一致性檢查 (Phase 3 Check) ---
     def verify_implementation_deps(self, code_path: str, allowed_deps: list) -> bool:
         """
         解析真實 Python 檔案，確認其 import 是否超出 allowed_deps 範圍。
         """
-        try:
-            with open(code_path, 'r', encoding='utf-8') as f:
-                code = f.read()
-
-            # 使用 ASTGraph 解析
-            g = ASTGraph.ASTGraph()
-            p = PythonSourceParser.PythonSourceParser(g)
-            p.analyze_code(code)
-
-            actual_imports = set()
-            for _, data in g.graph.nodes(data=True):
-                if data.get('type') == 'import':
-                    label = data.get('label', '')
-                    # 處理 "from x import y" 或 "import x"
-                    # 簡化邏輯：抓第一個 token
-                    token = label.replace("from ", "").replace("import ", "").split(" ")[0].split('.')[0]
-                    actual_imports.add(token)
-
-            # 檢查是否違反 (忽略標準庫，這裡假設 internal_modules 已正確填充)
-            # 若 internal_modules 為空，需重新初始化
-            if not self.internal_modules:
-                self._preprocess()
-
-            for imp in actual_imports:
-                # 如果是專案內部的模組，但不在允許列表內 -> 違規
-                if imp in self.internal_modules and imp not in allowed_deps:
-                    # 排除自己
-                    # 取得 code_path 所屬模組名...這裡簡化，假設呼叫者會處理
-                    print(f"[Audit] Violation: Imported '{imp}' but only {allowed_deps} allowed.")
-                    return False
-
-            return True
+        return self.verify_implementation_deps_batch([(code_path, allowed_deps)])[code_path]
 
-        except Exception as e:
-            print(f"[Audit Error] {e}")
-            return False # 保守策略：分析失敗視為失敗
+    @_locked
+    def verify_implementation_deps_batch(self, items: list) -> dict:
+        """
+        [新增] 一次檢查多個檔案: items = [(code_path, allowed_deps)]，回傳 { code_path: bool }。
+        只解析 import 語句，不建立流程圖。
+        """
+        # 檢查是否違反 (忽略標準庫，這裡假設 internal_modules 已正確填充)
+        # 若 internal_modules 為空，需重新初始化
+        if not self.internal_modules:
+            self._preprocess()
+
+        paths = [path for path, _ in items]
+        scanned = ImportScanner.scan_files(paths, {p: self._package_for(p) for p in paths})
+        results = {}
+        for code_path, allowed_deps in items:
+            actual_imports = scanned[code_path]
+            if isinstance(actual_imports, Exception):
+                print(f"[Audit Error] {actual_imports}")
+                results[code_path] = False # 保守策略：分析失敗視為失敗
+                continue
+            # 如果是專案內部的模組，但不在允許列表內 -> 違規
+            violations = sorted(imp for imp in actual_imports
+                                if imp in self.internal_modules and imp not in allowed_deps)
+            if violations:
+                print(f"[Audit] Violation: Imported {violations} but only {allowed_deps} allowed.")
+            results[code_path] = not violations
+        return results
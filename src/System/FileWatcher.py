@@ -0,0 +1,292 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import threading
+from dataclasses import dataclass
+
+# inotify 透過 ctypes 直接呼叫 libc (不需額外套件)；非 Linux 或載入失敗時改用輪詢
+try:
+    import ctypes
+    import ctypes.util
+    if not sys.platform.startswith("linux"):
+        raise ImportError("inotify is Linux only")
+    _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    _libc.inotify_init1.argtypes = [ctypes.c_int]
+    _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    _libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    HAS_INOTIFY = True
+except (ImportError, OSError, AttributeError):
+    _libc = None
+    HAS_INOTIFY = False
+
+# inotify 事件旗標 (<sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+_EVENT_HEADER = struct.Struct("iIII")   # wd, mask, cookie, len
+
+@dataclass(frozen=True)
+class FileEvent:
+    """
+    一筆合併後的檔案變更。
+    category: 'spec' | 'status' | 'implementation' | 'test' | 'chaos_report' | 'rescan'
+    module: 檔案所屬模組目錄名 (tests/ 內的檔案歸屬上一層模組)；工作區根目錄的檔案為 None
+    """
+    path: str
+    category: str
+    module: str = None
+    removed: bool = False
+
+class FileWatcher:
+    """
+    [新增] 工作區檔案監看服務 (取代 ProjectExplorer 每 2 秒在 Tk 執行緒上輪詢 mtime)。
+    - 背景執行緒：Linux 使用 inotify，其他平台或 inotify 不可用時改為輪詢 (mtime, size) 快照
+    - 短時間內的大量事件 (例如生成器連續寫檔) 會合併成一批，同一路徑只回報一次
+    - 事件依檔名分類後交給訂閱者；callback 在監看執行緒上呼叫，操作 Tk 元件需自行 after()
+    """
+    IGNORED_DIRS = {".git", "__pycache__", ".metacoder_cache", ".pytest_cache"}
+    DEBOUNCE = 0.25       # 靜默多久後送出一批
+    MAX_DELAY = 1.0       # 持續有事件時，最長延遲多久也要送出
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, root: str, use_inotify: bool = True):
+        self.root = os.path.abspath(root)
+        self.use_inotify = use_inotify and HAS_INOTIFY
+        self._subscribers = []
+        self._thread = None
+        self._stop = threading.Event()
+        self._fd = None
+        self._wake_r = self._wake_w = None
+        self._wd_to_dir = {}
+        self.backend = None
+
+    # --- 分類 ---
+    @classmethod
+    def classify(cls, root: str, path: str):
+        """回傳 (category, module)；不需關注的檔案回傳 (None, None)"""
+        rel = os.path.relpath(path, root)
+        parts = rel.split(os.sep)
+        if parts[0] == os.pardir or cls.IGNORED_DIRS.intersection(parts[:-1]):
+            return None, None
+        name = parts[-1]
+        dirs = parts[:-1]
+        in_tests = "tests" in dirs
+        if in_tests:
+            dirs = dirs[:dirs.index("tests")]
+        module = dirs[-1] if dirs else None
+
+        if name in ("architecture.json", "spec.json"):
+            return "spec", module
+        if name == ".status.json":
+            return "status", module
+        if name == "chaos_report.json":
+            return "chaos_report", module
+        if name.endswith(".py"):
+            if in_tests or name.startswith("test_"):
+                return "test", module
+            return "implementation", module
+        return None, None
+
+    def _make_event(self, path: str, removed: bool):
+        category, module = self.classify(self.root, path)
+        if category is None: return None
+        return FileEvent(path, category, module, removed)
+
+    # --- 訂閱 ---
+    def subscribe(self, callback):
+        """callback(events: list[FileEvent])"""
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _dispatch(self, events: list):
+        if not events: return
+        for callback in list(self._subscribers):
+            try:
+                callback(events)
+            except Exception as e:
+                print(f"[FileWatcher] Subscriber error: {e}")
+
+    # --- 生命週期 ---
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        if not os.path.isdir(self.root):
+            print(f"[FileWatcher] Root not found: {self.root}")
+            return
+        self._stop.clear()
+        if self.use_inotify:
+            try:
+                self._open_inotify()
+                self.backend = "inotify"
+            except OSError as e:
+                print(f"[FileWatcher] inotify unavailable ({e}), falling back to polling.")
+                self._close_inotify()
+                self.backend = "polling"
+        else:
+            self.backend = "polling"
+        target = self._inotify_loop if self.backend == "inotify" else self._poll_loop
+        self._thread = threading.Thread(target=target, name="FileWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._wake_w is not None:
+            try: os.write(self._wake_w, b"x")
+            except OSError: pass
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+        self._close_inotify()
+
+    def set_root(self, root: str):
+        """切換工作區：訂閱者保留，監看目錄改為新的 root"""
+        running = self._thread is not None
+        self.stop()
+        self.root = os.path.abspath(root)
+        if running: self.start()
+
+    # --- inotify 後端 ---
+    def _open_inotify(self):
+        fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self._fd = fd
+        self._wake_r, self._wake_w = os.pipe()
+        self._wd_to_dir = {}
+        self._add_tree(self.root)
+
+    def _close_inotify(self):
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            if fd is not None:
+                try: os.close(fd)
+                except OSError: pass
+        self._fd = self._wake_r = self._wake_w = None
+        self._wd_to_dir = {}
+
+    def _add_watch(self, directory: str) -> bool:
+        wd = _libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                print("[FileWatcher] inotify watch limit reached (fs.inotify.max_user_watches).")
+            return False
+        self._wd_to_dir[wd] = directory
+        return True
+
+    def _add_tree(self, top: str, pending: dict = None):
+        """監看 top 及其子目錄；pending 不為 None 時，把已存在的檔案視為新增 (補上建立目錄與監看之間的空窗)"""
+        for root, dirs, files in os.walk(top):
+            dirs[:] = [d for d in dirs if d not in self.IGNORED_DIRS]
+            self._add_watch(root)
+            if pending is not None:
+                for name in files:
+                    pending[os.path.join(root, name)] = False
+
+    def _read_events(self, pending: dict) -> bool:
+        """讀取 inotify 事件到 pending {path: removed}；回傳是否發生佇列溢位"""
+        overflow = False
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            if mask & IN_IGNORED:
+                self._wd_to_dir.pop(wd, None)
+                continue
+            directory = self._wd_to_dir.get(wd)
+            if directory is None or not name: continue
+            path = os.path.join(directory, os.fsdecode(name))
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and os.path.basename(path) not in self.IGNORED_DIRS:
+                    self._add_tree(path, pending)
+                elif mask & IN_MOVED_FROM:
+                    # 目錄被移走時其下的檔案不會各自產生事件，交給訂閱者整體重新掃描
+                    # (刪除則不同：rm -r 會先對每個檔案送出 IN_DELETE)
+                    overflow = True
+                continue
+            if mask & IN_CREATE:
+                continue   # 等 IN_CLOSE_WRITE，避免看到寫到一半的檔案
+            pending[path] = bool(mask & (IN_DELETE | IN_MOVED_FROM))
+        return overflow
+
+    def _inotify_loop(self):
+        pending = {}
+        first_at = None
+        rescan = False
+        while not self._stop.is_set():
+            if pending or rescan:
+                timeout = max(0.0, min(self.DEBOUNCE, first_at + self.MAX_DELAY - time.monotonic()))
+            else:
+                timeout = None
+            try:
+                ready, _, _ = select.select([self._fd, self._wake_r], [], [], timeout)
+            except (OSError, ValueError):
+                break
+            if self._stop.is_set(): break
+            if self._fd in ready:
+                if first_at is None: first_at = time.monotonic()
+                rescan = self._read_events(pending) or rescan
+                if time.monotonic() - first_at < self.MAX_DELAY:
+                    continue
+            if pending or rescan:
+                self._flush(pending, rescan)
+                pending = {}
+                first_at = None
+                rescan = False
+
+    def _flush(self, pending: dict, rescan: bool):
+        events = [FileEvent(self.root, "rescan")] if rescan else []
+        for path, removed in pending.items():
+            ev = self._make_event(path, removed)
+            if ev: events.append(ev)
+        self._dispatch(events)
+
+    # --- 輪詢後端 ---
+    def _snapshot(self) -> dict:
+        snap = {}
+        for root, dirs, files in os.walk(self.root):
+            dirs[:] = [d for d in dirs if d not in self.IGNORED_DIRS]
+            for name in files:
+                path = os.path.join(root, name)
+                if self.classify(self.root, path)[0] is None: continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snap[path] = (st.st_mtime_ns, st.st_size)
+        return snap
+
+    def _poll_loop(self):
+        previous = self._snapshot()
+        while not self._stop.wait(self.POLL_INTERVAL):
+            current = self._snapshot()
+            pending = {p: False for p, sig in current.items() if previous.get(p) != sig}
+            pending.update({p: True for p in previous if p not in current})
+            previous = current
+            if pending:
+                self._flush(pending, False)
@@ -1,11 +1,13 @@
 import os
 import datetime
+import threading
 from typing import List, Dict, Optional
 import git # pip install gitpython
 
 class VersionController:
     def __init__(self, workspace_dir: str = "./vibe_workspace"):
         self.workspace_dir = os.path.abspath(workspace_dir)
+        self._lock = threading.Lock()  # [新增] DagScheduler 會從多個執行緒歸檔
         if not os.path.exists(self.workspace_dir):
             os.makedirs(self.workspace_dir)
 
@@ -17,23 +19,60 @@ class VersionController:
             self.repo = git.Repo.init(self.workspace_dir)
             self._setup_gitignore()
 
+        # [新增] 解析快取不應進入版本歷史 (舊工作區補上規則)
+        # 基準測試結果以 commit 為鍵另存於 PerfHistory，本身不歸檔 (否則每次量測都會產生新 commit)
+        # TestRunner 的結果快取隨每次測試變動，同樣不歸檔
+        added = [p for p in (".metacoder_cache/", ".benchmarks.json", ".test_cache.json") if self._ensure_ignored(p)]
+        if added:
+            # [修正] 立即提交 .gitignore，否則下一次歸檔 (例如基準測試快照) 會被誤認為含有使用者的未歸檔編輯
+            self._commit_gitignore(f"Ignore {', '.join(added)}")
+
     def _setup_gitignore(self):
         """建立 .gitignore 防止追蹤不必要的檔案"""
         gitignore_path = os.path.join(self.workspace_dir, ".gitignore")
         if not os.path.exists(gitignore_path):
             with open(gitignore_path, "w") as f:
-                f.write("__pycache__/\n*.pyc\n.env\n.DS_Store\n")
+                f.write("__pycache__/\n*.pyc\n.env\n.DS_Store\n.metacoder_cache/\n")
             self.repo.index.add([gitignore_path])
             self.repo.index.commit("Initial commit: Add .gitignore")
 
+    def _ensure_ignored(self, pattern: str) -> bool:
+        """確保 .gitignore 含有指定規則；有新增時回傳 True (由呼叫端提交)"""
+        gitignore_path = os.path.join(self.workspace_dir, ".gitignore")
+        try:
+            existing = ""
+            if os.path.exists(gitignore_path):
+                with open(gitignore_path, "r") as f:
+                    existing = f.read()
+            if pattern not in existing.splitlines():
+                with open(gitignore_path, "a") as f:
+                    if existing and not existing.endswith("\n"): f.write("\n")
+                    f.write(f"{pattern}\n")
+                return True
+        except OSError as e:
+            print(f"[VersionController] Failed to update .gitignore: {e}")
+        return False
+
+    def _commit_gitignore(self, message: str):
+        """只提交 .gitignore，工作區其他未歸檔的變更保持原狀"""
+        try:
+            self.repo.index.add([os.path.join(self.workspace_dir, ".gitignore")])
+            self.repo.index.commit(message)
+        except Exception as e:
+            print(f"[VersionController] Failed to commit .gitignore: {e}")
+
     def archiveVersion(self, message: str) -> str:
         """
         [歸檔] 將目前的專案狀態提交 (Commit)
         Args:
             message: 提交訊息 (例如 "Initial structure for Auth module")
         Returns:
-            commit_hash (short sha)
+            commit_hash (完整 hexsha；沒有變更可提交時為目前 HEAD)
         """
+        with self._lock:
+            return self._archive(message)
+
+    def _archive(self, message: str) -> str:
         # 1. 加入所有變更 (git add .)
         # untracked_files 處理新增檔案，diff(None) 處理修改檔案
         if self.repo.is_dirty(untracked_files=True):
@@ -74,6 +113,20 @@ class VersionController:
             print(f"[!] Rollback failed: {e}")
             return False
 
+    def currentVersion(self) -> Optional[str]:
+        """[新增] 目前 HEAD 的 commit hash (尚無任何 commit 時為 None)"""
+        try:
+            return self.repo.head.commit.hexsha
+        except ValueError:
+            return None
+
+    def getAncestors(self, commit_hash: str = "HEAD", limit: int = 100) -> List[str]:
+        """[新增] commit_hash 本身與其祖先的 hash (由新到舊)，供效能基準比較時尋找前一個版本"""
+        try:
+            return [c.hexsha for c in self.repo.iter_commits(commit_hash, max_count=limit)]
+        except (ValueError, git.exc.GitCommandError):
+            return []
+
     def getHistory(self, limit: int = 10) -> List[Dict]:
         """獲取最近的提交紀錄供 GUI 顯示"""
         history = []
@@ -0,0 +1,103 @@
+import os
+import time
+import shutil
+import tempfile
+
+# 嘗試匯入分析器
+try:
+    import sys
+    sys.path.append("../src/Static")
+    import BatchCodeAnalyzer
+    from CodeAnalyzer import CodeAnalyzer
+except ImportError:
+    print("錯誤：找不到 BatchCodeAnalyzer，請確保檔案在正確目錄下。")
+    exit()
+
+def make_function(i: int) -> str:
+    """每個檔案一個函式 (與 Generate 產出的 mod/func.py 相同形態)，分支數不同"""
+    lines = [f'def func_{i}(data, limit={i}):',
+             f'    """處理第 {i} 批資料"""',
+             '    total = 0']
+    for b in range(i % 12):
+        lines += [f'    if data and data[0] > {b}:',
+                  f'        total += data[0] * {b}  # branch {b}',
+                  '    else:',
+                  '        total -= 1']
+    lines += ['    for x in data:', '        total += x', '    return total']
+    return "\n".join(lines) + "\n"
+
+def reference_metrics(code: str) -> dict:
+    """舊版用法：每個指標各自建立分析器 (各自 parse，不共用中間結果)"""
+    return {'complexity': CodeAnalyzer(code).calculateComplexity(),
+            'halstead': CodeAnalyzer(code).calculateHalstead(),
+            'raw': CodeAnalyzer(code).calculateRawMetrics(),
+            'maintainability': CodeAnalyzer(code).calculateMaintainability()}
+
+def run_batch_test():
+    print("=== BatchCodeAnalyzer 共用 AST / 內容雜湊快取測試 ===\n")
+    work_dir = tempfile.mkdtemp(prefix="batch_code_")
+    try:
+        n_files = 300
+        paths = []
+        for i in range(n_files):
+            path = os.path.join(work_dir, f"func_{i}.py")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(make_function(i))
+            paths.append(path)
+        # 內容相同的檔案共用同一份結果
+        shutil.copy(paths[5], os.path.join(work_dir, "copy.py"))
+        paths.append(os.path.join(work_dir, "copy.py"))
+
+        # 1. 與逐一呼叫的結果一致
+        start = time.perf_counter()
+        reference = {}
+        for p in paths:
+            with open(p, encoding="utf-8") as f:
+                reference[p] = reference_metrics(f.read())
+        t_old = time.perf_counter() - start
+
+        batch = BatchCodeAnalyzer.BatchCodeAnalyzer()
+        start = time.perf_counter()
+        results = batch.analyzeFiles(paths, max_workers=1)
+        t_cold = time.perf_counter() - start
+        assert results == reference
+        assert batch.get_stats()['misses'] == n_files, "重複內容只分析一次"
+
+        start = time.perf_counter()
+        again = batch.analyzeFiles(paths)
+        t_warm = time.perf_counter() - start
+        assert again == reference and batch.get_stats()['misses'] == n_files
+
+        print(f"   {len(paths)} files: per-metric radon {t_old * 1000:.0f} ms | "
+              f"shared AST {t_cold * 1000:.0f} ms | cached {t_warm * 1000:.1f} ms")
+        print(f"   stats {batch.get_stats()}")
+
+        # 2. 檔案修改後重新分析；語法錯誤沿用 CodeAnalyzer 的預設值
+        with open(paths[0], "w", encoding="utf-8") as f:
+            f.write("def broken(:\n")
+        os.utime(paths[0], ns=(0, 0))
+        broken = batch.analyzeFile(paths[0])
+        assert broken == reference_metrics("def broken(:\n") and broken['maintainability'] == 0.0
+        assert batch.analyzeFile(os.path.join(work_dir, "missing.py")) is None
+
+        # 3. LRU 淘汰
+        small = BatchCodeAnalyzer.BatchCodeAnalyzer(capacity=10)
+        small.analyzeFiles(paths[1:30], max_workers=1)
+        assert small.get_stats()['entries'] == 10
+        small.analyzeSource(make_function(29))   # 最近使用：命中
+        assert small.hits == 1
+        small.analyzeSource(make_function(1))    # 已淘汰：重新分析
+        assert small.misses == 30
+
+        # 4. 行程池結果與依序分析相同
+        pooled = BatchCodeAnalyzer.BatchCodeAnalyzer()
+        start = time.perf_counter()
+        assert pooled.analyzeFiles(paths[1:], max_workers=2) == {p: reference[p] for p in paths[1:]}
+        print(f"   process pool (2 workers, {os.cpu_count()} CPU) {time.perf_counter() - start:.2f} s")
+    finally:
+        shutil.rmtree(work_dir)
+
+    print("\n[*] 測試通過：批次結果與逐一計算一致，未變更的檔案直接命中快取。")
+
+if __name__ == "__main__":
+    run_batch_test()
@@ -0,0 +1,169 @@
+import os
+import json
+import shutil
+import tempfile
+import textwrap
+from types import SimpleNamespace
+
+# 嘗試匯入基準測試工具
+try:
+    import sys
+    sys.path.append("../src/Dynamic")
+    sys.path.append("../src/Static")
+    sys.path.append("../src/GUI")
+    from BenchmarkHarness import BenchmarkHarness, collect_test_inputs, summarize
+    from TrafficLightManager import TrafficLightManager
+except ImportError:
+    print("錯誤：找不到 BenchmarkHarness，請確保檔案在正確目錄下。")
+    exit()
+
+SPEC = {
+    "module_name": "mathx",
+    "dependencies": [],
+    "functions": [{"name": n, "args": [], "return_type": "Any", "docstring": "", "access": "public"}
+                  for n in ("small_sum", "big_sum", "safe_div", "hang", "untested", "drain")],
+}
+
+IMPLS = {
+    "small_sum": "def small_sum(items):\n    return sum(items)\n",
+    "big_sum": "def big_sum(n, step=1):\n    print('noisy output is discarded')\n    return sum(range(0, n, step))\n",
+    "safe_div": "def safe_div(a, b):\n    if b == 0:\n        raise ValueError('b == 0')\n    return a / b\n",
+    "hang": "import time\n\ndef hang(x):\n    time.sleep(x)\n",
+    "untested": "def untested():\n    return 1\n",
+    # 就地清空輸入：若每輪共用同一個 list，第一次之後量到的都是空 list
+    "drain": "def drain(items):\n    while items:\n        items.pop()\n",
+}
+
+TESTS = {
+    "small_sum": """
+        import unittest
+        from ..small_sum import small_sum
+
+        class TestSmallSum(unittest.TestCase):
+            def setUp(self):
+                self.data = [1, 2, 3]
+
+            def test_basic(self):
+                self.assertEqual(small_sum(self.data), 6)
+                self.assertEqual(small_sum([]), 0)
+
+            def test_local(self):
+                values = (4, 5)
+                self.assertEqual(small_sum(values), 9)
+                self.assertEqual(small_sum([1, 2, 3]), 6)   # 與 self.data 重複，去重
+                self.assertEqual(small_sum(list(range(3))), 3)  # 非常值，略過
+    """,
+    "big_sum": """
+        import unittest
+        from ..big_sum import big_sum
+
+        class TestBigSum(unittest.TestCase):
+            def test_sum(self):
+                self.assertEqual(big_sum(20000), 199990000)
+                self.assertEqual(big_sum(20000, step=2), 99990000)
+    """,
+    "safe_div": """
+        import unittest
+        from ..safe_div import safe_div
+
+        class TestSafeDiv(unittest.TestCase):
+            def test_ok(self):
+                self.assertEqual(safe_div(6, 3), 2)
+
+            def test_zero(self):
+                with self.assertRaises(ValueError):
+                    safe_div(1, 0)
+    """,
+    "hang": """
+        import unittest
+        from ..hang import hang
+
+        class TestHang(unittest.TestCase):
+            def test_hang(self):
+                hang(0)
+    """,
+}
+
+def build_workspace(root: str):
+    mod_dir = os.path.join(root, "mathx")
+    os.makedirs(os.path.join(mod_dir, "tests"))
+    with open(os.path.join(mod_dir, "spec.json"), "w") as f:
+        json.dump(SPEC, f)
+    for name, code in IMPLS.items():
+        with open(os.path.join(mod_dir, f"{name}.py"), "w") as f:
+            f.write(code)
+    for name, code in TESTS.items():
+        with open(os.path.join(mod_dir, "tests", f"test_{name}.py"), "w") as f:
+            f.write(textwrap.dedent(code))
+    # 使用者提供的輸入產生器優先於測試中的常值
+    with open(os.path.join(mod_dir, "tests", "bench_big_sum.py"), "w") as f:
+        f.write("def bench_inputs():\n    return [(50000,), ((50000,), {'step': 3})]\n")
+
+def run_benchmark_harness_test():
+    print("=== BenchmarkHarness 統計式基準測試 ===\n")
+    work_dir = tempfile.mkdtemp(prefix="bench_")
+    try:
+        build_workspace(work_dir)
+        tests_dir = os.path.join(work_dir, "mathx", "tests")
+
+        # 1. 從生成的測試取出常值輸入 (含 setUp 的 self 屬性與區域變數)
+        small_inputs = collect_test_inputs(os.path.join(tests_dir, "test_small_sum.py"), "small_sum")
+        assert small_inputs == [(([1, 2, 3],), {}), (([],), {}), (((4, 5),), {})], small_inputs
+        assert collect_test_inputs(os.path.join(tests_dir, "test_big_sum.py"), "big_sum")[1] == ((20000,), {"step": 2})
+
+        # 2. 統計量
+        stats = summarize([float(x) for x in range(1, 31)])
+        assert stats["median_us"] == 15.5 and stats["mad_us"] == 7.5
+        assert stats["ci_low_us"] <= 15.5 <= stats["ci_high_us"] and abs(stats["p95_us"] - 28.55) < 1e-9
+
+        # 3. 在子行程中執行整個模組
+        harness = BenchmarkHarness(work_dir, rounds=15, warmup_s=0.02, sample_s=0.005, timeout_s=20)
+        results = harness.benchmark_module("mathx", ["small_sum", "big_sum", "safe_div", "untested"])
+        small, big, div = results["small_sum"], results["big_sum"], results["safe_div"]
+        assert small.status == big.status == div.status == "ok", (small, big, div)
+        assert results["untested"].status == "no_inputs"
+        assert small.inputs == 3 and small.input_source == "tests" and small.iterations > 1
+        assert big.input_source == "generator" and big.inputs == 2
+        assert div.inputs == 1 and div.rejected_inputs == 1, "assertRaises 的輸入不計時"
+        for r in (small, big, div):
+            assert r.rounds == len(r.samples) >= harness.min_rounds
+            assert r.ci_low_us <= r.median_us <= r.ci_high_us and r.median_us <= r.p95_us
+        assert big.median_us > small.median_us * 20, (big.median_us, small.median_us)
+        print(f"   small_sum {small.median_us:.3f} us | big_sum {big.median_us:.1f} us "
+              f"(MAD {big.mad_us:.1f}, {big.rounds} x {big.iterations})")
+
+        # 3b. 就地修改輸入的函式：每次呼叫都拿到新的副本，量到的是完整的工作量
+        n_items = 20000
+        drained = harness.benchmark_module("mathx", ["drain"], inputs={"drain": [list(range(n_items))]}, save=False)["drain"]
+        assert drained.status == "ok" and drained.inputs == 1, drained
+        assert drained.median_us > n_items * 0.005, f"副本未生效，量到的是已清空的 list: {drained.median_us:.3f} us"
+        print(f"   drain({n_items} items) {drained.median_us:.1f} us ({drained.rounds} x {drained.iterations})")
+
+        # 4. 使用者輸入 + 逾時：卡住的函式被終止，worker 重新啟動後繼續
+        harness.timeout_s = 3
+        hung = harness.benchmark_module("mathx", ["hang", "small_sum"], inputs={"hang": [0.0, 30.0]})
+        assert hung["hang"].status == "timeout" and hung["hang"].input_source == "user"
+        assert hung["small_sum"].status == "ok"
+
+        # 5. 每次執行都保存；latest 取最近一次成功的結果
+        runs = harness.load_runs("mathx")
+        assert len(runs) == 2 and set(runs[0]["results"]) == {"small_sum", "big_sum", "safe_div", "untested"}
+        assert harness.latest("mathx", "big_sum")["median_us"] == big.median_us
+        assert harness.latest("mathx", "hang") is None
+
+        # 6. 燈號：有基準測試結果時使用中位數，而非單次 trace 的 avg_ms
+        meta = SimpleNamespace(workspace_root=work_dir, bench=harness,
+                               collector=SimpleNamespace(getBenchmarkData=lambda: {"small_sum": {"avg_ms": 500.0},
+                                                                                    "untested": {"avg_ms": 40.0}}))
+        light = TrafficLightManager(meta)
+        assert light.get_color("function", "runtime_analysis", "small_sum", parent_mod="mathx") == light.GREEN
+        assert light.get_color("function", "runtime_analysis", "untested", parent_mod="mathx") == light.YELLOW
+        assert light.get_color("function", "runtime_analysis", "hang", parent_mod="mathx") == light.GRAY
+        assert light.get_color("module", "runtime_analysis", "mathx") == light.GREEN
+    finally:
+        shutil.rmtree(work_dir)
+
+    print("\n[*] 測試通過：重複取樣的中位數與信賴區間取代單次量測。")
+
+if __name__ == "__main__":
+    run_benchmark_harness_test()
@@ -0,0 +1,99 @@
+import os
+import time
+import shutil
+import tempfile
+
+# 嘗試匯入分析器
+try:
+    import sys
+    sys.path.append("../src/Static")
+    import StructureAnalyzer
+except ImportError:
+    print("錯誤：找不到 StructureAnalyzer，請確保檔案在正確目錄下。")
+    exit()
+
+# ProjectManager 的配置：<模組>/<函式>.py，每檔一個函式；匯入寫法刻意混用
+FILES = {
+    "main/main.py": "from auth import login\nfrom cart.add_item import add_item\n\n"
+                    "def main():\n    user = login('a', 'b')\n    add_item(user, 1)\n",
+    "auth/__init__.py": "# Package marker for auth\n",
+    "auth/login.py": "from . import hash_password\nimport db.query\n\n"
+                     "def login(name, pw):\n    h = hash_password.hash_password(pw)\n"
+                     "    return db.query.query('users', name, h)\n",
+    "auth/hash_password.py": "import hashlib\n\ndef hash_password(pw):\n    return hashlib.sha256(pw.encode()).hexdigest()\n",
+    "auth/logout.py": "def logout(user):\n    audit(user)\n",                       # 同套件裸名稱
+    "auth/audit.py": "def audit(user):\n    print(user)\n",
+    "db/connect.py": "import sqlite3\n\ndef connect():\n    return sqlite3.connect(':memory:')\n",
+    "db/query.py": "from db import connect as conn\n\n"
+                   "def query(table, *args):\n    c = conn()\n    return _build(table)\n\n"
+                   "def _build(table):\n    return f'SELECT * FROM {table}'\n",
+    "cart/add_item.py": "from db.query import query\n\nclass Cart:\n    def total(self):\n        return len(query('cart'))\n\n"
+                        "def add_item(user, item):\n    query('cart', user, item)\n    return Cart().total()\n",
+}
+
+def write_workspace(work_dir, files):
+    for rel, code in files.items():
+        path = os.path.join(work_dir, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(code)
+
+def run_call_graph_test():
+    print("=== CallGraphIndex 函式層級呼叫圖測試 ===\n")
+    work_dir = tempfile.mkdtemp(prefix="call_graph_")
+    try:
+        write_workspace(work_dir, FILES)
+        analyzer = StructureAnalyzer.StructureAnalyzer(work_dir, use_cache=False)
+        index = analyzer.get_call_graph()
+
+        for edge in index.edges():
+            print(f"   {edge[0]:<22} -> {edge[1]}")
+        assert index.callees("main.main") == ["auth.login", "cart.add_item"]
+        assert index.callees("auth.login") == ["auth.hash_password", "db.query"]
+        assert index.callees("db.query") == ["db.connect", "db.query._build"]
+        assert index.callees("auth.logout") == ["auth.audit"]
+        assert index.callers("db.query") == ["auth.login", "cart.add_item", "cart.add_item.Cart.total"]
+        assert index.fan_in("db.query") == 3 and index.fan_out("cart.add_item") == 1
+
+        # 可達性與影響分析
+        reachable = index.reachable_from()
+        assert "db.connect" in reachable and "auth.logout" not in reachable
+        assert index.impacted_by("db.connect") == {"db.query", "auth.login", "cart.add_item",
+                                                   "cart.add_item.Cart.total", "main.main"}
+
+        # 增量：只重新掃描變更的檔案
+        with open(os.path.join(work_dir, "auth", "logout.py"), "w") as f:
+            f.write("from db.connect import connect\n\ndef logout(user):\n    connect()\n")
+        analyzer.invalidate(os.path.join(work_dir, "auth", "logout.py"))
+        index = analyzer.get_call_graph()
+        assert index.callees("auth.logout") == ["db.connect"]
+        assert "auth.logout" in index.impacted_by("db.connect")
+
+        # 規模：1000 個一檔一函式，查詢影響範圍
+        big_files = {}
+        for i in range(1000):
+            mod = f"m{i % 20}"
+            callee = f"f{i - 20}" if i >= 20 else None
+            code = (f"from m{(i - 20) % 20}.{callee} import {callee}\n\ndef f{i}():\n    return {callee}()\n"
+                    if callee else f"def f{i}():\n    return {i}\n")
+            big_files[f"{mod}/f{i}.py"] = code
+        big_dir = os.path.join(work_dir, "big")
+        write_workspace(big_dir, big_files)
+        big = StructureAnalyzer.StructureAnalyzer(big_dir, use_cache=False, max_workers=1)
+        start = time.perf_counter()
+        big_index = big.get_call_graph()
+        n_edges = len(big_index.edges())
+        t_build = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        impacted = big_index.impacted_by("m0.f0")
+        t_query = (time.perf_counter() - start) * 1000
+        print(f"\n   1000 functions / {n_edges} edges: build {t_build:.1f} ms | impacted_by(m0.f0) "
+              f"{len(impacted)} functions in {t_query:.2f} ms")
+        assert n_edges == 980 and len(impacted) == 49
+    finally:
+        shutil.rmtree(work_dir)
+
+    print("\n[*] 測試通過：跨模組呼叫經由 import 正確解析，影響分析與增量更新正常。")
+
+if __name__ == "__main__":
+    run_call_graph_test()
@@ -0,0 +1,152 @@
+import os
+import json
+import shutil
+import tempfile
+import textwrap
+
+# 嘗試匯入收集器
+try:
+    import sys
+    sys.path.append("../src/Dynamic")
+    from MetricCollector import MetricCollector
+    from CallTree import CallTree
+except ImportError:
+    print("錯誤：找不到 CallTree，請確保檔案在正確目錄下。")
+    exit()
+
+# helper 在使用者程式與匯入的模組中同名；Worker.run / Job.run 的 co_name 也相同 (各自獨立計算)
+CODE = textwrap.dedent("""
+    import time
+    import calltree_helpers
+
+    def helper(x):
+        return x + 1
+
+    class Worker:
+        def run(self):
+            time.sleep(0.02)
+
+    class Job:
+        def run(self):
+            return calltree_helpers.helper(2)
+
+    def fib(n):
+        return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+    def hot_loop(n):
+        s = 0
+        for i in range(n):
+            s = helper(s)
+        return s
+
+    def main():
+        Worker().run()
+        Job().run()
+        fib(15)
+        hot_loop(N)
+
+    main()
+""")
+
+HELPERS = "def helper(x):\n    return x * 2\n"
+
+def user_nodes(tree: dict) -> set:
+    """使用者程式碼的節點 (匯入機制的節點取決於模組是否已被快取，不比較)"""
+    names, stack = set(), [tree]
+    while stack:
+        node = stack.pop()
+        if node["file"] == "<string>": names.add((node["name"], node["calls"]))
+        stack.extend(node["children"])
+    return names
+
+def run_call_tree_test():
+    print("=== CallTree 呼叫樹聚合測試 ===\n")
+    work_dir = tempfile.mkdtemp(prefix="call_tree_")
+    with open(os.path.join(work_dir, "calltree_helpers.py"), "w") as f:
+        f.write(HELPERS)
+    sys.path.insert(0, work_dir)
+    try:
+        n_calls = 50_000
+        code = CODE.replace("hot_loop(N)", f"hot_loop({n_calls})")
+        collector = MetricCollector(history_size=1000)
+        collector.execute_code(code, backend="settrace")
+        tree = collector.call_tree
+        functions = tree.functions()
+        by_name = {}
+        for (path, qualname), f in functions.items():
+            by_name.setdefault(qualname, []).append((os.path.basename(path), f))
+
+        # 1. 同名函式依 (檔名, qualname) 區分
+        assert {p for p, _ in by_name["helper"]} == {"<string>", "calltree_helpers.py"}
+        assert "Worker.run" in by_name and "Job.run" in by_name
+
+        # 1b. 平面指標、覆蓋率與篩選輸出同樣不合併同名函式：不同檔案的 helper 以 "檔名:qualname" 區分
+        bench = collector.getBenchmarkData()
+        assert "run" not in bench and bench["Worker.run"]["calls"] == bench["Job.run"]["calls"] == 1
+        assert "helper" not in bench and bench["<string>:helper"]["calls"] == n_calls
+        assert bench["calltree_helpers.py:helper"]["calls"] == 1
+        assert bench["calltree_helpers.py:helper"]["file"].endswith("calltree_helpers.py")
+        coverage = collector.getCodeCoverage()
+        assert [v["source"] for v in coverage["calltree_helpers.py:helper"].values()] == ["return x * 2"]
+        assert [v["source"] for v in coverage["<string>:helper"].values()] == ["return x + 1"]
+        assert collector.findFunctions("helper") == ["<string>:helper", "calltree_helpers.py:helper"]
+        assert collector.findFunctions("run") == ["Job.run", "Worker.run"]
+        report = json.loads(collector.outputMetricResult(target_funcs=["helper"]))
+        assert set(report["performance"]) == {"<string>:helper", "calltree_helpers.py:helper"}
+        assert report["performance"]["calltree_helpers.py:helper"]["calls"] == 1
+        assert {(c["caller"], c["callee"]) for c in report["call_graph"]} == {
+            ("hot_loop", "<string>:helper"), ("Job.run", "calltree_helpers.py:helper")}
+
+        # 2. 記憶體有界：5 萬次呼叫只佔一個節點；原始事件只保留最近 1000 筆
+        history = collector.getCallHistory()
+        print(f"   {tree.event_count} call events -> {tree.node_count()} tree nodes, {len(history)} recent events kept")
+        assert tree.event_count > n_calls and tree.node_count() < 100
+        assert len(history) == 1000 and history[-1]["callee"] == "helper"
+
+        # 3. 包含 / 排除時間
+        worker = by_name["Worker.run"][0][1]
+        main = by_name["main"][0][1]
+        print(f"   Worker.run inclusive {worker['inclusive_ms']:.1f} ms | main inclusive {main['inclusive_ms']:.1f} ms, "
+              f"exclusive {main['exclusive_ms']:.2f} ms")
+        assert worker["inclusive_ms"] >= 19 and main["inclusive_ms"] >= worker["inclusive_ms"]
+        assert main["exclusive_ms"] < main["inclusive_ms"] / 2
+
+        # 4. 遞迴：函式層級的包含時間只計最外層，不會被層層重複累加
+        fib = by_name["fib"][0][1]
+        assert fib["calls"] == 1973 and fib["inclusive_ms"] <= main["inclusive_ms"]
+        assert collector.getBenchmarkData()["fib"]["time_ms"] <= collector.getBenchmarkData()["main"]["time_ms"]
+
+        # 5. 聚合的呼叫邊
+        edges = {(e["caller"], e["callee"]): e for e in collector.getCallGraph()}
+        assert edges[("hot_loop", "<string>:helper")]["calls"] == n_calls
+        assert edges[("Job.run", "calltree_helpers.py:helper")]["callee_file"].endswith("calltree_helpers.py")
+        assert edges[("fib", "fib")]["calls"] == 1972
+
+        # 6. 隔離模式：worker 傳回的呼叫樹與本行程一致
+        small = code.replace(f"hot_loop({n_calls})", "hot_loop(100)")
+        collector.execute_code(small, backend="settrace")
+        local = user_nodes(collector.getCallTree())
+        collector.execute_code(small, backend="settrace", isolated=True)
+        assert user_nodes(collector.getCallTree()) == local
+        assert {"<string>:helper", "calltree_helpers.py:helper", "Worker.run", "Job.run"} <= collector.getBenchmarkData().keys(), \
+            "worker 傳回的指標同樣以 (檔名, qualname) 區分"
+        assert collector.getCallGraph() and len(collector.getCallHistory()) <= 1000
+
+        # 7. 單純的 CallTree 操作：序列化往返
+        t = CallTree(history_size=0)
+        t.enter(("a.py", "f"), 0.0, 0.0)
+        t.enter(("a.py", "g"), 0.125, 0.0)
+        t.exit(0.375, 0.0)
+        t.exit(0.5, 0.0)
+        again = CallTree.from_dict(t.to_dict())
+        assert again.functions() == t.functions()
+        assert t.recent_events() == ([], 2)
+        assert t.functions()[("a.py", "f")]["exclusive_ms"] == 250
+    finally:
+        sys.path.remove(work_dir)
+        shutil.rmtree(work_dir)
+
+    print("\n[*] 測試通過：呼叫紀錄以呼叫樹聚合，記憶體不隨呼叫次數成長。")
+
+if __name__ == "__main__":
+    run_call_tree_test()
@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import textwrap
+
+# 嘗試匯入混沌測試執行器
+try:
+    import sys
+    sys.path.append("../src")
+    sys.path.append("../src/Dynamic")
+    from ChaosExecuter import ChaosExecuter, VirtualClock
+    import MetaCoder
+except ImportError:
+    print("錯誤：找不到 ChaosExecuter，請確保檔案在正確目錄下。")
+    exit()
+
+LATENCY_S = 0.5
+ROUNDS = 3
+
+FILES = {
+    "svc/__init__.py": "",
+    "svc/greet.py": "def greet(name):\n    return f'hello {name}'\n",
+    "svc/fetch.py": "def fetch(x):\n    return x * 2\n",
+    "svc/tests/__init__.py": "",
+    # greet 的測試不檢查時間：Latency 注入後仍會通過
+    "svc/tests/test_greet.py": """
+        import unittest
+        from svc.greet import greet
+
+        class TestGreet(unittest.TestCase):
+            def test_greet(self):
+                self.assertIsInstance(greet("bob"), str)
+    """,
+    # fetch 的測試有時間預算：虛擬時鐘下注入的延遲同樣會讓它失敗
+    "svc/tests/test_fetch.py": """
+        import time
+        import unittest
+        from svc.fetch import fetch
+
+        class TestFetch(unittest.TestCase):
+            def test_fetch(self):
+                start = time.monotonic()
+                self.assertEqual(fetch(2), 4)
+                self.assertTrue(time.monotonic() - start < 0.25, "over time budget")
+    """,
+}
+
+PLAN = {"experiments": [
+    {"target_function": "greet", "injections": [
+        {"type": "Latency", "value": LATENCY_S},
+        {"type": "DataCorruption"},
+        {"type": "Exception", "details": "ValueError: bad input"}]},
+    {"target_function": "fetch", "injections": [
+        {"type": "Latency", "value": LATENCY_S},
+        {"type": "Exception", "details": "Connection reset"}]},
+]}
+
+def build_workspace(root: str):
+    for rel, text in FILES.items():
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(textwrap.dedent(text))
+    with open(os.path.join(root, "svc", "chaos_plan.json"), "w") as f:
+        json.dump(PLAN, f)
+
+def campaign(runner: ChaosExecuter, **kwargs):
+    start = time.perf_counter()
+    path = runner.produceChaos("svc", test_rounds=ROUNDS, **kwargs)
+    elapsed = time.perf_counter() - start
+    with open(path) as f:
+        return json.load(f)["results"], elapsed
+
+def verdicts(results: list) -> list:
+    return [(r["function"], r["injection"], r["survival_rate"], r["status"]) for r in results]
+
+def run_chaos_executer_test():
+    print("=== ChaosExecuter 平行執行與虛擬時鐘測試 ===\n")
+    work_dir = tempfile.mkdtemp(prefix="chaos_")
+    try:
+        build_workspace(work_dir)
+        runner = ChaosExecuter(work_dir)
+        slept = 2 * ROUNDS * LATENCY_S
+        real_sleep = time.sleep
+
+        # 1. 依序 (本行程) 與平行 (worker 行程池) 的報告相同
+        serial, serial_s = campaign(runner, max_workers=1)
+        assert verdicts(serial) == [
+            ("greet", "Latency", 1.0, "RESILIENT"), ("greet", "DataCorruption", 1.0, "RESILIENT"),
+            ("greet", "Exception", 0.0, "FRAGILE"), ("fetch", "Latency", 0.0, "FRAGILE"),
+            ("fetch", "Exception", 0.0, "FRAGILE")], verdicts(serial)
+        assert serial_s >= slept, "未使用虛擬時鐘時注入的延遲會實際睡眠"
+        parallel, parallel_s = campaign(runner, max_workers=2)
+        assert parallel == serial, (parallel, serial)
+        print(f"   real clock: serial {serial_s:.2f}s | parallel {parallel_s:.2f}s")
+
+        # 2. 虛擬時鐘：延遲不實際睡眠，但時間仍前進，逾時判斷的結果不變
+        virtual, virtual_s = campaign(runner, max_workers=1, virtual_clock=True)
+        assert verdicts(virtual) == verdicts(serial)
+        assert virtual_s < slept / 3, f"虛擬時鐘下仍花了 {virtual_s:.2f}s"
+        assert time.sleep is real_sleep, "本行程的 time 模組需還原"
+        virtual_parallel, _ = campaign(runner, max_workers=2, virtual_clock=True)
+        assert virtual_parallel == virtual
+        print(f"   virtual clock: serial {virtual_s:.2f}s")
+
+        clock = VirtualClock()
+        clock.install()
+        try:
+            t0 = time.monotonic()
+            time.sleep(100)
+            assert time.monotonic() - t0 >= 100
+        finally:
+            clock.uninstall()
+
+        # 3. MetaCoder：設定會傳到 produceChaos，並寫入 vibe_config.json
+        meta = MetaCoder.MetaCoder(work_dir)
+        meta.set_chaos_virtual_clock(True)
+        start = time.perf_counter()
+        with open(meta._produce_chaos("svc")) as f:
+            assert verdicts(json.load(f)["results"]) == verdicts(serial)
+        assert time.perf_counter() - start < slept / 3
+        assert MetaCoder.MetaCoder(work_dir).chaos_config["virtual_clock"] is True
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\n[*] 測試通過：平行與依序的混沌報告一致，虛擬時鐘讓延遲注入不必實際等待。")
+
+if __name__ == "__main__":
+    run_chaos_executer_test()
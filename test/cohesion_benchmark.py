@@ -0,0 +1,98 @@
+import os
+import time
+import shutil
+import tempfile
+import networkx as nx
+from collections import defaultdict
+
+# 嘗試匯入分析器
+try:
+    import sys
+    sys.path.append("../src/Static")
+    import StructureAnalyzer
+except ImportError:
+    print("錯誤：找不到 StructureAnalyzer，請確保檔案在正確目錄下。")
+    exit()
+
+def reference_cohesion(graph):
+    """舊版演算法 (每個類別掃描整張圖 + 方法兩兩比對)，作為正確性與速度的基準"""
+    results = {}
+    nodes = [d for _, d in graph.iter_nodes()]
+    class_nodes = [d for d in nodes if d.get('type') == 'class']
+    for cls in class_nodes:
+        cls_name = cls.get('name')
+        methods = []
+        method_usage = defaultdict(set)
+        for d in nodes:
+            if d.get('type') == 'function' and d.get('parent_class') == cls_name:
+                methods.append(d.get('name'))
+            if d.get('parent_class') == cls_name and d.get('parent_method'):
+                for f in d.get('accessed_fields', []):
+                    method_usage[d.get('parent_method')].add(f)
+        if len(methods) <= 1:
+            results[cls_name] = {'lcom4': 1, 'density': 1.0}
+            continue
+        m_graph = nx.Graph()
+        m_graph.add_nodes_from(methods)
+        actual_edges = 0
+        for i in range(len(methods)):
+            for j in range(i + 1, len(methods)):
+                if not method_usage[methods[i]].isdisjoint(method_usage[methods[j]]):
+                    m_graph.add_edge(methods[i], methods[j])
+                    actual_edges += 1
+        n = len(methods)
+        results[cls_name] = {'lcom4': nx.number_connected_components(m_graph),
+                             'density': round(actual_edges / (n * (n - 1) / 2), 2)}
+    return results
+
+def make_class(name: str, n_methods: int, calls: bool = False) -> str:
+    """第 i 個方法使用 self.f{i % groups} 與專屬欄位 self.own{i}；calls=True 時每組第一個方法呼叫下一組"""
+    groups = max(1, n_methods // 10)
+    lines = [f"class {name}:"]
+    for i in range(n_methods):
+        lines.append(f"    def m{i}(self):")
+        lines.append(f"        self.own{i} = self.f{i % groups}")
+        if calls and i + 1 < groups:
+            lines.append(f"        self.m{i + 1}()")
+    return "\n".join(lines) + "\n"
+
+def run_benchmark():
+    print("=== LCOM4 計算效能測試 (合成類別) ===\n")
+    work_dir = tempfile.mkdtemp(prefix="cohesion_bench_")
+    try:
+        sizes = [10, 100, 1000]
+        for n in sizes:
+            with open(os.path.join(work_dir, f"cls_{n}.py"), "w") as f:
+                f.write(make_class(f"Class{n}", n))
+        with open(os.path.join(work_dir, "chained.py"), "w") as f:
+            f.write(make_class("Chained", 100, calls=True))
+
+        analyzer = StructureAnalyzer.StructureAnalyzer(work_dir, use_cache=False)
+
+        print(f"{'Methods':<8} | {'LCOM4':<6} | {'Density':<8} | {'Old (ms)':<10} | {'New (ms)':<10} | Speedup")
+        print("-" * 65)
+        for n in sizes:
+            mod = f"cls_{n}"
+            start = time.perf_counter()
+            old = reference_cohesion(analyzer.graphs[mod])
+            t_old = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            new = analyzer.calculateCohesion(mod)
+            t_new = (time.perf_counter() - start) * 1000
+
+            res = new[f"Class{n}"]
+            print(f"{n:<8} | {res['lcom4']:<6} | {res['density']:<8} | {t_old:<10.2f} | {t_new:<10.2f} | {t_old / max(t_new, 1e-6):.0f}x")
+            assert new == old, f"結果不一致: {new} vs {old}"
+            assert res['lcom4'] == max(1, n // 10)
+
+        # 方法呼叫也算連結：10 組欄位互不相交，但 m0 -> m1 -> ... -> m9 串起所有組別
+        chained = analyzer.calculateCohesion("chained")["Chained"]
+        print(f"\nChained (100 methods, 10 field groups linked by calls): {chained}")
+        assert chained['lcom4'] == 1, "self.m() 呼叫應連結方法"
+    finally:
+        shutil.rmtree(work_dir)
+
+    print("\n[*] 測試通過：結果與舊演算法一致，且方法呼叫納入 LCOM4。")
+
+if __name__ == "__main__":
+    run_benchmark()
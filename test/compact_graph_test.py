@@ -0,0 +1,114 @@
+import gc
+import os
+import pickle
+import shutil
+import tempfile
+import tracemalloc
+
+# 嘗試匯入分析器
+try:
+    import sys
+    sys.path.append("../src/Static")
+    import StructureAnalyzer
+    import CompactASTGraph
+except ImportError:
+    print("錯誤：找不到 StructureAnalyzer，請確保檔案在正確目錄下。")
+    exit()
+
+def make_module(i: int) -> str:
+    """每個檔案：import 前一個模組、一個含分支/迴圈的類別與一個頂層函式"""
+    prev = f"import mod_{i - 1}\n" if i else ""
+    return prev + f'''import os
+
+class Service{i}:
+    def __init__(self):
+        self.items = []
+        self.total = 0
+
+    def add(self, x):
+        if x > 0:
+            self.items.append(x)
+        else:
+            print("skip", x)
+        for v in self.items:
+            self.total += v
+        return self.total
+
+    def reset(self):
+        while self.items:
+            self.items.pop()
+
+def helper_{i}(path):
+    with open(path) as f:
+        return f.read()
+'''
+
+def graph_shape(g):
+    ids = [n for n, _ in g.iter_nodes()]
+    index = {n: i for i, n in enumerate(ids)}
+    nodes = []
+    for n in ids:
+        d = dict(g.get_node_info(n))
+        d['label'] = g.get_label(n)
+        if 'accessed_fields' in d: d['accessed_fields'] = sorted(d['accessed_fields'])
+        nodes.append(d)
+    return nodes, sorted((index[u], index[v], c) for u in ids for v, c in g.get_next_steps(u))
+
+def graph_memory(work_dir, compact):
+    """建立分析器後丟棄其流程圖，以釋放的記憶體量作為流程圖本身的用量"""
+    tracemalloc.start()
+    analyzer = StructureAnalyzer.StructureAnalyzer(work_dir, use_cache=False, compact_graphs=compact)
+    before = tracemalloc.get_traced_memory()[0]
+    analyzer.graphs.clear()
+    gc.collect()   # NetworkX 圖內含循環參照，需要 gc 才會釋放
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return before - after
+
+def run_compact_test():
+    print("=== CompactASTGraph 記憶體與相容性測試 ===\n")
+    work_dir = tempfile.mkdtemp(prefix="compact_graph_")
+    try:
+        n_files = 200
+        for i in range(n_files):
+            with open(os.path.join(work_dir, f"mod_{i}.py"), "w") as f:
+                f.write(make_module(i))
+
+        nx_bytes = graph_memory(work_dir, compact=False)
+        compact_bytes = graph_memory(work_dir, compact=True)
+        nx_analyzer = StructureAnalyzer.StructureAnalyzer(work_dir, use_cache=False, compact_graphs=False)
+        compact_analyzer = StructureAnalyzer.StructureAnalyzer(work_dir, use_cache=False)
+        nodes = sum(len(g) for g in compact_analyzer.graphs.values())
+        print(f"   files / nodes      {n_files} / {nodes}")
+        print(f"   NetworkX backend   {nx_bytes / 1024:.0f} KiB")
+        print(f"   Compact backend    {compact_bytes / 1024:.0f} KiB  ({nx_bytes / max(compact_bytes, 1):.1f}x smaller)")
+        assert compact_bytes < nx_bytes / 2, "陣列式後端應明顯節省記憶體"
+
+        # 同一份原始碼：兩種後端的節點屬性、標籤與邊完全一致
+        for mod in ("mod_0", "mod_7"):
+            assert graph_shape(nx_analyzer.graphs[mod]) == graph_shape(compact_analyzer.graphs[mod])
+            assert nx_analyzer.summaries[mod] == compact_analyzer.summaries[mod]
+        for mod in ("mod_3", "mod_199"):
+            for metric in ("calculateCoupling", "calculateCohesion", "calculateInstability", "calculateAbstractness"):
+                assert getattr(nx_analyzer, metric)(mod) == getattr(compact_analyzer, metric)(mod), metric
+
+        # ParseCache 以 pickle 保存：往返後內容不變，且仍可繼續加節點/加邊
+        g = compact_analyzer.graphs["mod_5"]
+        restored = pickle.loads(pickle.dumps(g))
+        assert graph_shape(restored) == graph_shape(g)
+        extra = restored.add_node("extra", node_type="custom")
+        restored.add_edge(restored.root_id, extra, condition="Maybe")
+        assert (extra, "Maybe") in restored.get_next_steps(restored.root_id)
+        assert restored.get_node_info(extra)['type'] == "custom"
+
+        # 繪圖時才轉為 NetworkX
+        nx_graph = g.to_networkx()
+        assert nx_graph.graph.number_of_nodes() == len(g)
+        assert nx_graph.graph.number_of_edges() == sum(len(g.get_next_steps(n)) for n, _ in g.iter_nodes())
+    finally:
+        shutil.rmtree(work_dir)
+
+    print("\n[*] 測試通過：陣列式後端與 NetworkX 後端結果一致，且記憶體用量較低。")
+
+if __name__ == "__main__":
+    run_compact_test()
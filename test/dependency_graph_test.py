@@ -0,0 +1,124 @@
+import os
+import time
+import random
+import shutil
+import tempfile
+import networkx as nx
+
+# 嘗試匯入分析器
+try:
+    import sys
+    sys.path.append("../src/Static")
+    import StructureAnalyzer
+    from DependencyGraph import DependencyGraph
+except ImportError:
+    print("錯誤：找不到 DependencyGraph，請確保檔案在正確目錄下。")
+    exit()
+
+def check_against_networkx(seed: int):
+    """隨機加/刪邊，每一步都與 NetworkX 重建的結果比對"""
+    rnd = random.Random(seed)
+    g, ref = DependencyGraph(), nx.MultiDiGraph()
+    n = rnd.randint(4, 12)
+    for _ in range(60):
+        u, v = rnd.randrange(n), rnd.randrange(n)
+        if rnd.random() < 0.6:
+            g.add_edge(u, v); ref.add_edge(u, v)
+        elif ref.has_edge(u, v):
+            g.remove_edge(u, v); ref.remove_edge(u, v)
+        simple = nx.DiGraph(ref)
+        assert {frozenset(c) for c in g.components()} == {frozenset(c) for c in nx.strongly_connected_components(simple)}
+        a, b = rnd.randrange(n), rnd.randrange(n)
+        if a in simple and b in simple:
+            assert g.would_create_cycle(a, b) == (a == b or nx.has_path(simple, b, a))
+
+def layered_modules(n_layers: int, width: int) -> dict:
+    """分層架構：每個模組依賴下一層的幾個模組 (無環)"""
+    rnd = random.Random(7)
+    deps = {}
+    for layer in range(n_layers):
+        for i in range(width):
+            below = [f"m{layer + 1}_{j}" for j in range(width)] if layer + 1 < n_layers else []
+            deps[f"m{layer}_{i}"] = rnd.sample(below, min(3, len(below)))
+    return deps
+
+def run_dependency_graph_test():
+    print("=== DependencyGraph 增量 SCC / 循環檢查測試 ===\n")
+
+    # 1. 正確性：與 NetworkX 比對
+    for seed in range(50):
+        check_against_networkx(seed)
+
+    # 2. 基本行為：最短環、刪邊後分量分裂、多來源參考計數
+    g = DependencyGraph()
+    g.set_dependencies("api", ["core", "util"])
+    g.set_dependencies("core", ["util"])
+    assert not g.would_create_cycle("api", "core") and g.last_search_size == 0, "拓撲序直接判定"
+    assert g.find_cycle("util", "api") == ["util", "api", "util"]
+    g.set_dependencies("util", ["api"], source="util/a.py")
+    g.set_dependencies("util", ["api"], source="util/b.py")
+    assert g.cycles() == [["api", "util", "api"]]
+    g.set_dependencies("util", [], source="util/a.py")
+    assert g.cycles(), "另一個來源仍提供 util -> api"
+    g.set_dependencies("util", [], source="util/b.py")
+    assert g.cycles() == [] and len(g.components()) == 3
+
+    # 3. 規模：每次細化只檢查新模組 vs 每次重建整張圖並列舉環
+    deps = layered_modules(20, 25)
+    start = time.perf_counter()
+    graph = DependencyGraph()
+    for mod, targets in deps.items():
+        assert graph.check_dependencies(mod, targets) is None
+        graph.set_dependencies(mod, targets)
+    t_incremental = (time.perf_counter() - start) * 1000
+
+    analyzer = StructureAnalyzer.StructureAnalyzer.__new__(StructureAnalyzer.StructureAnalyzer)
+    start = time.perf_counter()
+    virtual = {}
+    for mod, targets in list(deps.items())[:100]:
+        virtual[mod] = "\n".join(f"import {t}" for t in targets)
+        assert analyzer.detect_cycles_from_stubs(virtual) == []
+    rebuild = nx.DiGraph()
+    for mod, targets in list(deps.items())[:100]:
+        rebuild.add_edges_from((mod, t) for t in targets)
+        list(nx.simple_cycles(rebuild))
+    t_rebuild = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    back_edge = graph.find_cycle("m19_0", "m0_0")
+    t_query = (time.perf_counter() - start) * 1000
+    print(f"   {len(deps)} modules: incremental audit (all) {t_incremental:.1f} ms | "
+          f"rebuild per audit (first 100 only) {t_rebuild:.1f} ms")
+    print(f"   back-edge check {t_query:.2f} ms -> minimal cycle length {len(back_edge) - 1 if back_edge else 0}")
+    assert graph.would_create_cycle("m0_0", "m19_0") is False and graph.last_search_size == 0
+
+    # 4. StructureAnalyzer：實作檔的 import 是否會形成套件層級的環
+    work_dir = tempfile.mkdtemp(prefix="dep_graph_")
+    try:
+        for pkg, body in (("auth", "import db\n"), ("db", "import os\n"), ("cart", "import auth\n")):
+            os.makedirs(os.path.join(work_dir, pkg))
+            with open(os.path.join(work_dir, pkg, "impl.py"), "w") as f:
+                f.write(body)
+        analyzer = StructureAnalyzer.StructureAnalyzer(work_dir, use_cache=False)
+        assert analyzer.import_graph.cycles() == []
+
+        new_file = os.path.join(work_dir, "db", "query.py")
+        with open(new_file, "w") as f:
+            f.write("import cart\n")
+        cycle = analyzer.find_import_cycle(new_file)
+        print(f"\n   db/query.py imports cart -> {' -> '.join(cycle)}")
+        assert cycle == ["db", "cart", "auth", "db"]
+        analyzer.invalidate(new_file)
+        assert analyzer.import_graph.cycles() == [["auth", "db", "cart", "auth"]]
+        assert analyzer.find_import_cycle(new_file) == cycle, "寫入前後查詢結果相同"
+
+        os.remove(new_file)
+        analyzer.invalidate(new_file)
+        assert analyzer.import_graph.cycles() == []
+    finally:
+        shutil.rmtree(work_dir)
+
+    print("\n[*] 測試通過：增量 SCC 與 NetworkX 一致，循環檢查不需重建整張圖。")
+
+if __name__ == "__main__":
+    run_dependency_graph_test()
@@ -0,0 +1,146 @@
+import textwrap
+
+# 嘗試匯入收集器與 worker 行程池
+try:
+    import sys
+    sys.path.append("../src/Dynamic")
+    from MetricCollector import MetricCollector
+    from ExecutionWorker import ExecutionPool
+except ImportError:
+    print("錯誤：找不到 ExecutionWorker，請確保檔案在正確目錄下。")
+    exit()
+
+# 決定性的程式：呼叫次數、IO 與行覆蓋率都可以逐項比對
+CODE = textwrap.dedent("""
+    import os, tempfile
+
+    def square(x):
+        return x * x
+
+    def total(n):
+        s = 0
+        for i in range(n):
+            s += square(i)
+        return s
+
+    def save(text):
+        path = os.path.join(tempfile.gettempdir(), "metacoder_worker_test.txt")
+        with open(path, "w") as f:
+            f.write(text)
+        with open(path) as f:
+            return f.read()
+
+    def main():
+        for n in (10, 20, 30):
+            total(n)
+        save("x" * 100)
+
+    main()
+""")
+
+# 永不結束：只能靠牆鐘上限終止
+SPIN = textwrap.dedent("""
+    def tick(i):
+        return i + 1
+
+    def spin():
+        i = 0
+        while True:
+            i = tick(i)
+
+    spin()
+""")
+
+# 持續配置記憶體 (逐頁寫入，確實反映在 RSS)：只能靠 RSS 上限終止
+GROW = textwrap.dedent("""
+    import time
+    chunks = []
+
+    def grow():
+        chunks.append(b"x" * (8 << 20))
+        time.sleep(0.02)
+
+    def main():
+        while True:
+            grow()
+
+    main()
+""")
+
+# 比預設上限久但會自行結束
+SLOW = "import time\ntime.sleep(1.5)\n"
+
+def user_nodes(tree: dict) -> dict:
+    """呼叫樹中使用者函式的 {路徑: calls}"""
+    out, stack = {}, [((), c) for c in tree["children"]]
+    while stack:
+        path, node = stack.pop()
+        path = path + (node["name"],)
+        out[path] = node["calls"]
+        stack.extend((path, c) for c in node["children"])
+    return out
+
+def idle_pids(pool: ExecutionPool) -> set:
+    return {w.process.pid for w in pool._idle}
+
+def run_execution_worker_test():
+    print("=== ExecutionWorker 隔離執行測試 ===\n")
+    collector = MetricCollector()
+    pool = ExecutionPool.shared()
+
+    # 1. 往返一致：隔離模式還原的指標、IO、覆蓋率與呼叫樹與行程內執行相同
+    collector.execute_code(CODE, backend="settrace")
+    local = (collector.getBenchmarkData(), collector.getIOHistory(), collector.getCodeCoverage(),
+             user_nodes(collector.getCallTree()))
+    collector.execute_code(CODE, backend="settrace", isolated=True)
+    assert collector.isolated and collector.exec_status == "ok"
+    remote = (collector.getBenchmarkData(), collector.getIOHistory(), collector.getCodeCoverage(),
+              user_nodes(collector.getCallTree()))
+    calls = lambda bench: {n: d["calls"] for n, d in bench.items()}
+    assert calls(remote[0]) == calls(local[0]) and remote[0]["square"]["calls"] == 60, remote[0]
+    assert remote[1] == local[1] and remote[1]["save"] == {"r": 100, "w": 100}, remote[1]
+    assert remote[2] == local[2], "行覆蓋率需一致"
+    assert remote[3] == local[3], "呼叫樹需一致"
+
+    # 2. worker 重用：成功的執行把 worker 放回池中，下一次執行由同一個行程處理
+    reused = idle_pids(pool)
+    assert reused, "成功執行後 worker 應回到閒置池"
+    collector.execute_code(CODE, backend="settrace", isolated=True)
+    assert collector.exec_status == "ok" and idle_pids(pool) == reused, (idle_pids(pool), reused)
+
+    # 3. 牆鐘上限：worker 被終止，已串流的指標、覆蓋率與呼叫樹仍保留
+    collector.execute_code(SPIN, backend="settrace", isolated=True, time_limit=2.0)
+    assert collector.exec_status == "timeout"
+    bench = collector.getBenchmarkData()
+    assert bench.get("tick", {}).get("calls", 0) > 1000, bench
+    assert "spin" in collector.getCodeCoverage() and "tick" in collector.getCodeCoverage()
+    assert ("<module>", "spin", "tick") in user_nodes(collector.getCallTree()), "呼叫樹快照需在終止前送出"
+    assert not idle_pids(pool) & reused, "被終止的 worker 不可放回池中"
+    print(f"   timeout: tick x{bench['tick']['calls']} streamed before kill")
+
+    # 4. RSS 上限：同樣保留終止前的資料；之後的執行改用新的 worker
+    collector.execute_code(GROW, backend="settrace", isolated=True, time_limit=30.0, mem_limit_mb=300)
+    assert collector.exec_status == "memory_limit", collector.exec_status
+    grow = collector.getBenchmarkData().get("grow", {})
+    assert grow.get("calls", 0) >= 5 and grow.get("mem_peak", 0) >= 8 << 20, grow
+    assert "grow" in collector.getCodeCoverage()
+    print(f"   memory_limit: grow x{grow['calls']} (peak {grow['mem_peak'] >> 20} MB/call) streamed before kill")
+
+    collector.execute_code(CODE, backend="settrace", isolated=True)
+    assert collector.exec_status == "ok" and collector.getBenchmarkData()["square"]["calls"] == 60
+
+    # 5. time_limit=0：不設牆鐘上限 (例如執行到使用者關閉視窗的 Tk 程式)
+    default_limit = ExecutionPool.DEFAULT_TIME_LIMIT
+    ExecutionPool.DEFAULT_TIME_LIMIT = 0.5
+    try:
+        collector.execute_code(SLOW, backend="settrace", isolated=True, time_limit=0)
+        assert collector.exec_status == "ok", collector.exec_status
+        collector.execute_code(SLOW, backend="settrace", isolated=True)
+        assert collector.exec_status == "timeout", "None 仍使用預設上限"
+    finally:
+        ExecutionPool.DEFAULT_TIME_LIMIT = default_limit
+
+    print("\n[*] 測試通過：隔離執行的結果與行程內一致，被終止的執行仍保有串流回來的資料。")
+
+if __name__ == "__main__":
+    run_execution_worker_test()
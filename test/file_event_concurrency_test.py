@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+
+# 嘗試匯入 MetaCoder 與監看事件
+try:
+    import sys
+    sys.path.append("../src")
+    sys.path.append("../src/System")
+    import MetaCoder
+    from FileWatcher import FileEvent
+except ImportError:
+    print("錯誤：找不到 MetaCoder，請確保檔案在正確目錄下。")
+    exit()
+
+MODULES = ["core", "io_utils", "report"]
+DURATION_S = 3.0
+
+def write(path: str, text: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)   # 與編輯器存檔相同：讀者不會看到寫到一半的檔案
+
+def build_project(root: str) -> str:
+    proj = os.path.join(root, "proj")
+    arch = {"modules": [{"name": m, "dependencies": MODULES[:i]} for i, m in enumerate(MODULES)]}
+    write(os.path.join(proj, "architecture.json"), json.dumps(arch))
+    for i, m in enumerate(MODULES):
+        write(os.path.join(proj, m, "spec.json"), json.dumps({"module_name": m, "dependencies": MODULES[:i]}))
+        write(os.path.join(proj, m, ".status.json"), json.dumps({"f0": {"status": "implemented"}}))
+        for j in range(4):
+            write(os.path.join(proj, m, f"f{j}.py"), f"def f{j}(x):\n    return helper(x) + {j}\n\ndef helper(x):\n    return x\n")
+    return proj
+
+def run_file_event_concurrency_test():
+    print("=== FileWatcher 事件與查詢並行測試 ===\n")
+    work_dir = tempfile.mkdtemp(prefix="events_")
+    meta = None
+    try:
+        proj = build_project(work_dir)
+        meta = MetaCoder.MetaCoder(work_dir)
+        meta.file_watcher.stop()   # 事件改由本測試直接送出，避免與真實監看交錯而難以重現
+        assert meta.get_module_dag() is not None
+
+        stop = threading.Event()
+        errors = []
+        counts = {}
+
+        def reader(name, fn):
+            def loop():
+                n = 0
+                try:
+                    while not stop.is_set():
+                        fn()
+                        n += 1
+                except Exception as e:
+                    errors.append(f"{name}: {type(e).__name__}: {e}")
+                counts[name] = n
+            return threading.Thread(target=loop, name=name, daemon=True)
+
+        def audit():
+            with meta._audit_lock:
+                meta._get_spec_graph().check_dependencies("report", ["core"])
+
+        impl_items = [(os.path.join(proj, m, f"f{j}.py"), MODULES) for m in MODULES for j in range(4)]
+        readers = [
+            reader("distribution", meta.get_function_distribution),
+            reader("call_edges", meta.get_call_edges),
+            reader("impacted", lambda: meta.get_impacted_functions("proj.core", "helper")),
+            reader("metrics", lambda: [meta.static_analyzer.module_metrics(m) for m in MODULES]),
+            reader("deps_batch", lambda: meta.static_analyzer.verify_implementation_deps_batch(impl_items)),
+            reader("dag", lambda: [meta.check_dependencies_met(m) for m in MODULES]),
+            reader("audit", audit),
+        ]
+
+        # 監看執行緒：改寫 / 新增 / 刪除檔案並送出對應事件
+        def watcher():
+            k = 0
+            try:
+                while not stop.is_set():
+                    m = MODULES[k % len(MODULES)]
+                    extra = os.path.join(proj, m, f"extra{k % 5}.py")
+                    events = []
+                    if os.path.exists(extra):
+                        os.remove(extra)
+                        events.append(FileEvent(extra, "implementation", m, removed=True))
+                    else:
+                        write(extra, f"def extra{k}(x):\n    return helper(x)\n")
+                        events.append(FileEvent(extra, "implementation", m))
+                    status = os.path.join(proj, m, ".status.json")
+                    write(status, json.dumps({"f0": {"status": "implemented"}, "f1": {"status": "pending" if k % 2 else "implemented"}}))
+                    events.append(FileEvent(status, "status", m))
+                    spec = os.path.join(proj, m, "spec.json")
+                    events.append(FileEvent(spec, "spec", m))
+                    if k % 7 == 0:
+                        events.append(FileEvent(os.path.join(proj, "architecture.json"), "spec", None))
+                    if k % 11 == 0:
+                        events.append(FileEvent(proj, "rescan", None))
+                    meta._on_file_events(events)
+                    k += 1
+            except Exception as e:
+                errors.append(f"watcher: {type(e).__name__}: {e}")
+            counts["watcher"] = k
+
+        threads = readers + [threading.Thread(target=watcher, name="watcher", daemon=True)]
+        for t in threads: t.start()
+        time.sleep(DURATION_S)
+        stop.set()
+        for t in threads: t.join(timeout=10)
+
+        assert not any(t.is_alive() for t in threads), "執行緒卡住 (疑似死結)"
+        assert not errors, errors
+        assert all(counts.get(t.name, 0) > 0 for t in threads), counts
+        print("   " + " | ".join(f"{k} {v}" for k, v in sorted(counts.items())))
+
+        # 並行結束後，快取仍與磁碟一致
+        meta._on_file_events([FileEvent(proj, "rescan", None)])
+        funcs = meta.get_function_distribution()
+        on_disk = set()
+        for m in MODULES:
+            for f in os.listdir(os.path.join(proj, m)):
+                if f.startswith("extra"):
+                    with open(os.path.join(proj, m, f)) as fh:
+                        on_disk.add(fh.readline()[4:].split("(")[0])
+        listed = {f for names in funcs.values() for f in names if f.startswith("extra")}
+        assert listed == on_disk, (listed, on_disk)
+    finally:
+        if meta is not None:
+            meta.file_watcher.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\n[*] 測試通過：監看事件與 GUI / 排程器查詢並行時不會讀到半更新的快取。")
+
+if __name__ == "__main__":
+    run_file_event_concurrency_test()
@@ -0,0 +1,104 @@
+import os
+import time
+import json
+import shutil
+import tempfile
+import threading
+
+# 嘗試匯入監看服務
+try:
+    import sys
+    sys.path.append("../src/System")
+    import FileWatcher
+except ImportError:
+    print("錯誤：找不到 FileWatcher，請確保檔案在正確目錄下。")
+    exit()
+
+class Recorder:
+    """收集 FileWatcher 送出的批次"""
+    def __init__(self):
+        self.batches = []
+        self._cond = threading.Condition()
+
+    def __call__(self, events):
+        with self._cond:
+            self.batches.append(events)
+            self._cond.notify_all()
+
+    def wait(self, predicate, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not predicate(self.events()):
+                left = deadline - time.monotonic()
+                if left <= 0: return False
+                self._cond.wait(left)
+        return True
+
+    def events(self):
+        return {(ev.path, ev.category, ev.module, ev.removed) for b in self.batches for ev in b}
+
+def write(path, text="x = 1\n"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+def run_backend(use_inotify):
+    work_dir = tempfile.mkdtemp(prefix="file_watcher_")
+    try:
+        write(os.path.join(work_dir, "architecture.json"), "{}")
+        write(os.path.join(work_dir, "auth", "spec.json"), "{}")
+        watcher = FileWatcher.FileWatcher(work_dir, use_inotify=use_inotify)
+        rec = Recorder()
+        watcher.subscribe(rec)
+        watcher.start()
+        time.sleep(0.2)
+        try:
+            # 1. 生成器連續寫入：同一路徑多次寫入合併成一筆
+            auth = os.path.join(work_dir, "auth")
+            start = time.perf_counter()
+            for i in range(20):
+                write(os.path.join(auth, "login.py"), f"x = {i}\n")
+            write(os.path.join(auth, ".status.json"), json.dumps({"login": {"status": "implemented"}}))
+            write(os.path.join(auth, "tests", "test_login.py"))
+            write(os.path.join(auth, "chaos_report.json"), "{}")
+            write(os.path.join(auth, "notes.txt"))                          # 不關注
+            write(os.path.join(work_dir, ".metacoder_cache", "x.py"))       # 忽略目錄
+            expected = {
+                (os.path.join(auth, "login.py"), "implementation", "auth", False),
+                (os.path.join(auth, ".status.json"), "status", "auth", False),
+                (os.path.join(auth, "tests", "test_login.py"), "test", "auth", False),
+                (os.path.join(auth, "chaos_report.json"), "chaos_report", "auth", False),
+            }
+            assert rec.wait(lambda evs: expected <= evs), rec.events()
+            latency = time.perf_counter() - start
+            time.sleep(FileWatcher.FileWatcher.DEBOUNCE * 2)
+            assert rec.events() == expected, rec.events()
+            paths = [ev.path for b in rec.batches for ev in b]
+            assert len(paths) == len(set(paths)), "同一路徑在一批內只回報一次"
+
+            # 2. 新建的模組目錄 (含子目錄) 也會被監看
+            cart = os.path.join(work_dir, "cart")
+            write(os.path.join(cart, "spec.json"), "{}")
+            write(os.path.join(cart, "add_item.py"))
+            assert rec.wait(lambda evs: (os.path.join(cart, "add_item.py"), "implementation", "cart", False) in evs)
+            assert (os.path.join(cart, "spec.json"), "spec", "cart", False) in rec.events()
+
+            # 3. 刪除
+            os.remove(os.path.join(auth, "login.py"))
+            assert rec.wait(lambda evs: (os.path.join(auth, "login.py"), "implementation", "auth", True) in evs)
+            print(f"   {watcher.backend:<8} | batches {len(rec.batches):<3} | first batch latency {latency * 1000:.0f} ms")
+        finally:
+            watcher.stop()
+    finally:
+        shutil.rmtree(work_dir)
+
+def run_watcher_test():
+    print("=== FileWatcher 事件合併與分類測試 ===\n")
+    print(f"   inotify available: {FileWatcher.HAS_INOTIFY}")
+    if FileWatcher.HAS_INOTIFY:
+        run_backend(use_inotify=True)
+    run_backend(use_inotify=False)
+    print("\n[*] 測試通過：事件依類別分類、連續寫入合併，新目錄自動納入監看。")
+
+if __name__ == "__main__":
+    run_watcher_test()
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import textwrap
+
+# 嘗試匯入收集器與火焰圖
+try:
+    import sys
+    sys.path.append("../src/Dynamic")
+    from MetricCollector import MetricCollector
+    import FlameGraph
+except ImportError:
+    print("錯誤：找不到 FlameGraph，請確保檔案在正確目錄下。")
+    exit()
+
+CODE = textwrap.dedent("""
+    def parse(n):
+        return [str(i) for i in range(n)]
+
+    def render(rows):
+        return ";".join(rows)
+
+    def handle():
+        for _ in range(20):
+            render(parse(2000))
+
+    handle()
+""")
+
+def synthetic_tree(width: int, fanout: int) -> dict:
+    """width 個頂層呼叫，各自有 fanout 個子呼叫 (每個再帶一個葉節點)"""
+    children = []
+    for i in range(width):
+        leaves = [{"file": "lib.py", "name": f"leaf_{i}_{j}", "calls": 1, "inclusive_ms": 0.01, "exclusive_ms": 0.005,
+                   "children": [{"file": "lib.py", "name": "alloc", "calls": 1, "inclusive_ms": 0.005,
+                                 "exclusive_ms": 0.005, "children": []}]}
+                  for j in range(fanout)]
+        children.append({"file": "<string>", "name": f"task_{i}", "calls": 1, "inclusive_ms": 0.01 * fanout + 1.0,
+                         "exclusive_ms": 1.0, "children": leaves})
+    return {"file": "", "name": "root", "calls": 0, "inclusive_ms": 0.0, "exclusive_ms": 0.0, "children": children}
+
+def run_flame_graph_test():
+    print("=== FlameGraph 匯出與版面配置測試 ===\n")
+    work_dir = tempfile.mkdtemp(prefix="flame_")
+    try:
+        # 1. 由實際執行產生三種格式
+        collector = MetricCollector()
+        collector.execute_code(CODE)
+        tree = collector.getCallTree()
+        paths = {fmt: os.path.join(work_dir, name) for fmt, name in
+                 (("collapsed", "run.collapsed"), ("speedscope", "run.speedscope.json"), ("html", "run.html"))}
+        for fmt, path in paths.items():
+            assert collector.exportFlameGraph(path) == fmt
+
+        with open(paths["collapsed"]) as f:
+            lines = f.read().splitlines()
+        stacks = dict(line.rsplit(" ", 1) for line in lines)
+        assert any(s.endswith("handle;parse") for s in stacks), list(stacks)[:5]
+        assert all(int(v) > 0 for v in stacks.values())
+
+        with open(paths["speedscope"]) as f:
+            doc = json.load(f)
+        profile = doc["profiles"][0]
+        assert doc["$schema"].startswith("https://www.speedscope.app") and profile["type"] == "sampled"
+        assert len(profile["samples"]) == len(profile["weights"]) == len(lines)
+        names = [fr["name"] for fr in doc["shared"]["frames"]]
+        assert all(0 <= i < len(names) for s in profile["samples"] for i in s) and "render" in names
+
+        layout = FlameGraph.FlameLayout(tree)
+        with open(paths["html"], encoding="utf-8") as f:
+            page = f.read()
+        assert page.count("<g data-n=") == len(layout.frames) and "<svg" in page
+        handle = next(i for i, fr in enumerate(layout.frames) if fr.name == "handle")
+        assert {layout.frames[i].name for i in range(len(layout.frames)) if layout.frames[i].parent == handle} >= {"parse", "render"}
+        print(f"   run: {len(layout.frames)} frames -> collapsed {len(lines)} stacks, "
+              f"html {os.path.getsize(paths['html'])} bytes")
+
+        # 2. 十萬個以上 frame：版面配置一次，重繪只取可見 frame
+        big = synthetic_tree(300, 200)
+        start = time.perf_counter()
+        big_layout = FlameGraph.FlameLayout(big)
+        t_layout = (time.perf_counter() - start) * 1000
+        n_frames = len(big_layout.frames)
+        assert n_frames == 300 + 300 * 200 * 2
+
+        px = 1200
+        total = big_layout.total
+        start = time.perf_counter()
+        full = list(big_layout.visible(0, total, min_width=total / px))
+        t_full = (time.perf_counter() - start) * 1000
+        task = big_layout.frames[full[0]]
+        start = time.perf_counter()
+        zoomed = list(big_layout.visible(task.start, task.start + task.width, min_width=task.width / px))
+        t_zoom = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        matches, covered = big_layout.search("alloc")
+        t_search = (time.perf_counter() - start) * 1000
+        print(f"   {n_frames} frames: layout {t_layout:.0f} ms | full view draws {len(full)} ({t_full:.1f} ms) | "
+              f"zoomed view draws {len(zoomed)} ({t_zoom:.1f} ms) | search {t_search:.0f} ms")
+        assert len(full) <= px * 3, "全幅檢視只畫寬度 >= 1px 的 frame"
+        assert {big_layout.frames[i].depth for i in zoomed} == {0, 1, 2} and len(zoomed) >= 200 * 2
+        assert len(matches) == 300 * 200 and abs(covered - 300 * 200 * 0.005) < 1e-6
+
+        # 剪枝後的結果與逐一檢查全部 frame 相同
+        small = FlameGraph.FlameLayout(synthetic_tree(20, 30))
+        for x0, x1, min_w in ((0, small.total, small.total / 50), (3.0, 3.2, 0.001), (10.0, 40.0, 0.02), (0, small.total, 0)):
+            brute = {i for i, fr in enumerate(small.frames)
+                     if fr.start < x1 and fr.start + fr.width > x0 and fr.width >= min_w}
+            assert set(small.visible(x0, x1, min_width=min_w)) == brute, (x0, x1, min_w)
+
+        # HTML 以 min_fraction 限制大小
+        page = FlameGraph.to_html(big)
+        assert page.count("<g data-n=") < n_frames / 10
+        print(f"   html for {n_frames} frames: {len(page) // 1024} KB")
+    finally:
+        shutil.rmtree(work_dir)
+
+    print("\n[*] 測試通過：三種格式匯出正確，大型剖析結果只繪製可見 frame。")
+
+if __name__ == "__main__":
+    run_flame_graph_test()
@@ -0,0 +1,139 @@
+import os
+import re
+import json
+import time
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 嘗試匯入生成模組
+try:
+    import sys
+    sys.path.append("../src/Generate")
+    from ProjectManager import ProjectManager
+    from CodeImplementer import CodeImplementer
+    from TestSpawner import TestSpawner
+    from GenerationPipeline import GenerationPipeline
+except ImportError:
+    print("錯誤：找不到 Generate 模組，請確保檔案在正確目錄下。")
+    exit()
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """依 Prompt 類型回傳 spec JSON / 實作 / 測試程式碼，並記錄請求順序"""
+    protocol_version = "HTTP/1.1"
+    delay = 0.05
+    log = []   # [(kind, target, start, end)]
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        system, user = body["messages"][0]["content"], body["messages"][1]["content"]
+        start = time.perf_counter()
+
+        if body.get("format") == "json":
+            module = re.search(r"TARGET MODULE: (\w+)", user).group(1)
+            kind, target = "refine", module
+            content = json.dumps({"module_name": module, "dependencies": [], "functions": [
+                {"name": f"{module}_{i}", "args": [], "return_type": "int", "docstring": "stub"} for i in range(2)]})
+        elif "QA Engineer" in system:
+            func = re.search(r"Function: (\w+)", user).group(1)
+            kind, target = "test", func
+            content = f"```python\nimport unittest\nclass T(unittest.TestCase):\n    def test_{func}(self): pass\n```"
+        else:
+            func = re.search(r"Function: (\w+)", user).group(1)
+            kind, target = "implement", func
+            content = f"```python\nimport math\ndef {func}():\n    return 1\n```"
+
+        time.sleep(self.delay)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._chunk({"message": {"role": "assistant", "content": content},
+                     "logprobs": [{"token": "x", "logprob": -0.2}], "done": False})
+        self._chunk({"message": {"role": "assistant", "content": ""}, "done": True})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+        with StubOllamaHandler.lock:
+            StubOllamaHandler.log.append((kind, target, start, time.perf_counter()))
+
+def _make_project(root):
+    project_dir = os.path.join(root, "demo")
+    os.makedirs(project_dir)
+    arch = {"project_name": "demo", "modules": [
+        {"name": "core", "description": "base", "dependencies": []},
+        {"name": "api", "description": "uses core", "dependencies": ["core"]},
+        {"name": "cli", "description": "uses core", "dependencies": ["core"]},
+        {"name": "app", "description": "uses api and cli", "dependencies": ["api", "cli"]},
+    ]}
+    arch_path = os.path.join(project_dir, "architecture.json")
+    with open(arch_path, 'w') as f:
+        json.dump(arch, f)
+    return arch_path
+
+def run_pipeline_test():
+    print("=== GenerationPipeline 依賴順序 / 並行 / 接續執行 測試 (Stub Server) ===\n")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    with tempfile.TemporaryDirectory() as ws:
+        arch_path = _make_project(ws)
+        coder = CodeImplementer(url)
+        coder.client.set_concurrency(3, model="stub-model")
+        models = {"architect": "stub-model", "coder": "stub-model"}
+        events = []
+        pipeline = GenerationPipeline(arch_path, ProjectManager(ws, url), coder, TestSpawner(url), models,
+                                      on_event=events.append)
+
+        report = pipeline.run()
+        print(f"   backend       {report.backend}")
+        print(f"   wall_time_s   {report.wall_time}")
+        print(f"   modules       {report.module_status}")
+        print(f"   implemented   {len(report.implemented)}  tests {len(report.tests)}")
+
+        log = StubOllamaHandler.log
+        spans = {(k, t): (s, e) for k, t, s, e in log}
+        # 細化順序：依賴模組的 spec 必須先完成
+        for mod, deps in {"api": ["core"], "cli": ["core"], "app": ["api", "cli"]}.items():
+            for dep in deps:
+                assert spans[("refine", dep)][1] <= spans[("refine", mod)][0], f"{mod} 在 {dep} 細化完成前就開始"
+        # 實作順序：依賴模組必須已有實作
+        assert spans[("implement", "core_0")][1] <= spans[("implement", "api_0")][0]
+        # 互不相依的模組應並行 (api 與 cli 的細化時間重疊)
+        a, c = spans[("refine", "api")], spans[("refine", "cli")]
+        assert a[0] < c[1] and c[0] < a[1], "api 與 cli 應同時細化"
+
+        assert set(report.module_status.values()) == {"done"}, report.module_status
+        assert len(report.implemented) == 8 and len(report.tests) == 8 and not report.failed
+        assert os.path.exists(os.path.join(os.path.dirname(arch_path), "app", "tests", "test_app_1.py"))
+        assert events[-1].stage == "pipeline" and events[-1].done == events[-1].total == 20
+
+        # 第二次執行：所有 spec / 實作 / 測試都已存在，不應再送出任何請求
+        before = len(log)
+        again = GenerationPipeline(arch_path, ProjectManager(ws, url), coder, TestSpawner(url), models).run()
+        assert len(log) == before, "已完成的工作不應重做"
+        assert not again.implemented and not again.tests
+
+        # 取消：在第一個請求回來前設定 cancel_event
+        arch2 = _make_project(os.path.join(ws, "second"))
+        cancel = threading.Event()
+        threading.Timer(0.02, cancel.set).start()
+        cancelled = GenerationPipeline(arch2, ProjectManager(ws, url), coder, TestSpawner(url), models).run(cancel_event=cancel)
+        print(f"   cancelled     {cancelled.module_status}")
+        assert cancelled.cancelled and not cancelled.implemented
+
+    server.shutdown()
+    print("\n[*] 測試通過：依依賴順序排程、獨立模組並行、可接續執行且支援取消。")
+
+if __name__ == "__main__":
+    run_pipeline_test()
@@ -0,0 +1,126 @@
+import io
+import os
+import time
+import contextlib
+import shutil
+import tempfile
+
+# 嘗試匯入分析器
+try:
+    import sys
+    sys.path.append("../src/Static")
+    import StructureAnalyzer
+    import ImportScanner
+    import CompactASTGraph
+    import PythonSourceParser
+except ImportError:
+    print("錯誤：找不到 ImportScanner，請確保檔案在正確目錄下。")
+    exit()
+
+def legacy_imports(code: str) -> set:
+    """舊版：建立完整流程圖，再以字串 replace/split 從 import 節點標籤取出第一個 token"""
+    g = CompactASTGraph.CompactASTGraph()
+    PythonSourceParser.PythonSourceParser(g, lazy_labels=True).analyze_code(code)
+    tokens = set()
+    for _, data in g.iter_nodes():
+        if data.get('type') == 'import':
+            label = data.get('label', '')
+            tokens.add(label.replace("from ", "").replace("import ", "").split(" ")[0].split('.')[0])
+    return tokens
+
+def generated_function(i: int) -> str:
+    """模擬 CodeImplementer 產出的函式檔"""
+    return f'''import os
+import json
+from db.models import User
+from . import helpers
+
+def handler_{i}(request, retries=3):
+    """處理第 {i} 個請求"""
+    import logging
+    log = logging.getLogger(__name__)
+    result = []
+    for attempt in range(retries):
+        try:
+            user = User.load(request["id"])
+            if user and user.active:
+                result.append(json.dumps({{"id": user.id, "attempt": attempt}}))
+                break
+        except KeyError as e:
+            log.warning("missing %s", e)
+        finally:
+            os.environ.get("TRACE")
+    return helpers.finish(result)
+'''
+
+def run_benchmark():
+    print("=== ImportScanner 正確性與效能測試 ===\n")
+
+    # 1. 各種 import 形式
+    cases = [
+        ("import a.b, c as d", None, {"a", "c"}),
+        ("from x.y import z", None, {"x"}),
+        ("from . import sibling", "auth", {"auth"}),
+        ("from .util import f", "auth", {"auth"}),
+        ("from ..db import q", "auth.sub", {"auth"}),     # auth.db
+        ("from ..db import q", "auth", {"db"}),          # 工作區根目錄下的 db
+        ("def f():\n    import lazy\n", None, {"lazy"}),
+        ("try:\n    import fast\nexcept ImportError:\n    import slow\n", None, {"fast", "slow"}),
+        ("x = 'import nothing'", None, set()),
+    ]
+    for code, package, expected in cases:
+        got = ImportScanner.top_level_imports(code, package)
+        assert got == expected, (code, got)
+    print(f"   legacy on 'import a.b, c as d' -> {sorted(legacy_imports('import a.b, c as d'))}  (new: ['a', 'c'])")
+    print(f"   legacy on 'from . import sibling' -> {sorted(legacy_imports('from . import sibling'))}  (new: ['auth'])")
+
+    # 2. verify_implementation_deps：單檔與批次結果一致
+    work_dir = tempfile.mkdtemp(prefix="import_scanner_")
+    try:
+        for pkg in ("db", "auth", "billing"):
+            os.makedirs(os.path.join(work_dir, pkg))
+            with open(os.path.join(work_dir, pkg, "base.py"), "w") as f:
+                f.write("import os\n")
+        paths = []
+        for i in range(200):
+            path = os.path.join(work_dir, "auth", f"handler_{i}.py")
+            with open(path, "w") as f:
+                f.write(generated_function(i) + ("import billing\n" if i % 50 == 0 else ""))
+            paths.append(path)
+        analyzer = StructureAnalyzer.StructureAnalyzer(work_dir, use_cache=False)
+        allowed = ["db", "auth"]
+
+        codes = []
+        for p in paths:
+            with open(p) as f:
+                codes.append(f.read())
+        start = time.perf_counter()
+        for code in codes:
+            legacy_imports(code)
+        t_legacy = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for code in codes:
+            ImportScanner.top_level_imports(code, "auth")
+        t_scan = (time.perf_counter() - start) * 1000
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            single = {p: analyzer.verify_implementation_deps(p, allowed) for p in paths}
+            t_single = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            batch = analyzer.verify_implementation_deps_batch([(p, allowed) for p in paths])
+            t_batch = (time.perf_counter() - start) * 1000
+        assert single == batch
+        assert [p for p, ok in batch.items() if not ok] == [paths[i] for i in range(0, 200, 50)]
+
+        print(f"\n   {len(paths)} generated files")
+        print(f"   import extraction: legacy graph {t_legacy:.1f} ms | ImportScanner {t_scan:.1f} ms "
+              f"({t_legacy / max(t_scan, 1e-6):.1f}x)")
+        print(f"   verify_implementation_deps: per file {t_single:.1f} ms | batch {t_batch:.1f} ms")
+    finally:
+        shutil.rmtree(work_dir)
+
+    print("\n[*] 測試通過：import 形式解析正確，批次與單檔檢查結果一致。")
+
+if __name__ == "__main__":
+    run_benchmark()
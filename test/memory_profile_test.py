@@ -0,0 +1,88 @@
+import textwrap
+
+# 嘗試匯入收集器
+try:
+    import sys
+    sys.path.append("../src/Dynamic")
+    from MetricCollector import MetricCollector
+except ImportError:
+    print("錯誤：找不到 MetricCollector，請確保檔案在同一目錄下。")
+    exit()
+
+# build: 返回前已釋放的暫時配置 (舊的「返回時 - 進入時」差值看不到)
+# leak: 每次呼叫留下 10KB；fact: 遞迴，每層 1000 bytes
+CODE = textwrap.dedent("""
+    cache = []
+
+    def build(n):
+        rows = [bytearray(1000) for _ in range(n)]
+        n = len(rows)
+        del rows
+        return n
+
+    def leak(n):
+        cache.append(bytearray(n))
+
+    def fact(n):
+        buf = bytearray(1000)
+        if n <= 1: return 1
+        return n * fact(n - 1)
+
+    def main():
+        build(1000)
+        for _ in range(10): leak(10000)
+        fact(20)
+
+    main()
+""")
+
+def check_profile(profile: dict, label: str):
+    funcs = profile["functions"]
+    print(f"   [{label}]")
+    for name in ("main", "build", "leak", "fact"):
+        f = funcs[name]
+        print(f"     {name:<6} calls={f['calls']:<3} peak={f['peak_bytes']:>9}B  retained={f['retained_bytes']:>8}B")
+    assert funcs["build"]["peak_bytes"] >= 1_000_000, "暫時配置應計入峰值"
+    assert funcs["build"]["retained_bytes"] < 10_000, "暫時配置已釋放，不應計入保留量"
+    assert funcs["main"]["peak_bytes"] >= funcs["build"]["peak_bytes"], "子呼叫的峰值也是呼叫者的峰值"
+    assert 19_000 <= funcs["fact"]["peak_bytes"] < 40_000, "遞迴：最外層呼叫的峰值包含 20 層緩衝區"
+    assert 100_000 <= funcs["leak"]["retained_bytes"] < 110_000
+    return funcs
+
+def run_memory_profile_test():
+    print("=== MetricCollector 記憶體剖析 (配置位置) 測試 ===\n")
+    collector = MetricCollector()
+
+    # 1. peak 模式：真實峰值與保留量
+    collector.execute_code(CODE)
+    profile = collector.getMemoryProfile()
+    assert profile["mode"] == "peak" and profile["top_sites"] == []
+    check_profile(profile, "peak")
+    assert collector.getBenchmarkData()["build"]["mem_peak"] >= 1_000_000
+
+    # 2. sites 模式：快照歸屬到程式行與呼叫鏈
+    collector.execute_code(CODE, memory="sites", snapshot_at=["build"])
+    profile = collector.getMemoryProfile()
+    funcs = check_profile(profile, "sites")
+    labels = [s["label"] for s in profile["snapshots"]]
+    assert labels == ["build:return", "end"], labels
+    top = profile["top_sites"][0]
+    print(f"\n   top site: line {top['line']} in {top['function']}(): {top['source']}  ({top['size_bytes']}B x{top['count']})")
+    assert top["function"] == "leak" and top["source"] == "cache.append(bytearray(n))" and top["size_bytes"] >= 100_000
+    assert funcs["leak"]["top_sites"][0]["line"] == top["line"]
+    assert profile["top_stacks"][0]["stack"] == ["<module>", "main", "leak"]
+    # 只選取目標函式時，其他函式的配置位置不輸出
+    filtered = collector.getMemoryProfile(target_funcs=["fact"])
+    assert list(filtered["functions"]) == ["fact"] and all(s["function"] == "fact" for s in filtered["top_sites"])
+
+    # 3. 隔離模式：worker 子行程的剖析結果完整還原
+    collector.execute_code(CODE, memory="sites", isolated=True)
+    isolated = collector.getMemoryProfile()
+    check_profile(isolated, "isolated")
+    assert isolated["top_sites"][0]["source"] == top["source"]
+    assert isolated["functions"]["leak"]["top_sites"], "函式層級的配置位置需一併還原"
+
+    print("\n[*] 測試通過：峰值不受返回前釋放與遞迴影響，配置位置歸屬正確。")
+
+if __name__ == "__main__":
+    run_memory_profile_test()
@@ -0,0 +1,114 @@
+import os
+import time
+import shutil
+import tempfile
+from collections import defaultdict
+
+# 嘗試匯入分析器
+try:
+    import sys
+    sys.path.append("../src/Static")
+    import StructureAnalyzer
+except ImportError:
+    print("錯誤：找不到 StructureAnalyzer，請確保檔案在正確目錄下。")
+    exit()
+
+def write(work_dir, name, imports, abstract=False):
+    header = "from abc import ABC, abstractmethod\n" + "".join(f"import {m}\n" for m in imports)
+    base = "(ABC)" if abstract else ""
+    body = f"""
+class {name.capitalize()}{base}:
+    def a(self):
+        self.x = 1
+    def b(self):
+        return self.x
+    def c(self):
+        self.y = 2
+"""
+    with open(os.path.join(work_dir, f"{name}.py"), "w") as f:
+        f.write(header + body)
+
+def reference_instability(analyzer, module_name):
+    """舊版：每次呼叫都遍歷全域依賴表計算 Ca"""
+    if module_name not in analyzer.graphs: return 0.0
+    ce = len(analyzer.dependencies.get(module_name, ()))
+    ca = sum(1 for other, imports in analyzer.dependencies.items() if other != module_name and module_name in imports)
+    return 0.5 if ca + ce == 0 else round(ce / (ca + ce), 2)
+
+def check_table(analyzer):
+    table = analyzer.compute_all_metrics()
+    assert set(table) == set(analyzer.summaries)
+    for mod, row in table.items():
+        assert row.instability == reference_instability(analyzer, mod), mod
+        assert row.coupling == analyzer.calculateCoupling(mod)
+        assert row.cohesion == analyzer.calculateCohesion(mod)
+        assert row.distance == round(abs(row.abstractness + row.instability - 1), 2)
+    # 反向索引必須與正向依賴一致
+    expected = defaultdict(set)
+    for mod, deps in analyzer.dependencies.items():
+        for d in deps:
+            expected[d].add(mod)
+    assert dict(analyzer.dependents) == dict(expected)
+    return table
+
+def run_metrics_test():
+    print("=== StructureAnalyzer 反向依賴索引 / 全專案指標表測試 ===\n")
+    work_dir = tempfile.mkdtemp(prefix="metrics_table_")
+    try:
+        # core <- (api, cli) <- app；util 抽象且無人依賴
+        write(work_dir, "core", [])
+        write(work_dir, "api", ["core"])
+        write(work_dir, "cli", ["core"])
+        write(work_dir, "app", ["api", "cli"])
+        write(work_dir, "util", [], abstract=True)
+        analyzer = StructureAnalyzer.StructureAnalyzer(work_dir, use_cache=False)
+
+        table = check_table(analyzer)
+        print(f"{'Module':<6} | {'Ca':<3} | {'Ce':<3} | {'I':<5} | {'A':<5} | {'D':<5} | LCOM4")
+        print("-" * 50)
+        for mod in sorted(table):
+            r = table[mod]
+            print(f"{mod:<6} | {r.ca:<3} | {r.ce:<3} | {r.instability:<5} | {r.abstractness:<5} | {r.distance:<5} | {r.avg_lcom4}")
+        assert (table["core"].ca, table["core"].ce, table["core"].instability) == (2, 0, 0.0)
+        assert table["app"].instability == 1.0 and table["util"].abstractness == 1.0
+        assert table["core"].avg_lcom4 == 2.0   # a/b 共用 x，c 單獨使用 y
+
+        # 單一檔案變更：只重算該模組與 Ca 受影響的模組
+        write(work_dir, "cli", ["core", "util"])
+        analyzer.invalidate(os.path.join(work_dir, "cli.py"))
+        print(f"\n   dirty after editing cli.py   {sorted(analyzer._dirty_metrics)}")
+        assert analyzer._dirty_metrics == {"cli", "util"}
+        table = check_table(analyzer)
+        assert table["util"].ca == 1 and table["cli"].ce == 2
+
+        # 刪除模組：內部模組清單改變，依賴全部重算，列也一併移除
+        os.remove(os.path.join(work_dir, "api.py"))
+        analyzer.invalidate(os.path.join(work_dir, "api.py"))
+        table = check_table(analyzer)
+        assert "api" not in table and table["core"].ca == 1
+
+        # 規模：500 個模組，逐一呼叫 (舊版 O(n^2)) vs 指標表
+        for i in range(500):
+            write(work_dir, f"m{i}", [f"m{j}" for j in range(max(0, i - 3), i)])
+        big = StructureAnalyzer.StructureAnalyzer(work_dir, use_cache=False, max_workers=1)
+        start = time.perf_counter()
+        for mod in big.summaries:
+            reference_instability(big, mod)
+        t_old = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        big.compute_all_metrics()
+        t_table = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for mod in big.summaries:
+            big.module_metrics(mod)
+        t_redraw = (time.perf_counter() - start) * 1000
+        print(f"\n   {len(big.summaries)} modules: per-module Ca scan {t_old:.1f} ms (instability only) | "
+              f"full table {t_table:.1f} ms | redraw lookups {t_redraw:.2f} ms")
+        check_table(big)
+    finally:
+        shutil.rmtree(work_dir)
+
+    print("\n[*] 測試通過：指標表與逐一計算一致，單檔變更只重算受影響的模組。")
+
+if __name__ == "__main__":
+    run_metrics_test()
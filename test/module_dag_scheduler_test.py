@@ -0,0 +1,71 @@
+import time
+import threading
+
+# 嘗試匯入排程器
+try:
+    import sys
+    sys.path.append("../src/Generate")
+    from ModuleDAG import ModuleDAG, DagScheduler
+except ImportError:
+    print("錯誤：找不到 ModuleDAG，請確保檔案在正確目錄下。")
+    exit()
+
+def run_scheduler_test():
+    print("=== ModuleDAG / DagScheduler 測試 ===\n")
+
+    # core <- (api, cli) <- app；util 獨立；slow 依賴 util
+    dag = ModuleDAG({
+        "core": [], "api": ["core"], "cli": ["core"], "app": ["api", "cli"],
+        "util": [], "slow": ["util", "ghost"],   # ghost 不在架構中，應被忽略
+    })
+    print(f"   waves          {dag.waves()}")
+    assert dag.waves() == [["core", "util"], ["api", "cli", "slow"], ["app"]]
+    assert dag.dependents("core") == ["api", "cli"]
+
+    cost = {"core": 0.10, "api": 0.10, "cli": 0.05, "app": 0.05, "util": 0.02, "slow": 0.30}
+    log = {}
+    lock = threading.Lock()
+
+    def work(m):
+        start = time.perf_counter()
+        time.sleep(cost[m])
+        with lock:
+            log[m] = (start, time.perf_counter())
+        return True
+
+    report = DagScheduler(dag, max_workers=2).run(dag.modules, work)
+    print(f"   status         {report.status}")
+    print(f"   summary        {report.summary()}")
+
+    for m, deps in {"api": ["core"], "cli": ["core"], "app": ["api", "cli"], "slow": ["util"]}.items():
+        for d in deps:
+            assert log[d][1] <= log[m][0], f"{m} 在 {d} 完成前開始"
+    # slow 只依賴 util：應在 core 完成前就開始，而不是等第一個 wave 全部結束
+    assert log["slow"][0] < log["core"][1], "依賴滿足的模組應立即開始"
+    assert set(report.status.values()) == {"done"}
+    assert report.critical_path == ["util", "slow"], report.critical_path
+    assert abs(report.critical_path_time - 0.32) < 0.05
+    assert report.idle_time >= 0 and 0 < report.utilization <= 1
+
+    # 失敗傳遞：core 失敗 -> api / cli / app 皆 blocked
+    failed = DagScheduler(dag, max_workers=2).run(["core", "api", "cli", "app"], lambda m: m != "core")
+    print(f"   on failure     {failed.status}")
+    assert failed.status == {"core": "failed", "api": "blocked", "cli": "blocked", "app": "blocked"}
+
+    # 批次外的依賴以 is_satisfied 判斷
+    outside = DagScheduler(dag, is_satisfied=lambda m: m != "core").run(["api", "util"], lambda m: True)
+    assert outside.status == {"api": "blocked", "util": "done"}
+
+    # 取消：不再啟動新模組
+    cancel = threading.Event()
+    def cancel_after(m):
+        cancel.set()
+        return True
+    cancelled = DagScheduler(dag, max_workers=1).run(["core", "api", "app"], cancel_after, cancel_event=cancel)
+    print(f"   cancelled      {cancelled.status}")
+    assert cancelled.status == {"core": "done", "api": "cancelled", "app": "cancelled"}
+
+    print("\n[*] 測試通過：依賴完成即解除阻擋、失敗與取消正確傳遞，關鍵路徑計算正確。")
+
+if __name__ == "__main__":
+    run_scheduler_test()
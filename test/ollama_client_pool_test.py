@@ -0,0 +1,190 @@
+import json
+import time
+import asyncio
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+
+# 嘗試匯入客戶端
+try:
+    import sys
+    sys.path.append("../src/Generate")
+    from OllamaClient import OllamaClient, _parse_chunk
+    from AsyncOllamaClient import AsyncOllamaClient
+except ImportError:
+    print("錯誤：找不到 OllamaClient，請確保檔案在同一目錄下。")
+    exit()
+
+class StubChatHandler(BaseHTTPRequestHandler):
+    """模擬 Ollama /api/chat 串流 (NDJSON + chunked，HTTP/1.1 keep-alive)"""
+    protocol_version = "HTTP/1.1"
+    first_token_delay = 0.05
+    token_delay = 0.01
+    malformed = False   # True 時在正常內容之間夾雜欄位型別錯誤的行
+
+    # 欄位型別不符的串流行 (logprobs 不是 dict 的列表、message 不是 dict ...)
+    BAD_CHUNKS = [
+        {"message": {"content": ""}, "logprobs": [1.0]},
+        {"message": "oops"},
+        {"message": {"content": ""}, "logprobs": {"logprob": -5}},
+        {"message": {"content": "", "logprobs": [None, {"logprob": "bad"}]}},
+        {"message": {"content": 3}},
+        [1, 2],
+    ]
+
+    request_count = 0
+    in_flight = 0
+    max_in_flight = 0
+    connections = set()
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _chunk(self, obj):
+        data = (json.dumps(obj) + "\n").encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = StubChatHandler
+        with cls.lock:
+            cls.request_count += 1
+            cls.connections.add(self.client_address)
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            tokens = ['{"ok":', ' true', ', "model": "' + body["model"] + '"}']
+            time.sleep(cls.first_token_delay)
+            for tok in tokens:
+                if cls.malformed:
+                    for bad in cls.BAD_CHUNKS: self._chunk(bad)
+                self._chunk({"message": {"role": "assistant", "content": tok},
+                             "logprobs": [{"token": tok, "logprob": -0.1}], "done": False})
+                time.sleep(cls.token_delay)
+            self._chunk({"message": {"role": "assistant", "content": ""}, "done": True})
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+def run_pool_test():
+    print("=== OllamaClient 連線池 / 並行限制 測試 (Stub Server) ===\n")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubChatHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    client = OllamaClient.shared(base_url)
+    assert OllamaClient.shared(base_url) is client, "shared() 應回傳同一實例"
+    client.set_concurrency(2, model="stub-model")
+
+    def one(i):
+        data, entropy, stats = client.chat_complete_json("stub-model", "sys", f"req {i}")
+        return data, entropy, stats
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(one, range(12)))
+    elapsed = time.perf_counter() - start
+
+    metrics = client.get_metrics()
+    server.shutdown()
+
+    for k, v in metrics.items():
+        print(f"   {k:<22} {v}")
+    print(f"   {'server_connections':<22} {len(StubChatHandler.connections)}")
+    print(f"   {'server_max_in_flight':<22} {StubChatHandler.max_in_flight}")
+    print(f"   {'wall_time_s':<22} {elapsed:.2f}")
+
+    assert all(r[0] == {"ok": True, "model": "stub-model"} for r in results), "串流內容組裝錯誤"
+    assert all(abs(r[1] - 0.1) < 1e-6 for r in results), "熵值計算錯誤"
+    assert all(r[2]["ttft_ms"] is not None and r[2]["ttft_ms"] <= r[2]["total_ms"] for r in results)
+    assert StubChatHandler.max_in_flight <= 2, "並行上限未生效"
+    assert metrics["requests"] == 12 and metrics["errors"] == 0
+    assert metrics["connections_reused"] > 0, "連線未被重用"
+    assert len(StubChatHandler.connections) <= 2, "應只開啟與並行上限相同數量的連線"
+    assert metrics["queue_wait_ms_max"] > 0, "超出上限的請求應該排隊"
+
+    print("\n[*] 測試通過：連線被重用、並行數受限，且統計數據正確。")
+
+def run_cache_test():
+    print("\n=== OllamaClient 回應快取測試 ===\n")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubChatHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = OllamaClient(f"http://127.0.0.1:{server.server_address[1]}")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        client.enable_cache(cache_dir, max_mb=1)
+        StubChatHandler.request_count = 0
+
+        first = client.chat_complete_json("stub-model", "sys", "same prompt")
+        second = client.chat_complete_json("stub-model", "sys", "same prompt")
+        bypass = client.chat_complete_json("stub-model", "sys", "same prompt", use_cache=False)
+        other = client.chat_complete_json("stub-model", "sys", "other prompt", temperature=0.7)
+
+        stats = client.get_cache_stats()
+        for k, v in stats.items():
+            print(f"   {k:<12} {v}")
+
+        assert first[2]["cached"] is False and second[2]["cached"] is True, "第二次相同請求應命中快取"
+        assert second[:2] == first[:2], "快取內容與熵值應與原始結果一致"
+        assert bypass[2]["cached"] is False, "use_cache=False 應略過快取"
+        assert StubChatHandler.request_count == 3, f"伺服器應只收到 3 個請求: {StubChatHandler.request_count}"
+        assert stats["hits"] == 1 and stats["misses"] == 2 and stats["entries"] == 2
+
+        # 容量上限：縮小上限後寫入新項目，最舊的項目應被淘汰
+        client.cache.max_bytes = 300
+        client.chat_complete_json("stub-model", "sys", "third prompt")
+        assert client.get_cache_stats()["evictions"] > 0, "超出容量應淘汰舊項目"
+
+    server.shutdown()
+    print("\n[*] 測試通過：相同請求命中快取、可略過快取，且容量上限生效。")
+
+def run_malformed_chunk_test():
+    print("\n=== 串流中欄位型別錯誤的行 ===\n")
+
+    # 只略過無法使用的部分，不拋出例外
+    assert _parse_chunk('{"message":{"content":"a"},"logprobs":[1.0]}') == ("a", [])
+    assert _parse_chunk('{"message":"oops"}') == ("", [])
+    assert _parse_chunk('{"message":{"content":"b","logprobs":[{"logprob":-0.5},{"logprob":null},7]}}') == ("b", [-0.5])
+    assert _parse_chunk('not json') == ("", [])
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubChatHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    StubChatHandler.malformed = True
+    try:
+        client = OllamaClient(base_url)
+        data, entropy, _ = client.chat_complete_json("stub-model", "sys", "prompt")
+        assert data == {"ok": True, "model": "stub-model"} and abs(entropy - 0.1) < 1e-6, (data, entropy)
+        assert client.get_metrics()["errors"] == 0
+
+        async def run_async():
+            aclient = AsyncOllamaClient(base_url, sync_client=client)
+            try:
+                return await aclient.chat_complete_json("stub-model", "sys", "async prompt")
+            finally:
+                await aclient.aclose()
+        data, entropy, _ = asyncio.run(run_async())
+        assert data == {"ok": True, "model": "stub-model"} and abs(entropy - 0.1) < 1e-6, (data, entropy)
+    finally:
+        StubChatHandler.malformed = False
+        server.shutdown()
+
+    print("[*] 測試通過：型別錯誤的串流行被略過，同步與非同步客戶端都能完成請求。")
+
+if __name__ == "__main__":
+    run_pool_test()
+    run_cache_test()
+    run_malformed_chunk_test()
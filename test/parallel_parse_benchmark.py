@@ -0,0 +1,118 @@
+import os
+import time
+import shutil
+import tempfile
+
+# 嘗試匯入分析器
+try:
+    import sys
+    sys.path.append("../src/Static")
+    import StructureAnalyzer
+    import ParseWorker
+except ImportError:
+    print("錯誤：找不到 StructureAnalyzer，請確保檔案在正確目錄下。")
+    exit()
+
+def make_module(i: int, n_methods: int) -> str:
+    """檔案大小刻意不均 (n_methods 不同)，驗證依大小平衡切批"""
+    lines = [f"import mod_{i - 1}" if i else "import os", "", f"class Worker{i}:"]
+    for m in range(n_methods):
+        lines += [f"    def step{m}(self, x):",
+                  f"        if x > {m}:",
+                  f"            self.acc{m % 5} = x * {m}",
+                  f"        for k in range(x):",
+                  f"            self.total += k",
+                  f"        return self.acc{m % 5}"]
+    return "\n".join(lines) + "\n"
+
+def count_parallel_calls() -> list:
+    """包裝 _parse_parallel，記錄每次實際走行程池路徑時的 worker 數"""
+    calls = []
+    original = StructureAnalyzer.StructureAnalyzer._parse_parallel
+    def counting(self, pending, workers):
+        calls.append(workers)
+        return original(self, pending, workers)
+    StructureAnalyzer.StructureAnalyzer._parse_parallel = counting
+    return calls
+
+def run_benchmark():
+    print("=== StructureAnalyzer 平行預處理擴展性測試 ===\n")
+    work_dir = tempfile.mkdtemp(prefix="parallel_parse_")
+    try:
+        n_files = 240
+        for i in range(n_files):
+            with open(os.path.join(work_dir, f"mod_{i}.py"), "w") as f:
+                f.write(make_module(i, 5 + (i * 7) % 60))
+
+        # 切批：LPT 讓每批位元組數接近
+        sizes = {f"f{i}": 1000 + (i * 7919) % 5000 for i in range(100)}
+        chunks = ParseWorker.balance_chunks(sizes, 8)
+        totals = [sum(sizes[p] for p in c) for c in chunks]
+        assert sorted(p for c in chunks for p in c) == sorted(sizes)
+        assert max(totals) - min(totals) <= max(sizes.values()), totals
+
+        calls = count_parallel_calls()
+        print(f"CPU cores: {os.cpu_count()}  files: {n_files}\n")
+        print(f"{'Workers':<8} | {'Chunks':<6} | {'Time (s)':<9} | Speedup")
+        print("-" * 40)
+        baseline = None
+        reference = None
+        for workers in (1, 2, 4, 8):
+            start = time.perf_counter()
+            analyzer = StructureAnalyzer.StructureAnalyzer(work_dir, use_cache=False, max_workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            stats = analyzer.last_preprocess
+            print(f"{workers:<8} | {stats['chunks']:<6} | {elapsed:<9.2f} | {baseline / elapsed:.2f}x")
+
+            assert stats['parsed'] == n_files and stats['workers'] == workers
+            assert calls == ([workers] if workers > 1 else []), f"max_workers={workers} 應{'使用' if workers > 1 else '不使用'}行程池: {calls}"
+            calls.clear()
+            result = (analyzer.summaries, dict(analyzer.dependencies),
+                      {m: analyzer.calculateCohesion(m) for m in ("mod_0", "mod_100")})
+            if reference is None:
+                reference = result
+            assert result == reference, "平行解析的結果必須與依序解析相同"
+            assert list(analyzer.summaries) == list(reference[0]), "合併順序應與走訪順序一致"
+
+        # 快取命中的檔案不再送進行程池
+        cached = StructureAnalyzer.StructureAnalyzer(work_dir, max_workers=4)
+        again = StructureAnalyzer.StructureAnalyzer(work_dir, max_workers=4)
+        print(f"\n   with cache: first {cached.last_preprocess}")
+        print(f"               again {again.last_preprocess}")
+        assert again.last_preprocess['parsed'] == 0 and again.last_preprocess['workers'] == 1
+        assert again.summaries == reference[0]
+        assert calls == [4], f"只有第一次 (未命中快取) 應使用行程池: {calls}"
+        calls.clear()
+
+        # 單核心：max_workers=None 依 CPU 數決定，退回本行程依序解析
+        real_cpu_count = StructureAnalyzer.os.cpu_count
+        StructureAnalyzer.os.cpu_count = lambda: 1
+        try:
+            single = StructureAnalyzer.StructureAnalyzer(work_dir, use_cache=False)
+        finally:
+            StructureAnalyzer.os.cpu_count = real_cpu_count
+        assert single.last_preprocess['workers'] == 1 and not calls, calls
+        assert single.summaries == reference[0]
+        StructureAnalyzer.os.cpu_count = lambda: 4
+        try:
+            assert single._resolve_workers(n_files) == 4
+        finally:
+            StructureAnalyzer.os.cpu_count = real_cpu_count
+
+        # 未達 PARALLEL_MIN_FILES：即使指定多個 worker 也依序解析
+        few = StructureAnalyzer.StructureAnalyzer.PARALLEL_MIN_FILES - 1
+        small_dir = os.path.join(work_dir, "small")
+        os.makedirs(small_dir)
+        for i in range(few):
+            with open(os.path.join(small_dir, f"mod_{i}.py"), "w") as f:
+                f.write(make_module(i, 5))
+        small = StructureAnalyzer.StructureAnalyzer(small_dir, use_cache=False, max_workers=4)
+        assert small.last_preprocess['parsed'] == few and small.last_preprocess['workers'] == 1 and not calls, calls
+    finally:
+        shutil.rmtree(work_dir)
+
+    print("\n[*] 測試通過：各 worker 數的結果一致，行程池只在檔案數達門檻且有多核心時使用，快取命中的檔案不重新解析。")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+
+# 嘗試匯入分析器與解析快取
+try:
+    import sys
+    sys.path.append("../src/Static")
+    import StructureAnalyzer
+    from ParseCache import ParseCache
+except ImportError:
+    print("錯誤：找不到 ParseCache，請確保檔案在正確目錄下。")
+    exit()
+
+FILES = {
+    "shop/__init__.py": "",
+    "shop/order.py": "from shop.price import price\n\ndef order(item):\n    return price(item) + 1\n",
+    "shop/price.py": "def price(item):\n    return len(item)\n",
+    "shop/refund.py": "from shop.price import price\n\ndef refund(item):\n    return -price(item)\n",
+}
+
+def write(root: str, rel: str, text: str):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+def entries(cache: ParseCache) -> set:
+    return set(os.listdir(cache.entry_dir)) if os.path.isdir(cache.entry_dir) else set()
+
+def callers_of_price(analyzer) -> set:
+    return {u for u, v in analyzer.get_call_graph().edges() if v.endswith("price")}
+
+def run_parse_cache_test():
+    print("=== ParseCache 內容雜湊快取測試 ===\n")
+    work_dir = tempfile.mkdtemp(prefix="parse_cache_")
+    try:
+        for rel, text in FILES.items():
+            write(work_dir, rel, text)
+
+        # 1. 首次掃描：全數解析並寫入快取
+        first = StructureAnalyzer.StructureAnalyzer(work_dir, max_workers=1)
+        assert first.last_preprocess["parsed"] == len(FILES) and first.last_preprocess["cached"] == 0, first.last_preprocess
+        assert os.path.exists(first.cache.index_path) and len(entries(first.cache)) >= 3
+
+        # 2. 內容未變：新的分析器 (模擬重新啟動) 全數命中快取
+        second = StructureAnalyzer.StructureAnalyzer(work_dir, max_workers=1)
+        assert second.last_preprocess["parsed"] == 0 and second.cache.hits == len(FILES), (second.last_preprocess, second.cache.hits)
+        assert second.summaries.keys() == first.summaries.keys()
+
+        # 3. 編輯一個檔案：只有它未命中並重新解析；舊內容的快取檔被清掉
+        old_digest = second.cache._index[os.path.join("shop", "price.py")]
+        write(work_dir, "shop/price.py", "def price(item):\n    return 2 * len(item)\n")
+        third = StructureAnalyzer.StructureAnalyzer(work_dir, max_workers=1)
+        assert third.last_preprocess["parsed"] == 1 and third.cache.hits == len(FILES) - 1, third.last_preprocess
+        assert third.cache._index[os.path.join("shop", "price.py")] != old_digest
+        assert f"{old_digest}.pkl" not in entries(third.cache), "不再被引用的快取檔應被 prune"
+
+        # 4. invalidate：刪除的檔案從索引移除；快取自身的 get / put / discard / prune
+        assert len(callers_of_price(third)) == 2
+        os.remove(os.path.join(work_dir, "shop", "refund.py"))
+        third.invalidate(os.path.join(work_dir, "shop", "refund.py"))
+        assert os.path.join("shop", "refund.py") not in third.cache._index
+        assert len(callers_of_price(third)) == 1
+
+        cache = ParseCache(work_dir)
+        digest = ParseCache.hash_content(b"x = 1\n")
+        assert cache.get("tmp.py", digest) is None and cache.misses == 1
+        cache.put("tmp.py", digest, {"graph": None, "summary": {}})
+        assert cache.get("tmp.py", digest) == {"graph": None, "summary": {}} and cache.hits == 1
+        assert cache.get("tmp.py", ParseCache.hash_content(b"x = 2\n")) is None
+        cache.discard("tmp.py")
+        assert "tmp.py" not in cache._index
+        cache.prune(set(cache._index))
+        assert f"{digest}.pkl" not in entries(cache), "沒有路徑引用的快取檔應被刪除"
+        cache.put("ghost.py", digest, {"graph": None, "summary": {}})
+        cache.prune({os.path.join("shop", "order.py")})
+        assert set(cache._index) == {os.path.join("shop", "order.py")}
+        assert entries(cache) == {f"{cache._index[os.path.join('shop', 'order.py')]}.pkl"}
+
+        # 5. refresh：改名後重新掃描，呼叫圖不可殘留舊檔案的邊
+        analyzer = StructureAnalyzer.StructureAnalyzer(work_dir, max_workers=1)
+        before = callers_of_price(analyzer)
+        assert len(before) == 1 and any("order" in u for u in before), before
+        os.rename(os.path.join(work_dir, "shop", "order.py"), os.path.join(work_dir, "shop", "checkout.py"))
+        analyzer.refresh()
+        after = callers_of_price(analyzer)
+        assert after == {"shop.checkout.order"}, after
+        assert analyzer.last_preprocess["parsed"] == 1, analyzer.last_preprocess
+
+        # 同大小改寫並還原 mtime (呼叫圖索引以 mtime + size 判斷變更)：refresh 仍須重建呼叫圖
+        path = os.path.join(work_dir, "shop", "checkout.py")
+        st = os.stat(path)
+        text = FILES["shop/order.py"].replace("price(item)", "len(item)  ").replace("from shop.price import price", "# " + " " * 26)
+        assert len(text) == st.st_size
+        write(work_dir, "shop/checkout.py", text)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        analyzer.refresh()
+        assert not callers_of_price(analyzer), callers_of_price(analyzer)
+        print(f"   callers of price: {sorted(before)} -> {sorted(after)} -> []")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\n[*] 測試通過：內容未變時命中快取，編輯、刪除與改名都會讓快取與呼叫圖同步更新。")
+
+if __name__ == "__main__":
+    run_parse_cache_test()
@@ -0,0 +1,107 @@
+import time
+import textwrap
+
+# 嘗試匯入解析器
+try:
+    import sys
+    sys.path.append("../src/Static")
+    import ASTGraph
+    import PythonSourceParser
+except ImportError:
+    print("錯誤：找不到 PythonSourceParser，請確保檔案在正確目錄下。")
+    exit()
+
+SAMPLE = textwrap.dedent('''\
+    import os
+    from abc import ABC, abstractmethod
+
+    class Base:
+        class Inner:
+            @abstractmethod
+            def run(self): ...
+
+        def load(self, path):
+            """docstring 不產生節點"""
+            # 註解行不計入 real_loc
+            if self.cache and path in self.cache:
+                return self.cache[path]
+            for i, (k, v) in enumerate(self.items.items()):
+                print(k, v)
+            while (n := self.next()) is not None:
+                self.total += n
+            try:
+                data = open(path).read()
+            except OSError:
+                data = self.fallback(
+                    path,
+                    "預設值")
+            self.cache[path] = data; return data
+
+    def main():
+        b = Base()
+        return b.load("x")
+    ''')
+
+def parse(code, lazy):
+    g = ASTGraph.ASTGraph()
+    PythonSourceParser.PythonSourceParser(g, lazy_labels=lazy).analyze_code(code)
+    return g
+
+def shape(g):
+    """節點屬性 (含標籤) 依建立順序排列，邊以節點序號表示"""
+    ids = [n for n, _ in g.iter_nodes()]
+    index = {n: i for i, n in enumerate(ids)}
+    nodes = []
+    for n in ids:
+        d = {k: v for k, v in g.get_node_info(n).items() if k != 'label_src'}
+        d['label'] = g.get_label(n)
+        if 'accessed_fields' in d: d['accessed_fields'] = sorted(d['accessed_fields'])
+        nodes.append(d)
+    edges = sorted((index[u], index[v], c) for u in ids for v, c in g.get_next_steps(u))
+    return nodes, edges
+
+def nested_classes(depth):
+    lines = []
+    for i in range(depth):
+        pad = "    " * i
+        lines.append(f"{pad}class C{i}:")
+        lines.append(f"{pad}    def m{i}(self): self.f{i} = {i}")
+    lines.append("    " * depth + "@abstractmethod")
+    lines.append("    " * depth + "def leaf(self): pass")
+    return "\n".join(lines) + "\n"
+
+def run_parser_test():
+    print("=== PythonSourceParser 單次走訪 / 延遲標籤 測試 ===\n")
+
+    eager, lazy = parse(SAMPLE, False), parse(SAMPLE, True)
+    pending = sum(1 for _, d in lazy.iter_nodes() if 'label' not in d)
+    print(f"   nodes          {len(eager)}  (lazy 模式未產生標籤: {pending})")
+    assert pending > 0, "延遲模式不應在解析時產生 process 標籤"
+    assert shape(eager) == shape(lazy), "延遲標籤必須與即時模式一致"
+
+    nodes = {d.get('label'): d for _, d in eager.iter_nodes()}
+    assert nodes['For (i, (k, v)) in enumerate(self.items.items())?']['type'] == 'loop'
+    assert nodes['import os']['type'] == 'import'
+    assert nodes['class Inner']['is_abstract'] and nodes['class Base']['is_abstract']
+    assert nodes['def load']['real_loc'] == 15, nodes['def load']['real_loc']
+    try_node = next(d for label, d in nodes.items() if label.startswith('try:'))
+    assert sorted(try_node['accessed_fields']) == ['fallback'] and try_node['parent_method'] == 'load'
+    assert sorted(nodes['self.total += n']['accessed_fields']) == ['total']
+    assert nodes["b = Base()"]['accessed_fields'] == []
+
+    # 巢狀類別：舊版每一層都重新 ast.walk 整個子樹 (O(depth^2))
+    print(f"\n{'Depth':<8} | {'Parse (ms)':<10} | abstract classes")
+    print("-" * 40)
+    for depth in (20, 40, 80):
+        code = nested_classes(depth)
+        start = time.perf_counter()
+        g = parse(code, True)
+        elapsed = (time.perf_counter() - start) * 1000
+        abstract = sum(1 for _, d in g.iter_nodes() if d.get('type') == 'class' and d.get('is_abstract'))
+        print(f"{depth:<8} | {elapsed:<10.2f} | {abstract}")
+        assert abstract == depth
+
+    print("\n[*] 測試通過：延遲標籤與即時模式一致，欄位存取、抽象類別與真實行數正確。")
+
+if __name__ == "__main__":
+    run_parser_test()
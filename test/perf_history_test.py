@@ -0,0 +1,139 @@
+import os
+import json
+import random
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+# 嘗試匯入效能歷史與版本控制
+try:
+    import sys
+    sys.path.append("../src/Dynamic")
+    sys.path.append("../src/System")
+    sys.path.append("../src/Static")
+    sys.path.append("../src/GUI")
+    sys.path.append("../src")
+    from PerfHistory import PerfHistory, mann_whitney
+    from VersionController import VersionController
+    import git
+    from TrafficLightManager import TrafficLightManager
+    import MetaCoder
+except ImportError:
+    print("錯誤：找不到 PerfHistory，請確保檔案在正確目錄下。")
+    exit()
+
+def noisy(median: float, n: int = 20, seed: int = 0) -> list:
+    """帶長尾雜訊的計時樣本"""
+    rng = random.Random(seed)
+    return [median * (1 + abs(rng.gauss(0, 0.03))) + (median * 0.5 if rng.random() < 0.1 else 0) for _ in range(n)]
+
+def result(samples: list) -> dict:
+    ordered = sorted(samples)
+    return {"status": "ok", "median_us": ordered[len(ordered) // 2], "p95_us": ordered[-1], "mad_us": 0.0,
+            "ci_low_us": ordered[0], "ci_high_us": ordered[-1], "samples": samples}
+
+def commit_file(vc: VersionController, path: str, text: str, msg: str) -> str:
+    with open(path, "w") as f:
+        f.write(text)
+    return vc.archiveVersion(msg)
+
+def run_perf_history_test():
+    print("=== PerfHistory 版本效能基準與退化偵測測試 ===\n")
+    work_dir = tempfile.mkdtemp(prefix="perf_")
+    try:
+        # 1. Mann-Whitney：同分佈不顯著，明顯變慢則 p 值極小
+        same = mann_whitney(noisy(100, seed=1), noisy(100, seed=2))
+        slower = mann_whitney(noisy(100, seed=1), noisy(130, seed=3))
+        assert same["p_slower"] > 0.01 and same["p_faster"] > 0.01, same
+        assert slower["p_slower"] < 1e-4 and slower["p_faster"] > 0.9, slower
+        assert mann_whitney([1.0] * 5, [1.0] * 5)["p_slower"] == 1.0
+        print(f"   same distribution p={min(same['p_slower'], same['p_faster']):.2f} | 30% slower p={slower['p_slower']:.1e}")
+
+        # 2. 以 VersionController 的 commit 為鍵；與最近一個有結果的祖先比較
+        mod_dir = os.path.join(work_dir, "core")
+        os.makedirs(mod_dir)
+        vc = VersionController(work_dir)
+        impl = os.path.join(mod_dir, "parse.py")
+        c1 = commit_file(vc, impl, "def parse(s):\n    return s\n", "v1")
+        c2 = commit_file(vc, impl, "def parse(s):\n    return s.strip()\n", "v2 (no benchmark)")
+        c3 = commit_file(vc, impl, "def parse(s):\n    return s.strip().lower()\n", "v3")
+        assert vc.currentVersion() == c3 and vc.getAncestors(c3)[:3] == [c3, c2, c1]
+        with open(os.path.join(work_dir, ".gitignore")) as f:
+            assert ".benchmarks.json" in f.read().splitlines(), "基準測試結果不進版本歷史"
+
+        history = PerfHistory(work_dir)
+        assert history.record(c1, "core", {"parse": result(noisy(10, seed=4)), "split": result(noisy(5, seed=5))},
+                              ancestors=vc.getAncestors(c1)) == []
+        cmps = {c.function: c for c in history.record(
+            c3, "core", {"parse": result(noisy(14, seed=6)), "split": result(noisy(5, seed=7)),
+                         "broken": {"status": "timeout"}}, ancestors=vc.getAncestors(c3))}
+        assert set(cmps) == {"parse", "split"}, "失敗的量測不記錄"
+        assert cmps["parse"].verdict == "regression" and cmps["parse"].baseline_commit == c1, cmps["parse"]
+        assert 0.3 < cmps["parse"].change < 0.5
+        assert cmps["split"].verdict == "unchanged"
+        print(f"   parse {cmps['parse'].baseline_median_us:.2f} -> {cmps['parse'].median_us:.2f} us "
+              f"({cmps['parse'].change:+.0%}, p={cmps['parse'].p_value:.1e})")
+
+        # 3. 存放在 .metacoder_cache；新的實例讀回相同資料
+        reloaded = PerfHistory(work_dir)
+        assert os.path.exists(os.path.join(work_dir, ".metacoder_cache", "perf_history.json"))
+        assert reloaded.status("core", "parse").verdict == "regression"
+        assert "1 slower" in reloaded.summary(c3) and reloaded.summary(c2) == ""
+        assert {c.function for c in reloaded.comparisons(c3)} == {"parse", "split"}
+
+        # 4. 再次量測：修好後以 c3 為基準顯示改善，燈號不再標紅
+        meta = SimpleNamespace(workspace_root=work_dir, perf_history=history, bench=None,
+                               collector=SimpleNamespace(getBenchmarkData=lambda: {"parse": {"avg_ms": 0.01},
+                                                                                    "split": {"avg_ms": 0.01}}))
+        with open(os.path.join(mod_dir, "spec.json"), "w") as f:
+            json.dump({"functions": [{"name": "parse"}, {"name": "split"}]}, f)
+        light = TrafficLightManager(meta)
+        assert light.get_color("function", "runtime_analysis", "parse", parent_mod="core") == light.RED
+        assert light.get_color("function", "runtime_analysis", "split", parent_mod="core") == light.GREEN
+        assert light.get_color("module", "runtime_analysis", "core") == light.YELLOW
+
+        c4 = commit_file(vc, impl, "def parse(s):\n    return s.strip()\n", "v4")
+        fixed = history.record(c4, "core", {"parse": result(noisy(10, seed=8))}, ancestors=vc.getAncestors(c4))
+        assert fixed[0].verdict == "improvement" and fixed[0].baseline_commit == c3
+        assert light.get_color("function", "runtime_analysis", "parse", parent_mod="core") == light.GREEN
+        assert light.get_color("module", "runtime_analysis", "core") == light.GREEN
+
+        # 5. MetaCoder.run_benchmarks：歸檔時一併提交了未歸檔的編輯，歷史中標記為快照
+        meta = MetaCoder.MetaCoder(work_dir)
+        meta.vc.archiveVersion("clean tree")
+        meta.run_benchmarks("core", ["parse"], inputs={"parse": [" Ab "]})
+        clean = meta.vc.currentVersion()
+        assert meta.perf_history._load()["commits"][clean].get("dirty") is None
+        with open(impl, "w") as f:
+            f.write("def parse(s):\n    return s.strip().upper()\n")
+        meta.run_benchmarks("core", ["parse"], inputs={"parse": [" Ab "]})
+        snapshot = meta.vc.currentVersion()
+        assert snapshot != clean and meta.vc.getHistory(1)[0]["message"].endswith("Benchmark snapshot: core")
+        assert meta.perf_history._load()["commits"][snapshot]["dirty"] is True
+        assert meta.perf_history.summary(snapshot).endswith("(snapshot)"), meta.perf_history.summary(snapshot)
+        meta.file_watcher.stop()
+
+        # 6. 舊工作區：補上的 .gitignore 規則立即提交，不會讓第一次基準測試快照被標記為含未歸檔編輯
+        legacy = os.path.join(work_dir, "legacy")
+        os.makedirs(legacy)
+        with open(os.path.join(legacy, ".gitignore"), "w") as f:
+            f.write("__pycache__/\n")
+        with open(os.path.join(legacy, "main.py"), "w") as f:
+            f.write("print('hi')\n")
+        repo = git.Repo.init(legacy)
+        repo.index.add([".gitignore", "main.py"])
+        head = repo.index.commit("legacy").hexsha
+        with open(os.path.join(legacy, "main.py"), "a") as f:
+            f.write("print('pending')\n")
+        vc = VersionController(legacy)
+        assert vc.repo.head.commit.message.startswith("Ignore .metacoder_cache/, .benchmarks.json, .test_cache.json")
+        assert vc.repo.head.commit.hexsha != head and ".gitignore" not in vc.repo.git.status("--porcelain")
+        assert vc.repo.git.status("--porcelain").strip() == "M main.py", "使用者的未歸檔編輯不可被一併提交"
+        assert VersionController(legacy).repo.head.commit == vc.repo.head.commit, "規則已存在時不再提交"
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\n[*] 測試通過：效能結果依 commit 保存，顯著變慢的函式在燈號與歷史中標示。")
+
+if __name__ == "__main__":
+    run_perf_history_test()
@@ -0,0 +1,144 @@
+import time
+import textwrap
+
+# 嘗試匯入收集器
+try:
+    import sys
+    sys.path.append("../src/Dynamic")
+    from MetricCollector import MetricCollector
+except ImportError:
+    print("錯誤：找不到 MetricCollector，請確保檔案在同一目錄下。")
+    exit()
+
+def run_overhead_report():
+    print("=== 量測開銷比較：trace vs sampling ===\n")
+
+    # CPU 密集的熱迴圈：trace 模式每一行都會觸發事件，最能凸顯開銷差距
+    code = textwrap.dedent("""
+        def inner(n):
+            s = 0
+            for i in range(n):
+                s += i * i
+            return s
+
+        def outer():
+            total = 0
+            for _ in range(30):
+                total += inner(20000)
+            return total
+
+        outer()
+    """)
+
+    collector = MetricCollector()
+    report = collector.measureOverhead(code, repeats=3)
+
+    row_fmt = "{:<12} | {:>12} | {:>10}"
+    print(row_fmt.format("Mode", "Wall (ms)", "Overhead"))
+    print("-" * 40)
+    print(row_fmt.format("baseline", f"{report['baseline_ms']:.2f}", "1.00x"))
+    print(row_fmt.format("trace", f"{report['trace_ms']:.2f}", f"{report['trace_overhead_x']:.2f}x"))
+    print(row_fmt.format("sampling", f"{report['sampling_ms']:.2f}", f"{report['sampling_overhead_x']:.2f}x"))
+    print(f"\n   (Samples: {report['samples']}, Interval: {report['sample_interval_ms']}ms)")
+
+    # 取樣模式的輸出格式需與 trace 模式一致
+    bench = collector.getBenchmarkData()
+    coverage = collector.getCodeCoverage()
+    assert "inner" in bench and "outer" in bench, f"sampling 未捕捉到目標函式: {list(bench)}"
+    assert set(bench["inner"]) == {"calls", "time_ms", "avg_ms", "cpu_ms", "mem_peak", "file", "qualname"}
+    assert "inner" in coverage and coverage["inner"], "sampling 未產生覆蓋率熱點"
+    assert report["sampling_overhead_x"] < report["trace_overhead_x"], "sampling 應比 trace 便宜"
+
+    print("\n[*] 測試通過：sampling 模式輸出與 trace 模式同形，且開銷較低。")
+
+def run_backend_parity_check():
+    print("\n=== 追蹤後端一致性：settrace vs sys.monitoring ===\n")
+
+    # 涵蓋遞迴、generator、例外展開、單行迴圈
+    code = textwrap.dedent("""
+        def fib(n):
+            if n < 2: return n
+            return fib(n - 1) + fib(n - 2)
+
+        def gen():
+            for i in range(3):
+                yield i
+
+        def boom():
+            raise ValueError("x")
+
+        def main():
+            fib(10)
+            list(gen())
+            try: boom()
+            except ValueError: pass
+            for _ in range(50): fib(3)
+
+        main()
+    """)
+
+    collector = MetricCollector()
+    results = {}
+    for backend in ("settrace", "auto"):
+        start = time.perf_counter()
+        collector.execute_code(code, backend=backend)
+        elapsed = (time.perf_counter() - start) * 1000
+        results[collector.backend] = (
+            {n: d["calls"] for n, d in collector.getBenchmarkData().items()},
+            collector.getCodeCoverage(),
+            [(c["caller"], c["callee"]) for c in collector.getCallHistory()],
+        )
+        print(f"   {collector.backend:<12} {elapsed:8.2f} ms")
+
+    if "monitoring" not in results:
+        print("\n[*] 略過：此直譯器不支援 sys.monitoring (需要 Python 3.12+)。")
+        return
+
+    assert results["settrace"] == results["monitoring"], "兩種追蹤後端的輸出不一致"
+    print("\n[*] 測試通過：兩種追蹤後端的呼叫次數、覆蓋率與呼叫紀錄完全一致。")
+
+def run_shared_monitoring_check():
+    print("\n=== sys.monitoring 與其他工具 (除錯器) 共用 ===\n")
+    mon = getattr(sys, "monitoring", None)
+    if mon is None:
+        print("[*] 略過：此直譯器不支援 sys.monitoring (需要 Python 3.12+)。")
+        return
+
+    def probe():
+        x = 1
+        return x
+
+    # 模擬除錯器：每行只需要通知一次，之後回傳 DISABLE
+    seen = []
+    def on_line(code, line):
+        seen.append(line)
+        return mon.DISABLE
+
+    code = "def f(n):\n    return n if n < 2 else f(n - 1) + f(n - 2)\n\nf(8)\n"
+    collector = MetricCollector()
+    collector.execute_code(code, backend="settrace", coverage="presence")
+    expected = collector.getCodeCoverage()
+
+    mon.use_tool_id(mon.DEBUGGER_ID, "debugger-probe")
+    try:
+        mon.register_callback(mon.DEBUGGER_ID, mon.events.LINE, on_line)
+        mon.set_local_events(mon.DEBUGGER_ID, probe.__code__, mon.events.LINE)
+        probe(); probe()
+        assert len(seen) == 2, seen
+
+        for _ in range(2):
+            collector.execute_code(code, backend="monitoring", coverage="presence")
+            assert collector.backend == "monitoring" and collector.getCodeCoverage() == expected
+        probe()
+        assert len(seen) == 2, "收集器不可恢復其他工具停用的事件 (restart_events)"
+    finally:
+        mon.set_local_events(mon.DEBUGGER_ID, probe.__code__, mon.events.NO_EVENTS)
+        mon.register_callback(mon.DEBUGGER_ID, mon.events.LINE, None)
+        mon.free_tool_id(mon.DEBUGGER_ID)
+
+    print("[*] 測試通過：與除錯器共用 sys.monitoring 時不干擾其事件，覆蓋率仍與 settrace 一致。")
+
+if __name__ == "__main__":
+    run_overhead_report()
+    run_backend_parity_check()
+    run_shared_monitoring_check()
@@ -0,0 +1,126 @@
+import os
+import json
+import shutil
+import tempfile
+import textwrap
+
+# 嘗試匯入測試執行器與版本控制
+try:
+    import sys
+    sys.path.append("../src/Dynamic")
+    sys.path.append("../src/System")
+    from TestRunner import TestRunner
+    from VersionController import VersionController
+except ImportError:
+    print("錯誤：找不到 TestRunner，請確保檔案在正確目錄下。")
+    exit()
+
+FILES = {
+    "calc/__init__.py": "",
+    "calc/spec.json": json.dumps({"module_name": "calc", "dependencies": ["base"]}),
+    # add 與 scale 都呼叫同模組的輔助函式 _norm (不屬於任何測試檔名對應的實作檔)
+    "calc/helpers.py": "def _norm(x):\n    return int(x)\n",
+    "calc/add.py": "from .helpers import _norm\n\ndef add(a, b):\n    return _norm(a) + _norm(b)\n",
+    "calc/scale.py": "from .helpers import _norm\n\ndef scale(a, k):\n    return _norm(a) * k\n",
+    "calc/slow.py": "import time\n\ndef slow():\n    time.sleep(0.2)\n    return 1\n",
+    "calc/tests/__init__.py": "",
+    "calc/tests/test_add.py": """
+        import unittest
+        from ..add import add
+
+        class TestAdd(unittest.TestCase):
+            def test_ints(self):
+                self.assertEqual(add(1, 2), 3)
+
+            def test_floats(self):
+                self.assertEqual(add(1.9, 2.9), 3)
+    """,
+    "calc/tests/test_scale.py": """
+        import unittest
+        from ..scale import scale
+
+        class TestScale(unittest.TestCase):
+            def test_scale(self):
+                self.assertEqual(scale(2.7, 3), 6)
+    """,
+    "calc/tests/test_slow.py": """
+        import unittest
+        from ..slow import slow
+
+        class TestSlow(unittest.TestCase):
+            def test_slow(self):
+                self.assertEqual(slow(), 1)
+    """,
+    "base/__init__.py": "",
+    "base/const.py": "ZERO = 0\n",
+}
+
+def build_workspace(root: str):
+    for rel, text in FILES.items():
+        path = os.path.join(root, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(textwrap.dedent(text))
+
+def edit(root: str, rel: str, text: str):
+    with open(os.path.join(root, rel), "w") as f:
+        f.write(text)
+
+def run_test_runner_cache_test():
+    print("=== TestRunner 平行執行與結果快取測試 ===\n")
+    work_dir = tempfile.mkdtemp(prefix="runner_")
+    try:
+        build_workspace(work_dir)
+        runner = TestRunner(work_dir, max_workers=2)
+
+        # 1. 以測試檔為單位分派到 worker 行程，結果依函式彙整
+        first = runner.run_module_tests_detailed("calc")
+        assert first.results == {"add": True, "scale": True, "slow": True}, first.results
+        assert sorted(first.executed_files) == [os.path.join("tests", f"test_{n}.py") for n in ("add", "scale", "slow")]
+        assert not first.cached_files
+
+        # 2. 每個測試的耗時，以及每個函式所有測試的總和
+        assert len(first.durations) == 4 and all(d >= 0 for d in first.durations.values()), first.durations
+        slow_id = next(t for t in first.durations if t.endswith("test_slow"))
+        assert first.durations[slow_id] >= 0.2 and first.func_durations["slow"] >= 0.2
+        add_ids = [t for t in first.durations if ".test_add." in t]
+        assert abs(first.func_durations["add"] - sum(first.durations[t] for t in add_ids)) < 1e-5
+        print(f"   first run {first.wall_time}s, slow test {first.durations[slow_id]:.3f}s")
+
+        # 3. 內容未變：全數沿用快取，不再執行
+        second = runner.run_module_tests_detailed("calc")
+        assert second.results == first.results and not second.executed_files
+        assert len(second.cached_files) == 3 and second.durations == first.durations
+        assert second.wall_time < first.durations[slow_id], "命中快取時不應再執行慢的測試"
+
+        # 4. 只改同模組的輔助檔：呼叫它的測試都要重新執行 (不能回報舊的通過結果)
+        edit(work_dir, "calc/helpers.py", "def _norm(x):\n    return round(x)\n")
+        third = runner.run_module_tests_detailed("calc")
+        assert sorted(third.executed_files) == sorted(first.executed_files), third.executed_files
+        assert third.results == {"add": False, "scale": False, "slow": True}, third.results
+
+        # 5. 失敗的結果不快取；修好後重新執行並再次快取
+        fourth = runner.run_module_tests_detailed("calc")
+        assert len(fourth.executed_files) == 2 and fourth.cached_files == [os.path.join("tests", "test_slow.py")]
+        edit(work_dir, "calc/helpers.py", "def _norm(x):\n    return int(x)\n")
+        assert all(runner.run_module_tests("calc").values())
+        assert len(runner.run_module_tests_detailed("calc").cached_files) == 3
+
+        # 6. 宣告的依賴模組變更同樣使快取失效
+        edit(work_dir, "base/const.py", "ZERO = 0.0\n")
+        assert len(runner.run_module_tests_detailed("calc").executed_files) == 3
+
+        # 7. 快取檔不進版本歷史
+        assert os.path.exists(os.path.join(work_dir, "calc", TestRunner.CACHE_FILE))
+        vc = VersionController(work_dir)
+        with open(os.path.join(work_dir, ".gitignore")) as f:
+            assert TestRunner.CACHE_FILE in f.read().splitlines()
+        vc.archiveVersion("snapshot")
+        assert not any(p.endswith(TestRunner.CACHE_FILE) for p in vc.repo.git.ls_files().splitlines())
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print("\n[*] 測試通過：測試檔平行執行並計時，快取在同模組或依賴的原始碼變更時失效。")
+
+if __name__ == "__main__":
+    run_test_runner_cache_test()